@@ -2,6 +2,9 @@
 """
 Batch upload salary statement files (給料明細) from D:\給料明細\
 Uploads all .xlsm files to the backend API
+
+For historical backfills without the API running, use bulk_ingest.py
+(parallel parsing, direct bulk writes, resumable).
 """
 
 import os
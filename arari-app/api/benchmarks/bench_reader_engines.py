@@ -0,0 +1,78 @@
+"""
+Benchmark: workbook reader engines
+===================================
+Compares the SalaryStatementParser engines on a synthetic workbook:
+
+- openpyxl:  full workbook load, cell-by-cell access
+- streaming: openpyxl read-only, rows 1-60 snapshotted per sheet
+- xml:       direct XML reader (xlsx_reader.XlsxGridReader)
+
+Run from arari-app/api:
+    python -m benchmarks.bench_reader_engines --sheets 40 --employees 12
+"""
+
+import argparse
+import contextlib
+import io
+import tempfile
+import time
+from pathlib import Path
+from statistics import median
+
+from benchmarks.synthetic_payroll import build_payroll_workbook
+from salary_parser import SalaryStatementParser
+from template_manager import TemplateManager
+
+
+def _time(func, repeat: int) -> float:
+    """Median wall time of `repeat` runs (parser progress output is discarded)"""
+    timings = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+    return median(timings)
+
+
+def run(sheets: int, employees: int, repeat: int) -> None:
+    content = build_payroll_workbook(sheet_count=sheets, employees_per_sheet=employees)
+    print(f"Workbook: {sheets} sheets x {employees} employees, {len(content) / 1024:.0f} KB")
+
+    tmp = tempfile.TemporaryDirectory()
+    manager = TemplateManager(db_path=Path(tmp.name) / 'templates.db')
+
+    results = {}
+    for engine in SalaryStatementParser.ENGINES:
+        parser = SalaryStatementParser(use_intelligent_mode=False, template_manager=manager, engine=engine)
+
+        def load_grids():
+            wb = parser._load_workbook(content)
+            for name in wb.sheetnames:
+                parser._sheet_view(wb[name])
+            wb.close()
+
+        def parse():
+            return SalaryStatementParser(
+                use_intelligent_mode=False, template_manager=manager, engine=engine
+            ).parse(content)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            records = len(parse())
+        results[engine] = (_time(load_grids, repeat), _time(parse, repeat), records)
+
+    tmp.cleanup()
+
+    baseline = results['openpyxl'][1]
+    print(f"{'engine':<10} {'load (ms)':>10} {'parse (ms)':>11} {'records':>8} {'speedup':>8}")
+    for engine, (load, parse, records) in results.items():
+        print(f"{engine:<10} {load * 1000:>10.1f} {parse * 1000:>11.1f} {records:>8} {baseline / parse:>7.1f}x")
+
+
+if __name__ == '__main__':
+    cli = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    cli.add_argument('--sheets', type=int, default=40)
+    cli.add_argument('--employees', type=int, default=12)
+    cli.add_argument('--repeat', type=int, default=3)
+    args = cli.parse_args()
+    run(args.sheets, args.employees, args.repeat)
@@ -0,0 +1,230 @@
+"""
+Parser benchmark suite
+======================
+Times the parsers on synthetic workbooks of several sizes:
+
+- salary_parse:      SalaryStatementParser.parse (給与明細, templates warm)
+- template_analyze:  TemplateGenerator.analyze_worksheet over every sheet
+- employee_master:   DBGenzaiXParser.parse_employees (社員台帳)
+
+For each case: median wall time, peak Python memory (tracemalloc, separate
+run) and records/sec. Results can be saved as a baseline and later runs
+compared against it; a case slower than the baseline by more than
+--tolerance is reported as a regression (exit code 1).
+
+Run from arari-app/api:
+    python -m benchmarks.run_benchmarks --save-baseline
+    python -m benchmarks.run_benchmarks               # compare with baseline
+    python -m benchmarks.run_benchmarks --sizes small --repeat 1
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from io import BytesIO
+from pathlib import Path
+from statistics import median
+from typing import Any, Callable, Dict, List, Optional
+
+import openpyxl
+
+from benchmarks.synthetic_payroll import build_employee_master, build_payroll_workbook, write_workbook
+from employee_parser import DBGenzaiXParser
+from salary_parser import SalaryStatementParser
+from template_manager import TemplateGenerator, TemplateManager
+
+
+DEFAULT_BASELINE = Path(__file__).parent / 'baseline.json'
+DEFAULT_TOLERANCE = 0.25  # 25% slower than baseline = regression
+
+# size -> (factory sheets, employees per sheet, employee master rows)
+SIZES = {
+    'small': (5, 8, 500),
+    'medium': (20, 12, 2000),
+    'large': (60, 15, 6000),
+}
+
+
+def measure(func: Callable[[], int], repeat: int) -> Dict[str, Any]:
+    """
+    Time func() `repeat` times (median) and measure its peak memory once.
+
+    func returns the number of records it produced. Output printed by the
+    parsers is discarded.
+    """
+    timings = []
+    records = 0
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            records = func()
+            timings.append(time.perf_counter() - start)
+
+    # tracemalloc slows Python down: separate, untimed run
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    wall = median(timings)
+    return {
+        'wall_seconds': round(wall, 4),
+        'peak_memory_mb': round(peak / 1024 / 1024, 2),
+        'records': records,
+        'records_per_second': round(records / wall, 1) if wall > 0 else None,
+    }
+
+
+def run_suite(sizes: List[str], repeat: int, engine: str) -> Dict[str, Dict[str, Any]]:
+    """Run every case for every size. Returns {case_name: result}"""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        for size in sizes:
+            sheets, employees, master_rows = SIZES[size]
+
+            payroll_path = write_workbook(
+                build_payroll_workbook(sheet_count=sheets, employees_per_sheet=employees),
+                tmp_dir / f'給与明細_{size}.xlsm',
+            )
+            master_path = write_workbook(
+                build_employee_master(master_rows, sheet_count=sheets, employees_per_sheet=employees),
+                tmp_dir / f'社員台帳_{size}.xlsm',
+            )
+
+            # Steady state: templates for every factory already exist
+            manager = TemplateManager(db_path=tmp_dir / f'templates_{size}.db')
+            with contextlib.redirect_stdout(io.StringIO()):
+                SalaryStatementParser(template_manager=manager, engine=engine).parse(payroll_path)
+
+            def salary_parse():
+                parser = SalaryStatementParser(template_manager=manager, engine=engine)
+                return len(parser.parse(payroll_path))
+
+            wb = openpyxl.load_workbook(BytesIO(payroll_path.read_bytes()), data_only=True)
+            worksheets = [wb[name] for name in wb.sheetnames if name not in SalaryStatementParser.SKIP_SHEETS]
+
+            def template_analyze():
+                generator = TemplateGenerator()
+                return sum(1 for ws in worksheets if generator.analyze_worksheet(ws, ws.title))
+
+            def employee_master():
+                employees_found, _ = DBGenzaiXParser().parse_employees(str(master_path))
+                return len(employees_found)
+
+            cases = [
+                ('salary_parse', salary_parse),
+                ('template_analyze', template_analyze),
+                ('employee_master', employee_master),
+            ]
+            for case, func in cases:
+                name = f'{case}[{size}]'
+                print(f"  running {name}...", file=sys.stderr)
+                results[name] = measure(func, repeat)
+
+            wb.close()
+
+    return results
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+            tolerance: float = DEFAULT_TOLERANCE) -> List[Dict[str, Any]]:
+    """
+    Compare results with a baseline.
+
+    Returns one row per case present in both, with the wall time ratio
+    (current / baseline) and whether it counts as a regression.
+    """
+    rows = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base or not base.get('wall_seconds'):
+            continue
+        ratio = result['wall_seconds'] / base['wall_seconds']
+        rows.append({
+            'case': name,
+            'baseline_seconds': base['wall_seconds'],
+            'current_seconds': result['wall_seconds'],
+            'ratio': round(ratio, 2),
+            'regression': ratio > 1 + tolerance,
+        })
+    return rows
+
+
+def load_baseline(path: Path) -> Optional[Dict[str, Dict[str, Any]]]:
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding='utf-8'))['results']
+
+
+def save_baseline(path: Path, results: Dict[str, Dict[str, Any]], engine: str) -> None:
+    payload = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'engine': engine,
+        'results': results,
+    }
+    path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding='utf-8')
+
+
+def print_results(results: Dict[str, Dict[str, Any]], comparison: List[Dict[str, Any]]) -> None:
+    ratios = {row['case']: row for row in comparison}
+    print(f"{'case':<28} {'wall (ms)':>10} {'peak (MB)':>10} {'records':>8} {'rec/s':>10} {'vs base':>8}")
+    for name, result in results.items():
+        row = ratios.get(name)
+        versus = f"{row['ratio']:.2f}x" + (' !' if row['regression'] else '') if row else '-'
+        print(f"{name:<28} {result['wall_seconds'] * 1000:>10.1f} {result['peak_memory_mb']:>10.2f} "
+              f"{result['records']:>8} {result['records_per_second'] or 0:>10.0f} {versus:>8}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    cli = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    cli.add_argument('--sizes', nargs='+', choices=list(SIZES), default=['small', 'medium'])
+    cli.add_argument('--repeat', type=int, default=3)
+    cli.add_argument('--engine', choices=SalaryStatementParser.ENGINES, default='xml')
+    cli.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE)
+    cli.add_argument('--save-baseline', action='store_true', help='Store these results as the new baseline')
+    cli.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    cli.add_argument('--json', type=Path, help='Also write the results to this file')
+    args = cli.parse_args(argv)
+
+    results = run_suite(args.sizes, args.repeat, args.engine)
+
+    baseline = None if args.save_baseline else load_baseline(args.baseline)
+    comparison = compare(results, baseline, args.tolerance) if baseline else []
+    print_results(results, comparison)
+
+    if args.json:
+        args.json.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding='utf-8')
+
+    if args.save_baseline:
+        save_baseline(args.baseline, results, args.engine)
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+
+    if baseline is None:
+        print(f"\nNo baseline at {args.baseline} (run with --save-baseline to create one)")
+        return 0
+
+    regressions = [row for row in comparison if row['regression']]
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.tolerance:.0%}: "
+              + ', '.join(row['case'] for row in regressions))
+        return 1
+    print(f"\nNo regressions (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
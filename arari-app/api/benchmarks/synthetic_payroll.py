@@ -0,0 +1,251 @@
+"""
+Synthetic workbooks for benchmarks
+===================================
+給与明細 (payroll) workbooks with the real layout of the monthly files:
+one sheet per factory (派遣先), employee blocks 14 columns wide, fixed rows
+from SalaryStatementParser.FALLBACK_ROW_POSITIONS, hours split into hours +
+minutes columns, 有給 days next to the 有給休暇 amount, dynamic allowance zone in
+rows 20-29, plus styled cells, a formula footer and rows past 60 that the
+parser ignores.
+
+社員台帳 (employee master) workbooks with a DBGenzaiX sheet for
+DBGenzaiXParser.
+
+Usage:
+    from benchmarks.synthetic_payroll import build_payroll_workbook
+    content = build_payroll_workbook(sheet_count=40, employees_per_sheet=12)
+"""
+
+import random
+from datetime import datetime, timedelta
+from io import BytesIO
+from pathlib import Path
+from typing import List, Union
+
+import openpyxl
+from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+from openpyxl.utils import get_column_letter
+
+from salary_parser import SalaryStatementParser
+
+
+ROWS = SalaryStatementParser.FALLBACK_ROW_POSITIONS
+OFFSETS = SalaryStatementParser.COLUMN_OFFSETS
+EMPLOYEE_COLUMN_WIDTH = SalaryStatementParser.EMPLOYEE_COLUMN_WIDTH
+
+# Label written in the label column of each fixed row
+FIXED_LABELS = {
+    'work_days': '出勤日数',
+    'paid_leave_days': '有給日数',
+    'work_hours': '労働時間',
+    'overtime_hours': '残業時間',
+    'night_hours': '深夜時間',
+    'base_salary': '基本給',
+    'overtime_pay': '残業手当',
+    'night_pay': '深夜手当',
+    'gross_salary': '総支給額',
+    'social_insurance': '健康保険',
+    'welfare_pension': '厚生年金',
+    'employment_insurance': '雇用保険',
+    'income_tax': '所得税',
+    'resident_tax': '住民税',
+    'net_salary': '差引支給額',
+}
+
+# Fields whose value sits in the days column / has a minutes column
+# (有給日数 is in the value column; 有給 days of the dynamic zone use the days column)
+DAY_FIELDS = ('work_days',)
+MINUTE_FIELDS = ('work_hours', 'overtime_hours', 'night_hours')
+DEDUCTION_FIELDS = ('social_insurance', 'welfare_pension', 'employment_insurance', 'income_tax', 'resident_tax')
+
+# Dynamic zone labels seen in real files (label, amount range, has days)
+DYNAMIC_LABELS = [
+    ('有給休暇', (5000, 20000), True),
+    ('60H過残業', (5000, 30000), False),
+    ('通勤手当(非)', (2000, 15000), False),
+    ('ガソリン代', (3000, 10000), False),
+    ('皆勤手当', (3000, 5000), False),
+    ('職務手当', (5000, 20000), False),
+    ('寮費', (20000, 40000), False),
+    ('弁当', (3000, 8000), False),
+]
+
+FACTORY_NAMES = [
+    '高雄工業 本社', '高雄工業 岡山', 'プレテック', 'ユアサ工機', '三和精工', '東洋電装',
+    '中部金型', '日進化成', '丸菱工業', '大和技研', '北陸樹脂', '浜松精密',
+]
+
+FAMILY_NAMES = ['グエン', 'チャン', 'サントス', 'シルバ', '山田', '佐藤', 'レ', 'ファム']
+GIVEN_NAMES = ['ヴァン', 'ティ', 'マリア', 'ジョアン', '太郎', '花子', 'ミン', 'アン']
+
+
+def factory_names(count: int) -> List[str]:
+    """Unique sheet names (real names first, then numbered variants)"""
+    names = []
+    for i in range(count):
+        base = FACTORY_NAMES[i % len(FACTORY_NAMES)]
+        names.append(base if i < len(FACTORY_NAMES) else f"{base} {i // len(FACTORY_NAMES) + 1}")
+    return names
+
+
+def employee_ids(sheet_count: int, employees_per_sheet: int) -> List[str]:
+    """Employee IDs used by build_payroll_workbook (in sheet/block order)"""
+    return [f"{200000 + seq:06d}" for seq in range(1, sheet_count * employees_per_sheet + 1)]
+
+
+def build_payroll_workbook(sheet_count: int = 40, employees_per_sheet: int = 12,
+                           extra_rows: int = 30, seed: int = 0,
+                           period: datetime = datetime(2025, 1, 31)) -> bytes:
+    """
+    Build a synthetic 給与明細 workbook.
+
+    Args:
+        sheet_count: Number of factory sheets (plus one 集計 summary sheet)
+        employees_per_sheet: Employee blocks per sheet
+        extra_rows: Rows after row 60 with notes (ignored by the parser)
+        seed: Random seed (same seed -> same workbook)
+        period: Date written to the period row of every employee block
+
+    Returns:
+        Workbook bytes (.xlsx/.xlsm package)
+    """
+    rng = random.Random(seed)
+    wb = openpyxl.Workbook()
+    summary = wb.active
+    summary.title = '集計'
+    summary['A1'] = '給与集計'
+
+    thin = Side(style='thin')
+    border = Border(top=thin, bottom=thin, left=thin, right=thin)
+    header_font = Font(bold=True, name='ＭＳ ゴシック')
+    fill = PatternFill('solid', fgColor='DDEBF7')
+
+    ids = iter(employee_ids(sheet_count, employees_per_sheet))
+    for sheet_index, name in enumerate(factory_names(sheet_count)):
+        ws = wb.create_sheet(name)
+        ws['A1'] = f'{name} 給与明細'
+        ws['A1'].font = header_font
+
+        for idx in range(employees_per_sheet):
+            base = 1 + idx * EMPLOYEE_COLUMN_WIDTH
+            label_col = base + OFFSETS['label']
+            value_col = base + OFFSETS['value']
+            days_col = base + OFFSETS['days']
+            minutes_col = base + OFFSETS['minutes']
+
+            emp_id = ws.cell(row=ROWS['employee_id'], column=base + OFFSETS['employee_id'], value=next(ids))
+            emp_id.font = header_font
+            ws.cell(row=ROWS['name'], column=base + OFFSETS['name'],
+                    value=f"{rng.choice(FAMILY_NAMES)} {rng.choice(GIVEN_NAMES)}")
+            period_cell = ws.cell(row=ROWS['period'], column=base + OFFSETS['period'], value=period)
+            period_cell.number_format = 'yyyy"年"m"月"'
+
+            hourly = rng.choice([1200, 1300, 1450])
+            values = {
+                'work_days': rng.choice([18, 20, 21, 22]),
+                'paid_leave_days': rng.choice([0, 0, 1, 2]),
+                'work_hours': rng.choice([152, 160, 168, 176]),
+                'overtime_hours': rng.choice([0, 12, 25, 40, 61, 73]),
+                'night_hours': rng.choice([0, 8, 16]),
+                'social_insurance': 14000, 'welfare_pension': 25000, 'employment_insurance': 1300,
+                'income_tax': 4000, 'resident_tax': rng.choice([0, 8000]),
+            }
+            values['base_salary'] = values['work_hours'] * hourly
+            values['overtime_pay'] = int(values['overtime_hours'] * hourly * 1.25)
+            values['night_pay'] = int(values['night_hours'] * hourly * 0.25)
+
+            dynamic_total = 0
+            dynamic = rng.sample(DYNAMIC_LABELS, rng.randint(1, 5))
+            for offset, (text, (low, high), has_days) in enumerate(dynamic):
+                row = SalaryStatementParser.DYNAMIC_ZONE_START + offset
+                amount = rng.randint(low, high)
+                dynamic_total += amount
+                ws.cell(row=row, column=label_col, value=text)
+                ws.cell(row=row, column=value_col, value=amount).number_format = '#,##0'
+                if has_days:
+                    ws.cell(row=row, column=days_col, value=max(values['paid_leave_days'], 1))
+
+            values['gross_salary'] = (values['base_salary'] + values['overtime_pay']
+                                      + values['night_pay'] + dynamic_total)
+            values['net_salary'] = values['gross_salary'] - sum(values[f] for f in DEDUCTION_FIELDS)
+
+            for field, text in FIXED_LABELS.items():
+                row = ROWS[field]
+                label_cell = ws.cell(row=row, column=label_col, value=text)
+                label_cell.border = border
+                label_cell.fill = fill
+                target = days_col if field in DAY_FIELDS else value_col
+                cell = ws.cell(row=row, column=target, value=values[field])
+                cell.number_format = '#,##0'
+                cell.border = border
+                if field in MINUTE_FIELDS:
+                    ws.cell(row=row, column=minutes_col, value=rng.choice([0, 0, 15, 30, 45]))
+
+            # Footer beyond the parsed region: formulas and notes
+            letter = get_column_letter(value_col)
+            ws.cell(row=55, column=value_col, value=f'=SUM({letter}16:{letter}18)')
+            for extra in range(extra_rows):
+                note = ws.cell(row=61 + extra, column=label_col, value=f'備考 {extra + 1}')
+                note.alignment = Alignment(wrap_text=True)
+
+        summary.cell(row=sheet_index + 3, column=1, value=name)
+        summary.cell(row=sheet_index + 3, column=2, value=f"='{name}'!D30")
+
+    output = BytesIO()
+    wb.save(output)
+    return output.getvalue()
+
+
+def build_employee_master(employee_count: int = 1000, seed: int = 0,
+                          sheet_count: int = 40, employees_per_sheet: int = 12) -> bytes:
+    """
+    Build a synthetic 社員台帳 workbook (DBGenzaiX sheet, header in row 2).
+
+    The first employees reuse the IDs of build_payroll_workbook(sheet_count,
+    employees_per_sheet), so both files can be imported together.
+    """
+    rng = random.Random(seed)
+    wb = openpyxl.Workbook()
+    cover = wb.active
+    cover.title = '表紙'
+    cover['A1'] = '社員台帳'
+
+    ws = wb.create_sheet('DBGenzaiX')
+    ws['A1'] = '現在社員一覧'
+    headers = ['社員№', '氏名', 'カナ', '派遣先', '時給', '請求単価', '現在', '入社日', '性別', '生年月日', '退社日']
+    for col, header in enumerate(headers, 1):
+        ws.cell(row=2, column=col, value=header)
+
+    ids = employee_ids(sheet_count, employees_per_sheet)
+    factories = factory_names(sheet_count)
+    for i in range(employee_count):
+        row = 3 + i
+        terminated = rng.random() < 0.1
+        hire = datetime(2018, 1, 1) + timedelta(days=rng.randint(0, 2500))
+        hourly = rng.choice([1200, 1300, 1450])
+        values = [
+            ids[i] if i < len(ids) else f"{300000 + i:06d}",
+            f"{rng.choice(FAMILY_NAMES)} {rng.choice(GIVEN_NAMES)}",
+            'テスト',
+            factories[i // employees_per_sheet % len(factories)],
+            hourly,
+            hourly + rng.choice([300, 400, 500]),
+            '退社' if terminated else '在籍中',
+            hire,
+            rng.choice(['男', '女']),
+            datetime(1980, 1, 1) + timedelta(days=rng.randint(0, 9000)),
+            hire + timedelta(days=400) if terminated else None,
+        ]
+        for col, value in enumerate(values, 1):
+            ws.cell(row=row, column=col, value=value)
+
+    output = BytesIO()
+    wb.save(output)
+    return output.getvalue()
+
+
+def write_workbook(content: bytes, path: Union[str, Path]) -> Path:
+    """Write workbook bytes to `path` (e.g. 給与明細_2025年1月.xlsm)"""
+    path = Path(path)
+    path.write_bytes(content)
+    return path
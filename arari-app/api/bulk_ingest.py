@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Offline bulk ingestion of salary statement files (給料明細)
+
+Loads workbooks straight into the database, without the API:
+
+- Files are parsed in parallel worker processes (folder_sync.parse_files,
+  the same parser and pool as /api/sync-from-folder)
+- One writer (this process) saves records with PayrollService's bulk insert
+  and commits many files per transaction (--commit-files / --commit-records);
+  a file that fails is rolled back to its savepoint, the others are kept
+- Resume: every file's sync manifest entry (folder_sync.py) is committed
+  with its records, so an interrupted run picks up where it stopped and
+  files already imported by the API are skipped too (--restart ignores it)
+- Throughput (files/s, records/s, MB/s) is printed after each commit
+
+Use it for historical backfills; batch_upload_salary_files.py sends files
+through the running API one at a time.
+
+Uso:
+    python bulk_ingest.py D:/給料明細
+    python bulk_ingest.py D:/給料明細 --recursive --workers 8
+    python bulk_ingest.py 2023/*.xlsm --db ./arari_pro.db --restart
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import database
+from folder_sync import parse_files
+from ingestion import PARSER_ENGINE, ParsedFileWriter, plan_sync
+from salary_parser import SalaryStatementParser, shutdown_parse_pool
+from template_manager import TemplateManager
+
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+DEFAULT_COMMIT_FILES = 25
+DEFAULT_COMMIT_RECORDS = 20000
+
+
+class ThroughputStats:
+    """Counters and rates of a bulk run"""
+
+    def __init__(self, files_total: int):
+        self.files_total = files_total
+        self.started = time.perf_counter()
+        self.files_done = 0
+        self.files_imported = 0
+        self.files_partial = 0
+        self.files_failed = 0
+        self.records = 0
+        self.saved = 0
+        self.skipped = 0
+        self.errors = 0
+        self.bytes = 0
+        self.write_seconds = 0.0
+        self.commits = 0
+
+    @property
+    def elapsed(self) -> float:
+        return max(time.perf_counter() - self.started, 1e-9)
+
+    def add(self, info: Dict[str, Any], written: Optional[Dict[str, Any]]) -> None:
+        self.files_done += 1
+        self.bytes += info['size']
+        if written is None:
+            self.files_failed += 1
+            return
+        if written['status'] == 'imported':
+            self.files_imported += 1
+        else:
+            self.files_partial += 1
+        self.records += written['records']
+        self.saved += written['saved']
+        self.skipped += written['skipped']
+        self.errors += written['errors']
+
+    def line(self) -> str:
+        elapsed = self.elapsed
+        return (
+            f"[BULK] {self.files_done}/{self.files_total} files, {self.saved:,} records saved "
+            f"({self.files_done / elapsed:.1f} files/s, {self.saved / elapsed:,.0f} rec/s, "
+            f"{self.bytes / elapsed / (1024 * 1024):.1f} MB/s, {elapsed:.1f}s)"
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        elapsed = self.elapsed
+        return {
+            'files_total': self.files_total,
+            'files_done': self.files_done,
+            'files_imported': self.files_imported,
+            'files_partial': self.files_partial,
+            'files_failed': self.files_failed,
+            'records_parsed': self.records,
+            'records_saved': self.saved,
+            'records_skipped': self.skipped,
+            'record_errors': self.errors,
+            'megabytes': round(self.bytes / (1024 * 1024), 2),
+            'commits': self.commits,
+            'seconds': round(elapsed, 2),
+            'write_seconds': round(self.write_seconds, 2),
+            'files_per_second': round(self.files_done / elapsed, 2),
+            'records_per_second': round(self.saved / elapsed, 1),
+        }
+
+
+class BulkIngestor:
+    """Parallel parse + single bulk writer for a list of files"""
+
+    def __init__(self, conn: sqlite3.Connection, template_manager: TemplateManager,
+                 workers: int = DEFAULT_WORKERS, commit_files: int = DEFAULT_COMMIT_FILES,
+                 commit_records: int = DEFAULT_COMMIT_RECORDS, engine: str = PARSER_ENGINE,
+                 kind: str = 'auto', restart: bool = False, out=None):
+        self.conn = conn
+        self.template_manager = template_manager
+        self.workers = max(1, workers)
+        self.commit_files = max(1, commit_files)
+        self.commit_records = max(1, commit_records)
+        self.engine = engine
+        self.kind = kind
+        self.restart = restart
+        # Progress lines go here even while parser output is redirected
+        self.out = out or sys.stdout
+        self.failures: List[Dict[str, str]] = []
+
+    def log(self, message: str) -> None:
+        print(message, file=self.out, flush=True)
+
+    def run(self, files: List[Path]) -> Dict[str, Any]:
+        """Import files; returns throughput stats and failures"""
+        # Checkpoint: files whose manifest entry says they are imported are skipped
+        _, pending = plan_sync(self.conn, files, force=self.restart)
+        self.conn.commit()
+        stats = ThroughputStats(len(pending))
+        self.log(f"[BULK] {len(files)} files, {len(files) - len(pending)} already imported, "
+                 f"{len(pending)} to import ({self.workers} workers)")
+        if not pending:
+            return {**stats.to_dict(), 'files_already_imported': len(files), 'failures': []}
+
+        writer = ParsedFileWriter(self.conn, self.template_manager, record_metrics=False)
+        tasks = [
+            (key, writer.parse_args(key, info['kind'] if self.kind == 'auto' else self.kind, self.engine))
+            for key, info in pending.items()
+        ]
+
+        batch_files = batch_records = 0
+        for key, result in parse_files(tasks, self.workers):
+            info = pending[key]
+            write_started = time.perf_counter()
+
+            # New templates are written by TemplateManager on its own connection:
+            # commit first so it does not wait on this transaction's lock
+            if not isinstance(result, Exception) and result['pending_templates'] and self.conn.in_transaction:
+                self._commit(stats)
+                batch_files = batch_records = 0
+            if not isinstance(result, Exception):
+                writer.save_templates(result)
+
+            written = self._write_file(writer, key, info, result)
+            stats.add(info, written)
+            stats.write_seconds += time.perf_counter() - write_started
+
+            batch_files += 1
+            batch_records += written['records'] if written else 0
+            if batch_files >= self.commit_files or batch_records >= self.commit_records:
+                self._commit(stats)
+                batch_files = batch_records = 0
+
+        self._commit(stats)
+        return {
+            **stats.to_dict(),
+            'files_already_imported': len(files) - len(pending),
+            'failures': self.failures,
+        }
+
+    def _write_file(self, writer: ParsedFileWriter, key: str, info: Dict[str, Any],
+                    result: Any) -> Optional[Dict[str, Any]]:
+        """Write one file inside a savepoint (None if it failed)"""
+        if not self.conn.in_transaction:
+            self.conn.execute("BEGIN")
+        self.conn.execute("SAVEPOINT bulk_file")
+        try:
+            if isinstance(result, Exception):
+                raise result
+            written = writer.write(key, info, result)
+            self.conn.execute("RELEASE SAVEPOINT bulk_file")
+            return written
+        except Exception as e:
+            self.conn.execute("ROLLBACK TO SAVEPOINT bulk_file")
+            self.conn.execute("RELEASE SAVEPOINT bulk_file")
+            writer.record_failure(key, info, str(e))
+            self.failures.append({'file': key, 'error': str(e)})
+            self.log(f"[WARN] {Path(key).name}: {e}")
+            return None
+
+    def _commit(self, stats: ThroughputStats) -> None:
+        if self.conn.in_transaction:
+            self.conn.commit()
+            stats.commits += 1
+            self.log(stats.line())
+
+
+def collect_files(paths: List[str], pattern: str = '*.xlsm', recursive: bool = False) -> List[Path]:
+    """Files named on the command line plus the matching files of directories"""
+    files = []
+    for name in paths:
+        path = Path(name)
+        if path.is_dir():
+            files.extend(path.rglob(pattern) if recursive else path.glob(pattern))
+        elif path.is_file():
+            files.append(path)
+        else:
+            print(f"[WARN] Not found: {name}")
+    # Office lock files (~$...) are never workbooks
+    return sorted({f for f in files if not f.name.startswith('~$')})
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Offline bulk ingestion of 給料明細 files')
+    parser.add_argument('paths', nargs='+', help='Files or folders to import')
+    parser.add_argument('--db', type=Path, default=database.DB_PATH, help='SQLite database (default: arari_pro.db)')
+    parser.add_argument('--pattern', default='*.xlsm', help='File pattern inside folders (default: *.xlsm)')
+    parser.add_argument('--recursive', action='store_true', help='Search folders recursively')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Parser processes')
+    parser.add_argument('--commit-files', type=int, default=DEFAULT_COMMIT_FILES,
+                        help='Files per transaction')
+    parser.add_argument('--commit-records', type=int, default=DEFAULT_COMMIT_RECORDS,
+                        help='Commit once a transaction holds this many records')
+    parser.add_argument('--engine', choices=SalaryStatementParser.ENGINES, default=PARSER_ENGINE)
+    parser.add_argument('--kind', choices=('auto', 'payroll', 'generic'), default='auto',
+                        help="Parser: 'payroll' (給与明細), 'generic' (CSV-like sheets) or by file name")
+    parser.add_argument('--restart', action='store_true', help='Ignore the checkpoint and re-import everything')
+    parser.add_argument('--verbose', action='store_true', help='Show parser output')
+    args = parser.parse_args(argv)
+
+    files = collect_files(args.paths, args.pattern, args.recursive)
+    if not files:
+        print("No files to import")
+        return 1
+
+    database.DB_PATH = args.db
+    with contextlib.redirect_stdout(io.StringIO()):
+        database.init_db()
+    conn = database.get_connection()
+    # Bigger page cache for long write transactions
+    conn.execute("PRAGMA cache_size = -65536")
+    conn.execute("PRAGMA temp_store = MEMORY")
+
+    ingestor = BulkIngestor(
+        conn, TemplateManager(db_path=args.db), workers=args.workers,
+        commit_files=args.commit_files, commit_records=args.commit_records,
+        engine=args.engine, kind=args.kind, restart=args.restart, out=sys.stdout,
+    )
+    try:
+        # Parser progress is printed per sheet: keep only the [BULK] lines
+        quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+        with quiet:
+            result = ingestor.run(files)
+    except KeyboardInterrupt:
+        conn.rollback()
+        print("\n[BULK] Interrupted: committed files are kept, run again to resume")
+        return 130
+    finally:
+        shutdown_parse_pool()
+        conn.close()
+
+    print("\n" + "=" * 70)
+    print("BULK INGESTION SUMMARY")
+    print("=" * 70)
+    print(f"  Files:   {result['files_done']} processed, {result['files_already_imported']} already imported")
+    print(f"           {result['files_imported']} imported, {result['files_partial']} partial, "
+          f"{result['files_failed']} failed")
+    print(f"  Records: {result['records_saved']:,} saved, {result['records_skipped']:,} skipped, "
+          f"{result['record_errors']:,} errors")
+    print(f"  Time:    {result['seconds']}s ({result['write_seconds']}s writing, {result['commits']} commits)")
+    print(f"  Rate:    {result['files_per_second']} files/s, {result['records_per_second']:,} records/s, "
+          f"{result['megabytes']} MB")
+    for failure in result['failures'][:20]:
+        print(f"  FAIL {Path(failure['file']).name}: {failure['error']}")
+    print("=" * 70)
+
+    return 0 if not result['failures'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
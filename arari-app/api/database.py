@@ -3,32 +3,64 @@ Database configuration and initialization
 SQLite database for 粗利 PRO
 """
 
+import importlib
 import sqlite3
 from pathlib import Path
 from contextlib import contextmanager
 
+from fastapi import Request
+
+from db_pool import connect, get_pool
+from migrations import BACKFILL_MODE, Backfill, Migration, migrate, pending_backfills
+from periods import PERIOD_KEY_SQL, set_period_key_fallback
+
 # Database file path
 DB_PATH = Path(__file__).parent / "arari_pro.db"
 
+# Requests served from the read pool (everything else uses the write pool)
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
 def get_connection():
-    """Create a new database connection"""
-    conn = sqlite3.connect(str(DB_PATH), check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    # Enable foreign key constraints (disabled by default in SQLite)
-    conn.execute("PRAGMA foreign_keys = ON")
-    return conn
-
-def get_db():
-    """Dependency for FastAPI to get database connection"""
+    """Create a new (unpooled) database connection, WAL mode and tuned PRAGMAs"""
+    return connect(DB_PATH)
+
+def get_db(request: Request):
+    """
+    Dependency for FastAPI to get database connection.
+
+    Connections come from the pools in db_pool.py (read pool for GET/HEAD,
+    write pool otherwise) and go back when the request ends; uncommitted
+    changes are rolled back, as with close().
+    """
+    pool = get_pool(DB_PATH, 'read' if request.method in READ_METHODS else 'write')
+    conn = pool.acquire()
+    try:
+        yield conn
+    finally:
+        pool.release(conn)
+
+def get_ingest_db():
+    """
+    Dependency for uploads and folder syncs: a connection of their own.
+
+    They hold it for the whole parse, so it is not taken from the pools
+    (a few concurrent uploads would starve every other request), as with
+    the upload jobs (JobRunner). Their writes go through the DB writer.
+    """
     conn = get_connection()
     try:
         yield conn
     finally:
         conn.close()
 
-def init_db():
-    """Initialize the database with tables"""
-    conn = get_connection()
+@contextmanager
+def read_connection():
+    """Read-pool connection outside the request dependency (released on exit)"""
+    with get_pool(DB_PATH, 'read').connection() as conn:
+        yield conn
+
+def _create_core_schema(conn: sqlite3.Connection):
+    """Migration 1: core tables, columns added over time, indexes, settings, templates"""
     cursor = conn.cursor()
 
     # Create employees table
@@ -131,6 +163,7 @@ def init_db():
         ("birth_date", "TEXT"),          # 生年月日: YYYY-MM-DD
         ("employee_type", "TEXT DEFAULT 'haken'"),  # 従業員タイプ: haken/ukeoi
         ("termination_date", "TEXT"),    # 退社日: YYYY-MM-DD (resignation date)
+        ("content_hash", "TEXT"),        # SHA-1 of imported columns (change detection on import)
     ]
 
     for col_name, col_type in employee_new_columns:
@@ -139,6 +172,19 @@ def init_db():
         except sqlite3.OperationalError:
             pass  # Column already exists
 
+    # Edits outside an import (UPDATE without a new content_hash) clear the stored
+    # hash, so the next import compares against the stored values instead
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_employees_reset_content_hash
+        AFTER UPDATE OF name, name_kana, dispatch_company, department, hourly_rate, billing_rate,
+                        status, hire_date, employee_type, gender, birth_date, termination_date
+        ON employees
+        WHEN NEW.content_hash IS OLD.content_hash AND NEW.content_hash IS NOT NULL
+        BEGIN
+            UPDATE employees SET content_hash = NULL WHERE id = NEW.id;
+        END
+    """)
+
     # Create indexes for performance
     cursor.execute("""
         CREATE INDEX IF NOT EXISTS idx_payroll_period
@@ -223,59 +269,130 @@ def init_db():
 
     conn.commit()
 
-    # ================================================================
-    # INITIALIZE AGENT TABLES
-    # ================================================================
 
-    # Import and initialize all agent tables
-    try:
-        from auth import init_auth_tables
-        init_auth_tables(conn)
-        print("[OK] Auth tables initialized")
-    except Exception as e:
-        print(f"[WARN] Auth tables: {e}")
+# (module, init function, label) of the tables owned by the agent modules
+AGENT_TABLES = (
+    ('auth', 'init_auth_tables', 'Auth'),
+    ('alerts', 'init_alerts_tables', 'Alerts'),
+    ('audit', 'init_audit_tables', 'Audit'),
+    ('reports', 'init_reports_tables', 'Reports'),
+    ('budget', 'init_budget_tables', 'Budget'),
+    ('notifications', 'init_notification_tables', 'Notifications'),
+    ('cache', 'init_cache_tables', 'Cache'),
+    ('sheet_fingerprints', 'init_fingerprint_tables', 'Sheet fingerprint'),
+    ('parse_metrics', 'init_parse_metrics_tables', 'Parse metrics'),
+    ('upload_jobs', 'init_upload_job_tables', 'Upload job'),
+    ('folder_sync', 'init_sync_manifest_tables', 'Sync manifest'),
+)
+
+
+def _create_agent_tables(conn: sqlite3.Connection):
+    """
+    Migration 1: tables owned by the agent modules (init_*_tables)
+
+    Each module is isolated as in the original init_db: one that fails is
+    reported and skipped (its partial tables rolled back), the others and
+    later migrations still apply.
+    """
+    for module_name, func_name, label in AGENT_TABLES:
+        try:
+            init_tables = getattr(importlib.import_module(module_name), func_name)
+            with conn:  # Savepoint inside a migration step
+                init_tables(conn)
+            print(f"[OK] {label} tables initialized")
+        except Exception as e:
+            print(f"[WARN] {label} tables: {e}")
 
-    try:
-        from alerts import init_alerts_tables
-        init_alerts_tables(conn)
-        print("[OK] Alerts tables initialized")
-    except Exception as e:
-        print(f"[WARN] Alerts tables: {e}")
 
-    try:
-        from audit import init_audit_tables
-        init_audit_tables(conn)
-        print("[OK] Audit tables initialized")
-    except Exception as e:
-        print(f"[WARN] Audit tables: {e}")
+def _baseline(conn: sqlite3.Connection):
+    """Schema as built by init_db before schema_version existed"""
+    _create_core_schema(conn)
+    _create_agent_tables(conn)
 
-    try:
-        from reports import init_reports_tables
-        init_reports_tables(conn)
-        print("[OK] Reports tables initialized")
-    except Exception as e:
-        print(f"[WARN] Reports tables: {e}")
+
+def _add_payroll_period_key(conn: sqlite3.Connection):
+    """payroll_records.period_key (YYYYMM of period), its indexes and triggers"""
+    cursor = conn.cursor()
 
     try:
-        from budget import init_budget_tables
-        init_budget_tables(conn)
-        print("[OK] Budget tables initialized")
-    except Exception as e:
-        print(f"[WARN] Budget tables: {e}")
+        cursor.execute("ALTER TABLE payroll_records ADD COLUMN period_key INTEGER")
+    except sqlite3.OperationalError:
+        pass  # Column already exists
+
+    # Chronological order: latest period, trends and period ranges
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_payroll_period_key
+        ON payroll_records(period_key)
+    """)
+
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_payroll_emp_period_key
+        ON payroll_records(employee_id, period_key)
+    """)
+
+    # Rows written without a key (scripts, older code paths) get it from period
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_payroll_period_key_insert
+        AFTER INSERT ON payroll_records
+        WHEN NEW.period_key IS NULL
+        BEGIN
+            UPDATE payroll_records SET period_key = {PERIOD_KEY_SQL.format(col='NEW.period')}
+            WHERE id = NEW.id;
+        END
+    """)
+
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_payroll_period_key_update
+        AFTER UPDATE OF period ON payroll_records
+        BEGIN
+            UPDATE payroll_records SET period_key = {PERIOD_KEY_SQL.format(col='NEW.period')}
+            WHERE id = NEW.id;
+        END
+    """)
 
+
+def _add_parse_fingerprint_stage(conn: sqlite3.Connection):
+    """parse_sheet_metrics.fingerprint_seconds (fingerprinting was timed as template_lookup)"""
     try:
-        from notifications import init_notification_tables
-        init_notification_tables(conn)
-        print("[OK] Notifications tables initialized")
-    except Exception as e:
-        print(f"[WARN] Notifications tables: {e}")
+        conn.execute("ALTER TABLE parse_sheet_metrics ADD COLUMN fingerprint_seconds REAL DEFAULT 0")
+    except sqlite3.OperationalError:
+        pass  # Column already exists
+
+
+PERIOD_KEY_BACKFILL = 'payroll_period_key'
 
+# Ordered schema steps (migrations.py). Append new steps; never edit applied ones.
+MIGRATIONS = [
+    Migration(1, 'baseline', _baseline),
+    Migration(2, 'payroll_period_key', _add_payroll_period_key, backfills=(
+        # Records saved before period_key existed
+        Backfill(
+            PERIOD_KEY_BACKFILL, 'payroll_records',
+            f"""UPDATE payroll_records SET period_key = {PERIOD_KEY_SQL.format(col='period')}
+                WHERE id > ? AND id <= ? AND period_key IS NULL"""
+        ),
+    )),
+    Migration(3, 'parse_fingerprint_stage', _add_parse_fingerprint_stage),
+]
+
+
+def init_db():
+    """
+    Initialize the database: apply pending schema migrations.
+
+    A current database costs one query (see migrations.py).
+    """
+    conn = get_connection()
     try:
-        from cache import init_cache_tables
-        init_cache_tables(conn)
-        print("[OK] Cache tables initialized")
-    except Exception as e:
-        print(f"[WARN] Cache tables: {e}")
+        result = migrate(conn, MIGRATIONS)
+        if not result['applied'] and result['failed'] is None:
+            print(f"[OK] Schema is current (version {result['version']})")
+        if BACKFILL_MODE == 'background' and PERIOD_KEY_BACKFILL in pending_backfills(conn):
+            # Until BackfillWorker finishes, keys of older rows are computed in the queries
+            set_period_key_fallback(True)
+            print("[INFO] period_key backfill pending: period queries compute missing keys")
+    finally:
+        conn.close()
 
     try:
         from backup import init_backup_system
@@ -287,7 +404,11 @@ def init_db():
     # NO sample data - start with clean database
     # Users will upload their own payroll files
 
-    conn.close()
+def backfill_finished(name: str):
+    """BackfillWorker callback: period queries use the period_key index again"""
+    if name == PERIOD_KEY_BACKFILL:
+        set_period_key_fallback(False)
+
 
 def insert_sample_data(conn):
     """Insert sample data for demonstration"""
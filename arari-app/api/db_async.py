@@ -0,0 +1,149 @@
+"""
+DBAsync - Database work off the event loop
+
+The services (PayrollService, ReportService, ...) use the blocking sqlite3
+module. Called directly inside `async def` endpoints they block the event
+loop, so one slow query stalls every other request of the worker.
+
+Blocking endpoint bodies run on a dedicated, bounded DB thread pool instead:
+
+    @app.get("/api/statistics")
+    @db_endpoint
+    def get_statistics(db: sqlite3.Connection = Depends(get_db)):
+        return PayrollService(db).get_statistics()
+
+and async code awaits individual calls:
+
+    job = await run_db(UploadJobService(db).get_job, job_id)
+
+Endpoints that write use db_write_endpoint instead: their body runs as a
+task of the DB writer (db_writer.py), with the writer's connection as `db`,
+so a request never competes with uploads for the SQLite write lock (and
+takes no pooled connection):
+
+    @app.put("/api/settings/{key}")
+    @db_write_endpoint
+    def update_setting(key: str, payload: dict, db: sqlite3.Connection = None):
+        ...
+
+The pool is separate from Starlette's thread pool (used for file parsing),
+so long uploads cannot take the threads that serve dashboard queries.
+Context variables (progress channel) are carried into the pool.
+
+Configuration:
+- ARARI_DB_THREADS: DB threads (default 8, matching the read pool in db_pool.py)
+"""
+
+import asyncio
+import contextvars
+import functools
+import inspect
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+DB_THREADS = int(os.environ.get("ARARI_DB_THREADS", "8"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_metrics_lock = threading.Lock()
+_metrics = {'calls': 0, 'active': 0, 'peak_active': 0, 'queue_seconds': 0.0, 'max_queue_seconds': 0.0}
+
+
+def get_db_executor() -> ThreadPoolExecutor:
+    """Get (or lazily create) the DB thread pool"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max(1, DB_THREADS), thread_name_prefix='db')
+        return _executor
+
+
+def shutdown_db_executor(wait: bool = False) -> None:
+    """Shut down the DB thread pool (application shutdown, tests)"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+            _executor = None
+
+
+def _timed_call(submitted: float, func: Callable, args: tuple, kwargs: dict) -> Any:
+    waited = time.perf_counter() - submitted
+    with _metrics_lock:
+        _metrics['calls'] += 1
+        _metrics['active'] += 1
+        _metrics['peak_active'] = max(_metrics['peak_active'], _metrics['active'])
+        _metrics['queue_seconds'] += waited
+        _metrics['max_queue_seconds'] = max(_metrics['max_queue_seconds'], waited)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        with _metrics_lock:
+            _metrics['active'] -= 1
+
+
+async def run_db(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking call on the DB thread pool and await its result"""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, _timed_call, time.perf_counter(), func, args, kwargs)
+    return await loop.run_in_executor(get_db_executor(), call)
+
+
+def db_endpoint(func: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Make a blocking endpoint function awaitable on the DB thread pool.
+
+    Place it under the route decorator; FastAPI reads the parameters of the
+    wrapped function (functools.wraps), so Depends/Query/Body keep working.
+    """
+    @functools.wraps(func)
+    async def endpoint(*args, **kwargs):
+        return await run_db(func, *args, **kwargs)
+
+    return endpoint
+
+
+def db_write_endpoint(func: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Run a blocking endpoint that writes as a DB writer task.
+
+    The `db` argument is the writer's connection: commit() is deferred to
+    the writer's group commit, rollback() and exceptions (HTTPException
+    included) undo this request's writes only. The response is sent once
+    the writes are committed.
+
+    Declare it as `db: sqlite3.Connection = None`: it is hidden from FastAPI,
+    so the request does not check out a connection it would never use.
+    """
+    @functools.wraps(func)
+    async def endpoint(*args, **kwargs):
+        from db_writer import db_writer
+
+        def task(conn):
+            return func(*args, **{**kwargs, 'db': conn})
+
+        return await asyncio.wrap_future(db_writer.submit(task))
+
+    signature = inspect.signature(func)
+    endpoint.__signature__ = signature.replace(
+        parameters=[p for p in signature.parameters.values() if p.name != 'db']
+    )
+    return endpoint
+
+
+def db_executor_stats() -> Dict[str, Any]:
+    """Threads, calls in progress and time spent waiting for a thread"""
+    with _metrics_lock:
+        calls = _metrics['calls']
+        return {
+            'threads': max(1, DB_THREADS),
+            **_metrics,
+            'queue_seconds': round(_metrics['queue_seconds'], 4),
+            'max_queue_seconds': round(_metrics['max_queue_seconds'], 4),
+            'avg_queue_seconds': round(_metrics['queue_seconds'] / calls, 4) if calls else 0,
+        }
@@ -0,0 +1,261 @@
+"""
+DBPool - Pooled, WAL-tuned SQLite connections for request handlers
+
+database.get_db draws connections from here instead of opening (and
+PRAGMA-configuring) a new one per request:
+
+- WAL journal: readers keep reading while an upload writes
+- Tuned PRAGMAs: synchronous=NORMAL, page cache, mmap, busy timeout
+- Separate pools per database: 'read' (GET/HEAD requests) and 'write'
+  (everything else), so long imports cannot starve dashboard reads
+- Per-connection prepared statement cache (sqlite3 cached_statements)
+- Health checks: idle connections are pinged before reuse, connections
+  returned with an open transaction are rolled back, broken ones replaced
+- Metrics: checked out, waits, wait time, timeouts (GET /api/db/pool)
+
+Configuration:
+- ARARI_DB_READ_POOL:        read connections per database (default 8)
+- ARARI_DB_WRITE_POOL:       write connections per database (default 2)
+- ARARI_DB_POOL_TIMEOUT:     seconds to wait for a free connection (default 30)
+- ARARI_DB_CACHE_MB:         page cache per connection (default 32)
+- ARARI_DB_MMAP_MB:          memory-mapped I/O size (default 256)
+- ARARI_DB_BUSY_TIMEOUT_MS:  wait for SQLite locks (default 5000)
+- ARARI_DB_STATEMENT_CACHE:  prepared statements kept per connection (default 256)
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, Tuple, Union
+
+
+READ_POOL_SIZE = int(os.environ.get("ARARI_DB_READ_POOL", "8"))
+WRITE_POOL_SIZE = int(os.environ.get("ARARI_DB_WRITE_POOL", "2"))
+POOL_TIMEOUT = float(os.environ.get("ARARI_DB_POOL_TIMEOUT", "30"))
+CACHE_SIZE_MB = int(os.environ.get("ARARI_DB_CACHE_MB", "32"))
+MMAP_SIZE_MB = int(os.environ.get("ARARI_DB_MMAP_MB", "256"))
+BUSY_TIMEOUT_MS = int(os.environ.get("ARARI_DB_BUSY_TIMEOUT_MS", "5000"))
+STATEMENT_CACHE_SIZE = int(os.environ.get("ARARI_DB_STATEMENT_CACHE", "256"))
+
+# Idle connections older than this are pinged (SELECT 1) before reuse
+HEALTH_CHECK_IDLE_SECONDS = 30.0
+
+POOL_KINDS = ('read', 'write')
+
+
+class PoolTimeoutError(sqlite3.OperationalError):
+    """No connection became free within the pool timeout"""
+
+
+def configure_connection(conn: sqlite3.Connection) -> sqlite3.Connection:
+    """Apply the row factory and PRAGMAs used by every connection"""
+    conn.row_factory = sqlite3.Row
+    # Enable foreign key constraints (disabled by default in SQLite)
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    # WAL is stored in the database file; the other settings are per connection
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_MB * 1024}")
+    conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE_MB * 1024 * 1024}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    return conn
+
+
+def connect(db_path: Union[str, Path]) -> sqlite3.Connection:
+    """Open a configured connection (not pooled)"""
+    conn = sqlite3.connect(
+        str(db_path), check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE
+    )
+    return configure_connection(conn)
+
+
+class ConnectionPool:
+    """
+    Bounded pool of connections to one database.
+
+    Connections are created lazily up to `size`; acquire() waits up to
+    `timeout` seconds for one to be released.
+    """
+
+    def __init__(self, db_path: Union[str, Path], size: int, name: str = 'pool',
+                 timeout: float = POOL_TIMEOUT):
+        self.db_path = str(db_path)
+        self.size = max(1, size)
+        self.name = name
+        self.timeout = timeout
+        self._idle: Deque[Tuple[sqlite3.Connection, float]] = deque()
+        self._created = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._metrics = {
+            'checkouts': 0, 'checked_out': 0, 'peak_checked_out': 0,
+            'waits': 0, 'wait_seconds': 0.0, 'max_wait_seconds': 0.0, 'timeouts': 0,
+            'created': 0, 'discarded': 0, 'health_check_failures': 0, 'rollbacks': 0,
+        }
+
+    def acquire(self) -> sqlite3.Connection:
+        """Check out a connection (raises PoolTimeoutError)"""
+        started = time.monotonic()
+        waited = False
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise sqlite3.ProgrammingError(f"Connection pool '{self.name}' is closed")
+                if self._idle:
+                    conn, idle_since = self._idle.pop()  # Most recently used: warmest cache
+                    break
+                if self._created < self.size:
+                    self._created += 1
+                    conn, idle_since = None, None
+                    break
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self._metrics['timeouts'] += 1
+                    raise PoolTimeoutError(
+                        f"No free '{self.name}' connection after {self.timeout:g}s "
+                        f"({self.size} in use)"
+                    )
+                if not waited:
+                    waited = True
+                    self._metrics['waits'] += 1
+                self._cond.wait(remaining)
+
+            self._checked_out(time.monotonic() - started if waited else 0.0)
+
+        try:
+            if conn is None:
+                conn = self._create()
+            elif time.monotonic() - idle_since > HEALTH_CHECK_IDLE_SECONDS and not self._healthy(conn):
+                self._close_quietly(conn)
+                conn = self._create()
+        except Exception:
+            with self._cond:
+                self._created -= 1
+                self._metrics['checked_out'] -= 1
+                self._cond.notify()
+            raise
+        return conn
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        """Return a connection; uncommitted work is rolled back"""
+        healthy = True
+        rolled_back = False
+        try:
+            if conn.in_transaction:
+                rolled_back = True
+                conn.rollback()
+        except sqlite3.Error:
+            # Closed by the caller or unusable: replaced by a new connection
+            healthy = False
+
+        with self._cond:
+            self._metrics['checked_out'] -= 1
+            self._metrics['rollbacks'] += int(rolled_back)
+            if healthy and not self._closed:
+                self._idle.append((conn, time.monotonic()))
+            else:
+                self._created -= 1
+                self._metrics['discarded'] += 1
+                self._close_quietly(conn)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self) -> None:
+        """Close idle connections; checked-out ones are closed on release"""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._created -= 1
+                self._close_quietly(conn)
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                'name': self.name,
+                'size': self.size,
+                'open': self._created,
+                'idle': len(self._idle),
+                **self._metrics,
+                'wait_seconds': round(self._metrics['wait_seconds'], 4),
+                'max_wait_seconds': round(self._metrics['max_wait_seconds'], 4),
+            }
+
+    # ---------------- Internals ----------------
+
+    def _checked_out(self, wait_seconds: float) -> None:
+        metrics = self._metrics
+        metrics['checkouts'] += 1
+        metrics['checked_out'] += 1
+        metrics['peak_checked_out'] = max(metrics['peak_checked_out'], metrics['checked_out'])
+        metrics['wait_seconds'] += wait_seconds
+        metrics['max_wait_seconds'] = max(metrics['max_wait_seconds'], wait_seconds)
+
+    def _create(self) -> sqlite3.Connection:
+        conn = connect(self.db_path)
+        with self._cond:
+            self._metrics['created'] += 1
+        return conn
+
+    def _healthy(self, conn: sqlite3.Connection) -> bool:
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            with self._cond:
+                self._metrics['health_check_failures'] += 1
+            return False
+
+    @staticmethod
+    def _close_quietly(conn: sqlite3.Connection) -> None:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+
+# Pools by (database path, kind)
+_pools: Dict[Tuple[str, str], ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: Union[str, Path], kind: str = 'read') -> ConnectionPool:
+    """Pool of `kind` ('read' or 'write') for a database (created on first use)"""
+    if kind not in POOL_KINDS:
+        raise ValueError(f"Unknown pool kind: {kind}. Allowed: {', '.join(POOL_KINDS)}")
+    key = (str(db_path), kind)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            size = READ_POOL_SIZE if kind == 'read' else WRITE_POOL_SIZE
+            pool = _pools[key] = ConnectionPool(db_path, size, name=f"{kind}:{Path(db_path).name}")
+        return pool
+
+
+def close_pools() -> None:
+    """Close every pool (application shutdown, tests)"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Metrics of every pool, keyed by '<kind>:<database path>'"""
+    with _pools_lock:
+        pools = list(_pools.items())
+    return {f"{kind}:{path}": pool.stats() for (path, kind), pool in pools}
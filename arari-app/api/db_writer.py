@@ -0,0 +1,284 @@
+"""
+DBWriter - Single-writer queue for SQLite writes
+
+SQLite allows one writer at a time. Instead of every upload, employee
+import and alert scan opening its own connection and fighting over the
+write lock ("database is locked"), write tasks are queued to one thread
+that owns the only write connection:
+
+    future = db_writer.submit(lambda conn: AlertService(conn).scan_for_alerts())
+    result = future.result()            # or: await asyncio.wrap_future(future)
+
+- Tasks receive a connection and use it like any other (services
+  unchanged). Their commit() calls are deferred: the writer groups the
+  tasks waiting in the queue into one transaction (group commit) and
+  resolves their futures once it is committed
+- Each task runs in its own SAVEPOINT, so a failing task (or one calling
+  rollback()) only undoes its own writes; the others are still committed
+- Tasks run in FIFO order, in the submitter's context (progress events
+  published by a task go to the submitter's channel)
+- A task that submits another task (a service that writes through the
+  writer, called from a write endpoint) runs it right away, in a nested
+  savepoint of its own transaction, instead of waiting for itself
+- In WAL mode (db_pool.py) readers never wait for the writer
+
+Configuration:
+- ARARI_DB_WRITER_BATCH:     max tasks per transaction (default 100)
+- ARARI_DB_WRITER_LINGER_MS: wait for more tasks before committing (default 2)
+"""
+
+import contextvars
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from db_pool import connect
+
+
+WRITER_BATCH_SIZE = int(os.environ.get("ARARI_DB_WRITER_BATCH", "100"))
+WRITER_LINGER_SECONDS = int(os.environ.get("ARARI_DB_WRITER_LINGER_MS", "2")) / 1000
+
+_STOP = object()
+
+
+class _Task:
+    __slots__ = ('func', 'args', 'kwargs', 'context', 'future')
+
+    def __init__(self, func: Callable, args: tuple, kwargs: dict):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.context = contextvars.copy_context()
+        self.future: Future = Future()
+
+
+class TaskConnection:
+    """
+    Connection handed to a write task.
+
+    Delegates to the writer's connection; commit() is deferred to the group
+    commit and rollback() undoes this task's writes only (its savepoint).
+    A `with conn:` block runs in a nested savepoint: released on success
+    (the commit stays deferred), rolled back if the block raises.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, savepoint: str = 'write_task'):
+        self._conn = conn
+        self._savepoint = savepoint
+
+    def commit(self) -> None:
+        pass
+
+    def rollback(self) -> None:
+        self._conn.execute(f"ROLLBACK TO SAVEPOINT {self._savepoint}")
+
+    def close(self) -> None:
+        pass
+
+    # Special methods are looked up on the type, not through __getattr__
+    def __enter__(self) -> 'TaskConnection':
+        self._conn.execute(f"SAVEPOINT {self._savepoint}_block")
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if exc_type is not None:
+            self._conn.execute(f"ROLLBACK TO SAVEPOINT {self._savepoint}_block")
+        self._conn.execute(f"RELEASE SAVEPOINT {self._savepoint}_block")
+        return False
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
+
+
+class WriteQueue:
+    """Queue of write tasks executed by one thread with one connection"""
+
+    def __init__(self, db_path: Optional[Union[str, Path]] = None,
+                 batch_size: int = WRITER_BATCH_SIZE, linger: float = WRITER_LINGER_SECONDS,
+                 connect_func: Optional[Callable[[], sqlite3.Connection]] = None):
+        """
+        Args:
+            db_path: Database file (default: database.DB_PATH when the thread starts)
+            batch_size: Max tasks per transaction
+            linger: Seconds to wait for more tasks once one arrives
+            connect_func: Connection factory (overrides db_path)
+        """
+        self.db_path = db_path
+        self.batch_size = max(1, batch_size)
+        self.linger = linger
+        self.connect_func = connect_func
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._writer_ident: Optional[int] = None
+        self._task_conn: Optional[TaskConnection] = None
+        self._lock = threading.Lock()
+        self._metrics = {
+            'tasks': 0, 'failed_tasks': 0, 'transactions': 0, 'failed_transactions': 0,
+            'max_batch': 0, 'max_queue_depth': 0, 'busy_seconds': 0.0,
+        }
+
+    # ---------------- Submitting ----------------
+
+    def submit(self, func: Callable[..., Any], *args, **kwargs) -> Future:
+        """
+        Queue func(conn, *args, **kwargs).
+
+        Returns:
+            Future resolved with func's result after its transaction commits
+        """
+        task = _Task(func, args, kwargs)
+        if threading.get_ident() == self._writer_ident:
+            return self._run_nested(task)
+        self.start()
+        self._queue.put(task)
+        depth = self._queue.qsize()
+        with self._lock:
+            if depth > self._metrics['max_queue_depth']:
+                self._metrics['max_queue_depth'] = depth
+        return task.future
+
+    def _run_nested(self, task: _Task) -> Future:
+        """Run a task submitted by the running task, inside its transaction"""
+        task.future.set_running_or_notify_cancel()
+        try:
+            with self._task_conn:
+                result = task.func(self._task_conn, *task.args, **task.kwargs)
+        except Exception as e:
+            task.future.set_exception(e)
+        else:
+            task.future.set_result(result)
+        return task.future
+
+    def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """submit() and wait for the result (blocking callers)"""
+        return self.submit(func, *args, **kwargs).result()
+
+    def execute(self, sql: str, params: Iterable = ()) -> Future:
+        """Queue one statement; the future gets the cursor's lastrowid"""
+        return self.submit(lambda conn: conn.execute(sql, tuple(params)).lastrowid)
+
+    def executemany(self, sql: str, seq_of_params: Iterable[Iterable]) -> Future:
+        """Queue a batch statement; the future gets the row count"""
+        rows = [tuple(params) for params in seq_of_params]
+        return self.submit(lambda conn: conn.executemany(sql, rows).rowcount)
+
+    # ---------------- Thread ----------------
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Finish the queued tasks and stop the thread"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.connect_func is not None:
+            return self.connect_func()
+        if self.db_path is None:
+            import database
+            return connect(database.DB_PATH)
+        return connect(self.db_path)
+
+    def _run(self) -> None:
+        conn = self._connect()
+        self._writer_ident = threading.get_ident()
+        self._task_conn = TaskConnection(conn)
+        try:
+            stopping = False
+            while not stopping:
+                item = self._queue.get()
+                if item is _STOP:
+                    break
+                batch, stopping = self._collect(item)
+                self._run_batch(conn, batch)
+        finally:
+            self._writer_ident = None
+            conn.close()
+
+    def _collect(self, first: _Task) -> Tuple[List[_Task], bool]:
+        """First task plus the ones queued behind it (up to batch_size)"""
+        batch = [first]
+        deadline = time.monotonic() + self.linger
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run_batch(self, conn: sqlite3.Connection, batch: List[_Task]) -> None:
+        started = time.perf_counter()
+        proxy = self._task_conn
+        outcomes: List[Tuple[_Task, Any, Optional[BaseException]]] = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for task in batch:
+                if not task.future.set_running_or_notify_cancel():
+                    continue
+                conn.execute("SAVEPOINT write_task")
+                try:
+                    result = task.context.run(task.func, proxy, *task.args, **task.kwargs)
+                    outcomes.append((task, result, None))
+                except Exception as e:
+                    conn.execute("ROLLBACK TO SAVEPOINT write_task")
+                    outcomes.append((task, None, e))
+                conn.execute("RELEASE SAVEPOINT write_task")
+            conn.commit()
+        except Exception as e:
+            # Commit (or BEGIN) failed: nothing of this batch was written
+            print(f"[DB-WRITER] Transaction of {len(batch)} tasks failed: {e}")
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                pass
+            self._metrics['failed_transactions'] += 1
+            for task in batch:
+                if task.future.running() or task.future.set_running_or_notify_cancel():
+                    task.future.set_exception(e)
+            return
+        finally:
+            self._metrics['busy_seconds'] += time.perf_counter() - started
+
+        self._metrics['transactions'] += 1
+        self._metrics['tasks'] += len(outcomes)
+        self._metrics['max_batch'] = max(self._metrics['max_batch'], len(outcomes))
+        for task, result, error in outcomes:
+            if error is not None:
+                self._metrics['failed_tasks'] += 1
+                task.future.set_exception(error)
+            else:
+                task.future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        transactions = self._metrics['transactions']
+        return {
+            **self._metrics,
+            'running': self.running,
+            'queue_depth': self._queue.qsize(),
+            'avg_batch': round(self._metrics['tasks'] / transactions, 2) if transactions else 0,
+            'busy_seconds': round(self._metrics['busy_seconds'], 4),
+        }
+
+
+# Global writer for the application database (started on first submit)
+db_writer = WriteQueue()
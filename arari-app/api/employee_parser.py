@@ -5,10 +5,20 @@ Supports both .xls and .xlsm files.
 """
 
 import openpyxl
-from typing import List, Dict, Tuple, Optional
+from typing import Any, Iterable, Iterator, List, Dict, Tuple, Optional
 from dataclasses import dataclass
+from itertools import islice
 import re
 
+from sheet_grid import WorkbookSource, workbook_input
+
+
+# Rows scanned for the header row (streaming mode)
+HEADER_SCAN_ROWS = 20
+
+# Default size of the batches handed to the database by importers
+EMPLOYEE_BATCH_SIZE = 500
+
 
 @dataclass
 class EmployeeRecord:
@@ -29,6 +39,16 @@ class EmployeeRecord:
     termination_date: Optional[str] = None  # 退社日: Resignation/termination date
 
 
+def batched(records: Iterable[Any], size: int = EMPLOYEE_BATCH_SIZE) -> Iterator[List[Any]]:
+    """Split an iterable (e.g. iter_employees) into lists of at most `size` items"""
+    iterator = iter(records)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
 class DBGenzaiXParser:
     """Parser for DBGenzaiX sheet containing employee master data"""
 
@@ -63,10 +83,133 @@ class DBGenzaiXParser:
         self.errors: List[str] = []
         self.warnings: List[str] = []
 
-    def parse_employees(self, file_path: str) -> Tuple[List[EmployeeRecord], Dict[str, int]]:
+    def parse_employees(self, file_path: WorkbookSource,
+                        streaming: bool = True) -> Tuple[List[EmployeeRecord], Dict[str, int]]:
         """
         Parse employees from Excel file.
-        
+
+        Args:
+            file_path: Path to the workbook (or its bytes)
+            streaming: Read-only mode via iter_employees (default). False uses
+                       the legacy full workbook load with per-cell access.
+
+        Returns:
+            (employees, stats)
+        """
+        if streaming:
+            stats = self.new_stats()
+            employees = list(self.iter_employees(file_path, stats))
+            return employees, stats
+        return self._parse_employees_full(file_path)
+
+    @staticmethod
+    def new_stats() -> Dict[str, int]:
+        """Empty stats dict (filled by iter_employees / parse_employees)"""
+        return {
+            'total_rows': 0,
+            'employees_found': 0,
+            'rows_skipped': 0,
+            'errors': 0,
+        }
+
+    def iter_employees(self, file_path: WorkbookSource,
+                       stats: Optional[Dict[str, int]] = None) -> Iterator[EmployeeRecord]:
+        """
+        Stream employees from a read-only workbook.
+
+        Only the DBGenzaiX sheet is opened (other sheets are scanned only if
+        it is missing or has no header). The header is searched in the first
+        HEADER_SCAN_ROWS rows and data rows are read with
+        iter_rows(values_only=True), so records can be written in batches
+        while the file is still being read (see batched()).
+
+        Args:
+            file_path: Path to the workbook (or its bytes)
+            stats: Optional dict updated while iterating
+                   (total_rows, employees_found, rows_skipped, errors)
+
+        Yields:
+            EmployeeRecord for every row with an employee ID
+        """
+        self.errors = []
+        self.warnings = []
+        stats = stats if stats is not None else self.new_stats()
+
+        try:
+            wb = openpyxl.load_workbook(workbook_input(file_path), read_only=True, data_only=True)
+        except FileNotFoundError:
+            self.errors.append(f"Archivo no encontrado: {file_path}")
+            return
+        except Exception as e:
+            self.errors.append(f"Error al leer archivo Excel: {str(e)}")
+            return
+
+        try:
+            target_sheet, header_row, col_indices = self._find_target_sheet_streaming(wb)
+            if target_sheet is None:
+                print("[DEBUG] CRITICAL: No suitable sheet found after scanning all.")
+                self.errors.append("No se encontró ninguna hoja con columna '社員番号' (Employee ID)")
+                return
+
+            print(f"[DEBUG] Streaming sheet '{target_sheet.title}' from row {header_row + 1}")
+            columns = [(field, col_idx - 1) for field, col_idx in col_indices.items() if col_idx]
+
+            row_num = header_row
+            for values in target_sheet.iter_rows(min_row=header_row + 1, values_only=True):
+                row_num += 1
+                stats['total_rows'] += 1
+                try:
+                    row_data = {
+                        field: values[index] if index < len(values) else None
+                        for field, index in columns
+                    }
+                    emp = self._build_employee(row_data)
+                    if emp is None:
+                        stats['rows_skipped'] += 1
+                        continue
+                    stats['employees_found'] += 1
+                    yield emp
+                except Exception as e:
+                    stats['errors'] += 1
+                    print(f"[DEBUG] Error in row {row_num}: {e}")
+                    self.errors.append(f"Fila {row_num}: {str(e)}")
+
+            print(f"[INFO] Streamed {stats['employees_found']} employees "
+                  f"({stats['rows_skipped']} rows skipped)")
+        except Exception as e:
+            self.errors.append(f"Error al leer archivo Excel: {str(e)}")
+        finally:
+            wb.close()
+
+    def _find_target_sheet_streaming(self, wb) -> Tuple[Any, Optional[int], Dict[str, Optional[int]]]:
+        """DBGenzaiX first, then every other sheet (header rows only)"""
+        sheet_name = self._find_sheet(wb, 'DBGenzaiX')
+        candidates = [sheet_name] if sheet_name else []
+        candidates += [name for name in wb.sheetnames if name != sheet_name]
+
+        for name in candidates:
+            if name != sheet_name:
+                print(f"[DEBUG] No header in DBGenzaiX. Checking sheet: {name}")
+            sheet = wb[name]
+            if not hasattr(sheet, 'iter_rows'):
+                continue  # Chartsheet
+            # Generated files often declare a wrong <dimension>
+            if hasattr(sheet, 'reset_dimensions'):
+                sheet.reset_dimensions()
+
+            header_rows = sheet.iter_rows(min_row=1, max_row=HEADER_SCAN_ROWS, values_only=True)
+            for row_num, values in enumerate(header_rows, 1):
+                col_indices = self._detect_columns_in_values(values)
+                if self._is_header(col_indices):
+                    print(f"[DEBUG] VALID HEADER FOUND in {name} at row {row_num}")
+                    return sheet, row_num, col_indices
+
+        return None, None, {}
+
+    def _parse_employees_full(self, file_path: WorkbookSource) -> Tuple[List[EmployeeRecord], Dict[str, int]]:
+        """
+        Parse employees from Excel file (legacy full workbook load).
+
         Logic:
         1. Try to find 'DBGenzaiX' sheet.
         2. If found, look for headers in first 10 rows.
@@ -76,16 +219,11 @@ class DBGenzaiXParser:
         self.errors = []
         self.warnings = []
         employees = []
-        stats = {
-            'total_rows': 0,
-            'employees_found': 0,
-            'rows_skipped': 0,
-            'errors': 0,
-        }
+        stats = self.new_stats()
 
         try:
             # Load workbook
-            wb = openpyxl.load_workbook(file_path, data_only=True)
+            wb = openpyxl.load_workbook(workbook_input(file_path), data_only=True)
             
             target_sheet = None
             header_row = None
@@ -145,47 +283,16 @@ class DBGenzaiXParser:
                     if row_num < header_row + 5:
                         print(f"[DEBUG] Row {row_num} raw data: {row_data}")
 
-                    # Check if employee_id exists (required field)
-                    emp_id = str(row_data.get('employee_id', '')).strip()
-                    if not emp_id or emp_id == 'None':
+                    emp = self._build_employee(row_data)
+                    if emp is None:
                         if row_num < header_row + 5:
                             print(f"[DEBUG] Row {row_num} skipped: No Employee ID")
                         stats['rows_skipped'] += 1
                         continue
 
-                    # Build employee record
-                    # Determine status based on termination_date if not explicitly set
-                    termination_date = self._format_date(row_data.get('termination_date'))
-                    explicit_status = row_data.get('status')
-
-                    # If termination_date exists, employee is inactive
-                    if termination_date:
-                        status = 'inactive'
-                    elif explicit_status:
-                        status = self._map_status(explicit_status)
-                    else:
-                        status = 'active'
-
-                    emp = EmployeeRecord(
-                        employee_id=emp_id,
-                        name=str(row_data.get('name', '')).strip() or f"Employee {emp_id}",
-                        name_kana=self._clean_value(row_data.get('name_kana')),
-                        hourly_rate=self._to_float(row_data.get('hourly_rate')),
-                        billing_rate=self._to_float(row_data.get('billing_rate')),
-                        dispatch_company=self._clean_value(row_data.get('dispatch_company')),
-                        status=status,
-                        hire_date=self._format_date(row_data.get('hire_date')),
-                        department=self._clean_value(row_data.get('department')),
-                        employee_type=self._detect_employee_type(row_data.get('billing_rate')),
-                        # NEW FIELDS
-                        gender=self._map_gender(row_data.get('gender')),
-                        birth_date=self._format_date(row_data.get('birth_date')),
-                        termination_date=termination_date,
-                    )
-
                     employees.append(emp)
                     stats['employees_found'] += 1
-                    print(f"[DEBUG] Added employee: {emp_id}")
+                    print(f"[DEBUG] Added employee: {emp.employee_id}")
 
                 except Exception as e:
                     stats['errors'] += 1
@@ -201,6 +308,42 @@ class DBGenzaiXParser:
 
         return employees, stats
 
+    def _build_employee(self, row_data: Dict[str, Any]) -> Optional[EmployeeRecord]:
+        """Build an EmployeeRecord from raw row values (None if no employee ID)"""
+        # Check if employee_id exists (required field)
+        emp_id = str(row_data.get('employee_id', '')).strip()
+        if not emp_id or emp_id == 'None':
+            return None
+
+        # Determine status based on termination_date if not explicitly set
+        termination_date = self._format_date(row_data.get('termination_date'))
+        explicit_status = row_data.get('status')
+
+        # If termination_date exists, employee is inactive
+        if termination_date:
+            status = 'inactive'
+        elif explicit_status:
+            status = self._map_status(explicit_status)
+        else:
+            status = 'active'
+
+        return EmployeeRecord(
+            employee_id=emp_id,
+            name=str(row_data.get('name', '')).strip() or f"Employee {emp_id}",
+            name_kana=self._clean_value(row_data.get('name_kana')),
+            hourly_rate=self._to_float(row_data.get('hourly_rate')),
+            billing_rate=self._to_float(row_data.get('billing_rate')),
+            dispatch_company=self._clean_value(row_data.get('dispatch_company')),
+            status=status,
+            hire_date=self._format_date(row_data.get('hire_date')),
+            department=self._clean_value(row_data.get('department')),
+            employee_type=self._detect_employee_type(row_data.get('billing_rate')),
+            # NEW FIELDS
+            gender=self._map_gender(row_data.get('gender')),
+            birth_date=self._format_date(row_data.get('birth_date')),
+            termination_date=termination_date,
+        )
+
     def _find_sheet(self, workbook, sheet_name: str) -> Optional[str]:
         """Find sheet by name (case-insensitive)"""
         for name in workbook.sheetnames:
@@ -217,33 +360,41 @@ class DBGenzaiXParser:
         """
         for row in range(1, min(20, sheet.max_row + 1)):
             col_indices = self._detect_columns_in_row(sheet, row)
-            
-            # Check for employee_id
-            has_id = col_indices.get('employee_id')
-            
-            # Check for at least one other critical field
-            has_other_field = any([
-                col_indices.get('name'),
-                col_indices.get('status'),
-                col_indices.get('billing_rate'),
-                col_indices.get('dispatch_company'),
-                col_indices.get('hourly_rate')
-            ])
-            
-            if has_id and has_other_field:
+            if self._is_header(col_indices):
                 return row, col_indices
                 
         # Last resort: if we only found ID but nothing else, maybe return it?
         # But safest is to return None to avoid garbage data.
         return None, {}
 
+    def _is_header(self, col_indices: Dict[str, Optional[int]]) -> bool:
+        """employee_id plus at least one other critical field"""
+        # Check for employee_id
+        has_id = col_indices.get('employee_id')
+
+        # Check for at least one other critical field
+        has_other_field = any([
+            col_indices.get('name'),
+            col_indices.get('status'),
+            col_indices.get('billing_rate'),
+            col_indices.get('dispatch_company'),
+            col_indices.get('hourly_rate')
+        ])
+
+        return bool(has_id and has_other_field)
+
     def _detect_columns_in_row(self, sheet, row_num: int) -> Dict[str, Optional[int]]:
         """Detect column indices from a specific row"""
+        return self._detect_columns_in_values(
+            sheet.cell(row=row_num, column=col_idx).value for col_idx in range(1, sheet.max_column + 1)
+        )
+
+    def _detect_columns_in_values(self, values: Iterable[Any]) -> Dict[str, Optional[int]]:
+        """Detect column indices (1-based) from the values of a row"""
         col_indices: Dict[str, Optional[int]] = {field: None for field in self.COLUMN_MAPPINGS}
 
         # Scan columns
-        for col_idx in range(1, sheet.max_column + 1):
-            header = sheet.cell(row=row_num, column=col_idx).value
+        for col_idx, header in enumerate(values, 1):
             if not header:
                 continue
 
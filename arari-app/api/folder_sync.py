@@ -0,0 +1,182 @@
+"""
+FolderSync - Sync manifest and parallel parsing for /api/sync-from-folder
+
+Re-syncing a folder of monthly 給与明細 workbooks only parses what changed:
+
+- sync_manifest remembers, per file path, the size, mtime and SHA-256 of the
+  last sync and its result. A file whose size and mtime match a fully
+  imported entry is skipped without being opened; a file whose bytes hash
+  to the stored digest (copied / touched) is skipped without being parsed.
+- Changed files are parsed concurrently in the shared process pool
+  (salary_parser.get_parse_pool). Workers never touch the database: the
+  caller persists each result as it completes, one transaction per file,
+  from a single thread.
+
+Files with skipped or failed records are stored as 'partial' and files that
+could not be imported as 'failed'; both are retried on the next sync.
+"""
+
+import sqlite3
+from concurrent.futures import as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from salary_parser import SalaryStatementParser, get_parse_pool, shutdown_parse_pool
+from template_manager import TemplateManager
+
+
+MANIFEST_STATUSES = ('imported', 'partial', 'failed')
+
+
+def init_sync_manifest_tables(conn: sqlite3.Connection):
+    """Initialize folder sync manifest table"""
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sync_manifest (
+            path TEXT PRIMARY KEY,
+            size_bytes INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            content_hash TEXT,
+            last_status TEXT NOT NULL,
+            records_saved INTEGER DEFAULT 0,
+            records_skipped INTEGER DEFAULT 0,
+            error_count INTEGER DEFAULT 0,
+            error TEXT,
+            synced_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    conn.commit()
+
+
+class SyncManifestService:
+    """Service for sync_manifest rows"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def get_entries(self) -> Dict[str, Dict[str, Any]]:
+        """All manifest entries by path"""
+        cursor = self.conn.execute("SELECT * FROM sync_manifest")
+        return {row['path']: dict(row) for row in cursor.fetchall()}
+
+    def record(self, path: str, size_bytes: int, mtime_ns: int, content_hash: Optional[str],
+               status: str, records_saved: int = 0, records_skipped: int = 0,
+               error_count: int = 0, error: Optional[str] = None) -> None:
+        """
+        Store the result of syncing one file.
+
+        Does not commit: call inside the file's transaction, so the entry
+        is only kept if the file's records are.
+        """
+        self.conn.execute("""
+            INSERT OR REPLACE INTO sync_manifest
+                (path, size_bytes, mtime_ns, content_hash, last_status,
+                 records_saved, records_skipped, error_count, error, synced_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            path, size_bytes, mtime_ns, content_hash, status,
+            records_saved, records_skipped, error_count, error, datetime.now().isoformat(),
+        ))
+
+    def touch(self, path: str, size_bytes: int, mtime_ns: int) -> None:
+        """Update size/mtime of an entry whose content did not change (no commit)"""
+        self.conn.execute(
+            "UPDATE sync_manifest SET size_bytes = ?, mtime_ns = ? WHERE path = ?",
+            (size_bytes, mtime_ns, path)
+        )
+
+
+def is_unchanged(entry: Optional[Dict[str, Any]], size_bytes: int, mtime_ns: int) -> bool:
+    """True if a file was fully imported and its size and mtime are the same"""
+    return (
+        entry is not None
+        and entry['last_status'] == 'imported'
+        and entry['size_bytes'] == size_bytes
+        and entry['mtime_ns'] == mtime_ns
+    )
+
+
+def parse_folder_file(path: str, kind: str, engine: str, template_db_path: str,
+                      template_version: Optional[str] = None,
+                      known_fingerprints: Optional[Dict[str, set]] = None) -> Dict[str, Any]:
+    """
+    Worker entry point: parse one file of a synced folder.
+
+    Runs in a pool process (or in the caller as fallback). Template saves
+    are deferred and returned, like salary_parser._parse_sheet_group.
+
+    Args:
+        kind: 'payroll' (SalaryStatementParser) or 'generic' (ExcelParser)
+
+    Returns:
+        Dict with records, stats (None for generic files) and pending_templates
+    """
+    if kind != 'payroll':
+        from services import ExcelParser
+        return {
+            'records': ExcelParser().parse(path, Path(path).suffix.lower()),
+            'stats': None,
+            'pending_templates': [],
+        }
+
+    template_manager = TemplateManager(Path(template_db_path))
+    template_manager.refresh_if_changed(template_version)
+
+    # One file per process: sheets of a file are parsed sequentially
+    parser = SalaryStatementParser(
+        use_intelligent_mode=True, template_manager=template_manager, engine=engine
+    )
+    parser.defer_template_saves = True
+    parser.known_fingerprints = known_fingerprints or {}
+    records = parser.parse(path)
+
+    return {
+        'records': records,
+        'stats': parser.get_parsing_stats(),
+        'pending_templates': parser.pending_templates,
+    }
+
+
+def parse_files(tasks: List[Tuple[str, tuple]], max_workers: int) -> Iterator[Tuple[str, Any]]:
+    """
+    Parse files concurrently, yielding results as they complete.
+
+    Args:
+        tasks: (key, parse_folder_file arguments) per file
+        max_workers: Pool size (1 = parse in this process)
+
+    Yields:
+        (key, result dict) or (key, exception) for a file that failed to parse
+    """
+    if max_workers > 1 and len(tasks) > 1:
+        remaining = dict(tasks)
+        try:
+            pool = get_parse_pool(max_workers)
+            futures = {pool.submit(parse_folder_file, *args): key for key, args in tasks}
+            for future in as_completed(futures):
+                key = futures[future]
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    raise
+                except Exception as e:
+                    result = e
+                del remaining[key]
+                yield key, result
+            return
+        except Exception as e:
+            # Broken pool (worker killed, pickling error...) - reset and finish sequentially
+            print(f"[WARNING] Parallel folder parse failed, parsing remaining files sequentially: {e}")
+            shutdown_parse_pool()
+            tasks = list(remaining.items())
+
+    for key, args in tasks:
+        try:
+            result = parse_folder_file(*args)
+        except Exception as e:
+            result = e
+        yield key, result
@@ -0,0 +1,309 @@
+"""
+FolderWatcher - Continuous ingestion of a watched folder
+
+Optional background thread started from the FastAPI lifespan when
+ARARI_WATCH_FOLDER is set. It polls the folder (no OS notification API, so
+it works the same on network shares), keeps a size/mtime index and queues
+new or changed workbooks as upload jobs (upload_jobs.py), so each file
+shows up in GET /api/jobs and streams progress like a manual upload.
+
+- Debounce: a file is only queued once its size and mtime have not changed
+  for ARARI_WATCH_DEBOUNCE seconds (files still being copied are left alone)
+- Bounded concurrency: at most ARARI_WATCH_WORKERS watcher jobs in flight
+- Manifest entries and job rows are written through the runner's DB writer
+  (db_writer.py) when it has one
+- Results are stored in the sync manifest (folder_sync.py), shared with
+  /api/sync-from-folder: files already synced are not imported again, and
+  after a restart only files that changed (or failed) are queued
+- Watcher jobs that were still queued at a restart (JobRunner.resume runs
+  them again) are tracked like the watcher's own, so their file is not
+  queued twice and their result reaches the manifest
+
+Configuration:
+- ARARI_WATCH_FOLDER:   folder to watch (watcher disabled if unset)
+- ARARI_WATCH_INTERVAL: seconds between polls (default 15)
+- ARARI_WATCH_DEBOUNCE: seconds a file must be stable (default 10)
+- ARARI_WATCH_WORKERS:  concurrent watcher jobs (default 2)
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from folder_sync import SyncManifestService, is_unchanged
+from ingestion import PAYROLL_EXTENSIONS
+from parse_cache import hash_content
+
+
+WATCH_FOLDER = os.environ.get("ARARI_WATCH_FOLDER", "")
+WATCH_INTERVAL = float(os.environ.get("ARARI_WATCH_INTERVAL", "15"))
+WATCH_DEBOUNCE = float(os.environ.get("ARARI_WATCH_DEBOUNCE", "10"))
+WATCH_WORKERS = int(os.environ.get("ARARI_WATCH_WORKERS", "2"))
+
+# Office lock / temp files written next to open workbooks
+IGNORED_PREFIXES = ('~$', '.~')
+
+Signature = Tuple[int, int]  # (size, mtime_ns)
+
+
+class FolderWatcher:
+    """
+    Polls one folder and queues new or changed files as upload jobs.
+
+    All state is owned by the watcher thread; poll_once() can also be
+    called directly (tests, manual trigger).
+    """
+
+    def __init__(self, folder: Path, interval: float = WATCH_INTERVAL,
+                 debounce: float = WATCH_DEBOUNCE, max_in_flight: int = WATCH_WORKERS,
+                 runner=None, connect: Optional[Callable[[], sqlite3.Connection]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        if runner is None:
+            from upload_jobs import job_runner as runner
+        if connect is None:
+            from database import get_connection
+            connect = get_connection
+        self.folder = Path(folder)
+        self.interval = interval
+        self.debounce = debounce
+        self.max_in_flight = max(1, max_in_flight)
+        self.runner = runner
+        # Single-writer queue (db_writer.py) of the job runner, if any
+        self.writer = runner.writer
+        self.connect = connect
+        self.clock = clock
+
+        # path -> (signature, time the signature was first seen)
+        self.index: Dict[str, Tuple[Signature, float]] = {}
+        # path -> signature of the last import attempt
+        self.ingested: Dict[str, Signature] = {}
+        # path -> (future, job_id, signature, content_hash)
+        self.in_flight: Dict[str, Tuple[Future, str, Signature, str]] = {}
+
+        # job_id -> future of jobs resumed before the watcher started
+        self._resumed: Dict[str, Future] = runner.active_futures()
+
+        self.counters = {'polls': 0, 'queued': 0, 'imported': 0, 'failed': 0, 'unchanged': 0}
+        self.last_poll: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------------- Thread ----------------
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='folder-watcher', daemon=True)
+        self._thread.start()
+        print(f"[WATCH] Watching {self.folder} every {self.interval:g}s (debounce {self.debounce:g}s)")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+                self.last_error = None
+            except Exception as e:
+                # Keep watching: the folder may be temporarily unreachable
+                self.last_error = str(e)
+                print(f"[WATCH] Poll failed: {e}")
+            self._stop.wait(self.interval)
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = self.connect()
+            # Files fully imported by an earlier process or folder sync
+            for path, entry in SyncManifestService(self._conn).get_entries().items():
+                if entry['last_status'] == 'imported':
+                    self.ingested[path] = (entry['size_bytes'], entry['mtime_ns'])
+            self._adopt_resumed_jobs(self._conn)
+        return self._conn
+
+    def _adopt_resumed_jobs(self, conn: sqlite3.Connection) -> None:
+        """Track resumed upload jobs of files in the watched folder as in flight"""
+        from upload_jobs import UploadJobService
+
+        service = UploadJobService(conn)  # Reads only
+        for job_id, future in self._resumed.items():
+            job = service.get_job(job_id)
+            if job is None or job['kind'] != 'upload' or job['delete_source']:
+                continue
+            path = job['source_path']
+            if not path or Path(path).parent != self.folder or path in self.in_flight:
+                continue
+            try:
+                stat = os.stat(path)
+                same_content = hash_content(path) == job['content_hash']
+            except OSError:
+                continue
+            # A file changed since it was queued keeps the queued size and no
+            # mtime, so the next poll compares its content again
+            signature = (stat.st_size, stat.st_mtime_ns) if same_content else (job['size_bytes'] or 0, 0)
+            self.in_flight[path] = (future, job_id, signature, job['content_hash'])
+        self._resumed = {}
+
+    # ---------------- Polling ----------------
+
+    def poll_once(self) -> List[str]:
+        """
+        Scan the folder once: record finished jobs, then queue stable files.
+
+        Returns:
+            Paths queued by this poll
+        """
+        now = self.clock()
+        self.counters['polls'] += 1
+        self.last_poll = time.time()
+        conn = self.conn
+        self._reap()
+
+        queued = []
+        for path, signature in self._scan():
+            known = self.index.get(path)
+            if known is None or known[0] != signature:
+                # New or still changing: wait until it is stable
+                self.index[path] = (signature, now)
+                if self.debounce > 0:
+                    continue
+            elif now - known[1] < self.debounce:
+                continue
+
+            if path in self.in_flight or self.ingested.get(path) == signature:
+                continue
+            if len(self.in_flight) >= self.max_in_flight:
+                break  # Picked up by a later poll
+
+            if self._queue(conn, path, signature):
+                queued.append(path)
+
+        return queued
+
+    def _scan(self) -> List[Tuple[str, Signature]]:
+        files = []
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if not entry.is_file() or entry.name.startswith(IGNORED_PREFIXES):
+                    continue
+                if Path(entry.name).suffix.lower() not in PAYROLL_EXTENSIONS:
+                    continue
+                stat = entry.stat()
+                if stat.st_size == 0:
+                    continue
+                files.append((str(self.folder / entry.name), (stat.st_size, stat.st_mtime_ns)))
+        files.sort()
+        return files
+
+    def _queue(self, conn: sqlite3.Connection, path: str, signature: Signature) -> bool:
+        """Queue one stable file (False if its content is already imported)"""
+        from upload_jobs import UploadJobService
+
+        entry = SyncManifestService(conn).get_entries().get(path)
+        if is_unchanged(entry, *signature):
+            self.ingested[path] = signature
+            return False
+
+        content_hash = hash_content(path)
+        if entry is not None and entry['last_status'] == 'imported' and entry['content_hash'] == content_hash:
+            # Touched or copied again with identical bytes
+            self._write(lambda write_conn: SyncManifestService(write_conn).touch(path, *signature))
+            self.ingested[path] = signature
+            self.counters['unchanged'] += 1
+            return False
+
+        name = Path(path).name
+        job_id = UploadJobService(conn, writer=self.writer).create_job(
+            'upload', path, filename=name, file_ext=Path(name).suffix.lower(),
+            content_hash=content_hash, size_bytes=signature[0],
+        )
+        self.in_flight[path] = (self.runner.submit(job_id), job_id, signature, content_hash)
+        self.counters['queued'] += 1
+        print(f"[WATCH] Queued {name} (job {job_id})")
+        return True
+
+    def _write(self, func: Callable[[sqlite3.Connection], Any]) -> None:
+        """func(conn) through the writer, or on the watcher's connection (committed)"""
+        if self.writer is not None:
+            self.writer.run(func)
+        else:
+            func(self.conn)
+            self.conn.commit()
+
+    def _reap(self) -> None:
+        """Store the result of finished watcher jobs in the sync manifest"""
+        for path, (future, job_id, signature, content_hash) in list(self.in_flight.items()):
+            if not future.done():
+                continue
+            del self.in_flight[path]
+            result = None if future.cancelled() else future.result()
+
+            if result is None:
+                status, saved, skipped, errors = 'failed', 0, 0, 1
+                error = f"Upload job {job_id} failed"
+            else:
+                saved = result.get('saved_records', 0)
+                skipped = result.get('skipped_count', 0)
+                errors = result.get('error_count', 0)
+                status = 'partial' if skipped or errors else 'imported'
+                error = None
+
+            self._write(lambda conn: SyncManifestService(conn).record(
+                path, *signature, content_hash, status, saved, skipped, errors, error))
+            # Not retried until the file changes again (or the server restarts)
+            self.ingested[path] = signature
+            self.counters['failed' if status == 'failed' else 'imported'] += 1
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'folder': str(self.folder),
+            'running': self._thread is not None and self._thread.is_alive(),
+            'interval': self.interval,
+            'debounce': self.debounce,
+            'max_in_flight': self.max_in_flight,
+            'tracked_files': len(self.index),
+            'in_flight': len(self.in_flight),
+            'last_poll': self.last_poll,
+            'last_error': self.last_error,
+            **self.counters,
+        }
+
+
+# Started by start_folder_watcher() when ARARI_WATCH_FOLDER is set
+folder_watcher: Optional[FolderWatcher] = None
+
+
+def start_folder_watcher(folder: str = WATCH_FOLDER) -> Optional[FolderWatcher]:
+    """Start the global watcher (no-op if no folder is configured or it does not exist)"""
+    global folder_watcher
+    if not folder:
+        return None
+    path = Path(folder)
+    if not path.is_dir():
+        print(f"[WARN] Watch folder not found: {folder}")
+        return None
+    if folder_watcher is None:
+        folder_watcher = FolderWatcher(path)
+        folder_watcher.start()
+    return folder_watcher
+
+
+def stop_folder_watcher() -> None:
+    global folder_watcher
+    if folder_watcher is not None:
+        folder_watcher.stop()
+        folder_watcher = None
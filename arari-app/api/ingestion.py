@@ -0,0 +1,613 @@
+"""
+Ingestion - Parse → calculate → persist pipeline for uploaded files and folders
+
+Shared by the synchronous endpoints (/api/upload, /api/sync-from-folder)
+and the background upload jobs (upload_jobs.py). Functions are blocking:
+endpoints run them in the thread pool, jobs in their worker threads.
+
+Progress is reported through an optional callback:
+
+    progress(stage, percent, **counts)
+
+with stage in 'parse', 'calculate', 'persist' and percent 0-100. The same
+updates are published as 'stage' events on the bound progress channel
+(progress_events.py), next to the parser's sheet events.
+"""
+
+import os
+from pathlib import Path
+import sqlite3
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from cache import CacheService, invalidate_employee_cache, invalidate_stats_cache
+from db_writer import WriteQueue
+from employee_parser import DBGenzaiXParser
+from folder_sync import SyncManifestService, is_unchanged, parse_files
+from models import EmployeeCreate
+from parse_cache import hash_content, parse_cache, parse_cached, parse_version_stamp
+from parse_metrics import ParseMetricsService
+from progress_events import publish_event
+from salary_parser import SalaryStatementParser
+from services import ExcelParser, PayrollService
+from sheet_fingerprints import SheetFingerprintService, partition_by_sheet
+from template_manager import TemplateManager
+
+
+# Reader engine for 給与明細 files ('xml' = direct XML reader for rows 1-60,
+# falls back to openpyxl per sheet; 'streaming' = openpyxl read-only snapshot;
+# 'openpyxl' = legacy full object model). All produce identical records.
+PARSER_ENGINE = os.environ.get("ARARI_PARSER_ENGINE", "xml")
+
+# Worker processes for parallel sheet parsing (1 = sequential). The pool is
+# created on first upload and reused until shutdown.
+PARSER_WORKERS = int(os.environ.get("ARARI_PARSER_WORKERS", os.cpu_count() or 1))
+
+# Files of a folder sync parsed concurrently (same process pool, one file per task)
+FOLDER_SYNC_WORKERS = int(os.environ.get("ARARI_FOLDER_SYNC_WORKERS", PARSER_WORKERS))
+
+PAYROLL_EXTENSIONS = ['.xlsx', '.xlsm', '.xls', '.csv']
+EMPLOYEE_EXTENSIONS = ['.xlsx', '.xlsm', '.xls']
+
+ProgressCallback = Callable[..., None]
+
+
+def _no_progress(stage: str, percent: float, **counts) -> None:
+    pass
+
+
+def _reporter(progress: Optional[ProgressCallback]) -> ProgressCallback:
+    """Progress callback that also publishes 'stage' events"""
+    progress = progress or _no_progress
+
+    def report(stage: str, percent: float, **counts) -> None:
+        progress(stage, percent, **counts)
+        publish_event('stage', stage=stage, percent=round(percent, 1), **counts)
+
+    return report
+
+
+def _write(db: sqlite3.Connection, writer: Optional[WriteQueue],
+           func: Callable[[sqlite3.Connection], Any]) -> Any:
+    """func(conn) as a write task if there is a writer, else on db"""
+    if writer is not None:
+        return writer.run(func)
+    return func(db)
+
+
+def detect_file_kind(filename: str, file_ext: str) -> str:
+    """
+    'payroll' (給与明細), 'employees' (社員台帳) or 'generic' (ExcelParser/CSV)
+    """
+    if file_ext in ['.xlsm', '.xlsx'] and ('給与' in filename or '給料' in filename or '明細' in filename):
+        return 'payroll'
+    if file_ext in EMPLOYEE_EXTENSIONS and ('社員' in filename or 'Employee' in filename or '台帳' in filename):
+        return 'employees'
+    return 'generic'
+
+
+def import_employee_file(db: sqlite3.Connection, path: str,
+                         writer: Optional[WriteQueue] = None) -> Dict[str, Any]:
+    """
+    Import a 社員台帳 file (DBGenzaiX format) into the employees table.
+
+    Employees are streamed from a read-only workbook (DBGenzaiXParser.iter_employees),
+    so rows are written while the file is still being read. With a writer
+    (db_writer.py), every batch of changed employees is its own write task.
+
+    Returns:
+        Dict with added/updated/unchanged/terminated counts, the diff
+        (see PayrollService.sync_employees), parser stats and errors
+    """
+    parser = DBGenzaiXParser()
+    stats = parser.new_stats()
+
+    employees = (
+        EmployeeCreate(
+            employee_id=emp.employee_id,
+            name=emp.name,
+            name_kana=emp.name_kana,
+            dispatch_company=emp.dispatch_company if emp.dispatch_company else "Unknown",
+            department=emp.department,
+            hourly_rate=emp.hourly_rate,
+            billing_rate=emp.billing_rate,
+            status=emp.status,
+            hire_date=emp.hire_date,
+            # NEW FIELDS - 2025-12-11
+            employee_type=emp.employee_type,
+            gender=emp.gender,
+            birth_date=emp.birth_date,
+            termination_date=emp.termination_date,
+        )
+        for emp in parser.iter_employees(path, stats)
+    )
+
+    # Only new or changed employees are written (content hash compared in memory)
+    result = PayrollService(db).sync_employees(employees, writer=writer)
+
+    # Invalidate only what changed
+    touched = result['diff']['added'] + list(result['diff']['changed'])
+    if touched:
+        def invalidate(conn: sqlite3.Connection) -> None:
+            cache_service = CacheService(conn)
+            invalidate_employee_cache(cache_service)
+            for employee_id in result['diff']['changed']:
+                invalidate_employee_cache(cache_service, employee_id)
+            invalidate_stats_cache(cache_service)
+
+        _write(db, writer, invalidate)
+
+    print(f"[INFO] Imported employees: {result['added']} added, {result['updated']} changed, "
+          f"{result['unchanged']} unchanged, {result['terminated']} terminated. Stats: {stats}")
+    return {
+        **result,
+        'stats': stats,
+        'errors': parser.errors,
+    }
+
+
+def employee_import_response(filename: str, result: Dict[str, Any]) -> Dict[str, Any]:
+    """/api/upload response for a 社員台帳 file"""
+    imported_count = result['added'] + result['updated'] + result['unchanged']
+    return {
+        "success": True,
+        "filename": filename,
+        "total_records": result['stats']['total_rows'],
+        "saved_records": imported_count,
+        "message": f"Successfully imported {imported_count} employees.",
+        "employees_added": result['added'],
+        "employees_updated": result['updated'],
+        "employees_unchanged": result['unchanged'],
+        "employees_terminated": result['terminated'],
+        "changes": result['diff'],
+    }
+
+
+def ingest_file(db: sqlite3.Connection, path: str, filename: str, file_ext: str,
+                content_hash: Optional[str] = None,
+                progress: Optional[ProgressCallback] = None,
+                writer: Optional[WriteQueue] = None) -> Dict[str, Any]:
+    """
+    Parse one uploaded file and save it (payroll records or employees).
+
+    Payroll records are saved in a single transaction (one executemany);
+    rows with unknown employees are skipped, rows that fail to compute are
+    reported per row.
+
+    Args:
+        path: File on disk (spooled upload)
+        filename: Original file name (decides the parser)
+        file_ext: Lowercase extension with dot
+        content_hash: SHA-256 of the file if already known (parse cache key)
+        progress: Optional progress callback
+        writer: Single-writer queue (db_writer.py); if None, writes go through db
+
+    Returns:
+        Response dict of /api/upload (without upload_stats)
+    """
+    progress = _reporter(progress)
+    kind = detect_file_kind(filename, file_ext)
+    cache_hit = False
+    template_stats = None
+    known_fingerprints = {}
+
+    progress('parse', 5)
+
+    # ---------------------------------------------------------
+    # CASE A: Payroll File (給与明細)
+    # ---------------------------------------------------------
+    if kind == 'payroll':
+        print(f"[INFO] Detected Payroll File: {filename}")
+        print(f"[DEBUG] File extension: {file_ext}")
+        # Use specialized SalaryStatementParser
+        parser = SalaryStatementParser(
+            use_intelligent_mode=True, engine=PARSER_ENGINE, max_workers=PARSER_WORKERS
+        )
+        # Sheets already imported with identical content are skipped
+        parser.known_fingerprints = known_fingerprints = SheetFingerprintService(db).get_known()
+
+        records, template_stats, cache_hit = parse_cached(parser, path, content_hash=content_hash)
+        print(f"[DEBUG] Parser returned {len(records)} records (cache_hit={cache_hit})")
+
+        # Keep per-sheet/per-stage metrics for /api/parse-metrics
+        _write(db, writer, lambda conn: ParseMetricsService(conn).record_run(
+            template_stats.get('metrics'), filename, cache_hit))
+
+    # ---------------------------------------------------------
+    # CASE B: Employee Master File (社員台帳)
+    # ---------------------------------------------------------
+    elif kind == 'employees':
+        print(f"[INFO] Detected Employee Master File: {filename}")
+        # Employees are streamed from the file and written as they are read
+        result = import_employee_file(db, path, writer=writer)
+        progress('persist', 100, records_saved=result['added'] + result['updated'] + result['unchanged'])
+        return employee_import_response(filename, result)
+
+    # ---------------------------------------------------------
+    # CASE C: Generic/Legacy Fallback
+    # ---------------------------------------------------------
+    else:
+        # Use existing ExcelParser for simple CSV/XLSX files
+        print(f"[INFO] Detected Generic/Legacy File: {filename}")
+        records = ExcelParser().parse(path, file_ext)
+
+    # Incremental re-upload: drop records of sheets that did not change
+    parsed_sheets = template_stats.get('sheets') if template_stats else None
+    total_parsed = len(records)
+    publish_event('records_parsed', count=total_parsed)
+    records, record_sheets, changed_sheets, unchanged_sheets = partition_by_sheet(
+        records, parsed_sheets, known_fingerprints
+    )
+    progress('calculate', 60, records_total=total_parsed)
+
+    service = PayrollService(db)
+
+    # Optimize N+1 queries: Load all employees and rates once
+    employee_map = {emp['employee_id']: emp for emp in service.get_employees()}
+    rates = service.get_insurance_rates()
+
+    def persist(conn: sqlite3.Connection) -> Dict[str, Any]:
+        result = PayrollService(conn).bulk_create_payroll_records(records, employee_map, rates)
+
+        # Sheets with skipped/failed records: fingerprint not stored
+        incomplete_sheets = {record_sheets[row['index']] for row in result['skipped'] + result['errors']}
+
+        # Remember fully imported sheets (same transaction as their records)
+        SheetFingerprintService(conn).record_sheets(
+            parsed_sheets, records, record_sheets, incomplete_sheets, filename
+        )
+
+        conn.commit()
+        return result
+
+    if writer is not None:
+        # Queued behind other writes; committed with them (group commit)
+        result = writer.run(persist)
+    else:
+        try:
+            result = persist(db)
+        except Exception:
+            db.rollback()
+            raise
+    progress('persist', 80, records_total=total_parsed)
+
+    skipped = result['skipped']
+    errors = result['errors']
+    progress('persist', 100, records_total=total_parsed, records_saved=result['saved'],
+             records_skipped=len(skipped), error_count=len(errors))
+
+    response = {
+        "success": True,
+        "filename": filename,
+        "total_records": total_parsed,
+        "saved_records": result['saved'],
+        "skipped_count": len(skipped),
+        "error_count": len(errors),
+        "skipped_details": skipped[:10] if skipped else None,  # First 10 skipped
+        "errors": [e['error'] for e in errors[:10]] if errors else None,  # First 10 error messages
+        "cache_hit": cache_hit,  # True if parse was skipped (identical file parsed before)
+        "changed_sheets": changed_sheets,
+        "unchanged_sheets": unchanged_sheets  # Skipped: identical to last import
+    }
+
+    # Add template stats if available
+    if template_stats:
+        response["template_stats"] = template_stats
+
+    return response
+
+
+def folder_file_kind(filename: str) -> str:
+    """'payroll' (SalaryStatementParser) or 'generic' (ExcelParser) for a synced file"""
+    filename = filename.lower()
+    if "給" in filename or "給与" in filename or "給料" in filename:
+        return 'payroll'
+    return 'generic'
+
+
+def plan_sync(db: sqlite3.Connection, files: List[Path], force: bool = False,
+              writer: Optional[WriteQueue] = None) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+    """
+    Compare files with the sync manifest (folder_sync.py).
+
+    Same size and mtime as a fully imported entry, or same SHA-256, means
+    unchanged; the size/mtime of touched files is updated (no commit, or
+    one write task with a writer).
+
+    Args:
+        force: Ignore the manifest (every file is pending)
+        writer: Single-writer queue (db_writer.py); if None, writes go through db
+
+    Returns:
+        (report per path, pending files per path with size, mtime_ns, hash, kind)
+    """
+    entries = {} if force else SyncManifestService(db).get_entries()
+    reports: Dict[str, Dict[str, Any]] = {}
+    pending: Dict[str, Dict[str, Any]] = {}
+    touched: List[Tuple[str, int, int]] = []
+
+    for file_path in files:
+        key = str(file_path)
+        report = reports[key] = {
+            "file": file_path.name, "status": "unchanged", "size": 0, "records": 0,
+            "saved": 0, "skipped": 0, "errors": 0, "cache_hit": False, "seconds": 0.0, "error": None,
+        }
+        try:
+            stat = file_path.stat()
+            report["size"] = stat.st_size
+            entry = entries.get(key)
+            if is_unchanged(entry, stat.st_size, stat.st_mtime_ns):
+                continue
+
+            content_hash = hash_content(file_path)
+            if entry is not None and entry['last_status'] == 'imported' and entry['content_hash'] == content_hash:
+                # Copied or touched: same bytes, remember the new size/mtime
+                touched.append((key, stat.st_size, stat.st_mtime_ns))
+                continue
+        except OSError as e:
+            report.update(status="failed", errors=1, error=str(e))
+            continue
+
+        report["status"] = "queued"
+        pending[key] = {
+            'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': content_hash,
+            'kind': folder_file_kind(file_path.name),
+        }
+
+    if touched:
+        def touch(conn: sqlite3.Connection) -> None:
+            manifest = SyncManifestService(conn)
+            for entry in touched:
+                manifest.touch(*entry)
+
+        _write(db, writer, touch)
+
+    return reports, pending
+
+
+class ParsedFileWriter:
+    """
+    Persists parse_folder_file results (sync_folder, bulk_ingest.py).
+
+    Employees, rates and sheet fingerprints are loaded once. write() does
+    not commit, so callers choose the transaction size: one file per
+    transaction (or write task) for folder syncs, many files for offline
+    bulk loads.
+    """
+
+    def __init__(self, db: sqlite3.Connection, template_manager: TemplateManager,
+                 record_metrics: bool = True):
+        self.db = db
+        self.template_manager = template_manager
+        # ParseMetricsService.record_run commits: off inside multi-file transactions
+        self.record_metrics = record_metrics
+        self.known_fingerprints = SheetFingerprintService(db).get_known()
+
+        # Employees and rates are loaded once for all files
+        service = PayrollService(db)
+        self.employee_map = {emp['employee_id']: emp for emp in service.get_employees()}
+        self.rates = service.get_insurance_rates()
+
+    def parse_args(self, key: str, kind: str, engine: str = PARSER_ENGINE) -> tuple:
+        """parse_folder_file arguments for one file"""
+        return (
+            key, kind, engine, str(self.template_manager.db_path),
+            self.template_manager.refresh_if_changed(), self.known_fingerprints,
+        )
+
+    def save_templates(self, result: Dict[str, Any]) -> None:
+        """
+        Save the templates detected by parse workers (from this single process).
+
+        TemplateManager writes on its own connection: call this outside the
+        write transaction (before the write task), or it waits on that lock.
+        """
+        for template_kwargs in result['pending_templates']:
+            self.template_manager.save_template(**template_kwargs)
+
+    def write(self, key: str, info: Dict[str, Any], result: Dict[str, Any],
+              cache_hit: bool = False, conn: Optional[sqlite3.Connection] = None) -> Dict[str, Any]:
+        """
+        Save the records of one parsed file and its manifest entry (no commit).
+
+        Args:
+            conn: Connection to write on (a write task's); default the writer's db
+
+        Returns:
+            Dict with status ('imported' or 'partial'), records, saved,
+            skipped, errors and changed/unchanged sheet names
+        """
+        conn = self.db if conn is None else conn
+        file_name = Path(key).name
+        parse_stats = result['stats']
+        payroll_records = result['records']
+
+        if parse_stats is not None and self.record_metrics:
+            ParseMetricsService(conn).record_run(parse_stats.get('metrics'), file_name, cache_hit)
+
+        # Skip sheets that did not change since the last import
+        parsed_sheets = parse_stats.get('sheets') if parse_stats else None
+        records, record_sheets, changed, unchanged = partition_by_sheet(
+            payroll_records, parsed_sheets, self.known_fingerprints
+        )
+
+        saved = PayrollService(conn).bulk_create_payroll_records(records, self.employee_map, self.rates)
+        incomplete_sheets = {
+            record_sheets[row['index']] for row in saved['skipped'] + saved['errors']
+        }
+        SheetFingerprintService(conn).record_sheets(
+            parsed_sheets, records, record_sheets, incomplete_sheets, file_name
+        )
+        status = 'partial' if saved['skipped'] or saved['errors'] else 'imported'
+        SyncManifestService(conn).record(
+            key, info['size'], info['mtime_ns'], info['hash'], status,
+            saved['saved'], len(saved['skipped']), len(saved['errors']),
+        )
+        return {
+            'status': status,
+            'records': len(payroll_records),
+            'saved': saved['saved'],
+            'skipped': len(saved['skipped']),
+            'errors': len(saved['errors']),
+            'changed': changed,
+            'unchanged': unchanged,
+        }
+
+    def record_failure(self, key: str, info: Dict[str, Any], error: str,
+                       conn: Optional[sqlite3.Connection] = None) -> None:
+        """Manifest entry for a file that could not be imported (no commit)"""
+        SyncManifestService(self.db if conn is None else conn).record(
+            key, info['size'], info['mtime_ns'], info['hash'], 'failed', error_count=1, error=error
+        )
+
+
+def sync_folder(db: sqlite3.Connection, folder: Path,
+                progress: Optional[ProgressCallback] = None, force: bool = False,
+                template_manager: Optional[TemplateManager] = None,
+                writer: Optional[WriteQueue] = None) -> Dict[str, Any]:
+    """
+    Import every .xlsm file of a folder, skipping files that did not change.
+
+    Files are compared with the sync manifest (plan_sync). Changed files
+    are parsed concurrently in the parse pool and written as they complete
+    (one transaction per file: a write task with a writer, else on db from
+    this thread). A file that fails is rolled back and reported; the other
+    files are still imported.
+
+    Args:
+        force: Ignore the manifest and re-import every file
+        template_manager: Factory templates (default database if None)
+        writer: Single-writer queue (db_writer.py); if None, writes go through db
+
+    Returns:
+        Response dict of /api/sync-from-folder, with a per-file report
+    """
+    progress = _reporter(progress)
+    started = time.perf_counter()
+
+    # Find all .xlsm files
+    xlsm_files = sorted(folder.glob("*.xlsm"))
+
+    if not xlsm_files:
+        return {
+            "status": "error",
+            "message": f"No .xlsm files found in {folder}",
+            "files_found": 0,
+            "files_processed": 0,
+            "total_records": 0
+        }
+
+    template_manager = template_manager or TemplateManager()
+
+    # 1. Manifest: skip files whose size/mtime or content is unchanged
+    reports, pending = plan_sync(db, xlsm_files, force=force, writer=writer)
+    db.commit()
+    files_unchanged = sum(1 for r in reports.values() if r["status"] == "unchanged")
+    print(f"[SYNC] {folder}: {len(xlsm_files)} files, {files_unchanged} unchanged, {len(pending)} to import")
+
+    # Process each file
+    file_writer = ParsedFileWriter(db, template_manager)
+    total_saved = 0
+    total_skipped = 0
+    total_errors = sum(r["errors"] for r in reports.values())
+    files_processed = 0
+    cache_hits = 0
+    changed_sheets = 0
+    unchanged_sheets = 0
+
+    # 2. Parse: cached results first, the rest in the process pool
+    version = parse_version_stamp(template_manager)
+    cached: Dict[str, Tuple[List[Any], Dict[str, Any]]] = {}
+    tasks = []
+    for key, info in pending.items():
+        hit = parse_cache.get(info['hash'], version) if info['kind'] == 'payroll' and version else None
+        if hit is not None:
+            cached[key] = hit
+        else:
+            tasks.append((key, file_writer.parse_args(key, info['kind'])))
+
+    def results():
+        for key, (records, stats) in cached.items():
+            yield key, {'records': records, 'stats': stats, 'pending_templates': [], 'cache_hit': True}
+        yield from parse_files(tasks, FOLDER_SYNC_WORKERS)
+
+    # 3. Persist: one transaction per file, in completion order
+    for done, (key, result) in enumerate(results(), start=1):
+        info = pending[key]
+        report = reports[key]
+        file_started = time.perf_counter()
+        try:
+            if isinstance(result, Exception):
+                raise result
+
+            cache_hit = result.get('cache_hit', False)
+            file_writer.save_templates(result)
+
+            def persist(conn: sqlite3.Connection) -> Dict[str, Any]:
+                return file_writer.write(key, info, result, cache_hit=cache_hit, conn=conn)
+
+            if writer is not None:
+                # This file's records are one write task (group commit)
+                written = writer.run(persist)
+            else:
+                try:
+                    written = persist(db)
+                    db.commit()  # Commit this file's records
+                except Exception:
+                    db.rollback()
+                    raise
+
+            # Full parses are cached under the stamp taken after template saves
+            parse_stats = result['stats']
+            if parse_stats is not None and not cache_hit and not parse_stats.get('unchanged_sheets'):
+                cache_version = parse_version_stamp(template_manager)
+                if cache_version is not None:
+                    parse_cache.put(info['hash'], cache_version, result['records'],
+                                    {k: v for k, v in parse_stats.items() if k != 'metrics'})
+
+            cache_hits += int(cache_hit)
+            changed_sheets += len(written['changed'])
+            unchanged_sheets += len(written['unchanged'])
+            total_saved += written['saved']
+            total_skipped += written['skipped']
+            total_errors += written['errors']
+            files_processed += 1
+            report.update(
+                status=written['status'], records=written['records'], saved=written['saved'],
+                skipped=written['skipped'], errors=written['errors'], cache_hit=cache_hit,
+            )
+
+        except Exception as e:
+            # File failed, but continue with next file
+            print(f"[WARN] Sync failed for {report['file']}: {e}")
+            total_errors += 1
+            report.update(status="failed", errors=1, error=str(e))
+            error = str(e)
+            _write(db, writer, lambda conn: file_writer.record_failure(key, info, error, conn=conn))
+            db.commit()
+
+        report["seconds"] = round(time.perf_counter() - file_started, 3)
+        publish_event('file_finished', **report)
+        progress('persist', 100 * done / max(len(pending), 1), records_saved=total_saved,
+                 records_skipped=total_skipped, error_count=total_errors)
+
+    progress('persist', 100, records_saved=total_saved, records_skipped=total_skipped,
+             error_count=total_errors)
+    files_failed = sum(1 for r in reports.values() if r["status"] == "failed")
+
+    return {
+        "status": "success",
+        "message": f"Processed {files_processed} files from {folder}",
+        "files_found": len(xlsm_files),
+        "files_processed": files_processed,
+        "files_unchanged": files_unchanged,
+        "files_failed": files_failed,
+        "total_records_saved": total_saved,
+        "total_records_skipped": total_skipped,
+        "total_errors": total_errors,
+        "cache_hits": cache_hits,
+        "changed_sheets": changed_sheets,
+        "unchanged_sheets": unchanged_sheets,
+        "seconds": round(time.perf_counter() - started, 3),
+        "files": [reports[str(file_path)] for file_path in xlsm_files],
+    }
@@ -0,0 +1,170 @@
+"""
+Label Matcher - Precompiled matching of Excel labels against known patterns
+===========================================================================
+Field detection and the dynamic-zone scan used to test every label against
+every pattern with nested loops (and re.match per allowance pattern).
+
+A LabelMatcher is built once per pattern set and answers, for one label:
+- which FIELD_PATTERNS fields match (prefix or substring semantics)
+- which DYNAMIC_ZONE_LABELS category matches (first in dict order)
+- whether it is an allowance (手当/割増/加算) or a non-billable name
+
+Patterns are indexed by their text, so a label is matched by looking up its
+own prefixes/substrings (bounded by the longest pattern) instead of looping
+over all patterns. Results are memoized per label, because the same labels
+repeat in every employee block of every sheet.
+
+The results are identical to the original loops (same ordering rules).
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+
+# Labels seen in one upload are few (~200), but keep the memo bounded
+LABEL_MEMO_SIZE = 8192
+
+# Labels containing these are payment (yen) rows, never hours/days rows
+PAYMENT_INDICATORS = ('手当', '代', '割増', '給')
+
+
+def strip_spaces(text: str) -> str:
+    """Remove ASCII and full-width spaces"""
+    return text.replace(' ', '').replace('　', '')
+
+
+_BRACKETS_RE = re.compile(r'[（(].*?[）)]')
+
+
+@lru_cache(maxsize=LABEL_MEMO_SIZE)
+def normalize_label(text: str) -> str:
+    """
+    Normalize a label for comparison (memoized).
+
+    Removes spaces, parentheses with their contents (通勤手当（非）→ 通勤手当)
+    and Japanese interpuncts (・).
+    """
+    text = text.replace('　', '').replace(' ', '')
+    text = _BRACKETS_RE.sub('', text)
+    text = text.replace('・', '').replace('･', '')
+    return text.strip()
+
+
+class LabelMatch(NamedTuple):
+    """Every category a single label belongs to"""
+    normalized: str                  # Label without spaces
+    fields: Tuple[str, ...]          # Matching FIELD_PATTERNS keys, in dict order
+    dynamic_category: Optional[str]  # DYNAMIC_ZONE_LABELS category (first match)
+    is_allowance: bool               # Matches any ALLOWANCE_PATTERNS regex
+    is_non_billable: bool            # Exact non-billable allowance name
+
+
+class LabelMatcher:
+    """
+    Precompiled matcher for one set of label patterns.
+
+    Field modes:
+        'prefix':    label == pattern, or label starts with pattern; for
+                     *_hours / *_days fields a prefix match is rejected when
+                     the label contains a payment indicator (手当/代/割増/給)
+        'substring': pattern appears anywhere in the label
+    """
+
+    def __init__(
+        self,
+        field_patterns: Dict[str, List[str]],
+        dynamic_labels: Optional[Dict[str, str]] = None,
+        allowance_patterns: Iterable[str] = (),
+        non_billable_names: Iterable[str] = (),
+        field_mode: str = 'prefix',
+    ):
+        if field_mode not in ('prefix', 'substring'):
+            raise ValueError(f"Unknown field_mode '{field_mode}'")
+        self.field_mode = field_mode
+
+        # pattern (normalized) -> [(field order, field name)]
+        self._field_index: Dict[str, List[Tuple[int, str]]] = {}
+        for order, (field_name, patterns) in enumerate(field_patterns.items()):
+            for pattern in patterns:
+                entries = self._field_index.setdefault(strip_spaces(pattern), [])
+                if (order, field_name) not in entries:
+                    entries.append((order, field_name))
+        self._field_max_len = max((len(p) for p in self._field_index), default=0)
+        self._time_fields = frozenset(
+            f for f in field_patterns if '_hours' in f or '_days' in f
+        )
+
+        # Dynamic zone: a known label matches if it is contained in the label,
+        # or if the label is contained in it. First match in dict order wins.
+        self._dynamic_items = list((dynamic_labels or {}).items())
+        self._dynamic_index: Dict[str, int] = {}
+        self._dynamic_within: Dict[str, int] = {}  # any substring of a known label -> first order
+        for order, (known, _) in enumerate(self._dynamic_items):
+            self._dynamic_index.setdefault(known, order)
+            for start in range(len(known)):
+                for end in range(start + 1, len(known) + 1):
+                    self._dynamic_within.setdefault(known[start:end], order)
+        self._dynamic_max_len = max((len(k) for k in self._dynamic_index), default=0)
+
+        patterns = list(allowance_patterns)
+        self._allowance_re = re.compile('|'.join(f'(?:{p})' for p in patterns)) if patterns else None
+        self._non_billable = frozenset(non_billable_names)
+
+        self.match = lru_cache(maxsize=LABEL_MEMO_SIZE)(self._match)
+
+    # ==================== Matching ====================
+
+    def _match(self, label: str) -> LabelMatch:
+        """Match one (stripped) label against all pattern sets"""
+        normalized = strip_spaces(label)
+        return LabelMatch(
+            normalized=normalized,
+            fields=self._match_fields(normalized),
+            dynamic_category=self._match_dynamic(normalized),
+            is_allowance=bool(self._allowance_re and self._allowance_re.match(label)),
+            is_non_billable=label in self._non_billable,
+        )
+
+    def _match_fields(self, normalized: str) -> Tuple[str, ...]:
+        index = self._field_index
+        found: Dict[int, str] = {}
+
+        if self.field_mode == 'prefix':
+            is_payment = any(ind in normalized for ind in PAYMENT_INDICATORS)
+            for length in range(min(len(normalized), self._field_max_len) + 1):
+                entries = index.get(normalized[:length])
+                if not entries:
+                    continue
+                exact = length == len(normalized)
+                for order, field_name in entries:
+                    if exact or not is_payment or field_name not in self._time_fields:
+                        found[order] = field_name
+        else:
+            for start in range(len(normalized)):
+                for end in range(start + 1, min(len(normalized), start + self._field_max_len) + 1):
+                    for order, field_name in index.get(normalized[start:end], ()):
+                        found[order] = field_name
+            for order, field_name in index.get('', ()):
+                found[order] = field_name
+
+        return tuple(found[order] for order in sorted(found))
+
+    def _match_dynamic(self, normalized: str) -> Optional[str]:
+        if not self._dynamic_items:
+            return None
+
+        # Label contained in a known label
+        best = self._dynamic_within.get(normalized)
+        if not normalized:
+            best = 0  # '' is contained in every known label
+
+        # Known label contained in the label
+        index = self._dynamic_index
+        for start in range(len(normalized)):
+            for end in range(start + 1, min(len(normalized), start + self._dynamic_max_len) + 1):
+                order = index.get(normalized[start:end])
+                if order is not None and (best is None or order < best):
+                    best = order
+
+        return self._dynamic_items[best][1] if best is not None else None
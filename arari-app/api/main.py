@@ -11,15 +11,28 @@ from fastapi import FastAPI, UploadFile, File, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
+import asyncio
 import uvicorn
 import tempfile
 import os
 
-from database import init_db, get_db
+from database import MIGRATIONS, backfill_finished, init_db, get_db, get_ingest_db, read_connection
+from db_pool import close_pools, pool_stats
+from db_writer import db_writer
+from db_async import db_endpoint, db_executor_stats, db_write_endpoint, run_db, shutdown_db_executor
+from migrations import BACKFILL_MODE, BackfillWorker, schema_status
 from models import Employee, PayrollRecord, EmployeeCreate, PayrollRecordCreate
-from services import PayrollService, ExcelParser
-from salary_parser import SalaryStatementParser
-from employee_parser import DBGenzaiXParser
+from services import PayrollService
+from salary_parser import shutdown_parse_pool
+from parse_cache import parse_cache
+from upload_spool import SpooledUpload, UploadTooLargeError, PeakMemoryMonitor
+from upload_jobs import UploadJobService, job_runner
+from progress_events import progress_bus
+import folder_watcher
+from ingestion import (
+    EMPLOYEE_EXTENSIONS, PAYROLL_EXTENSIONS, import_employee_file, ingest_file, sync_folder,
+)
+from parse_metrics import ParseMetricsService
 from template_manager import TemplateManager, create_template_from_excel
 from typing import List, Optional
 import sqlite3
@@ -28,14 +41,36 @@ from io import BytesIO
 from pathlib import Path
 from fastapi.responses import Response
 
+# Comment line sent on idle SSE progress streams (keeps proxies from closing them)
+SSE_HEARTBEAT_SECONDS = 15
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup: Initialize database
     init_db()
     print("[OK] Database initialized")
+    # Online schema backfills (ARARI_BACKFILL_MODE=background), through the DB writer
+    backfill_worker = None
+    if BACKFILL_MODE == 'background':
+        backfill_worker = BackfillWorker(MIGRATIONS, db_writer, on_done=backfill_finished)
+        backfill_worker.start()
+    # Background upload jobs left by the previous process
+    recovered = job_runner.resume()
+    if recovered['resumed'] or recovered['interrupted']:
+        print(f"[OK] Upload jobs: {recovered['resumed']} resumed, {recovered['interrupted']} interrupted")
+    # Optional continuous ingestion of ARARI_WATCH_FOLDER
+    folder_watcher.start_folder_watcher()
     yield
     # Shutdown
     print("[SHUTDOWN] Closing application...")
+    folder_watcher.stop_folder_watcher()
+    job_runner.shutdown()
+    shutdown_parse_pool()
+    if backfill_worker is not None:
+        backfill_worker.stop()
+    db_writer.stop()
+    shutdown_db_executor()
+    close_pools()
 
 app = FastAPI(
     title="粗利 PRO API",
@@ -81,7 +116,8 @@ async def health_check():
 # ============== Employees ==============
 
 @app.get("/api/employees", response_model=List[Employee])
-async def get_employees(
+@db_endpoint
+def get_employees(
     db: sqlite3.Connection = Depends(get_db),
     search: Optional[str] = None,
     company: Optional[str] = None,
@@ -92,7 +128,8 @@ async def get_employees(
     return service.get_employees(search=search, company=company, employee_type=employee_type)
 
 @app.get("/api/employees/{employee_id}", response_model=Employee)
-async def get_employee(employee_id: str, db: sqlite3.Connection = Depends(get_db)):
+@db_endpoint
+def get_employee(employee_id: str, db: sqlite3.Connection = Depends(get_db)):
     """Get a single employee by ID"""
     service = PayrollService(db)
     employee = service.get_employee(employee_id)
@@ -101,16 +138,18 @@ async def get_employee(employee_id: str, db: sqlite3.Connection = Depends(get_db
     return employee
 
 @app.post("/api/employees", response_model=Employee)
-async def create_employee(employee: EmployeeCreate, db: sqlite3.Connection = Depends(get_db)):
+@db_write_endpoint
+def create_employee(employee: EmployeeCreate, db: sqlite3.Connection = None):
     """Create a new employee"""
     service = PayrollService(db)
     return service.create_employee(employee)
 
 @app.put("/api/employees/{employee_id}", response_model=Employee)
-async def update_employee(
+@db_write_endpoint
+def update_employee(
     employee_id: str,
     employee: EmployeeCreate,
-    db: sqlite3.Connection = Depends(get_db)
+    db: sqlite3.Connection = None
 ):
     """Update an existing employee"""
     service = PayrollService(db)
@@ -120,7 +159,8 @@ async def update_employee(
     return updated
 
 @app.delete("/api/employees/{employee_id}")
-async def delete_employee(employee_id: str, db: sqlite3.Connection = Depends(get_db)):
+@db_write_endpoint
+def delete_employee(employee_id: str, db: sqlite3.Connection = None):
     """Delete an employee"""
     service = PayrollService(db)
     if not service.delete_employee(employee_id):
@@ -130,7 +170,8 @@ async def delete_employee(employee_id: str, db: sqlite3.Connection = Depends(get
 # ============== Payroll Records ==============
 
 @app.get("/api/payroll", response_model=List[PayrollRecord])
-async def get_payroll_records(
+@db_endpoint
+def get_payroll_records(
     db: sqlite3.Connection = Depends(get_db),
     period: Optional[str] = None,
     employee_id: Optional[str] = None
@@ -140,15 +181,17 @@ async def get_payroll_records(
     return service.get_payroll_records(period=period, employee_id=employee_id)
 
 @app.get("/api/payroll/periods")
-async def get_available_periods(db: sqlite3.Connection = Depends(get_db)):
+@db_endpoint
+def get_available_periods(db: sqlite3.Connection = Depends(get_db)):
     """Get list of available periods"""
     service = PayrollService(db)
     return service.get_available_periods()
 
 @app.post("/api/payroll", response_model=PayrollRecord)
-async def create_payroll_record(
+@db_write_endpoint
+def create_payroll_record(
     record: PayrollRecordCreate,
-    db: sqlite3.Connection = Depends(get_db)
+    db: sqlite3.Connection = None
 ):
     """Create a new payroll record"""
     service = PayrollService(db)
@@ -159,7 +202,8 @@ async def create_payroll_record(
 # ============== Statistics ==============
 
 @app.get("/api/statistics")
-async def get_statistics(
+@db_endpoint
+def get_statistics(
     db: sqlite3.Connection = Depends(get_db),
     period: Optional[str] = None
 ):
@@ -168,7 +212,8 @@ async def get_statistics(
     return service.get_statistics(period=period)
 
 @app.get("/api/statistics/monthly")
-async def get_monthly_statistics(
+@db_endpoint
+def get_monthly_statistics(
     db: sqlite3.Connection = Depends(get_db),
     year: Optional[int] = None,
     month: Optional[int] = None
@@ -178,13 +223,15 @@ async def get_monthly_statistics(
     return service.get_monthly_statistics(year=year, month=month)
 
 @app.get("/api/statistics/companies")
-async def get_company_statistics(db: sqlite3.Connection = Depends(get_db)):
+@db_endpoint
+def get_company_statistics(db: sqlite3.Connection = Depends(get_db)):
     """Get statistics by company"""
     service = PayrollService(db)
     return service.get_company_statistics()
 
 @app.get("/api/statistics/trend")
-async def get_profit_trend(
+@db_endpoint
+def get_profit_trend(
     db: sqlite3.Connection = Depends(get_db),
     months: int = 6
 ):
@@ -195,7 +242,8 @@ async def get_profit_trend(
 # ============== Sync Employees ==============
 
 @app.post("/api/sync-employees")
-async def sync_employees(db: sqlite3.Connection = Depends(get_db)):
+@db_write_endpoint
+def sync_employees(db: sqlite3.Connection = None):
     """Sync/update employees from ChinginGenerator database"""
     try:
         from migrate_employees import migrate_employees_sync
@@ -220,81 +268,41 @@ async def sync_employees(db: sqlite3.Connection = Depends(get_db)):
 @app.post("/api/import-employees")
 async def import_employees(
     file: UploadFile = File(...),
-    db: sqlite3.Connection = Depends(get_db)
+    db: sqlite3.Connection = Depends(get_ingest_db)
 ):
     """
     Dedicated endpoint for importing employees from Excel (DBGenzaiX format).
     Used by EmployeeUploader.tsx
     """
-    allowed_extensions = ['.xlsx', '.xlsm', '.xls']
-    file_ext = '.' + file.filename.split('.')[-1].lower() if '.' in file.filename else ''
-
-    if file_ext not in allowed_extensions:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Invalid file type. Allowed: {', '.join(allowed_extensions)}"
-        )
+    file_ext = _upload_extension(file.filename, EMPLOYEE_EXTENSIONS)
 
     try:
-        content = await file.read()
-        
-        # Save temp file for parser
-        import tempfile
-        import os
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as tmp:
-            tmp.write(content)
-            tmp_path = tmp.name
-            
+        # Spool upload to a temp file in chunks (size limit checked while copying)
+        upload = await SpooledUpload.from_upload(file, suffix=file_ext)
+
         try:
-            parser = DBGenzaiXParser()
-            employees, stats = parser.parse_employees(tmp_path)
-            print(f"[INFO] /api/import-employees: Parsed {len(employees)} employees. Stats: {stats}")
-            
-            service = PayrollService(db)
-            added_count = 0
-            updated_count = 0
-            
-            for emp in employees:
-                emp_data = EmployeeCreate(
-                    employee_id=emp.employee_id,
-                    name=emp.name,
-                    name_kana=emp.name_kana,
-                    dispatch_company=emp.dispatch_company if emp.dispatch_company else "Unknown",
-                    department=emp.department,
-                    hourly_rate=emp.hourly_rate,
-                    billing_rate=emp.billing_rate,
-                    status=emp.status,
-                    hire_date=emp.hire_date,
-                    # NEW FIELDS - 2025-12-11
-                    employee_type=emp.employee_type,
-                    gender=emp.gender,
-                    birth_date=emp.birth_date,
-                    termination_date=emp.termination_date,
-                )
-                
-                existing = service.get_employee(emp.employee_id)
-                if existing:
-                    service.update_employee(emp.employee_id, emp_data)
-                    updated_count += 1
-                else:
-                    service.create_employee(emp_data)
-                    added_count += 1
-            
+            from fastapi.concurrency import run_in_threadpool
+            result = await run_in_threadpool(import_employee_file, db, upload.path, writer=db_writer)
+            imported_count = result['added'] + result['updated'] + result['unchanged']
+
             return {
                 "status": "success",
-                "message": f"Successfully imported {len(employees)} employees",
-                "employees_added": added_count,
-                "employees_updated": updated_count,
-                "employees_skipped": stats['rows_skipped'],
-                "total_employees": len(employees),
-                "errors": parser.errors
+                "message": f"Successfully imported {imported_count} employees",
+                "employees_added": result['added'],
+                "employees_updated": result['updated'],
+                "employees_unchanged": result['unchanged'],
+                "employees_terminated": result['terminated'],
+                "changes": result['diff'],
+                "employees_skipped": result['stats']['rows_skipped'],
+                "total_employees": imported_count,
+                "errors": result['errors']
             }
             
         finally:
-            if os.path.exists(tmp_path):
-                os.unlink(tmp_path)
-                
+            upload.close()
+
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         print(f"[ERROR] Import failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -303,226 +311,223 @@ async def import_employees(
 @app.post("/api/upload")
 async def upload_payroll_file(
     file: UploadFile = File(...),
-    db: sqlite3.Connection = Depends(get_db)
+    upload_id: Optional[str] = None,
+    db: sqlite3.Connection = Depends(get_ingest_db)
 ):
-    """Upload and parse a payroll file (Excel or CSV)"""
-    # Validate file type
-    allowed_extensions = ['.xlsx', '.xlsm', '.xls', '.csv']
-    file_ext = '.' + file.filename.split('.')[-1].lower() if '.' in file.filename else ''
+    """
+    Upload and parse a payroll file (Excel or CSV)
+
+    Pass an upload_id (chosen by the client) and open
+    GET /api/progress/{upload_id} first to receive progress events.
+    """
+    file_ext = _upload_extension(file.filename, PAYROLL_EXTENSIONS)
+
+    # Uploads are spooled to disk in chunks (max 50MB, checked while copying)
+    memory_monitor = PeakMemoryMonitor().start()
+    upload = None
+    response = None
+
+    try:
+        try:
+            upload = await SpooledUpload.from_upload(file, suffix=file_ext)
+        except UploadTooLargeError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        print(f"[DEBUG] File size: {upload.size} bytes")
+
+        # Run CPU-bound parsing and the DB writes in thread pool to avoid blocking async loop
+        from fastapi.concurrency import run_in_threadpool
+        response = await run_in_threadpool(
+            progress_bus.bound, upload_id, ingest_file, db, upload.path, file.filename, file_ext, upload.sha256,
+            writer=db_writer,
+        )
+
+        if upload_id:
+            progress_bus.publish(upload_id, 'done', records_saved=response.get('saved_records', 0))
+        return response
+
+    except HTTPException as e:
+        if upload_id:
+            progress_bus.publish(upload_id, 'failed', error=str(e.detail))
+        raise
+    except Exception as e:
+        if upload_id:
+            progress_bus.publish(upload_id, 'failed', error=str(e))
+        raise HTTPException(status_code=400, detail=f"Error processing file: {str(e)}")
+    finally:
+        memory_stats = memory_monitor.stop()
+        if response is not None:
+            # Size and peak memory of this upload
+            response["upload_stats"] = {"size_bytes": upload.size, **memory_stats}
+        if upload is not None:
+            upload.close()
+
+
+def _upload_extension(filename: str, allowed_extensions: List[str]) -> str:
+    """Lowercase extension of an uploaded file (400 if not allowed)"""
+    file_ext = '.' + filename.split('.')[-1].lower() if '.' in filename else ''
 
     if file_ext not in allowed_extensions:
         raise HTTPException(
             status_code=400,
             detail=f"Invalid file type. Allowed: {', '.join(allowed_extensions)}"
         )
+    return file_ext
 
-    # Validate file size (max 50MB)
-    MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB in bytes
+
+def _sync_folder_path(payload: dict) -> Path:
+    """Validated folder of a sync request (400 if missing)"""
+    folder_path = payload.get("folder_path", "").strip()
+
+    if not folder_path:
+        raise HTTPException(status_code=400, detail="folder_path is required")
+
+    # Normalize path for Windows
+    folder_path = folder_path.replace("/", "\\")
+    path = Path(folder_path)
+
+    if not path.exists():
+        raise HTTPException(status_code=400, detail=f"Folder not found: {folder_path}")
+
+    if not path.is_dir():
+        raise HTTPException(status_code=400, detail=f"Path is not a directory: {folder_path}")
+
+    return path
+
+# ============== Upload Jobs (background ingestion) ==============
+
+@app.post("/api/jobs/upload")
+async def create_upload_job(file: UploadFile = File(...)):
+    """
+    Upload a payroll / employee file and import it in the background.
+
+    Returns the job ID right away; poll GET /api/jobs/{job_id} for progress.
+    """
+    file_ext = _upload_extension(file.filename, PAYROLL_EXTENSIONS)
 
     try:
-        # Read file content
-        content = await file.read()
+        upload = await SpooledUpload.from_upload(file, suffix=file_ext)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
 
-        # Check file size after reading
-        if len(content) > MAX_FILE_SIZE:
-            raise HTTPException(
-                status_code=413,
-                detail=f"File too large. Maximum size: 50MB. Your file: {len(content) / 1024 / 1024:.2f}MB"
-            )
+    # The job owns the spool file from now on (deleted when it ends)
+    source_path = upload.detach()
+    job_id = await asyncio.wrap_future(db_writer.submit(lambda conn: UploadJobService(conn).create_job(
+        'upload', source_path, filename=file.filename, file_ext=file_ext,
+        content_hash=upload.sha256, size_bytes=upload.size, delete_source=True,
+    )))
+    upload.close()
+    job_runner.submit(job_id)
 
-        # Detect file type and use appropriate parser
-        
-        # Detect file type and use appropriate parser
-        
-        # ---------------------------------------------------------
-        # CASE A: Payroll File (給与明細)
-        # ---------------------------------------------------------
-        if file_ext in ['.xlsm', '.xlsx'] and ('給与' in file.filename or '給料' in file.filename or '明細' in file.filename):
-            print(f"[INFO] Detected Payroll File: {file.filename}")
-            print(f"[DEBUG] File size: {len(content)} bytes")
-            print(f"[DEBUG] File extension: {file_ext}")
-            # Use specialized SalaryStatementParser
-            template_stats = None
-            parser = SalaryStatementParser(use_intelligent_mode=True)
-            
-            # Run CPU-bound parsing in thread pool to avoid blocking async loop
-            from fastapi.concurrency import run_in_threadpool
-            print(f"[DEBUG] About to call parser.parse() in threadpool...")
-            records = await run_in_threadpool(parser.parse, content)
-            print(f"[DEBUG] Parser returned {len(records)} records")
-            
-            template_stats = parser.get_parsing_stats()
-            
-        # ---------------------------------------------------------
-        # CASE B: Employee Master File (社員台帳)
-        # ---------------------------------------------------------
-        elif file_ext in ['.xlsx', '.xlsm', '.xls'] and ('社員' in file.filename or 'Employee' in file.filename or '台帳' in file.filename):
-            print(f"[INFO] Detected Employee Master File: {file.filename}")
-            
-            # Save temp file for parser
-            with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as tmp:
-                tmp.write(content)
-                tmp_path = tmp.name
-                
-            try:
-                parser = DBGenzaiXParser()
-                from fastapi.concurrency import run_in_threadpool
-                employees, stats = await run_in_threadpool(parser.parse_employees, tmp_path)
-                
-                print(f"[INFO] Parsed {len(employees)} employees. Stats: {stats}")
-                
-                service = PayrollService(db)
-                imported_count = 0
-                
-                # Upsert employees
-                for emp in employees:
-                    # Convert to EmployeeCreate schema
-                    emp_data = EmployeeCreate(
-                        employee_id=emp.employee_id,
-                        name=emp.name,
-                        name_kana=emp.name_kana,
-                        dispatch_company=emp.dispatch_company if emp.dispatch_company else "Unknown",
-                        department=emp.department,
-                        hourly_rate=emp.hourly_rate,
-                        billing_rate=emp.billing_rate,
-                        status=emp.status,
-                        hire_date=emp.hire_date,
-                        # NEW FIELDS - 2025-12-11
-                        employee_type=emp.employee_type,
-                        gender=emp.gender,
-                        birth_date=emp.birth_date,
-                        termination_date=emp.termination_date,
-                    )
-                    
-                    # Try update first (if exists), then create
-                    existing = service.get_employee(emp.employee_id)
-                    if existing:
-                        service.update_employee(emp.employee_id, emp_data)
-                    else:
-                        service.create_employee(emp_data)
-                    
-                    imported_count += 1
-                    
-                return {
-                    "success": True,
-                    "filename": file.filename,
-                    "total_records": stats['total_rows'],
-                    "saved_records": imported_count,
-                    "message": f"Successfully imported {imported_count} employees."
-                }
-                
-            finally:
-                if os.path.exists(tmp_path):
-                    os.unlink(tmp_path)
-
-        # ---------------------------------------------------------
-        # CASE C: Generic/Legacy Fallback
-        # ---------------------------------------------------------
-        else:
-            # Use existing ExcelParser for simple CSV/XLSX files
-            print(f"[INFO] Detected Generic/Legacy File: {file.filename}")
-            parser = ExcelParser()
-            from fastapi.concurrency import run_in_threadpool
-            records = await run_in_threadpool(parser.parse, content, file_ext)
+    return {"job_id": job_id, "status": "queued", "status_url": f"/api/jobs/{job_id}"}
 
-        # Save to database with transaction support
-        # All records are saved in a single transaction - if any fails, all rollback
-        service = PayrollService(db)
-        saved_count = 0
-        skipped = []  # Employees not found in database
-        errors = []   # Other errors
 
-        # Optimize N+1 queries: Load all employees once and create lookup map
-        all_employees = service.get_employees()
-        employee_map = {emp['employee_id']: emp for emp in all_employees}
+@app.post("/api/jobs/sync-from-folder")
+async def create_folder_sync_job(payload: dict):
+    """Sync a folder of .xlsm files in the background (returns the job ID)"""
+    path = _sync_folder_path(payload)
+    job_id = await asyncio.wrap_future(db_writer.submit(
+        lambda conn: UploadJobService(conn).create_job('folder_sync', str(path), filename=path.name)))
+    job_runner.submit(job_id)
 
-        # Start explicit transaction
-        cursor = db.cursor()
-        cursor.execute("BEGIN TRANSACTION")
+    return {"job_id": job_id, "status": "queued", "status_url": f"/api/jobs/{job_id}"}
+
+
+@app.get("/api/jobs")
+@db_endpoint
+def list_upload_jobs(
+    status: Optional[str] = None,
+    limit: int = 50,
+    db: sqlite3.Connection = Depends(get_db)
+):
+    """Recent upload jobs (newest first)"""
+    return UploadJobService(db).get_jobs(status=status, limit=limit)
 
+
+@app.get("/api/progress/{channel}")
+async def stream_progress(channel: str):
+    """
+    Server-Sent Events stream of an upload's progress.
+
+    channel: a job ID (/api/jobs/...) or the upload_id passed to /api/upload.
+    Events: stage, sheet_started, sheet_finished, records_parsed,
+    records_persisted, warning, and done/failed (end of the stream).
+    """
+    from fastapi.responses import StreamingResponse
+    import json as _json
+
+    # A job that finished before the client connected (or before a restart)
+    final_event = None
+    if not progress_bus.history(channel):
+        # No request connection: it would be held for the whole stream
+        def load_job():
+            with read_connection() as conn:
+                return UploadJobService(conn).get_job(channel)
+
+        job = await run_db(load_job)
+        if job and job['status'] in ('completed', 'failed'):
+            final_event = {
+                'type': 'done' if job['status'] == 'completed' else 'failed',
+                'data': {'error': job['error']} if job['error'] else {
+                    'records_saved': job['records_saved'], 'records_skipped': job['records_skipped'],
+                },
+            }
+
+    def format_event(event: dict) -> str:
+        return f"event: {event['type']}\ndata: {_json.dumps(event['data'], ensure_ascii=False, default=str)}\n\n"
+
+    async def event_stream():
+        if final_event:
+            yield format_event(final_event)
+            return
+        subscription = progress_bus.subscribe(channel)
         try:
-            for record in records:
-                try:
-                    # Check if employee exists using pre-loaded map (O(1) lookup)
-                    employee = employee_map.get(record.employee_id)
-                    if not employee:
-                        skipped.append({
-                            'employee_id': record.employee_id,
-                            'period': record.period,
-                            'reason': 'Employee not found in database'
-                        })
-                        continue
-
-                    service.create_payroll_record(record)
-                    saved_count += 1
-
-                except sqlite3.IntegrityError as e:
-                    # Duplicate record with same (employee_id, period) - this is OK
-                    # INSERT OR REPLACE in services.py handles this
-                    if 'UNIQUE constraint failed' in str(e):
-                        saved_count += 1  # Count as saved (replaced)
-                    else:
-                        errors.append({
-                            'employee_id': record.employee_id,
-                            'period': record.period,
-                            'error': str(e)
-                        })
-                        # Rollback on integrity errors (other than duplicate)
-                        db.rollback()
-                        raise
-
-                except Exception as e:
-                    errors.append({
-                        'employee_id': record.employee_id,
-                        'period': record.period,
-                        'error': str(e)
-                    })
-                    # Rollback on any unexpected error
-                    db.rollback()
-                    raise
-
-            # If we got here, all records processed successfully - commit transaction
-            db.commit()
-
-        except Exception as e:
-            # Rollback already happened in inner catch, but ensure it's done
-            try:
-                db.rollback()
-            except:
-                pass
-            # Re-raise to outer handler
-            raise
-
-        response = {
-            "success": True,
-            "filename": file.filename,
-            "total_records": len(records),
-            "saved_records": saved_count,
-            "skipped_count": len(skipped),
-            "error_count": len(errors),
-            "skipped_details": skipped[:10] if skipped else None,  # First 10 skipped
-            "errors": [e['error'] for e in errors[:10]] if errors else None  # First 10 error messages
-        }
+            while True:
+                event = await subscription.get(timeout=SSE_HEARTBEAT_SECONDS)
+                if event is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"id: {event['id']}\n" + format_event(event)
+                if event['type'] in ('done', 'failed'):
+                    return
+        finally:
+            subscription.close()
 
-        # Add template stats if available
-        if template_stats:
-            response["template_stats"] = template_stats
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-        return response
 
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Error processing file: {str(e)}")
+@app.get("/api/jobs/{job_id}")
+@db_endpoint
+def get_upload_job(job_id: str, db: sqlite3.Connection = Depends(get_db)):
+    """Status of an upload job: stage, percent, records saved/skipped, errors and result"""
+    job = UploadJobService(db).get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return job
+
+@app.get("/api/watcher")
+async def get_folder_watcher_status():
+    """Status of the folder watcher (ARARI_WATCH_FOLDER)"""
+    watcher = folder_watcher.folder_watcher
+    if watcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **watcher.status()}
 
 # ============== Export ==============
 
 @app.get("/api/export/employees")
-async def export_employees(db: sqlite3.Connection = Depends(get_db)):
+@db_endpoint
+def export_employees(db: sqlite3.Connection = Depends(get_db)):
     """Export all employees as JSON"""
     service = PayrollService(db)
     return service.get_employees()
 
 @app.get("/api/export/payroll")
-async def export_payroll(
+@db_endpoint
+def export_payroll(
     db: sqlite3.Connection = Depends(get_db),
     period: Optional[str] = None
 ):
@@ -531,7 +536,8 @@ async def export_payroll(
     return service.get_payroll_records(period=period)
 
 @app.get("/api/export/all")
-async def export_all_data(
+@db_endpoint
+def export_all_data(
     format: str = "excel",
     db: sqlite3.Connection = Depends(get_db)
 ):
@@ -586,93 +592,20 @@ async def export_all_data(
 @app.post("/api/sync-from-folder")
 async def sync_from_folder(
     payload: dict,
-    db: sqlite3.Connection = Depends(get_db)
+    db: sqlite3.Connection = Depends(get_ingest_db)
 ):
-    """Sync all .xlsm files from a folder path"""
-    from pathlib import Path
-    import os
-
-    folder_path = payload.get("folder_path", "").strip()
-
-    if not folder_path:
-        raise HTTPException(status_code=400, detail="folder_path is required")
-
-    # Normalize path for Windows
-    folder_path = folder_path.replace("/", "\\")
-    path = Path(folder_path)
-
-    if not path.exists():
-        raise HTTPException(status_code=400, detail=f"Folder not found: {folder_path}")
-
-    if not path.is_dir():
-        raise HTTPException(status_code=400, detail=f"Path is not a directory: {folder_path}")
-
-    # Find all .xlsm files
-    xlsm_files = list(path.glob("*.xlsm"))
-
-    if not xlsm_files:
-        return JSONResponse({
-            "status": "error",
-            "message": f"No .xlsm files found in {folder_path}",
-            "files_found": 0,
-            "files_processed": 0,
-            "total_records": 0
-        })
+    """
+    Sync all .xlsm files from a folder path.
 
-    # Process each file
-    service = PayrollService(db)
-    total_saved = 0
-    total_skipped = 0
-    total_errors = 0
-    files_processed = 0
+    Files unchanged since the last sync are skipped (sync manifest); pass
+    "force": true to re-import everything. The response has a per-file report.
+    """
+    path = _sync_folder_path(payload)
+    force = bool(payload.get("force", False))
 
-    for file_path in xlsm_files:
-        try:
-            # Read file content
-            with open(file_path, "rb") as f:
-                file_content = f.read()
-
-            # Detect file type and parse
-            filename = file_path.name.lower()
-
-            # Try to parse with salary statement parser if it looks like salary data
-            if "給" in filename or "給与" in filename or "給料" in filename:
-                parser = SalaryStatementParser(use_intelligent_mode=True)
-                payroll_records = parser.parse(file_content)
-            else:
-                parser = ExcelParser()
-                payroll_records = parser.parse(file_content)
-
-            # Insert records with transaction per file
-            cursor = db.cursor()
-            cursor.execute("BEGIN TRANSACTION")
-            try:
-                for record_data in payroll_records:
-                    try:
-                        service.create_payroll_record(record_data)
-                        total_saved += 1
-                    except Exception:
-                        total_errors += 1
-                        raise  # Rollback this file
-
-                db.commit()  # Commit this file's records
-                files_processed += 1
-            except:
-                db.rollback()
-                # File failed, but continue with next file
-
-        except Exception as e:
-            total_errors += 1
-
-    return JSONResponse({
-        "status": "success",
-        "message": f"Processed {files_processed} files from {folder_path}",
-        "files_found": len(xlsm_files),
-        "files_processed": files_processed,
-        "total_records_saved": total_saved,
-        "total_records_skipped": total_skipped,
-        "total_errors": total_errors
-    })
+    # Parsing and DB writes run in the thread pool (the event loop keeps serving requests)
+    from fastapi.concurrency import run_in_threadpool
+    return JSONResponse(await run_in_threadpool(sync_folder, db, path, force=force, writer=db_writer))
 
 
 # NOTE: Duplicate endpoint removed - using /api/import-employees defined at line ~216
@@ -680,13 +613,15 @@ async def sync_from_folder(
 # ============== SETTINGS ==============
 
 @app.get("/api/settings")
-async def get_settings(db: sqlite3.Connection = Depends(get_db)):
+@db_endpoint
+def get_settings(db: sqlite3.Connection = Depends(get_db)):
     """Get all system settings"""
     service = PayrollService(db)
     return service.get_all_settings()
 
 @app.get("/api/settings/{key}")
-async def get_setting(key: str, db: sqlite3.Connection = Depends(get_db)):
+@db_endpoint
+def get_setting(key: str, db: sqlite3.Connection = Depends(get_db)):
     """Get a single setting by key"""
     service = PayrollService(db)
     value = service.get_setting(key)
@@ -695,10 +630,11 @@ async def get_setting(key: str, db: sqlite3.Connection = Depends(get_db)):
     return {"key": key, "value": value}
 
 @app.put("/api/settings/{key}")
-async def update_setting(
+@db_write_endpoint
+def update_setting(
     key: str,
     payload: dict,
-    db: sqlite3.Connection = Depends(get_db)
+    db: sqlite3.Connection = None
 ):
     """Update a setting"""
     service = PayrollService(db)
@@ -712,7 +648,8 @@ async def update_setting(
     return {"key": key, "value": value, "status": "updated"}
 
 @app.get("/api/settings/rates/insurance")
-async def get_insurance_rates(db: sqlite3.Connection = Depends(get_db)):
+@db_endpoint
+def get_insurance_rates(db: sqlite3.Connection = Depends(get_db)):
     """Get current insurance rates"""
     service = PayrollService(db)
     return service.get_insurance_rates()
@@ -721,7 +658,8 @@ async def get_insurance_rates(db: sqlite3.Connection = Depends(get_db)):
 # ============== TEMPLATES ==============
 
 @app.get("/api/templates")
-async def list_templates(include_inactive: bool = False):
+@db_endpoint
+def list_templates(include_inactive: bool = False):
     """List all factory templates"""
     template_manager = TemplateManager()
     templates = template_manager.list_templates(include_inactive=include_inactive)
@@ -732,7 +670,8 @@ async def list_templates(include_inactive: bool = False):
     }
 
 @app.get("/api/templates/{factory_id}")
-async def get_template(factory_id: str):
+@db_endpoint
+def get_template(factory_id: str):
     """Get a specific template by factory identifier"""
     template_manager = TemplateManager()
     template = template_manager.load_template(factory_id)
@@ -741,7 +680,8 @@ async def get_template(factory_id: str):
     return template
 
 @app.put("/api/templates/{factory_id}")
-async def update_template(factory_id: str, payload: dict):
+@db_endpoint
+def update_template(factory_id: str, payload: dict):
     """Update a template's field positions or settings"""
     template_manager = TemplateManager()
 
@@ -777,7 +717,8 @@ async def update_template(factory_id: str, payload: dict):
     return {"status": "success", "message": f"Template '{factory_id}' updated"}
 
 @app.delete("/api/templates/{factory_id}")
-async def delete_template(factory_id: str, hard_delete: bool = False):
+@db_endpoint
+def delete_template(factory_id: str, hard_delete: bool = False):
     """Delete (or deactivate) a template"""
     template_manager = TemplateManager()
     success = template_manager.delete_template(factory_id, hard_delete=hard_delete)
@@ -808,7 +749,8 @@ async def analyze_excel_for_templates(file: UploadFile = File(...)):
         content = await file.read()
         template_manager = TemplateManager()
 
-        results = create_template_from_excel(content, template_manager)
+        # Workbook analysis and template writes run off the event loop
+        results = await run_db(create_template_from_excel, content, template_manager)
 
         return {
             "status": "success",
@@ -822,7 +764,8 @@ async def analyze_excel_for_templates(file: UploadFile = File(...)):
         raise HTTPException(status_code=400, detail=f"Error analyzing file: {str(e)}")
 
 @app.post("/api/templates/create")
-async def create_template_manually(payload: dict):
+@db_endpoint
+def create_template_manually(payload: dict):
     """Create a new template manually (for custom factory formats)"""
     template_manager = TemplateManager()
 
@@ -863,7 +806,8 @@ from auth import AuthService, validate_token, has_permission
 from fastapi import Header
 
 @app.post("/api/auth/login")
-async def login(payload: dict, db: sqlite3.Connection = Depends(get_db)):
+@db_write_endpoint
+def login(payload: dict, db: sqlite3.Connection = None):
     """Login and get token"""
     username = payload.get("username")
     password = payload.get("password")
@@ -883,9 +827,10 @@ async def login(payload: dict, db: sqlite3.Connection = Depends(get_db)):
     return result
 
 @app.post("/api/auth/logout")
-async def logout(
+@db_write_endpoint
+def logout(
     authorization: str = Header(None),
-    db: sqlite3.Connection = Depends(get_db)
+    db: sqlite3.Connection = None
 ):
     """Logout and revoke token"""
     if not authorization:
@@ -899,7 +844,8 @@ async def logout(
     return {"message": "Token not found or already revoked"}
 
 @app.get("/api/auth/me")
-async def get_current_user_info(
+@db_endpoint
+def get_current_user_info(
     authorization: str = Header(None),
     db: sqlite3.Connection = Depends(get_db)
 ):
@@ -916,13 +862,15 @@ async def get_current_user_info(
     return user
 
 @app.get("/api/users")
-async def get_users(db: sqlite3.Connection = Depends(get_db)):
+@db_endpoint
+def get_users(db: sqlite3.Connection = Depends(get_db)):
     """Get all users"""
     service = AuthService(db)
     return service.get_users()
 
 @app.post("/api/users")
-async def create_user(payload: dict, db: sqlite3.Connection = Depends(get_db)):
+@db_write_endpoint
+def create_user(payload: dict, db: sqlite3.Connection = None):
     """Create new user"""
     service = AuthService(db)
     result = service.create_user(
@@ -943,7 +891,8 @@ async def create_user(payload: dict, db: sqlite3.Connection = Depends(get_db)):
 from alerts import AlertService
 
 @app.get("/api/alerts")
-async def get_alerts(
+@db_endpoint
+def get_alerts(
     severity: Optional[str] = None,
     is_resolved: Optional[bool] = None,
     period: Optional[str] = None,
@@ -954,25 +903,24 @@ async def get_alerts(
     return service.get_alerts(severity=severity, is_resolved=is_resolved, period=period)
 
 @app.get("/api/alerts/summary")
-async def get_alerts_summary(db: sqlite3.Connection = Depends(get_db)):
+@db_endpoint
+def get_alerts_summary(db: sqlite3.Connection = Depends(get_db)):
     """Get alerts summary by severity"""
     service = AlertService(db)
     return service.get_alert_summary()
 
 @app.post("/api/alerts/scan")
-async def scan_for_alerts(
-    period: Optional[str] = None,
-    db: sqlite3.Connection = Depends(get_db)
-):
-    """Scan data and generate alerts"""
-    service = AlertService(db)
-    return service.scan_for_alerts(period=period)
+async def scan_for_alerts(period: Optional[str] = None):
+    """Scan data and generate alerts (one write task: all alerts in one transaction)"""
+    future = db_writer.submit(lambda conn: AlertService(conn).scan_for_alerts(period=period))
+    return await asyncio.wrap_future(future)
 
 @app.put("/api/alerts/{alert_id}/resolve")
-async def resolve_alert(
+@db_write_endpoint
+def resolve_alert(
     alert_id: int,
     payload: dict = None,
-    db: sqlite3.Connection = Depends(get_db)
+    db: sqlite3.Connection = None
 ):
     """Resolve an alert"""
     service = AlertService(db)
@@ -987,16 +935,18 @@ async def resolve_alert(
     return {"status": "resolved"}
 
 @app.get("/api/alerts/thresholds")
-async def get_alert_thresholds(db: sqlite3.Connection = Depends(get_db)):
+@db_endpoint
+def get_alert_thresholds(db: sqlite3.Connection = Depends(get_db)):
     """Get alert thresholds"""
     service = AlertService(db)
     return service.get_thresholds()
 
 @app.put("/api/alerts/thresholds/{key}")
-async def update_alert_threshold(
+@db_write_endpoint
+def update_alert_threshold(
     key: str,
     payload: dict,
-    db: sqlite3.Connection = Depends(get_db)
+    db: sqlite3.Connection = None
 ):
     """Update alert threshold"""
     service = AlertService(db)
@@ -1011,7 +961,8 @@ async def update_alert_threshold(
 from audit import AuditService
 
 @app.get("/api/audit")
-async def get_audit_logs(
+@db_endpoint
+def get_audit_logs(
     user_id: Optional[int] = None,
     action: Optional[str] = None,
     entity_type: Optional[str] = None,
@@ -1023,7 +974,8 @@ async def get_audit_logs(
     return service.get_logs(user_id=user_id, action=action, entity_type=entity_type, limit=limit)
 
 @app.get("/api/audit/summary")
-async def get_audit_summary(
+@db_endpoint
+def get_audit_summary(
     days: int = 7,
     db: sqlite3.Connection = Depends(get_db)
 ):
@@ -1032,7 +984,8 @@ async def get_audit_summary(
     return service.get_summary(days=days)
 
 @app.get("/api/audit/entity/{entity_type}/{entity_id}")
-async def get_entity_history(
+@db_endpoint
+def get_entity_history(
     entity_type: str,
     entity_id: str,
     db: sqlite3.Connection = Depends(get_db)
@@ -1047,13 +1000,15 @@ from reports import ReportService
 from fastapi.responses import Response
 
 @app.get("/api/reports/monthly/{period}")
-async def get_monthly_report_data(period: str, db: sqlite3.Connection = Depends(get_db)):
+@db_endpoint
+def get_monthly_report_data(period: str, db: sqlite3.Connection = Depends(get_db)):
     """Get monthly report data"""
     service = ReportService(db)
     return service.get_monthly_report_data(period)
 
 @app.get("/api/reports/employee/{employee_id}")
-async def get_employee_report_data(
+@db_endpoint
+def get_employee_report_data(
     employee_id: str,
     months: int = 6,
     db: sqlite3.Connection = Depends(get_db)
@@ -1063,13 +1018,15 @@ async def get_employee_report_data(
     return service.get_employee_report_data(employee_id, months)
 
 @app.get("/api/reports/company/{company}")
-async def get_company_report_data(company: str, db: sqlite3.Connection = Depends(get_db)):
+@db_endpoint
+def get_company_report_data(company: str, db: sqlite3.Connection = Depends(get_db)):
     """Get company report data"""
     service = ReportService(db)
     return service.get_company_report_data(company)
 
 @app.get("/api/reports/download/{report_type}")
-async def download_report(
+@db_endpoint
+def download_report(
     report_type: str,
     period: Optional[str] = None,
     employee_id: Optional[str] = None,
@@ -1102,7 +1059,8 @@ async def download_report(
     return data
 
 @app.get("/api/reports/history")
-async def get_report_history(limit: int = 50, db: sqlite3.Connection = Depends(get_db)):
+@db_endpoint
+def get_report_history(limit: int = 50, db: sqlite3.Connection = Depends(get_db)):
     """Get history of generated reports"""
     service = ReportService(db)
     return service.get_report_history(limit)
@@ -1112,7 +1070,8 @@ async def get_report_history(limit: int = 50, db: sqlite3.Connection = Depends(g
 from budget import BudgetService
 
 @app.get("/api/budgets")
-async def get_budgets(
+@db_endpoint
+def get_budgets(
     period: Optional[str] = None,
     entity_type: Optional[str] = None,
     db: sqlite3.Connection = Depends(get_db)
@@ -1122,7 +1081,8 @@ async def get_budgets(
     return service.get_budgets(period=period, entity_type=entity_type)
 
 @app.post("/api/budgets")
-async def create_budget(payload: dict, db: sqlite3.Connection = Depends(get_db)):
+@db_write_endpoint
+def create_budget(payload: dict, db: sqlite3.Connection = None):
     """Create a new budget"""
     service = BudgetService(db)
     result = service.create_budget(
@@ -1143,7 +1103,8 @@ async def create_budget(payload: dict, db: sqlite3.Connection = Depends(get_db))
     return result
 
 @app.get("/api/budgets/compare/{period}")
-async def compare_budget_vs_actual(
+@db_endpoint
+def compare_budget_vs_actual(
     period: str,
     entity_type: str = "total",
     entity_id: Optional[str] = None,
@@ -1159,13 +1120,15 @@ async def compare_budget_vs_actual(
     return result
 
 @app.get("/api/budgets/summary")
-async def get_budget_summary(year: Optional[int] = None, db: sqlite3.Connection = Depends(get_db)):
+@db_endpoint
+def get_budget_summary(year: Optional[int] = None, db: sqlite3.Connection = Depends(get_db)):
     """Get budget summary for a year"""
     service = BudgetService(db)
     return service.get_budget_summary(year)
 
 @app.delete("/api/budgets/{budget_id}")
-async def delete_budget(budget_id: int, db: sqlite3.Connection = Depends(get_db)):
+@db_write_endpoint
+def delete_budget(budget_id: int, db: sqlite3.Connection = None):
     """Delete a budget"""
     service = BudgetService(db)
     result = service.delete_budget(budget_id)
@@ -1180,7 +1143,8 @@ async def delete_budget(budget_id: int, db: sqlite3.Connection = Depends(get_db)
 from notifications import NotificationService
 
 @app.get("/api/notifications")
-async def get_notifications(
+@db_endpoint
+def get_notifications(
     user_id: Optional[int] = None,
     unread_only: bool = False,
     limit: int = 50,
@@ -1191,13 +1155,15 @@ async def get_notifications(
     return service.get_notifications(user_id=user_id, unread_only=unread_only, limit=limit)
 
 @app.get("/api/notifications/count")
-async def get_unread_count(user_id: Optional[int] = None, db: sqlite3.Connection = Depends(get_db)):
+@db_endpoint
+def get_unread_count(user_id: Optional[int] = None, db: sqlite3.Connection = Depends(get_db)):
     """Get unread notification count"""
     service = NotificationService(db)
     return {"unread_count": service.get_unread_count(user_id)}
 
 @app.put("/api/notifications/{notification_id}/read")
-async def mark_notification_read(notification_id: int, db: sqlite3.Connection = Depends(get_db)):
+@db_write_endpoint
+def mark_notification_read(notification_id: int, db: sqlite3.Connection = None):
     """Mark notification as read"""
     service = NotificationService(db)
     if service.mark_as_read(notification_id):
@@ -1205,23 +1171,26 @@ async def mark_notification_read(notification_id: int, db: sqlite3.Connection =
     raise HTTPException(status_code=404, detail="Notification not found")
 
 @app.put("/api/notifications/read-all")
-async def mark_all_read(user_id: int, db: sqlite3.Connection = Depends(get_db)):
+@db_write_endpoint
+def mark_all_read(user_id: int, db: sqlite3.Connection = None):
     """Mark all notifications as read"""
     service = NotificationService(db)
     count = service.mark_all_read(user_id)
     return {"marked_count": count}
 
 @app.get("/api/notifications/preferences/{user_id}")
-async def get_notification_preferences(user_id: int, db: sqlite3.Connection = Depends(get_db)):
+@db_endpoint
+def get_notification_preferences(user_id: int, db: sqlite3.Connection = Depends(get_db)):
     """Get notification preferences"""
     service = NotificationService(db)
     return service.get_preferences(user_id)
 
 @app.put("/api/notifications/preferences/{user_id}")
-async def update_notification_preferences(
+@db_write_endpoint
+def update_notification_preferences(
     user_id: int,
     payload: dict,
-    db: sqlite3.Connection = Depends(get_db)
+    db: sqlite3.Connection = None
 ):
     """Update notification preferences"""
     service = NotificationService(db)
@@ -1232,7 +1201,8 @@ async def update_notification_preferences(
 from search import SearchService
 
 @app.get("/api/search/employees")
-async def search_employees_get(
+@db_endpoint
+def search_employees_get(
     q: Optional[str] = None,
     sort_by: Optional[str] = None,
     sort_order: str = "asc",
@@ -1248,7 +1218,8 @@ async def search_employees_get(
     )
 
 @app.post("/api/search/employees")
-async def search_employees_post(
+@db_endpoint
+def search_employees_post(
     payload: dict,
     db: sqlite3.Connection = Depends(get_db)
 ):
@@ -1264,7 +1235,8 @@ async def search_employees_post(
     )
 
 @app.get("/api/search/payroll")
-async def search_payroll_records(
+@db_endpoint
+def search_payroll_records(
     q: Optional[str] = None,
     sort_by: Optional[str] = None,
     sort_order: str = "asc",
@@ -1280,19 +1252,22 @@ async def search_payroll_records(
     )
 
 @app.get("/api/search/anomalies")
-async def find_anomalies(period: Optional[str] = None, db: sqlite3.Connection = Depends(get_db)):
+@db_endpoint
+def find_anomalies(period: Optional[str] = None, db: sqlite3.Connection = Depends(get_db)):
     """Find data anomalies"""
     service = SearchService(db)
     return service.find_anomalies(period)
 
 @app.get("/api/search/suggestions")
-async def get_suggestions(q: str, field: str = "all", db: sqlite3.Connection = Depends(get_db)):
+@db_endpoint
+def get_suggestions(q: str, field: str = "all", db: sqlite3.Connection = Depends(get_db)):
     """Get search suggestions"""
     service = SearchService(db)
     return service.get_search_suggestions(q, field)
 
 @app.get("/api/search/filters")
-async def get_filter_options(db: sqlite3.Connection = Depends(get_db)):
+@db_endpoint
+def get_filter_options(db: sqlite3.Connection = Depends(get_db)):
     """Get available filter options"""
     service = SearchService(db)
     return service.get_filter_options()
@@ -1302,29 +1277,33 @@ async def get_filter_options(db: sqlite3.Connection = Depends(get_db)):
 from validation import ValidationService
 
 @app.get("/api/validation")
-async def validate_all_data(db: sqlite3.Connection = Depends(get_db)):
+@db_endpoint
+def validate_all_data(db: sqlite3.Connection = Depends(get_db)):
     """Run full data validation"""
     service = ValidationService(db)
     return service.validate_all()
 
 @app.get("/api/validation/employees")
-async def validate_employees_data(db: sqlite3.Connection = Depends(get_db)):
+@db_endpoint
+def validate_employees_data(db: sqlite3.Connection = Depends(get_db)):
     """Validate employee data"""
     service = ValidationService(db)
     service.validate_employees()
     return service.get_summary()
 
 @app.get("/api/validation/payroll")
-async def validate_payroll_data(db: sqlite3.Connection = Depends(get_db)):
+@db_endpoint
+def validate_payroll_data(db: sqlite3.Connection = Depends(get_db)):
     """Validate payroll data"""
     service = ValidationService(db)
     service.validate_payroll()
     return service.get_summary()
 
 @app.post("/api/validation/fix")
-async def auto_fix_issues(
+@db_write_endpoint
+def auto_fix_issues(
     payload: dict = None,
-    db: sqlite3.Connection = Depends(get_db)
+    db: sqlite3.Connection = None
 ):
     """Auto-fix certain data issues"""
     service = ValidationService(db)
@@ -1336,13 +1315,15 @@ async def auto_fix_issues(
 from backup import BackupService
 
 @app.get("/api/backups")
-async def list_backups():
+@db_endpoint
+def list_backups():
     """List all backups"""
     service = BackupService()
     return service.list_backups()
 
 @app.post("/api/backups")
-async def create_backup(payload: dict = None):
+@db_endpoint
+def create_backup(payload: dict = None):
     """Create a new backup"""
     service = BackupService()
     description = payload.get("description") if payload else None
@@ -1354,13 +1335,15 @@ async def create_backup(payload: dict = None):
     return result
 
 @app.get("/api/backups/stats")
-async def get_backup_stats():
+@db_endpoint
+def get_backup_stats():
     """Get backup statistics"""
     service = BackupService()
     return service.get_backup_stats()
 
 @app.post("/api/backups/{filename}/restore")
-async def restore_backup(filename: str):
+@db_endpoint
+def restore_backup(filename: str):
     """Restore from backup"""
     service = BackupService()
     result = service.restore_backup(filename)
@@ -1371,13 +1354,15 @@ async def restore_backup(filename: str):
     return result
 
 @app.get("/api/backups/{filename}/verify")
-async def verify_backup(filename: str):
+@db_endpoint
+def verify_backup(filename: str):
     """Verify backup integrity"""
     service = BackupService()
     return service.verify_backup(filename)
 
 @app.delete("/api/backups/{filename}")
-async def delete_backup_file(filename: str):
+@db_endpoint
+def delete_backup_file(filename: str):
     """Delete a backup"""
     service = BackupService()
     result = service.delete_backup(filename)
@@ -1392,7 +1377,8 @@ async def delete_backup_file(filename: str):
 from roi import ROIService
 
 @app.get("/api/roi/clients")
-async def get_client_roi(
+@db_endpoint
+def get_client_roi(
     company: Optional[str] = None,
     period: Optional[str] = None,
     db: sqlite3.Connection = Depends(get_db)
@@ -1402,7 +1388,8 @@ async def get_client_roi(
     return service.calculate_client_roi(company, period)
 
 @app.get("/api/roi/employees")
-async def get_employee_roi(
+@db_endpoint
+def get_employee_roi(
     employee_id: Optional[str] = None,
     period: Optional[str] = None,
     db: sqlite3.Connection = Depends(get_db)
@@ -1412,25 +1399,29 @@ async def get_employee_roi(
     return service.calculate_employee_roi(employee_id, period)
 
 @app.get("/api/roi/summary")
-async def get_roi_summary(period: Optional[str] = None, db: sqlite3.Connection = Depends(get_db)):
+@db_endpoint
+def get_roi_summary(period: Optional[str] = None, db: sqlite3.Connection = Depends(get_db)):
     """Get ROI summary"""
     service = ROIService(db)
     return service.get_roi_summary(period)
 
 @app.get("/api/roi/trend")
-async def get_roi_trend(months: int = 6, db: sqlite3.Connection = Depends(get_db)):
+@db_endpoint
+def get_roi_trend(months: int = 6, db: sqlite3.Connection = Depends(get_db)):
     """Get ROI trend"""
     service = ROIService(db)
     return service.get_roi_trend(months)
 
 @app.get("/api/roi/recommendations")
-async def get_roi_recommendations(period: Optional[str] = None, db: sqlite3.Connection = Depends(get_db)):
+@db_endpoint
+def get_roi_recommendations(period: Optional[str] = None, db: sqlite3.Connection = Depends(get_db)):
     """Get ROI improvement recommendations"""
     service = ROIService(db)
     return service.get_recommendations(period)
 
 @app.get("/api/roi/compare")
-async def compare_roi_periods(
+@db_endpoint
+def compare_roi_periods(
     period1: str,
     period2: str,
     db: sqlite3.Connection = Depends(get_db)
@@ -1444,33 +1435,77 @@ async def compare_roi_periods(
 from cache import CacheService
 
 @app.get("/api/cache/stats")
-async def get_cache_stats(db: sqlite3.Connection = Depends(get_db)):
+@db_endpoint
+def get_cache_stats(db: sqlite3.Connection = Depends(get_db)):
     """Get cache statistics"""
     service = CacheService(db)
     return {
         "memory": service.get_stats(),
-        "persistent": service.get_persistent_stats()
+        "persistent": service.get_persistent_stats(),
+        "parse_results": parse_cache.get_stats()
     }
 
 @app.post("/api/cache/clear")
-async def clear_cache(payload: dict = None, db: sqlite3.Connection = Depends(get_db)):
+@db_write_endpoint
+def clear_cache(payload: dict = None, db: sqlite3.Connection = None):
     """Clear cache"""
     service = CacheService(db)
     pattern = payload.get("pattern") if payload else None
     memory_cleared = service.clear(pattern)
     persistent_cleared = service.clear_persistent(pattern)
+    parse_results_cleared = parse_cache.clear() if pattern is None else 0
     return {
         "memory_cleared": memory_cleared,
-        "persistent_cleared": persistent_cleared
+        "persistent_cleared": persistent_cleared,
+        "parse_results_cleared": parse_results_cleared
     }
 
+# ============== PARSE METRICS ==============
+
+@app.get("/api/parse-metrics")
+@db_endpoint
+def get_parse_metrics(limit: int = 20, db: sqlite3.Connection = Depends(get_db)):
+    """Recent payroll parses with per-stage totals"""
+    return ParseMetricsService(db).get_runs(limit)
+
+@app.get("/api/parse-metrics/sheets")
+@db_endpoint
+def get_parse_metrics_by_sheet(limit: int = 50, db: sqlite3.Connection = Depends(get_db)):
+    """Average parse cost per factory sheet, slowest first"""
+    return ParseMetricsService(db).get_sheet_summary(limit)
+
+@app.get("/api/parse-metrics/{run_id}")
+@db_endpoint
+def get_parse_run_metrics(run_id: int, db: sqlite3.Connection = Depends(get_db)):
+    """Per-sheet metrics of one parse"""
+    sheets = ParseMetricsService(db).get_run_sheets(run_id)
+    if not sheets:
+        raise HTTPException(status_code=404, detail="Parse run not found")
+    return sheets
+
+@app.get("/api/db/pool")
+async def get_db_pool_stats():
+    """
+    Connection pool metrics (open/idle/checked out connections, waits, wait
+    time, timeouts), single-writer queue metrics (transactions, batch sizes)
+    and DB thread pool metrics (calls in progress, time waiting for a thread)
+    """
+    return {"pools": pool_stats(), "writer": db_writer.stats(), "threads": db_executor_stats()}
+
+@app.get("/api/db/schema")
+@db_endpoint
+def get_schema_status(db: sqlite3.Connection = Depends(get_db)):
+    """Schema version, applied migrations and backfill progress"""
+    return schema_status(db, MIGRATIONS)
+
 # ============== Run Server ==============
 
 
 # ============== RESET DATA ==============
 
 @app.delete("/api/reset-db")
-async def reset_database(db: sqlite3.Connection = Depends(get_db)):
+@db_write_endpoint
+def reset_database(db: sqlite3.Connection = None):
     """Delete ALL data (employees and payroll records)"""
     try:
         cursor = db.cursor()
@@ -1478,6 +1513,10 @@ async def reset_database(db: sqlite3.Connection = Depends(get_db)):
         # Delete data in correct order
         cursor.execute("DELETE FROM payroll_records")
         cursor.execute("DELETE FROM employees")
+        # Sheet fingerprints refer to deleted records: next upload re-imports all sheets
+        cursor.execute("DELETE FROM sheet_fingerprints")
+        # Same for the folder sync manifest: next sync re-imports all files
+        cursor.execute("DELETE FROM sync_manifest")
         
         db.commit()
         
@@ -0,0 +1,351 @@
+"""
+Migrations - Versioned schema changes
+
+The schema is built by an ordered list of migration steps (database.MIGRATIONS).
+Applied steps are recorded in `schema_version`, so startup is one query when
+the database is current:
+
+    SELECT MAX(version) FROM schema_version    -> nothing to do
+
+instead of re-running every CREATE TABLE/INDEX IF NOT EXISTS and ALTER TABLE
+probe. Schema changes are new steps appended to the list (never edits of an
+applied step); every instance applies the same steps in the same order.
+
+Steps run once per database, inside one BEGIN IMMEDIATE transaction, so
+concurrent starts (several workers) apply each step once. They should still
+be idempotent (IF NOT EXISTS, ALTER TABLE probes): databases created before
+schema_version existed already have part of the schema.
+
+Backfills: a step that adds a column can register a Backfill that fills
+existing rows. Backfills run in chunks of rowids; each chunk is committed
+together with its progress in `schema_backfills`, so an interrupted backfill
+resumes where it stopped. Rows written after the step are the application's
+job (e.g. a trigger), the backfill covers ids up to MAX(id) at registration.
+
+Configuration:
+- ARARI_BACKFILL_MODE:     'startup' (finish backfills in init_db, default)
+                           or 'background' (online, through the DB writer;
+                           the app must read correctly while rows are
+                           unfilled, see periods.period_key_sql)
+- ARARI_BACKFILL_CHUNK:    rows per chunk (default 5000)
+- ARARI_BACKFILL_PAUSE_MS: pause between background chunks (default 50)
+- ARARI_MIGRATION_LOCK_TIMEOUT: seconds to wait for another process's migration (default 600)
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from db_writer import TaskConnection
+
+BACKFILL_MODE = os.environ.get("ARARI_BACKFILL_MODE", "startup").lower()
+BACKFILL_CHUNK_SIZE = int(os.environ.get("ARARI_BACKFILL_CHUNK", "5000"))
+BACKFILL_PAUSE_SECONDS = int(os.environ.get("ARARI_BACKFILL_PAUSE_MS", "50")) / 1000
+MIGRATION_LOCK_TIMEOUT = int(os.environ.get("ARARI_MIGRATION_LOCK_TIMEOUT", "600"))
+
+
+@dataclass(frozen=True)
+class Backfill:
+    """
+    Chunked UPDATE of existing rows.
+
+    sql: statement with two placeholders for the rowid range, e.g.
+         "UPDATE t SET c = ... WHERE id > ? AND id <= ? AND c IS NULL"
+    """
+    name: str
+    table: str
+    sql: str
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    apply: Callable[[sqlite3.Connection], None]
+    backfills: Tuple[Backfill, ...] = ()
+
+
+def init_migration_tables(conn: sqlite3.Connection):
+    """Initialize schema_version and schema_backfills"""
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            seconds REAL,
+            applied_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_backfills (
+            name TEXT PRIMARY KEY,
+            table_name TEXT NOT NULL,
+            last_id INTEGER NOT NULL DEFAULT 0,
+            max_id INTEGER NOT NULL DEFAULT 0,
+            rows_updated INTEGER NOT NULL DEFAULT 0,
+            chunks INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL DEFAULT 'pending',   -- pending/done
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            finished_at TEXT
+        )
+    """)
+
+    conn.commit()
+
+
+def schema_state(conn: sqlite3.Connection) -> Tuple[int, int]:
+    """(schema version, unfinished backfills) - (0, 0) for a new database"""
+    try:
+        row = conn.execute("""
+            SELECT (SELECT MAX(version) FROM schema_version),
+                   (SELECT COUNT(*) FROM schema_backfills WHERE status != 'done')
+        """).fetchone()
+    except sqlite3.OperationalError:
+        return 0, 0  # Tables not created yet
+    return row[0] or 0, row[1] or 0
+
+
+def latest_version(migrations: Sequence[Migration]) -> int:
+    return max((m.version for m in migrations), default=0)
+
+
+def _backfills_by_name(migrations: Sequence[Migration]) -> Dict[str, Backfill]:
+    return {b.name: b for m in migrations for b in m.backfills}
+
+
+def migrate(conn: sqlite3.Connection, migrations: Sequence[Migration],
+            run_backfills_now: Optional[bool] = None) -> Dict[str, Any]:
+    """
+    Apply pending steps in version order, then (startup mode) the backfills.
+
+    Steps run in one BEGIN IMMEDIATE transaction: another process starting
+    at the same time waits for the lock, then re-reads the version and finds
+    nothing left to do. Each step gets a connection whose commit() is
+    deferred and runs in a savepoint, so a failing step is rolled back
+    (including tables its helpers "committed") and stops the run; the steps
+    before it are kept, later steps wait for the next start.
+
+    Returns:
+        {version, applied: [versions], failed: version or None, backfills: {name: rows}}
+    """
+    if run_backfills_now is None:
+        run_backfills_now = BACKFILL_MODE != 'background'
+    result = {'version': 0, 'applied': [], 'failed': None, 'backfills': {}}
+
+    version, unfinished = schema_state(conn)
+    target = latest_version(migrations)
+    if version > target:
+        print(f"[WARN] Database schema version {version} is newer than this code ({target})")
+    if version < target:
+        init_migration_tables(conn)
+        version = _apply_steps(conn, migrations, result)
+    elif not (unfinished and run_backfills_now):
+        result['version'] = version
+        return result
+
+    result['version'] = version
+    if run_backfills_now:
+        result['backfills'] = run_backfills(conn, migrations)
+    return result
+
+
+def _lock_schema(conn: sqlite3.Connection, timeout: float = MIGRATION_LOCK_TIMEOUT) -> None:
+    """BEGIN IMMEDIATE, waiting up to `timeout` for another process's migration"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            return
+        except sqlite3.OperationalError as e:
+            if 'locked' not in str(e) or time.monotonic() >= deadline:
+                raise
+            print("[INFO] Waiting for another process to finish migrating...")
+
+
+def _apply_steps(conn: sqlite3.Connection, migrations: Sequence[Migration],
+                 result: Dict[str, Any]) -> int:
+    """Apply the steps above the locked version; returns the version reached"""
+    _lock_schema(conn)
+    applied = []
+    try:
+        version, _ = schema_state(conn)  # Another process may have migrated meanwhile
+        step_conn = TaskConnection(conn, savepoint='migration_step')
+        for migration in sorted(migrations, key=lambda m: m.version):
+            if migration.version <= version:
+                continue
+            started = time.perf_counter()
+            conn.execute("SAVEPOINT migration_step")
+            try:
+                migration.apply(step_conn)
+                for backfill in migration.backfills:
+                    _register_backfill(conn, backfill)
+                conn.execute(
+                    "INSERT INTO schema_version (version, name, seconds) VALUES (?, ?, ?)",
+                    (migration.version, migration.name, round(time.perf_counter() - started, 3))
+                )
+            except Exception as e:
+                conn.execute("ROLLBACK TO SAVEPOINT migration_step")
+                conn.execute("RELEASE SAVEPOINT migration_step")
+                print(f"[WARN] Migration {migration.version} ({migration.name}) failed: {e}")
+                result['failed'] = migration.version
+                break
+            conn.execute("RELEASE SAVEPOINT migration_step")
+            version = migration.version
+            applied.append((migration, time.perf_counter() - started))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    for migration, seconds in applied:
+        result['applied'].append(migration.version)
+        print(f"[OK] Migration {migration.version}: {migration.name} ({seconds:.2f}s)")
+    return version
+
+
+def _register_backfill(conn: sqlite3.Connection, backfill: Backfill) -> None:
+    max_id = conn.execute(f"SELECT MAX(rowid) FROM {backfill.table}").fetchone()[0] or 0
+    conn.execute("""
+        INSERT OR IGNORE INTO schema_backfills (name, table_name, max_id, status, finished_at)
+        VALUES (?, ?, ?, ?, CASE WHEN ? = 0 THEN CURRENT_TIMESTAMP END)
+    """, (backfill.name, backfill.table, max_id, 'done' if max_id == 0 else 'pending', max_id))
+
+
+def pending_backfills(conn: sqlite3.Connection) -> List[str]:
+    """Names of unfinished backfills, in registration order"""
+    try:
+        rows = conn.execute(
+            "SELECT name FROM schema_backfills WHERE status != 'done' ORDER BY rowid"
+        ).fetchall()
+    except sqlite3.OperationalError:
+        return []
+    return [row[0] for row in rows]
+
+
+def run_backfill_chunk(conn: sqlite3.Connection, backfill: Backfill,
+                       chunk_size: int = BACKFILL_CHUNK_SIZE) -> bool:
+    """
+    Process the next chunk of a backfill and commit it with its progress.
+
+    Returns:
+        True when the backfill is finished
+    """
+    row = conn.execute(
+        "SELECT last_id, max_id, status FROM schema_backfills WHERE name = ?", (backfill.name,)
+    ).fetchone()
+    if row is None or row[2] == 'done':
+        return True
+    last_id, max_id = row[0], row[1]
+    upper = min(last_id + max(1, chunk_size), max_id)
+
+    try:
+        updated = conn.execute(backfill.sql, (last_id, upper)).rowcount
+        done = upper >= max_id
+        conn.execute("""
+            UPDATE schema_backfills
+            SET last_id = ?, rows_updated = rows_updated + ?, chunks = chunks + 1,
+                status = ?, finished_at = CASE WHEN ? THEN CURRENT_TIMESTAMP END
+            WHERE name = ?
+        """, (upper, max(updated, 0), 'done' if done else 'pending', done, backfill.name))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return done
+
+
+def run_backfills(conn: sqlite3.Connection, migrations: Sequence[Migration],
+                  chunk_size: int = BACKFILL_CHUNK_SIZE,
+                  max_chunks: Optional[int] = None) -> Dict[str, int]:
+    """
+    Run unfinished backfills to completion (or for max_chunks chunks).
+
+    Returns:
+        Rows updated so far per backfill that was worked on
+    """
+    backfills = _backfills_by_name(migrations)
+    rows: Dict[str, int] = {}
+    chunks = 0
+    for name in pending_backfills(conn):
+        backfill = backfills.get(name)
+        if backfill is None:
+            print(f"[WARN] Backfill {name}: no longer defined, skipped")
+            continue
+        if max_chunks is not None and chunks >= max_chunks:
+            break
+        started = time.perf_counter()
+        done = False
+        while not done and (max_chunks is None or chunks < max_chunks):
+            done = run_backfill_chunk(conn, backfill, chunk_size)
+            chunks += 1
+        rows[name] = conn.execute(
+            "SELECT rows_updated FROM schema_backfills WHERE name = ?", (name,)
+        ).fetchone()[0]
+        if done:
+            print(f"[OK] Backfill {name}: {rows[name]} rows ({time.perf_counter() - started:.2f}s)")
+    return rows
+
+
+class BackfillWorker(threading.Thread):
+    """
+    Online backfills: chunks are queued to the DB writer (db_writer.py) one
+    at a time, so they interleave with uploads instead of holding the write
+    lock for the whole table.
+    """
+
+    def __init__(self, migrations: Sequence[Migration], writer,
+                 chunk_size: int = BACKFILL_CHUNK_SIZE, pause: float = BACKFILL_PAUSE_SECONDS,
+                 on_done: Optional[Callable[[str], None]] = None):
+        super().__init__(name='schema-backfill', daemon=True)
+        self.backfills = _backfills_by_name(migrations)
+        self.writer = writer
+        self.on_done = on_done  # Called with the name of each finished backfill
+        self.chunk_size = chunk_size
+        self.pause = pause
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        try:
+            for name in self.writer.run(pending_backfills):
+                backfill = self.backfills.get(name)
+                if backfill is None:
+                    continue
+                started = time.perf_counter()
+                while not self._stop_event.is_set():
+                    if self.writer.run(run_backfill_chunk, backfill, self.chunk_size):
+                        print(f"[OK] Backfill {name} finished ({time.perf_counter() - started:.1f}s)")
+                        if self.on_done is not None:
+                            self.on_done(name)
+                        break
+                    self._stop_event.wait(self.pause)
+                if self._stop_event.is_set():
+                    return
+        except Exception as e:
+            print(f"[WARN] Backfill stopped (resumes at next start): {e}")
+
+    def stop(self, timeout: float = 30.0) -> None:
+        self._stop_event.set()
+        self.join(timeout)
+
+
+def schema_status(conn: sqlite3.Connection, migrations: Sequence[Migration]) -> Dict[str, Any]:
+    """Applied steps, latest known version and backfill progress"""
+    version, _ = schema_state(conn)
+    try:
+        applied = [dict(row) for row in conn.execute(
+            "SELECT version, name, seconds, applied_at FROM schema_version ORDER BY version")]
+        backfills = [dict(row) for row in conn.execute(
+            "SELECT * FROM schema_backfills ORDER BY rowid")]
+    except sqlite3.OperationalError:
+        applied, backfills = [], []
+    return {
+        'version': version,
+        'latest_version': latest_version(migrations),
+        'applied': applied,
+        'backfills': backfills,
+    }
@@ -0,0 +1,330 @@
+"""
+ParseCache - Content-addressed cache of parsed payroll files
+Skips SalaryStatementParser.parse when the exact same file is uploaded again
+
+Key:   SHA-256 of the file bytes + parser/template version stamp
+Value: parsed PayrollRecordCreate list, stored column-wise as gzip JSON
+
+Two tiers, both LRU with a byte-size cap:
+- Memory: OrderedDict of compressed payloads (per process)
+- Disk:   one .json.gz file per entry in PARSE_CACHE_DIR (shared by instances)
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from models import PayrollRecordCreate
+from sheet_grid import WorkbookSource
+
+
+# Cache configuration
+PARSE_CACHE_DIR = Path(os.environ.get("ARARI_PARSE_CACHE_DIR", Path(__file__).parent / "parse_cache"))
+MAX_MEMORY_BYTES = int(os.environ.get("ARARI_PARSE_CACHE_MEMORY_MB", "32")) * 1024 * 1024
+MAX_DISK_BYTES = int(os.environ.get("ARARI_PARSE_CACHE_DISK_MB", "256")) * 1024 * 1024
+
+# Bump when the payload layout changes
+PAYLOAD_FORMAT = 1
+
+# Read size when hashing files on disk
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_content(content: WorkbookSource) -> str:
+    """SHA-256 hex digest of file content (bytes, or a file path read in chunks)"""
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(content).hexdigest()
+
+    digest = hashlib.sha256()
+    with open(content, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_version_stamp(template_manager) -> Optional[str]:
+    """
+    Version stamp that invalidates cached results when parsing could change.
+
+    Combines the parser version with the current template state, so editing
+    or deleting a factory template makes older entries unreachable.
+    Returns None when the template state is unknown (cache must be bypassed).
+    """
+    from salary_parser import SalaryStatementParser
+    templates_version = template_manager.get_templates_version()
+    if templates_version is None:
+        return None
+    return f"{SalaryStatementParser.PARSER_VERSION}:{templates_version}"
+
+
+def parse_cached(parser, content: WorkbookSource,
+                 cache: Optional["ParseCache"] = None,
+                 content_hash: Optional[str] = None) -> Tuple[List[PayrollRecordCreate], Dict[str, Any], bool]:
+    """
+    Run parser.parse(content) unless an identical file was already parsed.
+
+    `content` may be bytes or a file path; pass `content_hash` when the
+    digest is already known (spooled uploads hash while receiving).
+
+    The entry is stored under the version stamp taken AFTER parsing, because
+    the first parse of a new factory sheet saves its template (which changes
+    the stamp). The next upload of the same file then hits that entry.
+    Partial results (sheets skipped as unchanged) are not cached.
+
+    Returns:
+        (records, parsing_stats, cache_hit)
+    """
+    cache = cache or parse_cache
+    content_hash = content_hash or hash_content(content)
+
+    version = parse_version_stamp(parser.template_manager)
+    if version is not None:
+        cached = cache.get(content_hash, version)
+        if cached is not None:
+            records, stats = cached
+            print(f"[ParseCache] Hit {content_hash[:12]}: {len(records)} records (parse skipped)")
+            return records, stats, True
+
+    records = parser.parse(content)
+    stats = parser.get_parsing_stats()
+
+    # Results with skipped (unchanged) sheets are partial: never cache them
+    if stats.get('unchanged_sheets'):
+        return records, stats, False
+
+    version = parse_version_stamp(parser.template_manager)
+    if version is not None:
+        # Timing metrics describe this parse only - a cache hit has none
+        cache.put(content_hash, version, records, {k: v for k, v in stats.items() if k != 'metrics'})
+    return records, stats, False
+
+
+def _encode(records: List[PayrollRecordCreate], stats: Dict[str, Any]) -> bytes:
+    """Serialize records column-wise (field names stored once) and gzip"""
+    fields = list(PayrollRecordCreate.model_fields)
+    payload = {
+        'format': PAYLOAD_FORMAT,
+        'fields': fields,
+        'rows': [[getattr(r, f) for f in fields] for r in records],
+        'stats': stats,
+    }
+    raw = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return gzip.compress(raw, compresslevel=6)
+
+
+def _decode(blob: bytes) -> Optional[Tuple[List[PayrollRecordCreate], Dict[str, Any]]]:
+    """Inverse of _encode. Returns None for unknown payload formats"""
+    payload = json.loads(gzip.decompress(blob))
+    if payload.get('format') != PAYLOAD_FORMAT:
+        return None
+    fields = payload['fields']
+    records = [PayrollRecordCreate(**dict(zip(fields, row))) for row in payload['rows']]
+    return records, payload.get('stats') or {}
+
+
+class ParseCache:
+    """Two-tier (memory + disk) LRU cache for parse results"""
+
+    def __init__(
+        self,
+        cache_dir: Optional[Path] = None,
+        max_memory_bytes: int = MAX_MEMORY_BYTES,
+        max_disk_bytes: int = MAX_DISK_BYTES,
+    ):
+        self.cache_dir = Path(cache_dir or PARSE_CACHE_DIR)
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'memory_hits': 0, 'disk_hits': 0, 'evictions': 0}
+
+    # ==================== Keys ====================
+
+    @staticmethod
+    def make_key(content_hash: str, version: str) -> str:
+        """Cache key for a file hash + version stamp"""
+        return hashlib.sha256(f"{content_hash}:{version}".encode('utf-8')).hexdigest()
+
+    def _disk_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json.gz"
+
+    # ==================== Public API ====================
+
+    def get(self, content_hash: str, version: str) -> Optional[Tuple[List[PayrollRecordCreate], Dict[str, Any]]]:
+        """
+        Look up parsed records for a file.
+
+        Returns:
+            (records, parsing_stats) or None on a miss
+        """
+        key = self.make_key(content_hash, version)
+
+        with self._lock:
+            blob = self._memory.get(key)
+            if blob is not None:
+                self._memory.move_to_end(key)
+                self._counters['memory_hits'] += 1
+
+        if blob is None:
+            path = self._disk_path(key)
+            try:
+                blob = path.read_bytes()
+                os.utime(path)  # Refresh LRU position on disk
+            except OSError:
+                blob = None
+
+            if blob is not None:
+                with self._lock:
+                    self._counters['disk_hits'] += 1
+                    self._remember(key, blob)
+
+        if blob is None:
+            with self._lock:
+                self._counters['misses'] += 1
+            return None
+
+        try:
+            result = _decode(blob)
+        except (OSError, ValueError, TypeError) as e:
+            print(f"[ParseCache] Dropping unreadable entry {key[:12]}: {e}")
+            self._forget(key)
+            result = None
+
+        with self._lock:
+            if result is None:
+                self._counters['misses'] += 1
+            else:
+                self._counters['hits'] += 1
+        return result
+
+    def put(self, content_hash: str, version: str,
+            records: List[PayrollRecordCreate], stats: Optional[Dict[str, Any]] = None) -> None:
+        """Store parsed records for a file in memory and on disk"""
+        key = self.make_key(content_hash, version)
+        blob = _encode(records, stats or {})
+
+        with self._lock:
+            self._remember(key, blob)
+
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            path = self._disk_path(key)
+            # Unique temp name per writer: two processes caching the same file
+            # each replace() a complete entry, never an interleaved one
+            with tempfile.NamedTemporaryFile(dir=path.parent, prefix=f"{key[:12]}.",
+                                             suffix='.tmp', delete=False) as tmp:
+                tmp_path = Path(tmp.name)
+                try:
+                    tmp.write(blob)
+                except OSError:
+                    tmp.close()
+                    tmp_path.unlink(missing_ok=True)
+                    raise
+            os.replace(tmp_path, path)  # Atomic: readers never see partial files
+            self._evict_disk()
+        except OSError as e:
+            print(f"[ParseCache] Could not write disk entry: {e}")
+
+    def clear(self) -> int:
+        """Remove all entries. Returns number of entries removed"""
+        with self._lock:
+            removed = len(self._memory)
+            self._memory.clear()
+            self._memory_bytes = 0
+
+        if self.cache_dir.exists():
+            for path in self.cache_dir.glob("*.json.gz"):
+                try:
+                    path.unlink()
+                    removed += 1
+                except OSError:
+                    pass
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Cache statistics (entries, bytes, hit counters)"""
+        disk_files = list(self.cache_dir.glob("*.json.gz")) if self.cache_dir.exists() else []
+        with self._lock:
+            return {
+                **self._counters,
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_bytes,
+                'max_memory_bytes': self.max_memory_bytes,
+                'disk_entries': len(disk_files),
+                'disk_bytes': sum(self._safe_size(p) for p in disk_files),
+                'max_disk_bytes': self.max_disk_bytes,
+            }
+
+    # ==================== Eviction ====================
+
+    def _remember(self, key: str, blob: bytes) -> None:
+        """Insert into the memory tier (lock must be held)"""
+        if len(blob) > self.max_memory_bytes:
+            return  # Too big for memory; disk only
+
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old)
+
+        self._memory[key] = blob
+        self._memory_bytes += len(blob)
+
+        while self._memory_bytes > self.max_memory_bytes and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self._counters['evictions'] += 1
+
+    def _forget(self, key: str) -> None:
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_bytes -= len(old)
+        try:
+            self._disk_path(key).unlink()
+        except OSError:
+            pass
+
+    def _evict_disk(self) -> None:
+        """Delete least recently used files until the disk tier fits its cap"""
+        entries = []
+        total = 0
+        for path in self.cache_dir.glob("*.json.gz"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        if total <= self.max_disk_bytes:
+            return
+
+        for _, size, path in sorted(entries):
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            with self._lock:
+                self._counters['evictions'] += 1
+            if total <= self.max_disk_bytes:
+                break
+
+    @staticmethod
+    def _safe_size(path: Path) -> int:
+        try:
+            return path.stat().st_size
+        except OSError:
+            return 0
+
+
+# Process-wide instance used by the upload endpoints
+parse_cache = ParseCache()
@@ -0,0 +1,279 @@
+"""
+ParseMetrics - Per-sheet, per-stage instrumentation of payroll parsing
+Finds slow factory layouts and helps size ARARI_PARSER_WORKERS
+
+Stages (seconds are exclusive: a nested stage is not counted twice):
+- workbook_load:     opening the workbook + reading the sheet's rows
+- fingerprint:       hashing the sheet to skip unchanged re-uploads
+- template_lookup:   finding/applying the factory template
+- field_detection:   label scan + template generation (no template found)
+- employee_columns:  scanning the employee ID row for blocks
+- extraction:        gathering fields and building records
+- dynamic_zone:      scanning rows 20-29 of every employee
+
+Per sheet: stage seconds, cells read, template hit/miss, employees found.
+Runs are stored in parse_runs / parse_sheet_metrics for later queries.
+"""
+
+import json
+import sqlite3
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+
+STAGES = (
+    'workbook_load', 'fingerprint', 'template_lookup', 'field_detection',
+    'employee_columns', 'extraction', 'dynamic_zone',
+)
+
+
+def init_parse_metrics_tables(conn: sqlite3.Connection):
+    """Initialize parse metrics tables"""
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS parse_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source_file TEXT,
+            engine TEXT,
+            workers INTEGER DEFAULT 1,
+            parallel INTEGER DEFAULT 0,
+            cache_hit INTEGER DEFAULT 0,
+            sheet_count INTEGER DEFAULT 0,
+            employees_found INTEGER DEFAULT 0,
+            cells_read INTEGER DEFAULT 0,
+            template_hits INTEGER DEFAULT 0,
+            template_misses INTEGER DEFAULT 0,
+            total_seconds REAL DEFAULT 0,
+            stage_seconds TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    stage_columns = ',\n'.join(f"            {stage}_seconds REAL DEFAULT 0" for stage in STAGES)
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS parse_sheet_metrics (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id INTEGER NOT NULL,
+            sheet_name TEXT NOT NULL,
+            template TEXT,
+            employees_found INTEGER DEFAULT 0,
+            records INTEGER DEFAULT 0,
+            cells_read INTEGER DEFAULT 0,
+            total_seconds REAL DEFAULT 0,
+{stage_columns},
+            FOREIGN KEY (run_id) REFERENCES parse_runs(id) ON DELETE CASCADE
+        )
+    """)
+
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_parse_sheet_metrics_sheet
+        ON parse_sheet_metrics(sheet_name)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_parse_sheet_metrics_run
+        ON parse_sheet_metrics(run_id)
+    """)
+
+    conn.commit()
+
+
+class _Stage:
+    """Context manager timing one stage of a SheetMetrics (exclusive time)"""
+
+    __slots__ = ('metrics', 'name', 'start', 'cells')
+
+    def __init__(self, metrics: 'SheetMetrics', name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        metrics = self.metrics
+        metrics._children.append([0.0, 0])
+        self.cells = metrics._cells()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        metrics = self.metrics
+        elapsed = time.perf_counter() - self.start
+        cells = metrics._cells() - self.cells
+        child_seconds, child_cells = metrics._children.pop()
+
+        metrics.stages[self.name] += elapsed - child_seconds
+        metrics.stage_cells[self.name] += cells - child_cells
+        if metrics._children:
+            metrics._children[-1][0] += elapsed
+            metrics._children[-1][1] += cells
+        return False
+
+
+class SheetMetrics:
+    """Metrics of one parsed sheet"""
+
+    def __init__(self, sheet: str):
+        self.sheet = sheet
+        self.stages: Dict[str, float] = {stage: 0.0 for stage in STAGES}
+        self.stage_cells: Dict[str, int] = {stage: 0 for stage in STAGES}
+        self.template: Optional[str] = None  # 'hit', 'miss' or 'generated'
+        self.employees_found = 0
+        self.records = 0
+        self.unchanged = False
+        self.view = None  # Grid/view whose cells_read counter is sampled
+        self._children: List[List[float]] = []
+
+    def _cells(self) -> int:
+        return getattr(self.view, 'cells_read', 0) if self.view is not None else 0
+
+    def stage(self, name: str) -> _Stage:
+        """
+        Time a stage:
+
+            with metrics.stage('extraction'):
+                ...
+        """
+        return _Stage(self, name)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'sheet': self.sheet,
+            'template': self.template,
+            'unchanged': self.unchanged,
+            'employees_found': self.employees_found,
+            'records': self.records,
+            'cells_read': sum(self.stage_cells.values()),
+            'total_seconds': round(sum(self.stages.values()), 6),
+            'stages': {stage: round(seconds, 6) for stage, seconds in self.stages.items()},
+            'stage_cells': dict(self.stage_cells),
+        }
+
+
+def summarize(sheets: List[Dict[str, Any]], workbook_load_seconds: float = 0.0,
+              engine: Optional[str] = None, workers: int = 1, parallel: bool = False,
+              wall_seconds: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Totals over per-sheet metrics (SheetMetrics.to_dict() entries).
+
+    workbook_load_seconds is the time spent opening the workbook itself
+    (once per process), added to the workbook_load stage.
+    """
+    stages = {stage: 0.0 for stage in STAGES}
+    for sheet in sheets:
+        for stage, seconds in sheet['stages'].items():
+            stages[stage] = stages.get(stage, 0.0) + seconds
+    stages['workbook_load'] += workbook_load_seconds
+
+    return {
+        'engine': engine,
+        'workers': workers,
+        'parallel': parallel,
+        'wall_seconds': round(wall_seconds, 6) if wall_seconds is not None else None,
+        'total_seconds': round(sum(stages.values()), 6),
+        'stages': {stage: round(seconds, 6) for stage, seconds in stages.items()},
+        'cells_read': sum(sheet['cells_read'] for sheet in sheets),
+        'employees_found': sum(sheet['employees_found'] for sheet in sheets),
+        'template_hits': sum(1 for sheet in sheets if sheet['template'] == 'hit'),
+        'template_misses': sum(1 for sheet in sheets if sheet['template'] in ('miss', 'generated')),
+        'sheets': sheets,
+    }
+
+
+class ParseMetricsService:
+    """Service for stored parse metrics"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def record_run(self, metrics: Optional[Dict[str, Any]], source_file: Optional[str] = None,
+                   cache_hit: bool = False) -> Optional[int]:
+        """
+        Store the metrics of one parse (get_parsing_stats()['metrics']) and commit.
+
+        Cache hits are stored without sheets or timings (nothing was parsed,
+        and parse_cached returns no metrics for them).
+
+        Returns:
+            Run ID, or None if there was nothing to store
+        """
+        if not metrics and not cache_hit:
+            return None
+        metrics = metrics or {}
+
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            INSERT INTO parse_runs
+                (source_file, engine, workers, parallel, cache_hit, sheet_count, employees_found,
+                 cells_read, template_hits, template_misses, total_seconds, stage_seconds, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            source_file, metrics.get('engine'), metrics.get('workers', 1), int(bool(metrics.get('parallel'))),
+            int(cache_hit), len(metrics.get('sheets', [])), metrics.get('employees_found', 0),
+            metrics.get('cells_read', 0), metrics.get('template_hits', 0), metrics.get('template_misses', 0),
+            metrics.get('wall_seconds') or metrics.get('total_seconds', 0),
+            json.dumps(metrics.get('stages', {})), datetime.now().isoformat(),
+        ))
+        run_id = cursor.lastrowid
+
+        if not cache_hit:
+            stage_columns = ', '.join(f"{stage}_seconds" for stage in STAGES)
+            placeholders = ', '.join('?' for _ in range(7 + len(STAGES)))
+            cursor.executemany(f"""
+                INSERT INTO parse_sheet_metrics
+                    (run_id, sheet_name, template, employees_found, records, cells_read, total_seconds,
+                     {stage_columns})
+                VALUES ({placeholders})
+            """, [
+                (
+                    run_id, sheet['sheet'], sheet['template'], sheet['employees_found'], sheet['records'],
+                    sheet['cells_read'], sheet['total_seconds'],
+                    *(sheet['stages'].get(stage, 0.0) for stage in STAGES),
+                )
+                for sheet in metrics.get('sheets', [])
+                if not sheet.get('unchanged')
+            ])
+
+        self.conn.commit()
+        return run_id
+
+    def get_runs(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most recent parse runs (newest first)"""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT * FROM parse_runs ORDER BY id DESC LIMIT ?", (limit,))
+        runs = []
+        for row in cursor.fetchall():
+            run = dict(row)
+            run['stage_seconds'] = json.loads(run['stage_seconds']) if run['stage_seconds'] else {}
+            runs.append(run)
+        return runs
+
+    def get_run_sheets(self, run_id: int) -> List[Dict[str, Any]]:
+        """Per-sheet metrics of one run (slowest first)"""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT * FROM parse_sheet_metrics WHERE run_id = ? ORDER BY total_seconds DESC
+        """, (run_id,))
+        return [dict(row) for row in cursor.fetchall()]
+
+    def get_sheet_summary(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Average cost per factory sheet over all stored runs (slowest first).
+        """
+        stage_averages = ', '.join(f"AVG({stage}_seconds) AS avg_{stage}_seconds" for stage in STAGES)
+        cursor = self.conn.cursor()
+        cursor.execute(f"""
+            SELECT
+                sheet_name,
+                COUNT(*) AS runs,
+                AVG(total_seconds) AS avg_seconds,
+                MAX(total_seconds) AS max_seconds,
+                AVG(employees_found) AS avg_employees,
+                AVG(cells_read) AS avg_cells_read,
+                SUM(CASE WHEN template = 'hit' THEN 1 ELSE 0 END) AS template_hits,
+                {stage_averages}
+            FROM parse_sheet_metrics
+            GROUP BY sheet_name
+            ORDER BY avg_seconds DESC
+            LIMIT ?
+        """, (limit,))
+        return [dict(row) for row in cursor.fetchall()]
@@ -0,0 +1,65 @@
+"""
+Periods - Sortable integer keys for payroll periods
+
+Periods are stored as text ('2025年1月'), which does not sort
+chronologically ('2025年9月' > '2025年10月'). payroll_records.period_key
+holds the same month as an integer (YYYYMM, 202501), so "latest period",
+trends and ranges are index seeks on idx_payroll_period_key /
+idx_payroll_emp_period_key:
+
+    SELECT period FROM payroll_records ORDER BY period_key DESC LIMIT 1
+    ... WHERE period_key BETWEEN 202401 AND 202412
+
+Queries name the column through period_key_sql(): while the period_key
+backfill is unfinished (ARARI_BACKFILL_MODE=background), rows saved before
+the column existed have no key yet, and the expression computes theirs
+from `period` (a table scan) instead of leaving them out.
+"""
+
+import re
+from typing import Optional
+
+_PERIOD_RE = re.compile(r'^(\d{4})年(\d{1,2})月$')
+
+# SQL expression computing the key of a `period` column ('YYYY年M月' or
+# 'YYYY年MM月'; NULL for anything else). Used by the backfill and the trigger
+# that fills rows written without a key.
+PERIOD_KEY_SQL = """
+    CASE WHEN {col} GLOB '[0-9][0-9][0-9][0-9]年[0-9]月'
+              OR {col} GLOB '[0-9][0-9][0-9][0-9]年[0-9][0-9]月'
+         THEN CAST(SUBSTR({col}, 1, 4) AS INTEGER) * 100
+              + CAST(REPLACE(SUBSTR({col}, 6), '月', '') AS INTEGER)
+    END
+"""
+
+
+# Set by init_db while the period_key backfill is unfinished
+_key_fallback = False
+
+
+def set_period_key_fallback(enabled: bool) -> None:
+    global _key_fallback
+    _key_fallback = enabled
+
+
+def period_key_sql(alias: str = '') -> str:
+    """Key of a payroll_records row in SQL: 'period_key' ('p' -> 'p.period_key')"""
+    prefix = f"{alias}." if alias else ''
+    if not _key_fallback:
+        return f"{prefix}period_key"
+    return f"COALESCE({prefix}period_key, {PERIOD_KEY_SQL.format(col=prefix + 'period')})"
+
+
+def period_key(period: Optional[str]) -> Optional[int]:
+    """'2025年1月' -> 202501 (None if the text is not a period)"""
+    if not period:
+        return None
+    match = _PERIOD_RE.match(str(period))
+    if not match:
+        return None
+    return month_key(int(match.group(1)), int(match.group(2)))
+
+
+def month_key(year: int, month: int) -> int:
+    """(2025, 1) -> 202501"""
+    return year * 100 + month
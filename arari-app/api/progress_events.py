@@ -0,0 +1,210 @@
+"""
+ProgressEvents - Lightweight in-process pub/sub for ingestion progress
+
+The parser, PayrollService and the ingestion pipeline publish events on a
+channel (an upload job ID, or an upload_id chosen by the client); the SSE
+endpoint (GET /api/progress/{channel}) streams them to the browser.
+
+    with progress_bus.bind(job_id):      # worker thread
+        ingest_file(...)                 # publish_event(...) calls inside go to job_id
+
+Publishing never blocks: events are appended to a short per-channel history
+and handed to subscribers with loop.call_soon_threadsafe. A slow subscriber
+loses its oldest events instead of slowing down the import. Code running
+without a bound channel (worker processes, tests, CLI) publishes nothing.
+
+Event types:
+- stage:             {stage, percent, ...counts}
+- sheet_started:     {sheet}
+- sheet_finished:    {sheet, records, template, unchanged, seconds}
+- records_parsed:    {count}
+- records_persisted: {saved, skipped, errors}
+- file_finished:     {file, status, records, saved, skipped, errors, seconds, ...} (folder sync)
+- warning:           {message, employee_id?, period?}
+- done / failed:     end of the channel ({...summary} / {error})
+"""
+
+import asyncio
+import contextvars
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+# Events kept per channel for late subscribers (replayed on subscribe)
+CHANNEL_HISTORY = 200
+
+# Events buffered per subscriber before the oldest are dropped
+SUBSCRIBER_QUEUE_SIZE = 500
+
+# Finished channels, and channels nothing was ever published on (a client
+# subscribed to an unknown id), are forgotten after this many seconds
+CHANNEL_TTL = 300
+
+# Warnings published per channel (the rest are only counted)
+MAX_WARNINGS = 50
+
+FINAL_EVENTS = ('done', 'failed')
+
+_current_channel: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    'progress_channel', default=None
+)
+
+
+class Subscription:
+    """Async view of one channel for one client"""
+
+    def __init__(self, bus: 'ProgressBus', channel: str, loop: asyncio.AbstractEventLoop,
+                 maxsize: Optional[int] = None):
+        self.bus = bus
+        self.channel = channel
+        self.loop = loop
+        self.queue: Deque[Dict[str, Any]] = deque(maxlen=maxsize or SUBSCRIBER_QUEUE_SIZE)
+        self.dropped = 0
+        self._ready = asyncio.Event()
+
+    def push(self, event: Dict[str, Any]) -> None:
+        """Called on the subscriber's event loop"""
+        if len(self.queue) == self.queue.maxlen:
+            self.dropped += 1
+        self.queue.append(event)
+        self._ready.set()
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Next event, or None on timeout"""
+        if not self.queue:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        return self.queue.popleft()
+
+    def close(self) -> None:
+        self.bus.unsubscribe(self)
+
+
+class _Channel:
+    __slots__ = ('history', 'subscribers', 'created_at', 'closed_at', 'warnings')
+
+    def __init__(self, now: float):
+        self.history: Deque[Dict[str, Any]] = deque(maxlen=CHANNEL_HISTORY)
+        self.subscribers: List[Subscription] = []
+        self.created_at = now
+        self.closed_at: Optional[float] = None
+        self.warnings = 0
+
+    def expired(self, now: float) -> bool:
+        if self.subscribers:
+            return False
+        if self.closed_at is not None:
+            return now - self.closed_at > CHANNEL_TTL
+        # Subscribed to, but never published on
+        return not self.history and now - self.created_at > CHANNEL_TTL
+
+
+class ProgressBus:
+    """Thread-safe, non-blocking publish / async subscribe"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._channels: Dict[str, _Channel] = {}
+        self._ids = itertools.count(1)
+
+    # ---------------- Publishing ----------------
+
+    def publish(self, channel: str, event_type: str, **data) -> None:
+        """Publish an event on a channel (never blocks)"""
+        now = time.time()
+        with self._lock:
+            state = self._channels.get(channel)
+            if state is None:
+                self._expire(now)
+                state = self._channels[channel] = _Channel(now)
+            if event_type == 'warning':
+                state.warnings += 1
+                if state.warnings > MAX_WARNINGS:
+                    return
+            event = {'id': next(self._ids), 'type': event_type, 'time': now, 'data': data}
+            state.history.append(event)
+            if event_type in FINAL_EVENTS:
+                state.closed_at = now
+            subscribers = list(state.subscribers)
+
+        for sub in subscribers:
+            try:
+                sub.loop.call_soon_threadsafe(sub.push, event)
+            except RuntimeError:
+                # Subscriber's loop is closed
+                self.unsubscribe(sub)
+
+    def _expire(self, now: float) -> None:
+        expired = [name for name, state in self._channels.items() if state.expired(now)]
+        for name in expired:
+            del self._channels[name]
+
+    @contextmanager
+    def bind(self, channel: Optional[str]):
+        """Route publish_event() calls of this thread/context to `channel`"""
+        token = _current_channel.set(channel)
+        try:
+            yield
+        finally:
+            _current_channel.reset(token)
+
+    def bound(self, channel: Optional[str], func: Callable, *args, **kwargs) -> Any:
+        """Call func with `channel` bound (for run_in_threadpool)"""
+        with self.bind(channel):
+            return func(*args, **kwargs)
+
+    # ---------------- Subscribing ----------------
+
+    def subscribe(self, channel: str) -> Subscription:
+        """
+        Subscribe from the running event loop. Events still in the channel
+        history are delivered first.
+        """
+        sub = Subscription(self, channel, asyncio.get_running_loop())
+        now = time.time()
+        with self._lock:
+            state = self._channels.get(channel)
+            if state is None:
+                self._expire(now)
+                state = self._channels[channel] = _Channel(now)
+            for event in state.history:
+                sub.push(event)
+            state.subscribers.append(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            state = self._channels.get(sub.channel)
+            if state is not None and sub in state.subscribers:
+                state.subscribers.remove(sub)
+
+    def is_closed(self, channel: str) -> bool:
+        with self._lock:
+            state = self._channels.get(channel)
+            return state is not None and state.closed_at is not None
+
+    def history(self, channel: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            state = self._channels.get(channel)
+            return list(state.history) if state else []
+
+
+def current_channel() -> Optional[str]:
+    return _current_channel.get()
+
+
+def publish_event(event_type: str, **data) -> None:
+    """Publish on the channel bound to the current context (no-op if none)"""
+    channel = _current_channel.get()
+    if channel is not None:
+        progress_bus.publish(channel, event_type, **data)
+
+
+# Global bus
+progress_bus = ProgressBus()
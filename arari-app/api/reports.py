@@ -9,6 +9,8 @@ from typing import List, Dict, Any, Optional
 from io import BytesIO
 import json
 
+from periods import period_key_sql
+
 # Note: For PDF generation, you'll need to install: pip install reportlab
 # For Excel: openpyxl is already installed
 
@@ -202,14 +204,14 @@ class ReportService:
         }
 
         # Historical payroll data
-        self.cursor.execute("""
+        self.cursor.execute(f"""
             SELECT period, work_hours, overtime_hours, overtime_over_60h,
                    night_hours, holiday_hours, gross_salary, billing_amount,
                    total_company_cost, gross_profit, profit_margin,
                    paid_leave_days, paid_leave_amount
             FROM payroll_records
             WHERE employee_id = ?
-            ORDER BY period DESC
+            ORDER BY {period_key_sql()} DESC
             LIMIT ?
         """, (employee_id, months))
 
@@ -274,7 +276,7 @@ class ReportService:
             })
 
         # Monthly aggregates
-        self.cursor.execute("""
+        self.cursor.execute(f"""
             SELECT
                 p.period,
                 COUNT(*) as employee_count,
@@ -285,8 +287,8 @@ class ReportService:
             FROM payroll_records p
             JOIN employees e ON p.employee_id = e.employee_id
             WHERE e.dispatch_company = ?
-            GROUP BY p.period
-            ORDER BY p.period DESC
+            GROUP BY {period_key_sql('p')}
+            ORDER BY {period_key_sql('p')} DESC
             LIMIT 12
         """, (company,))
 
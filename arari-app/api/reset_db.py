@@ -19,7 +19,21 @@ def reset_db():
         
         cursor.execute("DELETE FROM employees")
         print("✅ Employees deleted.")
-        
+
+        # Sheet fingerprints point at deleted records - forget them too
+        try:
+            cursor.execute("DELETE FROM sheet_fingerprints")
+            print("✅ Sheet fingerprints deleted.")
+        except sqlite3.OperationalError:
+            pass  # Table not created yet
+
+        # Folder sync manifest: files counted as imported would be skipped
+        try:
+            cursor.execute("DELETE FROM sync_manifest")
+            print("✅ Folder sync manifest deleted.")
+        except sqlite3.OperationalError:
+            pass  # Table not created yet
+
         # Optional: Reset settings or keep them? Keeping settings is usually better.
         # cursor.execute("DELETE FROM settings") 
         
@@ -7,6 +7,8 @@ import sqlite3
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 
+from periods import period_key_sql
+
 
 class ROIService:
     """Service for ROI calculations"""
@@ -226,7 +228,8 @@ class ROIService:
     def get_roi_trend(self, months: int = 6) -> List[Dict[str, Any]]:
         """Get ROI trend over time"""
 
-        self.cursor.execute("""
+        key = period_key_sql()
+        self.cursor.execute(f"""
             SELECT
                 period,
                 SUM(billing_amount) as revenue,
@@ -235,8 +238,9 @@ class ROIService:
                 AVG(profit_margin) as margin,
                 COUNT(DISTINCT employee_id) as emp_count
             FROM payroll_records
-            GROUP BY period
-            ORDER BY period DESC
+            WHERE {key} IS NOT NULL
+            GROUP BY {key}
+            ORDER BY {key} DESC
             LIMIT ?
         """, (months,))
 
@@ -36,12 +36,152 @@ Multipliers for billing calculation:
 - 休日: 単価 × 1.35
 """
 
+import json
 import openpyxl
 import re
+import math
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
 from typing import List, Optional, Dict, Any, Tuple
-from io import BytesIO
 from models import PayrollRecordCreate
 from template_manager import TemplateManager, TemplateGenerator
+from sheet_grid import (
+    SheetGrid, WorksheetView, WorkbookSource, as_sheet_view, read_sheet_names, workbook_input, grid_fingerprint,
+    DEFAULT_SNAPSHOT_ROWS,
+)
+from label_matcher import LabelMatcher, normalize_label
+from parse_metrics import SheetMetrics, summarize
+from progress_events import publish_event
+from xlsx_reader import XlsxGridReader, XlsxFormatError
+
+
+# ================================================================
+# PROCESS POOL - Shared across uploads so workers stay warm
+# ================================================================
+_parse_pool: Optional[ProcessPoolExecutor] = None
+_parse_pool_lock = threading.Lock()
+
+
+def get_parse_pool(max_workers: int) -> ProcessPoolExecutor:
+    """Get (or lazily create) the process pool used for parallel sheet parsing"""
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            _parse_pool = ProcessPoolExecutor(max_workers=max_workers)
+            print(f"[PARSER] Started parse pool with {max_workers} workers")
+        return _parse_pool
+
+
+def shutdown_parse_pool() -> None:
+    """Shut down the parse pool (called on application shutdown or after a crash)"""
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is not None:
+            _parse_pool.shutdown(wait=False, cancel_futures=True)
+            _parse_pool = None
+
+
+def _publish_sheet_finished(sheet: Dict[str, Any]) -> None:
+    """Progress event for a parsed sheet (SheetMetrics.to_dict() entry)"""
+    publish_event(
+        'sheet_finished', sheet=sheet['sheet'], records=sheet['records'], template=sheet['template'],
+        unchanged=sheet['unchanged'], seconds=sheet['total_seconds'],
+    )
+
+
+def _to_number(value: Any) -> float:
+    """Convert a cell value to float (formatted strings allowed, else 0.0)"""
+    if value is None or value == '':
+        return 0.0
+
+    if isinstance(value, (int, float)):
+        return float(value)
+
+    try:
+        value_str = str(value).strip()
+        if not value_str:
+            return 0.0
+
+        # Remove formatting
+        value_str = value_str.replace(',', '').replace('¥', '').replace(' ', '')
+
+        return float(value_str)
+
+    except (ValueError, TypeError):
+        return 0.0
+
+
+def _hours_with_minutes(hours: float, minutes: float) -> float:
+    """
+    Combine the 'value' (hours) and 'minutes' cells of an hour field.
+
+    1. Decimal hours (13.5) are returned as-is
+    2. Total minutes only (プレテック): 0h + 10080m -> 168.0
+    3. HH:MM in two cells: 73h + 30m -> 73.5
+    """
+    # Check if hours already has decimal (e.g., 13.5)
+    # If yes, it's already in decimal format - don't add minutes
+    if hours != int(hours):
+        return hours
+
+    # Format 3: Total minutes only (プレテック style)
+    # If hours is 0 and minutes is large (>=60), treat minutes as TOTAL minutes
+    if hours == 0 and minutes >= 60:
+        return minutes / 60.0
+
+    # Format 1: Normal HH:MM format (minutes is 0-59)
+    if 0 <= minutes < 60:
+        return hours + (minutes / 60.0)
+
+    # Minutes value is invalid (negative), ignore it
+    return hours
+
+
+def _safe_hours_with_minutes(hours: float, minutes: float) -> Any:
+    """_hours_with_minutes, returning the error (e.g. NaN hours) instead of raising"""
+    try:
+        return _hours_with_minutes(hours, minutes)
+    except (ValueError, OverflowError) as e:
+        return e
+
+
+def _parse_sheet_group(content: WorkbookSource, sheet_names: List[str], engine: str,
+                       use_intelligent_mode: bool, template_db_path: str,
+                       template_version: Optional[str] = None,
+                       known_fingerprints: Optional[Dict[str, set]] = None) -> Dict[str, Any]:
+    """
+    Worker entry point: parse a group of sheets in a separate process.
+
+    Template saves are deferred and returned to the parent, so only one
+    process writes to factory_templates. The worker keeps its template index
+    between tasks and only reloads it when the parent's version differs.
+    """
+    template_manager = TemplateManager(Path(template_db_path))
+    template_manager.refresh_if_changed(template_version)
+
+    parser = SalaryStatementParser(
+        use_intelligent_mode=use_intelligent_mode,
+        template_manager=template_manager,
+        engine=engine,
+    )
+    parser.defer_template_saves = True
+    parser.known_fingerprints = known_fingerprints or {}
+    records = parser._parse_sequential(content, only_sheets=set(sheet_names))
+
+    return {
+        'records': records,
+        'templates_used': parser.templates_used,
+        'templates_generated': parser.templates_generated,
+        'validation_warnings': parser.validation_warnings,
+        'pending_templates': parser.pending_templates,
+        'detected_fields': parser.detected_fields,
+        'detected_allowances': parser.detected_allowances,
+        'sheet_results': parser.sheet_results,
+        'sheet_metrics': parser.sheet_metrics,
+        'workbook_load_seconds': parser.workbook_load_seconds,
+    }
 
 
 class SalaryStatementParser:
@@ -228,7 +368,42 @@ class SalaryStatementParser:
         '年末調整': 'year_end_adjustment',
     }
 
-    def __init__(self, use_intelligent_mode: bool = True, template_manager: Optional[TemplateManager] = None):
+    # FIELD_PATTERNS / DYNAMIC_ZONE_LABELS / ALLOWANCE_PATTERNS compiled on first use
+    _compiled_label_matcher: Optional[LabelMatcher] = None
+
+    # Fields gathered from the 'value' column for all employees at once
+    BLOCK_VALUE_FIELDS = (
+        'paid_leave_days', 'base_salary', 'overtime_pay', 'night_pay', 'holiday_pay',
+        'transport_allowance', 'social_insurance', 'welfare_pension', 'employment_insurance',
+        'income_tax', 'resident_tax', 'gross_salary', 'net_salary',
+    )
+    # Hour fields (value + minutes columns, see _hours_with_minutes)
+    BLOCK_HOUR_FIELDS = ('work_hours', 'overtime_hours', 'night_hours', 'holiday_hours')
+
+    # Template fields that affect extraction (part of the sheet fingerprint)
+    TEMPLATE_FINGERPRINT_KEYS = (
+        'field_positions', 'column_offsets', 'detected_allowances',
+        'non_billable_allowances', 'employee_column_width',
+    )
+
+    # Bump whenever extraction logic changes (invalidates cached parse results)
+    PARSER_VERSION = '2.2'
+
+    # Sheets that never contain employee blocks
+    SKIP_SHEETS = ['集計', 'Summary', '目次', 'Index', '請負']
+
+    # ================================================================
+    # READER ENGINES
+    # - 'openpyxl':  full object model, cell-by-cell access (legacy)
+    # - 'streaming': read_only workbook, rows 1-60 snapshot per sheet
+    # - 'xml':       direct zip/XML reader, rows 1-60 snapshot per sheet
+    #                (falls back to openpyxl for anything it can't read)
+    # ================================================================
+    ENGINES = ('openpyxl', 'streaming', 'xml')
+    SNAPSHOT_ROWS = DEFAULT_SNAPSHOT_ROWS
+
+    def __init__(self, use_intelligent_mode: bool = True, template_manager: Optional[TemplateManager] = None,
+                 engine: str = 'openpyxl', max_workers: int = 1):
         """
         Initialize parser with template support.
 
@@ -237,8 +412,18 @@ class SalaryStatementParser:
                                  DEFAULT TRUE - now uses template system
             template_manager: Optional TemplateManager instance for template storage
                             If None, creates one automatically
+            engine: Reader engine ('openpyxl', 'streaming' or 'xml'). All produce
+                    the same records; 'streaming' uses far less memory and
+                    'xml' skips openpyxl entirely for standard packages.
+            max_workers: If > 1, sheets are parsed in parallel in a shared
+                         process pool (falls back to sequential on failure)
         """
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown parser engine: {engine}. Allowed: {', '.join(self.ENGINES)}")
+
         self.use_intelligent_mode = use_intelligent_mode
+        self.engine = engine
+        self.max_workers = max(1, max_workers)
         self.template_manager = template_manager or TemplateManager()
         self.template_generator = TemplateGenerator()
 
@@ -254,43 +439,49 @@ class SalaryStatementParser:
         self.templates_generated: List[str] = []  # Factory names where template was generated
         self.using_template: bool = False  # Whether current sheet uses a template
 
-    def parse(self, content: bytes) -> List[PayrollRecordCreate]:
+        # Worker processes collect templates instead of writing them
+        self.defer_template_saves: bool = False
+        self.pending_templates: List[Dict[str, Any]] = []
+        self.template_version: Optional[str] = None  # Template stamp at parse start
+
+        # Incremental re-ingestion (see sheet_fingerprints.py)
+        # known_fingerprints: sheet name -> fingerprints already imported
+        # sheet_results: one entry per parsed sheet, in workbook order
+        self.known_fingerprints: Dict[str, set] = {}
+        self.sheet_results: List[Dict[str, Any]] = []
+
+        # Instrumentation (see parse_metrics.py)
+        self.current_metrics: Optional[SheetMetrics] = None  # Sheet being parsed
+        self.sheet_metrics: List[Dict[str, Any]] = []
+        self.workbook_load_seconds: float = 0.0
+        self.parse_seconds: Optional[float] = None
+        self.parsed_in_parallel: bool = False
+
+    def parse(self, content: WorkbookSource) -> List[PayrollRecordCreate]:
         """
         Parse .xlsm file and extract all employee payroll records
 
         Args:
-            content: Binary content of the Excel file
+            content: Binary content of the Excel file, or a path to it
+                     (workers then open the file themselves instead of
+                     receiving a pickled copy of the bytes)
 
         Returns:
             List of PayrollRecordCreate objects
         """
-        try:
-            wb = openpyxl.load_workbook(BytesIO(content), data_only=True)
-        except Exception as e:
-            print(f"[ERROR] Error loading Excel file: {e}")
-            return []
+        # Pick up template changes made by other processes (one cheap query);
+        # all per-sheet lookups below are served from the in-memory index
+        self.template_version = self.template_manager.refresh_if_changed()
+        started = time.perf_counter()
 
-        records = []
+        records = None
+        if self.max_workers > 1:
+            records = self._parse_parallel(content)
+            self.parsed_in_parallel = records is not None
+        if records is None:
+            records = self._parse_sequential(content)
 
-        print(f"[DEBUG] Starting SalaryStatementParser. Sheets: {wb.sheetnames}")
-        
-        # Process all sheets except the summary sheet (集計) and Contract (請負)
-        for sheet_name in wb.sheetnames:
-            if sheet_name in ['集計', 'Summary', '目次', 'Index', '請負']:
-                print(f"[DEBUG] Skipping sheet: {sheet_name}")
-                continue  # Skip summary/index/contract sheets
-
-            try:
-                print(f"[DEBUG] Processing sheet: {sheet_name}")
-                ws = wb[sheet_name]
-                sheet_records = self._parse_sheet(ws, sheet_name)
-                print(f"[DEBUG] Sheet '{sheet_name}' yielded {len(sheet_records)} records")
-                records.extend(sheet_records)
-            except Exception as e:
-                print(f"[WARNING] Error parsing sheet '{sheet_name}': {e}")
-                import traceback
-                traceback.print_exc()
-                continue
+        self.parse_seconds = time.perf_counter() - started
 
         print(f"[OK] Parsed {len(records)} employee records from Excel")
 
@@ -310,6 +501,202 @@ class SalaryStatementParser:
 
         return records
 
+    def _parse_sequential(self, content: WorkbookSource, only_sheets: Optional[set] = None) -> List[PayrollRecordCreate]:
+        """
+        Parse sheets one after another in this process.
+
+        Args:
+            content: Binary content of the Excel file, or a path to it
+            only_sheets: If given, only these sheet names are parsed
+        """
+        started = time.perf_counter()
+        try:
+            wb = self._load_workbook(content)
+        except Exception as e:
+            print(f"[ERROR] Error loading Excel file: {e}")
+            return []
+        finally:
+            self.workbook_load_seconds += time.perf_counter() - started
+
+        records = []
+
+        print(f"[DEBUG] Starting SalaryStatementParser (engine={self.engine}). Sheets: {wb.sheetnames}")
+        
+        # Process all sheets except the summary sheet (集計) and Contract (請負)
+        try:
+            for sheet_name in wb.sheetnames:
+                if sheet_name in self.SKIP_SHEETS:
+                    print(f"[DEBUG] Skipping sheet: {sheet_name}")
+                    continue  # Skip summary/index/contract sheets
+                if only_sheets is not None and sheet_name not in only_sheets:
+                    continue  # Handled by another worker
+
+                sheet_result = {'sheet': sheet_name, 'fingerprint': None, 'records': 0, 'unchanged': False}
+                self.sheet_results.append(sheet_result)
+                metrics = self.current_metrics = SheetMetrics(sheet_name)
+                publish_event('sheet_started', sheet=sheet_name)
+                try:
+                    print(f"[DEBUG] Processing sheet: {sheet_name}")
+                    with metrics.stage('workbook_load'):
+                        ws = self._sheet_view(wb[sheet_name])
+                    metrics.view = ws
+
+                    # Skip sheets already imported with identical content
+                    with metrics.stage('fingerprint'):
+                        fingerprint = self._sheet_fingerprint(ws, sheet_name)
+                    if fingerprint in self.known_fingerprints.get(sheet_name, ()):
+                        print(f"[DEBUG] Sheet '{sheet_name}' unchanged since last import, skipping")
+                        sheet_result.update(fingerprint=fingerprint, unchanged=True)
+                        metrics.unchanged = True
+                        continue
+
+                    generated_before = len(self.templates_generated)
+                    sheet_records = self._parse_sheet(ws, sheet_name)
+                    print(f"[DEBUG] Sheet '{sheet_name}' yielded {len(sheet_records)} records")
+
+                    # A template was generated for this sheet: store the fingerprint
+                    # the next upload will compute (with the template in place)
+                    if len(self.templates_generated) != generated_before:
+                        with metrics.stage('fingerprint'):
+                            fingerprint = self._sheet_fingerprint(ws, sheet_name)
+                    records.extend(sheet_records)
+                    sheet_result.update(fingerprint=fingerprint, records=len(sheet_records))
+                    metrics.records = len(sheet_records)
+                except Exception as e:
+                    print(f"[WARNING] Error parsing sheet '{sheet_name}': {e}")
+                    import traceback
+                    traceback.print_exc()
+                    continue
+                finally:
+                    self.sheet_metrics.append(metrics.to_dict())
+                    self.current_metrics = None
+                    _publish_sheet_finished(self.sheet_metrics[-1])
+        finally:
+            # Read-only workbooks keep the archive open until closed
+            wb.close()
+
+        return records
+
+    def _parse_parallel(self, content: WorkbookSource) -> Optional[List[PayrollRecordCreate]]:
+        """
+        Parse groups of sheets in the shared process pool.
+
+        Sheets are split into contiguous groups and merged back in workbook
+        order, so records, templates_used/templates_generated and
+        validation_warnings come out in the same order as a sequential parse.
+
+        Returns:
+            List of records, or None if the caller should parse sequentially
+        """
+        try:
+            sheet_names = [n for n in read_sheet_names(content) if n not in self.SKIP_SHEETS]
+        except Exception as e:
+            print(f"[WARNING] Could not list sheets for parallel parse: {e}")
+            return None
+
+        if len(sheet_names) < 2:
+            return None
+
+        group_count = min(self.max_workers, len(sheet_names))
+        group_size = math.ceil(len(sheet_names) / group_count)
+        groups = [sheet_names[i:i + group_size] for i in range(0, len(sheet_names), group_size)]
+
+        print(f"[DEBUG] Parallel parse: {len(sheet_names)} sheets in {len(groups)} groups "
+              f"(engine={self.engine}, workers={self.max_workers})")
+
+        try:
+            pool = get_parse_pool(self.max_workers)
+            futures = [
+                pool.submit(
+                    _parse_sheet_group, content, group, self.engine,
+                    self.use_intelligent_mode, str(self.template_manager.db_path),
+                    self.template_version, self.known_fingerprints
+                )
+                for group in groups
+            ]
+            # Sheet progress is published as each group completes (workers cannot publish)
+            for future in as_completed(futures):
+                for sheet in future.result()['sheet_metrics']:
+                    _publish_sheet_finished(sheet)
+            results = [future.result() for future in futures]
+        except Exception as e:
+            # Broken pool (worker killed, pickling error...) - reset and go sequential
+            print(f"[WARNING] Parallel parse failed, falling back to sequential: {e}")
+            shutdown_parse_pool()
+            return None
+
+        # Merge in fixed (workbook) order
+        records = []
+        for result in results:
+            records.extend(result['records'])
+            self.templates_used.extend(result['templates_used'])
+            self.templates_generated.extend(result['templates_generated'])
+            self.validation_warnings.extend(result['validation_warnings'])
+            self.sheet_results.extend(result['sheet_results'])
+            self.sheet_metrics.extend(result['sheet_metrics'])
+            self.workbook_load_seconds += result['workbook_load_seconds']
+            self.detected_fields = result['detected_fields']
+            self.detected_allowances = result['detected_allowances']
+
+            # Persist templates detected by workers from this (single) process
+            for template_kwargs in result['pending_templates']:
+                self.template_manager.save_template(**template_kwargs)
+
+        return records
+
+    def _load_workbook(self, content: WorkbookSource):
+        """Open the workbook according to the selected engine"""
+        if self.engine == 'xml':
+            try:
+                return XlsxGridReader(content, max_row=self.SNAPSHOT_ROWS)
+            except XlsxFormatError as e:
+                print(f"[WARNING] XML reader cannot open workbook ({e}), using openpyxl")
+                return openpyxl.load_workbook(workbook_input(content), read_only=True, data_only=True)
+        if self.engine == 'streaming':
+            return openpyxl.load_workbook(workbook_input(content), read_only=True, data_only=True)
+        return openpyxl.load_workbook(workbook_input(content), data_only=True)
+
+    def _sheet_view(self, ws):
+        """
+        Wrap a worksheet in the value(row, col) interface used by the parser.
+
+        streaming: rows 1-60 are read once into a SheetGrid snapshot
+        openpyxl:  cells are read on demand from the full object model
+        xml:       the reader already returns SheetGrid snapshots
+        """
+        if isinstance(ws, SheetGrid):
+            return ws
+        if self.engine in ('streaming', 'xml'):
+            return SheetGrid.from_worksheet(ws, max_row=self.SNAPSHOT_ROWS)
+        return WorksheetView(ws)
+
+    def _sheet_fingerprint(self, ws, sheet_name: str) -> str:
+        """
+        Fingerprint of everything that determines this sheet's records:
+        the values in rows 1-60, the parser version and the saved template.
+        """
+        if not isinstance(ws, SheetGrid):
+            ws = SheetGrid.from_worksheet(ws.ws, max_row=self.SNAPSHOT_ROWS)
+
+        # Templates detected in this run (deferred in workers) count as saved
+        template = next(
+            (t for t in reversed(self.pending_templates) if t['factory_identifier'] == sheet_name),
+            None
+        ) or self.template_manager.find_matching_template(sheet_name)
+
+        # Template CONTENT (not its timestamp): a template generated from this
+        # same sheet does not change the fingerprint, a manual edit does
+        template_stamp = '-'
+        if template:
+            template_stamp = json.dumps(
+                [template.get(key) for key in self.TEMPLATE_FINGERPRINT_KEYS],
+                sort_keys=True, ensure_ascii=False, default=str
+            )
+
+        return grid_fingerprint(
+            ws, f"{self.PARSER_VERSION}|{self.use_intelligent_mode}|{template_stamp}"
+        )
+
     def get_parsing_stats(self) -> Dict[str, Any]:
         """
         Get statistics about the parsing operation.
@@ -323,6 +710,14 @@ class SalaryStatementParser:
             'validation_warnings': len(self.validation_warnings),
             'fields_detected': len(self.detected_fields),
             'allowances_detected': len(self.detected_allowances),
+            'sheets': [dict(sheet) for sheet in self.sheet_results],
+            'unchanged_sheets': [s['sheet'] for s in self.sheet_results if s['unchanged']],
+            # Per-sheet / per-stage timings, cells read, template hits (parse_metrics.py)
+            'metrics': summarize(
+                [dict(sheet) for sheet in self.sheet_metrics], self.workbook_load_seconds,
+                engine=self.engine, workers=self.max_workers, parallel=self.parsed_in_parallel,
+                wall_seconds=self.parse_seconds,
+            ),
         }
 
     def _parse_sheet(self, ws, sheet_name: str) -> List[PayrollRecordCreate]:
@@ -336,17 +731,36 @@ class SalaryStatementParser:
         4. If intelligent detection succeeds → Save template for future use
         5. If both fail → Use hardcoded fallback positions
         """
+        ws = as_sheet_view(ws)
         records = []
+
+        # Per-sheet state: nothing carries over from the previous sheet, so a
+        # sheet parses the same whichever sheets were parsed before it (in
+        # this process or in a parallel worker)
         self.using_template = False
+        self.detected_fields = {}
+        self.detected_allowances = {}
+        self.detected_non_billable = {}
+        self.current_column_offsets = {}
+
+        # Stage metrics go to the sheet entry of _parse_sequential (or are discarded)
+        metrics = self.current_metrics or SheetMetrics(sheet_name)
+        if metrics.view is None:
+            metrics.view = ws
 
         # ================================================================
         # STEP 1: Try to load existing template
         # ================================================================
-        template = self.template_manager.find_matching_template(sheet_name)
-
-        if template and template.get('detection_confidence', 0) >= 0.5:
+        with metrics.stage('template_lookup'):
+            template = self.template_manager.find_matching_template(sheet_name)
+            if template and template.get('detection_confidence', 0) >= 0.5:
+                self._apply_template(template)
+            else:
+                template = None
+
+        metrics.template = 'hit' if template else 'miss'
+        if template:
             # Use template
-            self._apply_template(template)
             self.using_template = True
             self.templates_used.append(sheet_name)
             print(f"  [Sheet '{sheet_name}'] Using saved template "
@@ -356,7 +770,8 @@ class SalaryStatementParser:
             # STEP 2: No template - use intelligent detection
             # ================================================================
             if self.use_intelligent_mode:
-                self._detect_field_positions(ws)
+                with metrics.stage('field_detection'):
+                    self._detect_field_positions(ws)
 
                 # Check if detection was successful (found enough fields)
                 required_fields = ['gross_salary', 'base_salary', 'work_hours']
@@ -367,8 +782,10 @@ class SalaryStatementParser:
                     # ================================================================
                     # STEP 3: Detection successful - save template
                     # ================================================================
-                    self._save_detected_template(ws, sheet_name, detection_confidence)
+                    with metrics.stage('field_detection'):
+                        self._save_detected_template(ws, sheet_name, detection_confidence)
                     self.templates_generated.append(sheet_name)
+                    metrics.template = 'generated'
                     print(f"  [Sheet '{sheet_name}'] Generated new template "
                           f"(confidence={detection_confidence:.2f})")
                 else:
@@ -382,7 +799,9 @@ class SalaryStatementParser:
         # ================================================================
         # STEP 4: Detect employee column positions
         # ================================================================
-        employee_cols = self._detect_employee_columns(ws)
+        with metrics.stage('employee_columns'):
+            employee_cols = self._detect_employee_columns(ws)
+        metrics.employees_found = len(employee_cols)
 
         if not employee_cols:
             print(f"  [WARNING] No employee IDs found in sheet '{sheet_name}'")
@@ -397,10 +816,9 @@ class SalaryStatementParser:
         # ================================================================
         # STEP 5: Extract data for each employee
         # ================================================================
-        for col_idx in employee_cols:
-            record = self._extract_employee_data(ws, col_idx, sheet_name)
-            if record:
-                records.append(record)
+        # All employees of the sheet are gathered field by field (see _extract_block)
+        with metrics.stage('extraction'):
+            records = [r for r in self._extract_block(ws, employee_cols, sheet_name) if r]
 
         return records
 
@@ -441,7 +859,7 @@ class SalaryStatementParser:
         for col in range(1, min(50, ws.max_column + 1)):
             # Find employee ID
             if not sample_emp_id:
-                cell_value = ws.cell(row=emp_id_row, column=col).value
+                cell_value = ws.value(emp_id_row, col)
                 if cell_value:
                     emp_str = str(cell_value).strip()
                     if emp_str.isdigit() and len(emp_str) == 6:
@@ -449,7 +867,7 @@ class SalaryStatementParser:
 
             # Find period
             if not sample_period:
-                cell_value = ws.cell(row=period_row, column=col).value
+                cell_value = ws.value(period_row, col)
                 if cell_value:
                     from datetime import datetime
                     if isinstance(cell_value, datetime):
@@ -460,8 +878,7 @@ class SalaryStatementParser:
                         if match:
                             sample_period = f"{match.group(1)}年{int(match.group(2))}月"
 
-        # Save template
-        self.template_manager.save_template(
+        template_kwargs = dict(
             factory_identifier=sheet_name,
             field_positions=self.detected_fields.copy(),
             column_offsets=self.current_column_offsets or self.COLUMN_OFFSETS.copy(),
@@ -474,11 +891,20 @@ class SalaryStatementParser:
             notes=f"Auto-generated from Excel parsing"
         )
 
+        # Worker processes hand templates back to the parent for saving
+        if self.defer_template_saves:
+            self.pending_templates.append(template_kwargs)
+            return
+
+        # Save template
+        self.template_manager.save_template(**template_kwargs)
+
     def _detect_field_positions(self, ws) -> None:
         """
         Scan worksheet to find row positions of known fields by their labels.
         Also detects any 手当 (allowances) dynamically.
         """
+        ws = as_sheet_view(ws)
         self.detected_fields = {}
         self.detected_allowances = {}
         self.detected_non_billable = {}
@@ -491,59 +917,49 @@ class SalaryStatementParser:
         for block_start in range(1, 100, 14):  # Generate for first ~7 employees
             label_columns.append(block_start + label_offset)  # Column with labels
 
+        matcher = self._label_matcher()
         for row in range(1, min(50, ws.max_row + 1)):
             for col in label_columns:
-                cell_value = ws.cell(row=row, column=col).value
+                cell_value = ws.value(row, col)
                 if not cell_value:
                     continue
 
                 label = str(cell_value).strip()
-                # Normalize label by removing ALL spaces (both ASCII and full-width)
-                label_normalized = label.replace(' ', '').replace('　', '')
 
-                # Check against known field patterns (using normalized label)
-                # IMPORTANTE: Usar matching EXACTO para evitar confusiones
+                # One lookup returns every category this label belongs to
+                # IMPORTANTE: Usar matching EXACTO o por prefijo (ver LabelMatcher 'prefix')
                 # Por ejemplo: '残業' no debe matchear '残業手当' (que es YEN, no horas)
-                for field_name, patterns in self.FIELD_PATTERNS.items():
+                match = matcher.match(label)
+                for field_name in match.fields:
                     if field_name not in self.detected_fields:
-                        for pattern in patterns:
-                            pattern_normalized = pattern.replace(' ', '').replace('　', '')
-                            # Usar EXACT MATCH o si el label COMIENZA con el pattern
-                            # Esto evita que '残業' matchee '残業手当'
-                            if label_normalized == pattern_normalized:
-                                self.detected_fields[field_name] = row
-                                break
-                            # También aceptar si el label empieza con el pattern (para variantes)
-                            # Pero SOLO si no contiene indicadores de pago (手当/代/割増/給)
-                            elif label_normalized.startswith(pattern_normalized):
-                                # Verificar que no sea un campo de pago disfrazado
-                                payment_indicators = ['手当', '代', '割増', '給']
-                                is_payment_field = any(ind in label_normalized for ind in payment_indicators)
-                                # Si estamos buscando horas y el label tiene indicador de pago, ignorar
-                                if '_hours' in field_name or '_days' in field_name:
-                                    if not is_payment_field:
-                                        self.detected_fields[field_name] = row
-                                        break
-                                else:
-                                    self.detected_fields[field_name] = row
-                                    break
+                        self.detected_fields[field_name] = row
 
                 # Check for NON-BILLABLE allowances (通勤手当（非）, 業務手当, etc.)
-                if label in self.NON_BILLABLE_ALLOWANCES:
+                if match.is_non_billable:
                     if label not in self.detected_non_billable:
                         self.detected_non_billable[label] = row
 
                 # Check for ANY 手当 (allowance) - dynamic detection
-                elif self._is_allowance(label) and label not in self.KNOWN_ALLOWANCES:
+                elif match.is_allowance and label not in self.KNOWN_ALLOWANCES:
                     if label not in self.detected_allowances:
                         self.detected_allowances[label] = row
 
+    @classmethod
+    def _label_matcher(cls) -> LabelMatcher:
+        """Compiled matcher for this class's label patterns (built once)"""
+        if cls._compiled_label_matcher is None:
+            cls._compiled_label_matcher = LabelMatcher(
+                field_patterns=cls.FIELD_PATTERNS,
+                dynamic_labels=cls.DYNAMIC_ZONE_LABELS,
+                allowance_patterns=cls.ALLOWANCE_PATTERNS,
+                non_billable_names=cls.NON_BILLABLE_ALLOWANCES,
+                field_mode='prefix',
+            )
+        return cls._compiled_label_matcher
+
     def _is_allowance(self, label: str) -> bool:
         """Check if a label represents an allowance (手当)"""
-        for pattern in self.ALLOWANCE_PATTERNS:
-            if re.match(pattern, label):
-                return True
-        return False
+        return self._label_matcher().match(label).is_allowance
 
     def _normalize_label(self, label: Any) -> str:
         """
@@ -557,14 +973,8 @@ class SalaryStatementParser:
         """
         if label is None:
             return ""
-        text = str(label)
-        # Remover espacios japoneses (全角) y normales
-        text = text.replace('\u3000', '').replace(' ', '').replace('　', '')
-        # Remover paréntesis y contenido (ej: 通勤手当（非）→ 通勤手当)
-        text = re.sub(r'[（(].*?[）)]', '', text)
-        # Remover caracteres de formato japonés
-        text = text.replace('・', '').replace('･', '')
-        return text.strip()
+        # Memoized: labels repeat in every employee block
+        return normalize_label(str(label))
 
     def _scan_dynamic_zone_for_employee(self, ws, base_col: int) -> Dict[str, Any]:
         """
@@ -609,10 +1019,10 @@ class SalaryStatementParser:
         }
 
         # Scan rows 20-29 for this employee
+        matcher = self._label_matcher()
         for row in range(self.DYNAMIC_ZONE_START, self.DYNAMIC_ZONE_END + 1):
             # Get the label in the employee's label column
-            label_cell = ws.cell(row=row, column=label_col)
-            label = label_cell.value
+            label = ws.value(row, label_col)
 
             if not label:
                 continue
@@ -626,44 +1036,40 @@ class SalaryStatementParser:
             # Get the value (yen amount)
             value = self._get_numeric(ws, row, value_col)
 
-            # Check against known labels
-            label_normalized = label_str.replace(' ', '').replace('　', '')
-
-            # Check known labels first
-            matched = False
-            for known_label, category in self.DYNAMIC_ZONE_LABELS.items():
-                if known_label in label_normalized or label_normalized in known_label:
-                    matched = True
-                    if category == 'overtime_over_60h_pay':
-                        result['overtime_over_60h_pay'] += value
-                    elif category == 'paid_leave_amount':
-                        # Extract BOTH the amount (value) AND the days from this row
-                        result['paid_leave_amount'] += value
-                        # Get days from 'days' column (same row, different column)
-                        days_value = self._get_numeric(ws, row, days_col)
-                        if days_value > 0:
-                            result['paid_leave_days'] += days_value
-                    elif category == 'non_billable':
-                        result['non_billable_total'] += value
-                        result['non_billable_details'].append(f"{label_str}=¥{value:,.0f}")
-                    elif category == 'other_allowance':
-                        result['other_allowances_total'] += value
-                        result['other_allowances_details'].append(f"{label_str}=¥{value:,.0f}")
-                    # NUEVAS categorías del ChinginGenerator (deducciones especiales)
-                    elif category == 'rent_deduction':
-                        result['rent_deduction'] += value
-                    elif category == 'utilities':
-                        result['utilities'] += value
-                    elif category == 'advance_payment':
-                        result['advance_payment'] += value
-                    elif category == 'meal_deduction':
-                        result['meal_deduction'] += value
-                    elif category == 'year_end_adjustment':
-                        result['year_end_adjustment'] += value
-                    break
+            # Check against known labels (first match in DYNAMIC_ZONE_LABELS order)
+            match = matcher.match(label_str)
+            category = match.dynamic_category
+            matched = category is not None
+
+            if category == 'overtime_over_60h_pay':
+                result['overtime_over_60h_pay'] += value
+            elif category == 'paid_leave_amount':
+                # Extract BOTH the amount (value) AND the days from this row
+                result['paid_leave_amount'] += value
+                # Get days from 'days' column (same row, different column)
+                days_value = self._get_numeric(ws, row, days_col)
+                if days_value > 0:
+                    result['paid_leave_days'] += days_value
+            elif category == 'non_billable':
+                result['non_billable_total'] += value
+                result['non_billable_details'].append(f"{label_str}=¥{value:,.0f}")
+            elif category == 'other_allowance':
+                result['other_allowances_total'] += value
+                result['other_allowances_details'].append(f"{label_str}=¥{value:,.0f}")
+            # NUEVAS categorías del ChinginGenerator (deducciones especiales)
+            elif category == 'rent_deduction':
+                result['rent_deduction'] += value
+            elif category == 'utilities':
+                result['utilities'] += value
+            elif category == 'advance_payment':
+                result['advance_payment'] += value
+            elif category == 'meal_deduction':
+                result['meal_deduction'] += value
+            elif category == 'year_end_adjustment':
+                result['year_end_adjustment'] += value
 
             # If not matched but looks like an allowance, add to other_allowances
-            if not matched and self._is_allowance(label_str) and value > 0:
+            if not matched and match.is_allowance and value > 0:
                 result['other_allowances_total'] += value
                 result['other_allowances_details'].append(f"{label_str}=¥{value:,.0f}")
 
@@ -674,6 +1080,7 @@ class SalaryStatementParser:
         Find column indices where employee blocks start.
         Employee IDs are 6-digit numbers.
         """
+        ws = as_sheet_view(ws)
         columns = []
 
         # Use current column offsets (from template or default)
@@ -684,7 +1091,7 @@ class SalaryStatementParser:
 
         # Scan for 6-digit numbers
         for col in range(1, ws.max_column + 1):
-            cell_value = ws.cell(row=emp_id_row, column=col).value
+            cell_value = ws.value(emp_id_row, col)
 
             if cell_value is None:
                 continue
@@ -703,224 +1110,221 @@ class SalaryStatementParser:
 
     def _extract_employee_data(self, ws, base_col: int, sheet_name: str) -> Optional[PayrollRecordCreate]:
         """Extract data for one employee using intelligent field detection or template"""
-        try:
-            # Use current column offsets (from template or default)
-            offsets = self.current_column_offsets or self.COLUMN_OFFSETS
-
-            # Get period
-            period_row = self.detected_fields.get('period') or self.FALLBACK_ROW_POSITIONS['period']
-            period_col = base_col + offsets.get('period', 8)
-            period_cell = ws.cell(row=period_row, column=period_col)
-
-            period = self._parse_period(period_cell.value)
-            if not period:
-                return None
-
-            # Get employee_id
-            emp_id_row = self.detected_fields.get('employee_id') or self.FALLBACK_ROW_POSITIONS.get('employee_id', 6)
-            emp_id_col = base_col + offsets.get('employee_id', 9)
-            emp_id_cell = ws.cell(row=emp_id_row, column=emp_id_col)
-            employee_id = str(emp_id_cell.value or '').strip()
-
-            if not employee_id or not employee_id.isdigit():
-                return None
-
-            # Filter out invalid employee IDs (0, 000000)
-            if int(employee_id) == 0:
-                return None
-
-            # Extract all standard fields
-            # work_days usa columna 'days' (offset 5), no 'value'
-            work_days_row = self.detected_fields.get('work_days') or self.FALLBACK_ROW_POSITIONS.get('work_days', 11)
-            work_days = self._get_numeric(ws, work_days_row, base_col + offsets.get('days', 5))
-
-            paid_leave_days = self._get_field_value(ws, 'paid_leave_days', base_col)
-            # Use _get_hours_with_minutes for hour fields to include minutes (73h 30m -> 73.5)
-            work_hours = self._get_hours_with_minutes(ws, 'work_hours', base_col)
-            overtime_hours = self._get_hours_with_minutes(ws, 'overtime_hours', base_col)
-            night_hours = self._get_hours_with_minutes(ws, 'night_hours', base_col)
-            holiday_hours = self._get_hours_with_minutes(ws, 'holiday_hours', base_col)
-
-            # NOTE: overtime_over_60h_pay is in DYNAMIC ZONE
-            # overtime_over_60h (hours) is CALCULATED from overtime_hours when > 60
-            overtime_over_60h_pay = 0  # Will be set from dynamic zone
-
-            # Calculate overtime_over_60h hours:
-            # If overtime_hours > 60, the excess goes to overtime_over_60h
-            # Example: 73h overtime → 60h normal overtime + 13h over-60h
-            # IMPORTANT: overtime_hours debe ser máximo 60, el resto va a overtime_over_60h
-            overtime_over_60h = max(0, overtime_hours - 60) if overtime_hours > 60 else 0
-            # Cap overtime_hours at 60 (excess already moved to overtime_over_60h)
-            overtime_hours = min(overtime_hours, 60)
-
-            base_salary = self._get_field_value(ws, 'base_salary', base_col)
-            overtime_pay = self._get_field_value(ws, 'overtime_pay', base_col)
-            night_pay = self._get_field_value(ws, 'night_pay', base_col)
-            holiday_pay = self._get_field_value(ws, 'holiday_pay', base_col)
-            transport_allowance = self._get_field_value(ws, 'transport_allowance', base_col)
-
-            # NOTE: paid_leave_amount is in DYNAMIC ZONE (有給休暇)
-            # It will be set from dynamic zone scanning below
-            paid_leave_amount = 0  # Will be set from dynamic zone
-
-            # Extract deductions
-            social_insurance = self._get_field_value(ws, 'social_insurance', base_col)
-            welfare_pension = self._get_field_value(ws, 'welfare_pension', base_col)
-            employment_insurance = self._get_field_value(ws, 'employment_insurance', base_col)
-            income_tax = self._get_field_value(ws, 'income_tax', base_col)
-            resident_tax = self._get_field_value(ws, 'resident_tax', base_col)
-
-            # Get totals from Excel
-            gross_salary_excel = self._get_field_value(ws, 'gross_salary', base_col)
-            net_salary = self._get_field_value(ws, 'net_salary', base_col)
+        return self._extract_block(as_sheet_view(ws), [base_col], sheet_name)[0]
 
-            # ================================================================
-            # DYNAMIC ZONE SCANNING (Rows 20-29)
-            # ================================================================
-            # Scan for employee-specific allowances in the dynamic zone
-            dynamic_data = self._scan_dynamic_zone_for_employee(ws, base_col)
+    def _field_row(self, field_name: str) -> Optional[int]:
+        """Row of a field: detected/template position first, then fallback"""
+        if field_name in self.detected_fields:
+            return self.detected_fields[field_name]
+        return self.FALLBACK_ROW_POSITIONS.get(field_name)
 
-            # Extract values from dynamic zone
-            if 'overtime_over_60h_pay' in dynamic_data:
-                overtime_over_60h_pay = dynamic_data['overtime_over_60h_pay']
-
-            if 'paid_leave_amount' in dynamic_data:
-                paid_leave_amount = dynamic_data['paid_leave_amount']
-
-            # NEW: Get paid_leave_days from dynamic zone if found
-            # (It's in the same row as 有給/有給休暇 but in the 'days' column)
-            if dynamic_data.get('paid_leave_days', 0) > 0:
-                paid_leave_days = dynamic_data['paid_leave_days']
-
-            other_allowances_total = dynamic_data.get('other_allowances_total', 0)
-            non_billable_total = dynamic_data.get('non_billable_total', 0)
-
-            # paid_leave_hours not available in this Excel format
-            paid_leave_hours = 0
-            
-            # Calculate gross_salary from components if Excel value is missing
-            gross_salary = gross_salary_excel or (
-                base_salary + overtime_pay + night_pay + holiday_pay + 
-                overtime_over_60h_pay + paid_leave_amount + other_allowances_total +
-                transport_allowance + non_billable_total
-            )
+    def _gather_numeric(self, ws, row: Optional[int], cols: List[int]) -> List[float]:
+        """
+        Numeric values of one row at many columns (one entry per employee).
 
-            data = {
-                'employee_id': employee_id,
-                'period': period,
-
-                # Time data
-                'work_days': int(work_days),
-                'work_hours': work_hours,
-                'overtime_hours': overtime_hours,
-                'night_hours': night_hours,
-                'holiday_hours': holiday_hours,
-                'overtime_over_60h': overtime_over_60h,
-                'paid_leave_days': paid_leave_days,
-                'paid_leave_hours': paid_leave_hours,
-                'paid_leave_amount': paid_leave_amount,
-
-                # Salary
-                'base_salary': base_salary,
-                'overtime_pay': overtime_pay,
-                'night_pay': night_pay,
-                'holiday_pay': holiday_pay,
-                'overtime_over_60h_pay': overtime_over_60h_pay,
-                'other_allowances': other_allowances_total,  # Only billable allowances
-                'non_billable_allowances': non_billable_total,  # 通勤手当（非）、業務手当等 - company cost only
-                'transport_allowance': transport_allowance,
-                'gross_salary': gross_salary,
-
-                # Deductions
-                'social_insurance': social_insurance,
-                'welfare_pension': welfare_pension,
-                'employment_insurance': employment_insurance,
-                'income_tax': income_tax,
-                'resident_tax': resident_tax,
-                'rent_deduction': dynamic_data.get('rent_deduction', 0),
-                'utilities_deduction': dynamic_data.get('utilities', 0),
-                'meal_deduction': dynamic_data.get('meal_deduction', 0),
-                'advance_payment': dynamic_data.get('advance_payment', 0),
-                'year_end_adjustment': dynamic_data.get('year_end_adjustment', 0),
-                'other_deductions': 0,
-                'net_salary': net_salary,
-
-                # Billing will be calculated by services.py
-                'billing_amount': 0,
-
-                # Extra: dispatch company from sheet name
-                'dispatch_company': sheet_name,
-            }
-
-            return PayrollRecordCreate(**data)
+        SheetGrid rows are plain tuples, so the whole row is indexed directly
+        instead of going through value() for every cell.
+        """
+        if row is None:
+            return [0.0] * len(cols)
 
-        except Exception as e:
-            print(f"  [ERROR] Error extracting data for employee at column {base_col}: {e}")
-            return None
+        if isinstance(ws, SheetGrid):
+            ws.cells_read += len(cols)
+            values = ws.rows[row - 1] if 1 <= row <= ws.max_row else ()
+            width = len(values)
+            return [_to_number(values[c - 1]) if 0 < c <= width else 0.0 for c in cols]
 
-    def _get_field_value(self, ws, field_name: str, base_col: int) -> float:
-        """Get value for a field, using detected position or fallback"""
-        # Try detected position first
-        if field_name in self.detected_fields:
-            row = self.detected_fields[field_name]
-        elif field_name in self.FALLBACK_ROW_POSITIONS:
-            row = self.FALLBACK_ROW_POSITIONS[field_name]
-        else:
-            return 0.0
+        return [_to_number(ws.value(row, c)) for c in cols]
 
+    def _gather_hours(self, ws, field_name: str, base_cols: List[int], offsets: Dict[str, int]) -> List[float]:
+        """Hour fields for all employees (value + minutes columns, see _hours_with_minutes)"""
+        row = self._field_row(field_name)
+        if row is None:
+            return [0.0] * len(base_cols)
+
+        hours = self._gather_numeric(ws, row, [b + offsets.get('value', 3) for b in base_cols])
+        minutes = self._gather_numeric(ws, row, [b + offsets.get('minutes', 9) for b in base_cols])
+        return [_safe_hours_with_minutes(h, m) for h, m in zip(hours, minutes)]
+
+    def _extract_block(self, ws, base_cols: List[int], sheet_name: str) -> List[Optional[PayrollRecordCreate]]:
+        """
+        Extract all employees of a sheet at once.
+
+        Every field is gathered as a column (one value per employee) with a
+        single pass over its row; the per-employee step only assembles the
+        record. Returns one entry per base column (None = no valid employee).
+        """
         # Use current column offsets (from template or default)
         offsets = self.current_column_offsets or self.COLUMN_OFFSETS
-        col = base_col + offsets.get('value', 3)
-        return self._get_numeric(ws, row, col)
+        value_off = offsets.get('value', 3)
+        value_cols = [b + value_off for b in base_cols]
 
-    def _get_hours_with_minutes(self, ws, field_name: str, base_col: int) -> float:
-        """Get hours value including minutes (HH:MM -> decimal hours)
+        # Get period and employee_id (raw values, validated per employee below)
+        period_row = self.detected_fields.get('period') or self.FALLBACK_ROW_POSITIONS['period']
+        emp_id_row = self.detected_fields.get('employee_id') or self.FALLBACK_ROW_POSITIONS.get('employee_id', 6)
+        periods = [ws.value(period_row, b + offsets.get('period', 8)) for b in base_cols]
+        employee_ids = [ws.value(emp_id_row, b + offsets.get('employee_id', 9)) for b in base_cols]
 
-        Handles THREE Excel formats:
-        1. Separate columns: Hours in 'value' (col 4), Minutes in 'minutes' (col 10)
-           Example: 73h in col 4, 30m in col 10 -> 73.5
-        2. Single decimal value: Already decimal in 'value' column
-           Example: 13.5 in col 4 -> 13.5
-        3. Total minutes only: Hours=0, Minutes=total minutes (プレテック format)
-           Example: 0h in col 4, 10080m in col 10 -> 168.0 (10080/60)
+        # work_days usa columna 'days' (offset 5), no 'value'
+        work_days_row = self.detected_fields.get('work_days') or self.FALLBACK_ROW_POSITIONS.get('work_days', 11)
+        columns = {
+            'work_days': self._gather_numeric(ws, work_days_row, [b + offsets.get('days', 5) for b in base_cols]),
+        }
+        for field_name in self.BLOCK_VALUE_FIELDS:
+            columns[field_name] = self._gather_numeric(ws, self._field_row(field_name), value_cols)
+        # Hour fields include minutes (73h 30m -> 73.5)
+        for field_name in self.BLOCK_HOUR_FIELDS:
+            columns[field_name] = self._gather_hours(ws, field_name, base_cols, offsets)
+
+        results = []
+        for i, base_col in enumerate(base_cols):
+            try:
+                period = self._parse_period(periods[i])
+                if not period:
+                    results.append(None)
+                    continue
 
-        Returns: hours as decimal (e.g., 73h 30m -> 73.5)
-        """
-        # Get the row for this field
-        if field_name in self.detected_fields:
-            row = self.detected_fields[field_name]
-        elif field_name in self.FALLBACK_ROW_POSITIONS:
-            row = self.FALLBACK_ROW_POSITIONS[field_name]
+                employee_id = str(employee_ids[i] or '').strip()
+                if not employee_id or not employee_id.isdigit():
+                    results.append(None)
+                    continue
+
+                # Filter out invalid employee IDs (0, 000000)
+                if int(employee_id) == 0:
+                    results.append(None)
+                    continue
+
+                values = {field_name: column[i] for field_name, column in columns.items()}
+                for value in values.values():
+                    if isinstance(value, Exception):
+                        raise value  # Same outcome as a per-employee read error
+                results.append(self._build_record(ws, base_col, employee_id, period, values, sheet_name))
+
+            except Exception as e:
+                print(f"  [ERROR] Error extracting data for employee at column {base_col}: {e}")
+                results.append(None)
+
+        return results
+
+    def _build_record(self, ws, base_col: int, employee_id: str, period: str,
+                      values: Dict[str, float], sheet_name: str) -> PayrollRecordCreate:
+        """Assemble one employee's record from gathered values + dynamic zone"""
+        work_days = values['work_days']
+        paid_leave_days = values['paid_leave_days']
+        work_hours = values['work_hours']
+        overtime_hours = values['overtime_hours']
+        night_hours = values['night_hours']
+        holiday_hours = values['holiday_hours']
+
+        # NOTE: overtime_over_60h_pay is in DYNAMIC ZONE
+        # overtime_over_60h (hours) is CALCULATED from overtime_hours when > 60
+        overtime_over_60h_pay = 0  # Will be set from dynamic zone
+
+        # Calculate overtime_over_60h hours:
+        # If overtime_hours > 60, the excess goes to overtime_over_60h
+        # Example: 73h overtime → 60h normal overtime + 13h over-60h
+        # IMPORTANT: overtime_hours debe ser máximo 60, el resto va a overtime_over_60h
+        overtime_over_60h = max(0, overtime_hours - 60) if overtime_hours > 60 else 0
+        # Cap overtime_hours at 60 (excess already moved to overtime_over_60h)
+        overtime_hours = min(overtime_hours, 60)
+
+        base_salary = values['base_salary']
+        overtime_pay = values['overtime_pay']
+        night_pay = values['night_pay']
+        holiday_pay = values['holiday_pay']
+        transport_allowance = values['transport_allowance']
+
+        # NOTE: paid_leave_amount is in DYNAMIC ZONE (有給休暇)
+        # It will be set from dynamic zone scanning below
+        paid_leave_amount = 0  # Will be set from dynamic zone
+
+        # Get totals from Excel
+        gross_salary_excel = values['gross_salary']
+        net_salary = values['net_salary']
+
+        # ================================================================
+        # DYNAMIC ZONE SCANNING (Rows 20-29)
+        # ================================================================
+        # Scan for employee-specific allowances in the dynamic zone
+        if self.current_metrics is not None:
+            with self.current_metrics.stage('dynamic_zone'):
+                dynamic_data = self._scan_dynamic_zone_for_employee(ws, base_col)
         else:
-            return 0.0
+            dynamic_data = self._scan_dynamic_zone_for_employee(ws, base_col)
 
-        offsets = self.current_column_offsets or self.COLUMN_OFFSETS
+        # Extract values from dynamic zone
+        if 'overtime_over_60h_pay' in dynamic_data:
+            overtime_over_60h_pay = dynamic_data['overtime_over_60h_pay']
 
-        # Get hours from 'value' column
-        hours_col = base_col + offsets.get('value', 3)
-        hours = self._get_numeric(ws, row, hours_col)
+        if 'paid_leave_amount' in dynamic_data:
+            paid_leave_amount = dynamic_data['paid_leave_amount']
 
-        # Check if hours already has decimal (e.g., 13.5)
-        # If yes, it's already in decimal format - don't add minutes
-        if hours != int(hours):
-            # Already decimal (e.g., 13.5), return as-is
-            return hours
+        # NEW: Get paid_leave_days from dynamic zone if found
+        # (It's in the same row as 有給/有給休暇 but in the 'days' column)
+        if dynamic_data.get('paid_leave_days', 0) > 0:
+            paid_leave_days = dynamic_data['paid_leave_days']
 
-        # Hours is whole number, check for separate minutes column
-        minutes_col = base_col + offsets.get('minutes', 9)
-        minutes = self._get_numeric(ws, row, minutes_col)
+        other_allowances_total = dynamic_data.get('other_allowances_total', 0)
+        non_billable_total = dynamic_data.get('non_billable_total', 0)
 
-        # Format 3: Total minutes only (プレテック style)
-        # If hours is 0 and minutes is large (>=60), treat minutes as TOTAL minutes
-        if hours == 0 and minutes >= 60:
-            return minutes / 60.0
+        # paid_leave_hours not available in this Excel format
+        paid_leave_hours = 0
 
-        # Format 1: Normal HH:MM format (minutes is 0-59)
-        if 0 <= minutes < 60:
-            return hours + (minutes / 60.0)
+        # Calculate gross_salary from components if Excel value is missing
+        gross_salary = gross_salary_excel or (
+            base_salary + overtime_pay + night_pay + holiday_pay +
+            overtime_over_60h_pay + paid_leave_amount + other_allowances_total +
+            transport_allowance + non_billable_total
+        )
 
-        # Minutes value is invalid (negative), ignore it
-        return hours
+        data = {
+            'employee_id': employee_id,
+            'period': period,
+
+            # Time data
+            'work_days': int(work_days),
+            'work_hours': work_hours,
+            'overtime_hours': overtime_hours,
+            'night_hours': night_hours,
+            'holiday_hours': holiday_hours,
+            'overtime_over_60h': overtime_over_60h,
+            'paid_leave_days': paid_leave_days,
+            'paid_leave_hours': paid_leave_hours,
+            'paid_leave_amount': paid_leave_amount,
+
+            # Salary
+            'base_salary': base_salary,
+            'overtime_pay': overtime_pay,
+            'night_pay': night_pay,
+            'holiday_pay': holiday_pay,
+            'overtime_over_60h_pay': overtime_over_60h_pay,
+            'other_allowances': other_allowances_total,  # Only billable allowances
+            'non_billable_allowances': non_billable_total,  # 通勤手当（非）、業務手当等 - company cost only
+            'transport_allowance': transport_allowance,
+            'gross_salary': gross_salary,
+
+            # Deductions
+            'social_insurance': values['social_insurance'],
+            'welfare_pension': values['welfare_pension'],
+            'employment_insurance': values['employment_insurance'],
+            'income_tax': values['income_tax'],
+            'resident_tax': values['resident_tax'],
+            'rent_deduction': dynamic_data.get('rent_deduction', 0),
+            'utilities_deduction': dynamic_data.get('utilities', 0),
+            'meal_deduction': dynamic_data.get('meal_deduction', 0),
+            'advance_payment': dynamic_data.get('advance_payment', 0),
+            'year_end_adjustment': dynamic_data.get('year_end_adjustment', 0),
+            'other_deductions': 0,
+            'net_salary': net_salary,
+
+            # Billing will be calculated by services.py
+            'billing_amount': 0,
+
+            # Extra: dispatch company from sheet name
+            'dispatch_company': sheet_name,
+        }
+
+        return PayrollRecordCreate(**data)
 
     def _parse_period(self, value) -> str:
         """Convert period string to standard format (YYYY年M月)"""
@@ -944,25 +1348,8 @@ class SalaryStatementParser:
     def _get_numeric(self, ws, row: int, col: int) -> float:
         """Safely extract numeric value from a cell"""
         try:
-            cell = ws.cell(row=row, column=col)
-            value = cell.value
-
-            if value is None or value == '':
-                return 0.0
-
-            if isinstance(value, (int, float)):
-                return float(value)
-
-            value_str = str(value).strip()
-            if not value_str:
-                return 0.0
-
-            # Remove formatting
-            value_str = value_str.replace(',', '').replace('¥', '').replace(' ', '')
-
-            return float(value_str)
-
-        except (ValueError, TypeError, AttributeError):
+            return _to_number(ws.value(row, col))
+        except AttributeError:
             return 0.0
 
 
@@ -1006,7 +1393,7 @@ class SalaryStatementParserLegacy:
         'value': 0,    # FIXED: Values are in same column as employee_id
     }
 
-    def parse(self, content: bytes) -> List[PayrollRecordCreate]:
+    def parse(self, content: WorkbookSource) -> List[PayrollRecordCreate]:
         """Use the new intelligent parser but with fallback mode"""
         parser = SalaryStatementParser(use_intelligent_mode=False)
         parser.FALLBACK_ROW_POSITIONS = self.ROW_POSITIONS
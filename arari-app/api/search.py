@@ -8,6 +8,8 @@ from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
 import re
 
+from periods import period_key_sql
+
 
 @dataclass
 class SearchFilter:
@@ -221,7 +223,7 @@ class SearchService:
 
         # Sorting
         sort_fields = {
-            "period": "p.period",
+            "period": period_key_sql('p'),
             "employee": "e.name",
             "company": "e.dispatch_company",
             "margin": "p.profit_margin",
@@ -233,7 +235,7 @@ class SearchService:
             order = "DESC" if sort_order.lower() == "desc" else "ASC"
             sql += f" ORDER BY {sort_fields[sort_by]} {order}"
         else:
-            sql += " ORDER BY p.period DESC, p.employee_id"
+            sql += f" ORDER BY {period_key_sql('p')} DESC, p.employee_id"
 
         # Pagination - Use parameterized queries to prevent SQL injection
         # Validate bounds to prevent DoS via huge LIMIT values
@@ -411,7 +413,11 @@ class SearchService:
         companies = [r[0] for r in self.cursor.fetchall()]
 
         # Periods
-        self.cursor.execute("SELECT DISTINCT period FROM payroll_records ORDER BY period DESC")
+        key = period_key_sql()
+        self.cursor.execute(
+            f"SELECT period FROM payroll_records WHERE {key} IS NOT NULL "
+            f"GROUP BY {key} ORDER BY {key} DESC"
+        )
         periods = [r[0] for r in self.cursor.fetchall()]
 
         # Statuses
@@ -3,13 +3,75 @@ Business logic services for 粗利 PRO
 """
 
 import sqlite3
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterable, Tuple
 from models import (
     Employee, EmployeeCreate,
     PayrollRecord, PayrollRecordCreate
 )
 import io
 import csv
+import hashlib
+import json
+from db_writer import WriteQueue
+from employee_parser import EMPLOYEE_BATCH_SIZE, batched
+from periods import month_key, period_key, period_key_sql
+from progress_events import publish_event
+from sheet_grid import WorkbookSource, workbook_input
+
+# Columns written by employee imports (employee_id is the upsert key)
+EMPLOYEE_COLUMNS = (
+    'employee_id', 'name', 'name_kana', 'dispatch_company', 'department',
+    'hourly_rate', 'billing_rate', 'status', 'hire_date',
+    'employee_type', 'gender', 'birth_date', 'termination_date',
+)
+
+_EMPLOYEE_CONTENT_COLUMNS = EMPLOYEE_COLUMNS[1:]
+
+# Upsert of EMPLOYEE_COLUMNS + content_hash; rows whose values did not change are left untouched
+_EMPLOYEE_UPSERT_SQL = f"""
+    INSERT INTO employees ({', '.join(EMPLOYEE_COLUMNS)}, content_hash)
+    VALUES ({', '.join('?' for _ in EMPLOYEE_COLUMNS)}, ?)
+    ON CONFLICT(employee_id) DO UPDATE SET
+        {', '.join(f'{col} = excluded.{col}' for col in _EMPLOYEE_CONTENT_COLUMNS)},
+        content_hash = excluded.content_hash,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE {' OR '.join(f'{col} IS NOT excluded.{col}' for col in _EMPLOYEE_CONTENT_COLUMNS)}
+"""
+
+# One payroll record per (employee_id, period); re-imports replace the row
+PAYROLL_INSERT_SQL = """
+    INSERT OR REPLACE INTO payroll_records (
+        employee_id, period, period_key, work_days, work_hours, overtime_hours,
+        night_hours, holiday_hours, overtime_over_60h,
+        paid_leave_hours, paid_leave_days, paid_leave_amount,
+        base_salary, overtime_pay, night_pay, holiday_pay, overtime_over_60h_pay,
+        transport_allowance, other_allowances, non_billable_allowances, gross_salary,
+        social_insurance, welfare_pension, employment_insurance, income_tax, resident_tax,
+        rent_deduction, utilities_deduction, meal_deduction, advance_payment, year_end_adjustment,
+        other_deductions, net_salary, billing_amount, company_social_insurance,
+        company_employment_insurance, company_workers_comp, total_company_cost, gross_profit, profit_margin
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _normalize_employee_value(value: Any) -> Any:
+    """Compare rates as floats (SQLite returns REAL for 1500) and everything else as text"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    return str(value)
+
+
+def employee_content_hash(values: Dict[str, Any]) -> str:
+    """
+    SHA-1 of an employee's imported columns (name, company, rates, status, dates...).
+
+    values: dict with the EMPLOYEE_COLUMNS keys (a stored row or an incoming record)
+    """
+    normalized = [_normalize_employee_value(values.get(col)) for col in EMPLOYEE_COLUMNS]
+    return hashlib.sha1(json.dumps(normalized, ensure_ascii=False).encode('utf-8')).hexdigest()
+
 
 class PayrollService:
     """Service class for payroll and employee operations"""
@@ -167,6 +229,173 @@ class PayrollService:
         self.db.commit()
         return self.get_employee(employee_id) if cursor.rowcount > 0 else None
 
+    def bulk_upsert_employees(self, employees: Iterable[EmployeeCreate],
+                              batch_size: int = EMPLOYEE_BATCH_SIZE) -> Dict[str, int]:
+        """
+        Insert or update many employees in one transaction.
+
+        Uses INSERT ... ON CONFLICT(employee_id) DO UPDATE with executemany
+        (in batches, so a streamed iterable is never fully materialized).
+        Rows whose values did not change are left untouched, so their
+        updated_at is not bumped. If the same employee_id appears more than
+        once, the last occurrence of each batch wins.
+
+        Returns:
+            Dict with added, updated and unchanged counts
+        """
+        added = updated = unchanged = 0
+        cursor = self.db.cursor()
+        try:
+            for batch in batched(employees, batch_size):
+                rows = {}
+                for emp in batch:
+                    values = {col: getattr(emp, col) for col in EMPLOYEE_COLUMNS}
+                    rows[emp.employee_id] = (*values.values(), employee_content_hash(values))
+                placeholders = ', '.join('?' for _ in rows)
+                cursor.execute(
+                    f"SELECT COUNT(*) FROM employees WHERE employee_id IN ({placeholders})",
+                    list(rows)
+                )
+                existing = cursor.fetchone()[0]
+
+                changes_before = self.db.total_changes
+                cursor.executemany(_EMPLOYEE_UPSERT_SQL, list(rows.values()))
+                written = self.db.total_changes - changes_before
+
+                batch_added = len(rows) - existing
+                added += batch_added
+                updated += written - batch_added
+                unchanged += existing - (written - batch_added)
+
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+        return {'added': added, 'updated': updated, 'unchanged': unchanged}
+
+    def sync_employees(self, employees: Iterable[EmployeeCreate],
+                       batch_size: int = EMPLOYEE_BATCH_SIZE,
+                       writer: Optional[WriteQueue] = None) -> Dict[str, Any]:
+        """
+        Change-detecting employee import (社員台帳).
+
+        Stored content hashes are loaded once; every incoming employee is
+        hashed and compared in memory, and only new or changed employees are
+        written (bulk_upsert_employees, one transaction). Unchanged employees
+        are not touched, so updated_at keeps meaning "last real change".
+
+        Rows without a stored hash (created or edited outside an import) are
+        hashed from their stored values.
+
+        With a writer (db_writer.py), the incoming employees are still read and
+        compared in this thread, and each batch of changes is one write task,
+        so a large file never holds the writer for the whole import. A failing
+        batch then leaves the earlier batches committed (the next import
+        finds them unchanged).
+
+        Returns:
+            Dict with added/updated/unchanged/terminated counts and a diff:
+            {'added': [ids], 'changed': {id: {field: [old, new]}}, 'terminated': [ids]}
+        """
+        diff = self._new_employee_diff()
+        changes = self._changed_employees(employees, diff)
+        if writer is None:
+            self.bulk_upsert_employees(changes, batch_size)
+        else:
+            for batch in batched(changes, batch_size):
+                writer.run(lambda conn, batch=batch: PayrollService(conn).bulk_upsert_employees(batch, batch_size))
+        return self._employee_sync_result(diff)
+
+    def _new_employee_diff(self) -> Dict[str, Any]:
+        """Stored employees (with content hashes) and empty diff lists"""
+        cursor = self.db.cursor()
+        cursor.execute(f"SELECT {', '.join(EMPLOYEE_COLUMNS)}, content_hash FROM employees")
+        return {
+            'stored': {row['employee_id']: dict(row) for row in cursor.fetchall()},
+            'added': [],
+            'changed': {},
+            'terminated': [],
+            'unchanged': 0,
+        }
+
+    def _changed_employees(self, employees: Iterable[EmployeeCreate],
+                           diff: Dict[str, Any]) -> Iterable[EmployeeCreate]:
+        """
+        Yield new or changed employees, recording them in diff.
+
+        An employee_id repeated in the import is counted once: the last
+        occurrence wins (as in bulk_upsert_employees), its outcome is
+        recomputed against the stored row, and it is yielded again only if
+        it differs from the occurrence written before it.
+        """
+        stored = diff['stored']
+        seen: Dict[str, Tuple[str, str]] = {}  # employee_id -> (outcome, content hash)
+        for emp in employees:
+            values = {col: getattr(emp, col) for col in EMPLOYEE_COLUMNS}
+            content_hash = employee_content_hash(values)
+            old = stored.get(emp.employee_id)
+            old_hash = (old['content_hash'] or employee_content_hash(old)) if old else None
+
+            previous = seen.get(emp.employee_id)
+            if previous is not None:
+                if previous[1] == content_hash:
+                    continue  # Same row again
+                self._forget_employee_outcome(diff, emp.employee_id, previous[0])
+
+            if old is None:
+                outcome = 'added'
+                diff['added'].append(emp.employee_id)
+            elif old_hash == content_hash:
+                outcome = 'unchanged'
+                diff['unchanged'] += 1
+            else:
+                outcome = 'changed'
+                diff['changed'][emp.employee_id] = {
+                    col: [old[col], values[col]]
+                    for col in _EMPLOYEE_CONTENT_COLUMNS
+                    if _normalize_employee_value(old[col]) != _normalize_employee_value(values[col])
+                }
+                if self._is_termination(old, values):
+                    diff['terminated'].append(emp.employee_id)
+            seen[emp.employee_id] = (outcome, content_hash)
+
+            # Written unless the row already holds these values
+            if content_hash != (previous[1] if previous is not None else old_hash):
+                yield emp
+
+    @staticmethod
+    def _forget_employee_outcome(diff: Dict[str, Any], employee_id: str, outcome: str) -> None:
+        """Undo the diff entry of an earlier occurrence of employee_id"""
+        if outcome == 'added':
+            diff['added'].remove(employee_id)
+        elif outcome == 'changed':
+            del diff['changed'][employee_id]
+            if employee_id in diff['terminated']:
+                diff['terminated'].remove(employee_id)
+        else:
+            diff['unchanged'] -= 1
+
+    @staticmethod
+    def _employee_sync_result(diff: Dict[str, Any]) -> Dict[str, Any]:
+        added, changed, terminated = diff['added'], diff['changed'], diff['terminated']
+        publish_event('records_persisted', saved=len(added) + len(changed), skipped=diff['unchanged'], errors=0)
+
+        return {
+            'added': len(added),
+            'updated': len(changed),
+            'unchanged': diff['unchanged'],
+            'terminated': len(terminated),
+            'diff': {'added': added, 'changed': changed, 'terminated': terminated},
+        }
+
+    @staticmethod
+    def _is_termination(old: Dict[str, Any], new: Dict[str, Any]) -> bool:
+        """Employee became inactive or got a 退社日 in this import"""
+        if old.get('status') == 'active' and new.get('status') != 'active':
+            return True
+        return not old.get('termination_date') and bool(new.get('termination_date'))
+
     def delete_employee(self, employee_id: str) -> bool:
         """Delete an employee"""
         cursor = self.db.cursor()
@@ -189,23 +418,27 @@ class PayrollService:
         params = []
 
         if period:
-            query += " AND p.period = ?"
-            params.append(period)
+            query += f" AND {period_key_sql('p')} = ?"
+            params.append(period_key(period))
 
         if employee_id:
             query += " AND p.employee_id = ?"
             params.append(employee_id)
 
-        query += " ORDER BY p.period DESC, p.employee_id"
+        query += f" ORDER BY {period_key_sql('p')} DESC, p.employee_id"
 
         cursor.execute(query, params)
         return [dict(row) for row in cursor.fetchall()]
 
     def get_available_periods(self) -> List[str]:
-        """Get list of available periods"""
+        """Get list of available periods, latest first"""
         cursor = self.db.cursor()
-        cursor.execute("""
-            SELECT DISTINCT period FROM payroll_records ORDER BY period DESC
+        key = period_key_sql()
+        cursor.execute(f"""
+            SELECT period FROM payroll_records
+            WHERE {key} IS NOT NULL
+            GROUP BY {key}
+            ORDER BY {key} DESC
         """)
         return [row['period'] for row in cursor.fetchall()]
 
@@ -289,7 +522,50 @@ class PayrollService:
         if not employee:
             raise ValueError(f"Employee {record.employee_id} not found")
 
-        hourly_rate = employee['hourly_rate']
+        cursor = self.db.cursor()
+
+        # Use INSERT OR REPLACE to handle updates for same employee+period
+        cursor.execute(
+            PAYROLL_INSERT_SQL,
+            self._payroll_row_values(record, employee, self.get_insurance_rates())
+        )
+
+        # NOTE: Commit is handled by the calling endpoint to allow transactions
+        # self.db.commit()  # Removed - caller must commit
+
+        # Return the created record as a dictionary
+        cursor.execute("""
+            SELECT p.*, e.name as employee_name, e.dispatch_company
+            FROM payroll_records p
+            LEFT JOIN employees e ON p.employee_id = e.employee_id
+            WHERE p.employee_id = ? AND p.period = ?
+        """, (record.employee_id, record.period))
+
+        row = cursor.fetchone()
+
+        # Helper function to convert Row to dict safely
+        if row:
+            result = dict(row)
+            # Ensure we return floats for numeric values to match test expectations
+            numeric_fields = [
+                'company_social_insurance', 'company_employment_insurance',
+                'total_company_cost', 'billing_amount'
+            ]
+            for field in numeric_fields:
+                if field in result and result[field] is not None:
+                    result[field] = float(result[field])
+            return result
+
+        return {}
+
+    def _payroll_row_values(self, record: PayrollRecordCreate, employee: Dict,
+                            rates: Dict[str, float]) -> tuple:
+        """
+        Derived fields (billing, company costs, profit) of one record.
+
+        Returns:
+            Values for PAYROLL_INSERT_SQL
+        """
         billing_rate = employee['billing_rate']
 
         # Get new hour fields with defaults
@@ -308,8 +584,7 @@ class PayrollService:
             billing_amount = self.calculate_billing_amount(record, employee)
 
         # Calculate company costs
-        # Get insurance rates from settings (dynamic)
-        rates = self.get_insurance_rates()
+        # Insurance rates come from settings (dynamic), loaded once by the caller
 
         # 社会保険（会社負担）= 本人負担と同額 (労使折半)
         # NOTE: 社会保険 = 健康保険 + 厚生年金 (both employer and employee pay equal amounts)
@@ -357,26 +632,11 @@ class PayrollService:
             round((gross_profit / billing_amount * 100), 1) if billing_amount > 0 else 0
         )
 
-        cursor = self.db.cursor()
-
         # Get non_billable_allowances from record
         non_billable_allowances = getattr(record, 'non_billable_allowances', 0) or 0
 
-        # Use INSERT OR REPLACE to handle updates for same employee+period
-        cursor.execute("""
-            INSERT OR REPLACE INTO payroll_records (
-                employee_id, period, work_days, work_hours, overtime_hours,
-                night_hours, holiday_hours, overtime_over_60h,
-                paid_leave_hours, paid_leave_days, paid_leave_amount,
-                base_salary, overtime_pay, night_pay, holiday_pay, overtime_over_60h_pay,
-                transport_allowance, other_allowances, non_billable_allowances, gross_salary,
-                social_insurance, welfare_pension, employment_insurance, income_tax, resident_tax,
-                rent_deduction, utilities_deduction, meal_deduction, advance_payment, year_end_adjustment,
-                other_deductions, net_salary, billing_amount, company_social_insurance,
-                company_employment_insurance, company_workers_comp, total_company_cost, gross_profit, profit_margin
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            record.employee_id, record.period, record.work_days, record.work_hours,
+        return (
+            record.employee_id, record.period, period_key(record.period), record.work_days, record.work_hours,
             record.overtime_hours, night_hours, holiday_hours, overtime_over_60h,
             record.paid_leave_hours, record.paid_leave_days, paid_leave_amount,
             record.base_salary, record.overtime_pay, night_pay, holiday_pay, overtime_over_60h_pay,
@@ -386,50 +646,95 @@ class PayrollService:
             record.other_deductions, record.net_salary, billing_amount,
             company_social_insurance, company_employment_insurance, company_workers_comp,
             total_company_cost, gross_profit, profit_margin
-        ))
+        )
 
-        # NOTE: Commit is handled by the calling endpoint to allow transactions
-        # self.db.commit()  # Removed - caller must commit
+    def bulk_create_payroll_records(self, records: Iterable[PayrollRecordCreate],
+                                    employee_map: Optional[Dict[str, Dict]] = None,
+                                    rates: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        """
+        Batch version of create_payroll_record for imports.
 
-        # Return the created record as a dictionary
-        cursor.execute("""
-            SELECT p.*, e.name as employee_name, e.dispatch_company
-            FROM payroll_records p
-            LEFT JOIN employees e ON p.employee_id = e.employee_id
-            WHERE p.employee_id = ? AND p.period = ?
-        """, (record.employee_id, record.period))
+        Derived fields are computed in one pass with a preloaded employee map
+        and insurance rates, and all rows are written with a single
+        executemany (INSERT OR REPLACE). Nothing is re-selected.
 
-        row = cursor.fetchone()
+        Like create_payroll_record, commit is left to the caller, so the
+        whole import stays one transaction.
 
-        # Helper function to convert Row to dict safely
-        if row:
-            result = dict(row)
-            # Ensure we return floats for numeric values to match test expectations
-            numeric_fields = [
-                'company_social_insurance', 'company_employment_insurance',
-                'total_company_cost', 'billing_amount'
-            ]
-            for field in numeric_fields:
-                if field in result and result[field] is not None:
-                    result[field] = float(result[field])
-            return result
+        Args:
+            records: Parsed payroll records
+            employee_map: {employee_id: employee dict}; loaded if not given
+            rates: get_insurance_rates(); loaded if not given
 
-        return {}
+        Returns:
+            Dict with the saved count and per-row skipped/errors lists
+            ({'index', 'employee_id', 'period', 'reason' / 'error'})
+        """
+        if employee_map is None:
+            employee_map = {emp['employee_id']: emp for emp in self.get_employees()}
+        if rates is None:
+            rates = self.get_insurance_rates()
+
+        rows = []
+        skipped = []
+        errors = []
+        for index, record in enumerate(records):
+            employee = employee_map.get(record.employee_id)
+            if not employee:
+                skipped.append({
+                    'index': index,
+                    'employee_id': record.employee_id,
+                    'period': record.period,
+                    'reason': 'Employee not found in database'
+                })
+                continue
+            try:
+                rows.append(self._payroll_row_values(record, employee, rates))
+            except Exception as e:
+                errors.append({
+                    'index': index,
+                    'employee_id': record.employee_id,
+                    'period': record.period,
+                    'error': str(e)
+                })
+
+        if rows:
+            self.db.cursor().executemany(PAYROLL_INSERT_SQL, rows)
+
+        for row in skipped:
+            publish_event('warning', message=row['reason'], employee_id=row['employee_id'], period=row['period'])
+        for row in errors:
+            publish_event('warning', message=row['error'], employee_id=row['employee_id'], period=row['period'])
+        publish_event('records_persisted', saved=len(rows), skipped=len(skipped), errors=len(errors))
+
+        return {'saved': len(rows), 'skipped': skipped, 'errors': errors}
 
     # ============== Statistics ==============
 
+    def get_latest_period(self) -> Optional[str]:
+        """Latest period with payroll records (index seek on period_key)"""
+        cursor = self.db.cursor()
+        key = period_key_sql()
+        cursor.execute(f"""
+            SELECT period FROM payroll_records
+            WHERE {key} IS NOT NULL
+            ORDER BY {key} DESC
+            LIMIT 1
+        """)
+        row = cursor.fetchone()
+        return row[0] if row else None
+
     def get_statistics(self, period: Optional[str] = None) -> Dict:
         """Get dashboard statistics"""
         cursor = self.db.cursor()
 
         # Get latest period if not specified
         if not period:
-            cursor.execute("SELECT MAX(period) FROM payroll_records")
-            result = cursor.fetchone()
-            period = result[0] if result else None
+            period = self.get_latest_period()
 
         if not period:
             return self._empty_statistics()
+        key = period_key(period)
 
         # Basic counts
         cursor.execute("SELECT COUNT(*) FROM employees")
@@ -442,7 +747,7 @@ class PayrollService:
         total_companies = cursor.fetchone()[0]
 
         # Period statistics
-        cursor.execute("""
+        cursor.execute(f"""
             SELECT
                 AVG(gross_profit) as average_profit,
                 AVG(profit_margin) as average_margin,
@@ -450,32 +755,18 @@ class PayrollService:
                 SUM(total_company_cost) as total_cost,
                 SUM(gross_profit) as total_profit
             FROM payroll_records
-            WHERE period = ?
-        """, (period,))
+            WHERE {period_key_sql()} = ?
+        """, (key,))
         stats = cursor.fetchone()
 
-        # Profit trend (last 6 periods) - Sort properly handling Japanese period format
-        cursor.execute("""
-            SELECT
-                period,
-                SUM(billing_amount) as revenue,
-                SUM(total_company_cost) as cost,
-                SUM(gross_profit) as profit,
-                AVG(profit_margin) as margin
-            FROM payroll_records
-            GROUP BY period
-            ORDER BY 
-                CAST(SUBSTR(period, 1, 4) AS INTEGER) DESC,
-                CAST(REPLACE(REPLACE(SUBSTR(period, 6), '月', ''), '年', '') AS INTEGER) DESC
-            LIMIT 6
-        """)
-        profit_trend = [dict(row) for row in cursor.fetchall()][::-1]  # Reverse for chronological order
+        # Profit trend (last 6 periods)
+        profit_trend = self.get_profit_trend(6)
 
         # Profit distribution
-        profit_distribution = self._calculate_profit_distribution(period)
+        profit_distribution = self._calculate_profit_distribution(key)
 
         # Top companies
-        cursor.execute("""
+        cursor.execute(f"""
             SELECT
                 e.dispatch_company as company_name,
                 COUNT(DISTINCT e.employee_id) as employee_count,
@@ -485,22 +776,22 @@ class PayrollService:
                 AVG((e.billing_rate - e.hourly_rate) / e.billing_rate * 100) as average_margin,
                 SUM(p.gross_profit) as total_monthly_profit
             FROM employees e
-            LEFT JOIN payroll_records p ON e.employee_id = p.employee_id AND p.period = ?
+            LEFT JOIN payroll_records p ON e.employee_id = p.employee_id AND {period_key_sql('p')} = ?
             GROUP BY e.dispatch_company
             ORDER BY total_monthly_profit DESC
             LIMIT 5
-        """, (period,))
+        """, (key,))
         top_companies = [dict(row) for row in cursor.fetchall()]
 
         # Recent payrolls
-        cursor.execute("""
+        cursor.execute(f"""
             SELECT p.*, e.name as employee_name, e.dispatch_company
             FROM payroll_records p
             LEFT JOIN employees e ON p.employee_id = e.employee_id
-            WHERE p.period = ?
+            WHERE {period_key_sql('p')} = ?
             ORDER BY p.gross_profit DESC
             LIMIT 10
-        """, (period,))
+        """, (key,))
         recent_payrolls = [dict(row) for row in cursor.fetchall()]
 
         return {
@@ -519,8 +810,8 @@ class PayrollService:
             "current_period": period
         }
 
-    def _calculate_profit_distribution(self, period: str) -> List[Dict]:
-        """Calculate profit distribution for a period
+    def _calculate_profit_distribution(self, key: Optional[int]) -> List[Dict]:
+        """Calculate profit distribution for a period (period_key)
 
         Ranges are based on 製造派遣 target margin of 15%:
         - <10%: Critical (赤字リスク)
@@ -537,15 +828,16 @@ class PayrollService:
             (">18%", 18, 999999999),     # Excellent - very profitable
         ]
 
-        cursor.execute("SELECT COUNT(*) FROM payroll_records WHERE period = ?", (period,))
+        key_sql = period_key_sql()
+        cursor.execute(f"SELECT COUNT(*) FROM payroll_records WHERE {key_sql} = ?", (key,))
         total = cursor.fetchone()[0]
 
         distribution = []
         for range_name, min_val, max_val in ranges:
-            cursor.execute("""
+            cursor.execute(f"""
                 SELECT COUNT(*) FROM payroll_records
-                WHERE period = ? AND profit_margin >= ? AND profit_margin < ?
-            """, (period, min_val, max_val))
+                WHERE {key_sql} = ? AND profit_margin >= ? AND profit_margin < ?
+            """, (key, min_val, max_val))
             count = cursor.fetchone()[0]
             percentage = (count / total * 100) if total > 0 else 0
             distribution.append({
@@ -591,13 +883,14 @@ class PayrollService:
             FROM payroll_records
         """
 
+        key_sql = period_key_sql()
+        query += f" WHERE {key_sql} IS NOT NULL"
         params = []
         if year and month:
-            period = f"{year}年{month}月"
-            query += " WHERE period = ?"
-            params.append(period)
+            query += f" AND {key_sql} = ?"
+            params.append(month_key(year, month))
 
-        query += " GROUP BY period ORDER BY period DESC"
+        query += f" GROUP BY {key_sql} ORDER BY {key_sql} DESC"
 
         cursor.execute(query, params)
         return [dict(row) for row in cursor.fetchall()]
@@ -607,10 +900,9 @@ class PayrollService:
         cursor = self.db.cursor()
 
         # Get latest period
-        cursor.execute("SELECT MAX(period) FROM payroll_records")
-        period = cursor.fetchone()[0]
+        key = period_key(self.get_latest_period())
 
-        cursor.execute("""
+        cursor.execute(f"""
             SELECT
                 e.dispatch_company as company_name,
                 COUNT(DISTINCT e.employee_id) as employee_count,
@@ -621,17 +913,18 @@ class PayrollService:
                 COALESCE(SUM(p.gross_profit), 0) as total_monthly_profit,
                 COALESCE(SUM(p.billing_amount), 0) as total_monthly_revenue
             FROM employees e
-            LEFT JOIN payroll_records p ON e.employee_id = p.employee_id AND p.period = ?
+            LEFT JOIN payroll_records p ON e.employee_id = p.employee_id AND {period_key_sql('p')} = ?
             GROUP BY e.dispatch_company
             ORDER BY total_monthly_profit DESC
-        """, (period,))
+        """, (key,))
 
         return [dict(row) for row in cursor.fetchall()]
 
     def get_profit_trend(self, months: int = 6) -> List[Dict]:
         """Get profit trend for last N months"""
         cursor = self.db.cursor()
-        cursor.execute("""
+        key = period_key_sql()
+        cursor.execute(f"""
             SELECT
                 period,
                 SUM(billing_amount) as revenue,
@@ -639,11 +932,12 @@ class PayrollService:
                 SUM(gross_profit) as profit,
                 AVG(profit_margin) as margin
             FROM payroll_records
-            GROUP BY period
-            ORDER BY period DESC
+            WHERE {key} IS NOT NULL
+            GROUP BY {key}
+            ORDER BY {key} DESC
             LIMIT ?
         """, (months,))
-        return [dict(row) for row in cursor.fetchall()][::-1]
+        return [dict(row) for row in cursor.fetchall()][::-1]  # Reverse for chronological order
 
 
 class ExcelParser:
@@ -698,9 +992,12 @@ class ExcelParser:
         '売上': 'billing_amount',
     }
 
-    def parse(self, content: bytes, file_ext: str) -> List[PayrollRecordCreate]:
-        """Parse file content and return list of PayrollRecordCreate objects"""
+    def parse(self, content: WorkbookSource, file_ext: str) -> List[PayrollRecordCreate]:
+        """Parse file content (bytes or file path) and return list of PayrollRecordCreate objects"""
         if file_ext == '.csv':
+            if not isinstance(content, (bytes, bytearray)):
+                with open(content, 'rb') as f:
+                    content = f.read()
             return self._parse_csv(content)
         elif file_ext in ['.xlsx', '.xlsm', '.xls']:
             return self._parse_excel(content)
@@ -730,13 +1027,12 @@ class ExcelParser:
 
         return records
 
-    def _parse_excel(self, content: bytes) -> List[PayrollRecordCreate]:
+    def _parse_excel(self, content: WorkbookSource) -> List[PayrollRecordCreate]:
         """Parse Excel content"""
         try:
             import openpyxl
-            from io import BytesIO
 
-            wb = openpyxl.load_workbook(BytesIO(content), data_only=True)
+            wb = openpyxl.load_workbook(workbook_input(content), data_only=True)
             ws = wb.active
 
             # Get header row
@@ -0,0 +1,170 @@
+"""
+SheetFingerprints - Incremental re-ingestion of payroll workbooks
+Skips factory sheets that did not change since they were last imported
+
+When one factory's sheet is corrected and the whole monthly workbook is
+uploaded again, only the corrected sheet is parsed and written.
+
+- Fingerprint: SHA-256 of the parsed region of a sheet (rows 1-60) plus the
+  parser version and the template used for that sheet
+  (see SalaryStatementParser._sheet_fingerprint)
+- Stored per (sheet_name, period) once ALL records of the sheet were saved,
+  so sheets with missing employees are retried on the next upload
+"""
+
+import sqlite3
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+
+def init_fingerprint_tables(conn: sqlite3.Connection):
+    """Initialize sheet fingerprint table"""
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sheet_fingerprints (
+            sheet_name TEXT NOT NULL,
+            period TEXT NOT NULL,
+            fingerprint TEXT NOT NULL,
+            record_count INTEGER DEFAULT 0,
+            source_file TEXT,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (sheet_name, period)
+        )
+    """)
+
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_sheet_fingerprints_fingerprint
+        ON sheet_fingerprints(fingerprint)
+    """)
+
+    conn.commit()
+
+
+def partition_by_sheet(
+    records: List[Any],
+    sheets: Optional[List[Dict[str, Any]]],
+    known: Dict[str, Set[str]],
+) -> Tuple[List[Any], List[Optional[str]], List[str], List[str]]:
+    """
+    Drop the records of unchanged sheets.
+
+    Records come in sheet order, `sheets` lists each parsed sheet with its
+    fingerprint and record count (get_parsing_stats()['sheets']).
+
+    Returns:
+        (records_to_save, sheet name for each record, changed, unchanged)
+    """
+    if not sheets:
+        return list(records), [None] * len(records), [], []
+
+    kept: List[Any] = []
+    kept_sheets: List[Optional[str]] = []
+    changed: List[str] = []
+    unchanged: List[str] = []
+
+    position = 0
+    for sheet in sheets:
+        count = sheet.get('records', 0)
+        sheet_records = records[position:position + count]
+        position += count
+
+        name = sheet['sheet']
+        if sheet.get('unchanged') or sheet.get('fingerprint') in known.get(name, ()):
+            unchanged.append(name)
+            continue
+
+        changed.append(name)
+        kept.extend(sheet_records)
+        kept_sheets.extend([name] * len(sheet_records))
+
+    # Records not covered by the sheet list are always saved
+    kept.extend(records[position:])
+    kept_sheets.extend([None] * len(records[position:]))
+
+    return kept, kept_sheets, changed, unchanged
+
+
+class SheetFingerprintService:
+    """Service for per-sheet fingerprints"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def get_known(self) -> Dict[str, Set[str]]:
+        """Get stored fingerprints grouped by sheet name"""
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute("SELECT sheet_name, fingerprint FROM sheet_fingerprints")
+        except sqlite3.OperationalError:
+            return {}  # Table not created yet (init_db not run)
+
+        known: Dict[str, Set[str]] = {}
+        for row in cursor.fetchall():
+            known.setdefault(row[0], set()).add(row[1])
+        return known
+
+    def record_sheets(
+        self,
+        sheets: Optional[List[Dict[str, Any]]],
+        saved_records: List[Any],
+        saved_sheets: List[Optional[str]],
+        incomplete_sheets: Set[str],
+        source_file: Optional[str] = None,
+    ) -> int:
+        """
+        Store fingerprints of sheets whose records were all saved.
+
+        Does not commit: call inside the upload transaction, so fingerprints
+        are only kept if the records are.
+
+        Args:
+            sheets: Parsed sheet list (get_parsing_stats()['sheets'])
+            saved_records: Records that were written (or attempted)
+            saved_sheets: Sheet name for each of saved_records
+            incomplete_sheets: Sheets with skipped/failed records
+
+        Returns:
+            Number of fingerprints stored
+        """
+        if not sheets:
+            return 0
+
+        periods: Dict[str, str] = {}
+        counts: Dict[str, int] = {}
+        for record, sheet_name in zip(saved_records, saved_sheets):
+            if sheet_name is None:
+                continue
+            periods.setdefault(sheet_name, record.period)
+            counts[sheet_name] = counts.get(sheet_name, 0) + 1
+
+        now = datetime.now().isoformat()
+        rows = [
+            (
+                sheet['sheet'], periods.get(sheet['sheet'], ''), sheet['fingerprint'],
+                counts.get(sheet['sheet'], 0), source_file, now,
+            )
+            for sheet in sheets
+            if sheet.get('fingerprint')
+            and not sheet.get('unchanged')
+            and sheet['sheet'] not in incomplete_sheets
+        ]
+
+        self.conn.executemany("""
+            INSERT INTO sheet_fingerprints
+                (sheet_name, period, fingerprint, record_count, source_file, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(sheet_name, period) DO UPDATE SET
+                fingerprint = excluded.fingerprint,
+                record_count = excluded.record_count,
+                source_file = excluded.source_file,
+                updated_at = excluded.updated_at
+        """, rows)
+        return len(rows)
+
+    def clear(self) -> int:
+        """Forget all fingerprints (next upload re-imports every sheet)"""
+        cursor = self.conn.cursor()
+        cursor.execute("DELETE FROM sheet_fingerprints")
+        self.conn.commit()
+        return cursor.rowcount
@@ -0,0 +1,198 @@
+"""
+Sheet Grid - Compact value snapshots of Excel worksheets
+=========================================================
+The salary parser only needs the first ~60 rows of every factory sheet
+(fixed rows 1-19, dynamic zone 20-29, totals/deductions 30-50).
+
+Instead of walking the openpyxl object model cell by cell, a worksheet is
+read once into a SheetGrid (a list of row tuples) and every field lookup
+is a plain index into that grid.
+
+Two views share the same interface (value / max_row / max_column / title):
+- SheetGrid:     snapshot of values (used by the streaming engine)
+- WorksheetView: thin wrapper over a full openpyxl worksheet (legacy engine)
+"""
+
+import hashlib
+import os
+import zipfile
+import xml.etree.ElementTree as ET
+from io import BytesIO
+from typing import Any, BinaryIO, Iterable, List, Optional, Tuple, Union
+
+
+# Rows 1-60 cover every fixed and dynamic position used by the parser
+DEFAULT_SNAPSHOT_ROWS = 60
+
+# A workbook is passed around either as bytes or as a path to a file on disk
+# (spooled uploads, folder sync). Paths keep large files out of memory.
+WorkbookSource = Union[bytes, str, os.PathLike]
+
+# SpreadsheetML main namespace (workbook.xml, sheetN.xml, sharedStrings.xml)
+SPREADSHEET_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+
+
+class _GridCell:
+    """Minimal stand-in for openpyxl's Cell (only .value is supported)"""
+
+    __slots__ = ('value',)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+
+class SheetGrid:
+    """
+    Read-only 2D snapshot of worksheet values.
+
+    Rows and columns are 1-based (same as openpyxl). Any position outside
+    the snapshot returns None, exactly like an empty cell.
+    """
+
+    __slots__ = ('title', 'rows', 'max_row', 'max_column', 'cells_read')
+
+    def __init__(self, title: str, rows: List[Tuple[Any, ...]]):
+        self.title = title
+        self.rows = rows
+        self.max_row = len(rows)
+        self.max_column = max((len(r) for r in rows), default=0)
+        self.cells_read = 0  # Lookups made by the parser (see parse_metrics)
+
+    def value(self, row: int, col: int) -> Any:
+        """Get the raw value at (row, col), or None if outside the grid"""
+        self.cells_read += 1
+        if row < 1 or col < 1 or row > self.max_row:
+            return None
+        values = self.rows[row - 1]
+        if col > len(values):
+            return None
+        return values[col - 1]
+
+    def cell(self, row: int, column: int) -> _GridCell:
+        """openpyxl-compatible accessor (for code that expects ws.cell().value)"""
+        return _GridCell(self.value(row, column))
+
+    @classmethod
+    def from_rows(cls, title: str, rows: Iterable[Iterable[Any]]) -> 'SheetGrid':
+        """
+        Build a grid from an iterable of row values.
+
+        Trailing empty cells are trimmed so that sparse rows stay compact.
+        """
+        snapshot = []
+        for values in rows:
+            values = tuple(values)
+            end = len(values)
+            while end and values[end - 1] is None:
+                end -= 1
+            snapshot.append(values[:end])
+
+        # Drop trailing empty rows (keeps max_row equal to the last used row)
+        while snapshot and not snapshot[-1]:
+            snapshot.pop()
+
+        return cls(title, snapshot)
+
+    @classmethod
+    def from_worksheet(cls, ws, max_row: int = DEFAULT_SNAPSHOT_ROWS) -> 'SheetGrid':
+        """
+        Snapshot rows 1..max_row of an openpyxl worksheet.
+
+        Works with both normal and read-only worksheets. For read-only
+        worksheets the declared <dimension> is ignored, because many
+        generated .xlsm files carry a wrong one (it would truncate rows).
+        """
+        if hasattr(ws, 'reset_dimensions'):
+            ws.reset_dimensions()
+
+        rows = ws.iter_rows(min_row=1, max_row=max_row, values_only=True)
+        return cls.from_rows(ws.title, rows)
+
+
+class WorksheetView:
+    """Grid interface over a full (non read-only) openpyxl worksheet"""
+
+    __slots__ = ('ws', 'title', 'cells_read')
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.title = ws.title
+        self.cells_read = 0
+
+    @property
+    def max_row(self) -> int:
+        return self.ws.max_row
+
+    @property
+    def max_column(self) -> int:
+        return self.ws.max_column
+
+    def value(self, row: int, col: int) -> Any:
+        self.cells_read += 1
+        return self.ws.cell(row=row, column=col).value
+
+    def cell(self, row: int, column: int):
+        return self.ws.cell(row=row, column=column)
+
+
+def as_sheet_view(ws) -> Any:
+    """
+    Return an object exposing value(row, col).
+
+    Grids and views are returned unchanged; raw openpyxl worksheets
+    (e.g. from debug scripts) are wrapped in a WorksheetView.
+    """
+    if isinstance(ws, (SheetGrid, WorksheetView)):
+        return ws
+    return WorksheetView(ws)
+
+
+def grid_fingerprint(grid: SheetGrid, salt: str = '') -> str:
+    """
+    SHA-256 over the title and every value of a grid.
+
+    Values are hashed with their type name, so 1, 1.0 and '1' differ.
+    """
+    digest = hashlib.sha256(salt.encode('utf-8'))
+    digest.update(b'\x00' + grid.title.encode('utf-8'))
+    for values in grid.rows:
+        digest.update(b'\x1e')
+        for value in values:
+            digest.update(f"\x1f{type(value).__name__}:{value!r}".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def workbook_input(source: WorkbookSource) -> Union[str, BinaryIO]:
+    """
+    Argument for zipfile.ZipFile / openpyxl.load_workbook.
+
+    Bytes are wrapped in a BytesIO; paths are passed through so the file is
+    read from disk on demand instead of being loaded into memory.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return BytesIO(source)
+    return os.fspath(source)
+
+
+def read_sheet_names(source: WorkbookSource) -> List[str]:
+    """
+    List sheet names in workbook order without loading any sheet data.
+
+    Reads xl/workbook.xml straight from the zip archive; falls back to
+    openpyxl (read-only) for anything that is not a plain OOXML package.
+    """
+    try:
+        with zipfile.ZipFile(workbook_input(source)) as zf:
+            root = ET.fromstring(zf.read('xl/workbook.xml'))
+        sheets = root.find(f'{{{SPREADSHEET_NS}}}sheets')
+        if sheets is not None:
+            return [sheet.get('name') for sheet in sheets]
+    except (zipfile.BadZipFile, KeyError, ET.ParseError):
+        pass
+
+    import openpyxl
+    wb = openpyxl.load_workbook(workbook_input(source), read_only=True)
+    try:
+        return list(wb.sheetnames)
+    finally:
+        wb.close()
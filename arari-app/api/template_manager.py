@@ -12,10 +12,87 @@ Flow:
 
 import json
 import sqlite3
+import threading
 from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime
 from pathlib import Path
 
+from label_matcher import LabelMatcher, strip_spaces
+
+
+# Databases whose factory_templates table was already created in this process
+_ensured_tables: set = set()
+
+
+class _TemplateIndex:
+    """
+    In-memory snapshot of the active templates of one database.
+
+    - templates:  factory_identifier -> decoded template dict
+    - normalized: factory_identifier without spaces -> factory_identifier
+    - order:      identifiers in row order (for the substring fallback)
+    - version:    templates version stamp the snapshot was read at
+    """
+
+    __slots__ = ('templates', 'normalized', 'order', 'version', 'generation', 'fuzzy')
+
+    def __init__(self, templates: Dict[str, Dict[str, Any]], version: Optional[str], generation: int):
+        self.templates = templates
+        self.order = list(templates)
+        self.normalized: Dict[str, str] = {}
+        for factory_id in self.order:
+            self.normalized.setdefault(strip_spaces(factory_id), factory_id)
+        self.version = version
+        self.generation = generation
+        self.fuzzy: Dict[str, Optional[str]] = {}  # sheet name -> matched identifier
+
+
+# Process-wide template indexes, keyed by database path
+_template_indexes: Dict[str, Optional[_TemplateIndex]] = {}
+_template_generations: Dict[str, int] = {}
+_template_index_lock = threading.Lock()
+
+
+def invalidate_template_index(db_path: Optional[Path] = None) -> None:
+    """
+    Drop the cached template index (all databases if db_path is None).
+
+    Called after every template write; the next lookup reloads the index.
+    """
+    with _template_index_lock:
+        keys = [str(db_path)] if db_path is not None else list(_template_indexes)
+        for key in keys:
+            _template_indexes[key] = None
+            _template_generations[key] = _template_generations.get(key, 0) + 1
+
+
+def _copy_template(template: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy a template so callers cannot modify the shared index"""
+    return {
+        key: value.copy() if isinstance(value, (dict, list)) else value
+        for key, value in template.items()
+    }
+
+
+def _decode_template_row(row: sqlite3.Row) -> Dict[str, Any]:
+    """Convert a factory_templates row into a template dict"""
+    return {
+        'id': row['id'],
+        'factory_identifier': row['factory_identifier'],
+        'template_name': row['template_name'],
+        'field_positions': json.loads(row['field_positions']),
+        'column_offsets': json.loads(row['column_offsets']),
+        'detected_allowances': json.loads(row['detected_allowances'] or '{}'),
+        'non_billable_allowances': json.loads(row['non_billable_allowances'] or '[]'),
+        'employee_column_width': row['employee_column_width'],
+        'detection_confidence': row['detection_confidence'],
+        'sample_employee_id': row['sample_employee_id'],
+        'sample_period': row['sample_period'],
+        'created_at': row['created_at'],
+        'updated_at': row['updated_at'],
+        'notes': row['notes'],
+    }
+
 
 class TemplateManager:
     """
@@ -36,7 +113,12 @@ class TemplateManager:
             db_path: Path to SQLite database. If None, uses default.
         """
         self.db_path = db_path or Path(__file__).parent / "arari_pro.db"
-        self._ensure_table_exists()
+        self._index_key = str(self.db_path)
+
+        # Table creation only needs to run once per database per process
+        if self._index_key not in _ensured_tables:
+            self._ensure_table_exists()
+            _ensured_tables.add(self._index_key)
 
     def _get_connection(self) -> sqlite3.Connection:
         """Get database connection"""
@@ -78,6 +160,75 @@ class TemplateManager:
         conn.commit()
         conn.close()
 
+    # ==================== Template Index ====================
+
+    def _get_index(self) -> _TemplateIndex:
+        """Return the process-wide index for this database, loading it if needed"""
+        index = _template_indexes.get(self._index_key)
+        if index is not None:
+            return index
+
+        with _template_index_lock:
+            index = _template_indexes.get(self._index_key)
+            if index is None:
+                index = self._load_index()
+                _template_indexes[self._index_key] = index
+            return index
+
+    def _load_index(self) -> _TemplateIndex:
+        """Read all active templates and the version stamp in one connection"""
+        generation = _template_generations.get(self._index_key, 0)
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        try:
+            version = self._read_templates_version(cursor)
+            cursor.execute("""
+                SELECT * FROM factory_templates
+                WHERE is_active = 1
+                ORDER BY id
+            """)
+            templates = {}
+            for row in cursor.fetchall():
+                try:
+                    templates[row['factory_identifier']] = _decode_template_row(row)
+                except (TypeError, ValueError) as e:
+                    print(f"[Template ERROR] Skipping unreadable template "
+                          f"'{row['factory_identifier']}': {e}")
+            return _TemplateIndex(templates, version, generation)
+
+        except Exception as e:
+            print(f"[Template ERROR] Failed to load template index: {e}")
+            return _TemplateIndex({}, None, generation)
+
+        finally:
+            conn.close()
+
+    @property
+    def generation(self) -> int:
+        """Counter bumped every time this database's templates are written"""
+        return _template_generations.get(self._index_key, 0)
+
+    def refresh_if_changed(self, version: Optional[str] = None) -> str:
+        """
+        Reload the index if the templates changed outside this process.
+
+        Args:
+            version: Known current version stamp (e.g. sent by the parent
+                     process to a worker). If None, it is read from the DB.
+
+        Returns:
+            Version stamp of the (possibly reloaded) index
+        """
+        if version is None:
+            version = self.get_templates_version()
+
+        index = self._get_index()
+        if version is not None and index.version != version:
+            invalidate_template_index(self.db_path)
+            index = self._get_index()
+        return index.version
+
     def save_template(
         self,
         factory_identifier: str,
@@ -150,6 +301,7 @@ class TemplateManager:
             ))
 
             conn.commit()
+            invalidate_template_index(self.db_path)
             print(f"[Template] Saved template for '{factory_identifier}' "
                   f"({len(field_positions)} fields, confidence={detection_confidence:.2f})")
             return True
@@ -172,89 +324,51 @@ class TemplateManager:
         Returns:
             Template dict or None if not found
         """
-        conn = self._get_connection()
-        cursor = conn.cursor()
-
-        try:
-            cursor.execute("""
-                SELECT * FROM factory_templates
-                WHERE factory_identifier = ? AND is_active = 1
-            """, (factory_identifier,))
-
-            row = cursor.fetchone()
-            if not row:
-                return None
-
-            template = {
-                'id': row['id'],
-                'factory_identifier': row['factory_identifier'],
-                'template_name': row['template_name'],
-                'field_positions': json.loads(row['field_positions']),
-                'column_offsets': json.loads(row['column_offsets']),
-                'detected_allowances': json.loads(row['detected_allowances'] or '{}'),
-                'non_billable_allowances': json.loads(row['non_billable_allowances'] or '[]'),
-                'employee_column_width': row['employee_column_width'],
-                'detection_confidence': row['detection_confidence'],
-                'sample_employee_id': row['sample_employee_id'],
-                'sample_period': row['sample_period'],
-                'created_at': row['created_at'],
-                'updated_at': row['updated_at'],
-                'notes': row['notes'],
-            }
-
-            print(f"[Template] Loaded template for '{factory_identifier}' "
-                  f"({len(template['field_positions'])} fields)")
-            return template
-
-        except Exception as e:
-            print(f"[Template ERROR] Failed to load template: {e}")
+        template = self._get_index().templates.get(factory_identifier)
+        if not template:
             return None
 
-        finally:
-            conn.close()
+        print(f"[Template] Loaded template for '{factory_identifier}' "
+              f"({len(template['field_positions'])} fields)")
+        return _copy_template(template)
 
     def find_matching_template(self, sheet_name: str) -> Optional[Dict[str, Any]]:
         """
         Find a template that matches the sheet name.
         Uses fuzzy matching for factory names.
 
+        Lookup order (all in memory, see _TemplateIndex):
+        1. Exact factory identifier
+        2. Same identifier ignoring spaces
+        3. Identifier contained in sheet name (or vice versa)
+
         Args:
             sheet_name: Sheet name from Excel file
 
         Returns:
             Best matching template or None
         """
-        # First, try exact match
-        template = self.load_template(sheet_name)
-        if template:
-            return template
-
-        # Try partial match (factory name might be substring)
-        conn = self._get_connection()
-        cursor = conn.cursor()
+        index = self._get_index()
 
-        try:
-            # Get all active templates
-            cursor.execute("""
-                SELECT factory_identifier FROM factory_templates
-                WHERE is_active = 1
-            """)
-
-            for row in cursor.fetchall():
-                factory_id = row['factory_identifier']
+        # First, try exact match
+        factory_id = sheet_name if sheet_name in index.templates else None
 
-                # Check if sheet_name contains factory_identifier or vice versa
-                if factory_id in sheet_name or sheet_name in factory_id:
-                    return self.load_template(factory_id)
+        # Then the same name ignoring spaces
+        if factory_id is None:
+            factory_id = index.normalized.get(strip_spaces(sheet_name))
 
-            return None
+        # Try partial match (factory name might be substring)
+        if factory_id is None:
+            if sheet_name not in index.fuzzy:
+                index.fuzzy[sheet_name] = next(
+                    (fid for fid in index.order if fid in sheet_name or sheet_name in fid),
+                    None
+                )
+            factory_id = index.fuzzy[sheet_name]
 
-        except Exception as e:
-            print(f"[Template ERROR] Failed to find matching template: {e}")
+        if factory_id is None:
             return None
-
-        finally:
-            conn.close()
+        return self.load_template(factory_id)
 
     def list_templates(self, include_inactive: bool = False) -> List[Dict[str, Any]]:
         """
@@ -332,6 +446,7 @@ class TemplateManager:
                 """, (datetime.now().isoformat(), factory_identifier))
 
             conn.commit()
+            invalidate_template_index(self.db_path)
 
             if cursor.rowcount > 0:
                 action = "deleted" if hard_delete else "deactivated"
@@ -347,6 +462,43 @@ class TemplateManager:
         finally:
             conn.close()
 
+    def get_templates_version(self) -> Optional[str]:
+        """
+        Get a stamp that changes whenever any template is saved or deleted.
+
+        Used to invalidate cached parse results (see parse_cache.py).
+
+        Returns:
+            Version string (template count, active count, last update),
+            or None if the table could not be read
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        try:
+            return self._read_templates_version(cursor)
+
+        except Exception as e:
+            print(f"[Template ERROR] Failed to get templates version: {e}")
+            return None
+
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _read_templates_version(cursor: sqlite3.Cursor) -> str:
+        """Version stamp query shared by get_templates_version and the index"""
+        cursor.execute("""
+            SELECT
+                COUNT(*) as total,
+                SUM(CASE WHEN is_active = 1 THEN 1 ELSE 0 END) as active,
+                MAX(updated_at) as last_updated
+            FROM factory_templates
+        """)
+
+        row = cursor.fetchone()
+        return f"{row['total'] or 0}-{row['active'] or 0}-{row['last_updated'] or ''}"
+
     def get_template_stats(self) -> Dict[str, Any]:
         """
         Get statistics about templates.
@@ -374,6 +526,7 @@ class TemplateManager:
                 'active_templates': row['active'] or 0,
                 'average_confidence': row['avg_confidence'] or 0.0,
                 'last_updated': row['last_updated'],
+                'index_generation': self.generation,
             }
 
         except Exception as e:
@@ -430,12 +583,30 @@ class TemplateGenerator:
         '通勤手当', '通勤手当（非）', '通勤費', '業務手当',
     ]
 
+    # Other 手当 (allowances)
+    ALLOWANCE_PATTERNS = [r'.*手当.*', r'.*割増.*']
+
+    # Compiled from the patterns above on first use (see _label_matcher)
+    _compiled_label_matcher: Optional[LabelMatcher] = None
+
     def __init__(self):
         self.detected_fields: Dict[str, Tuple[int, int]] = {}  # field -> (row, col)
         self.detected_allowances: Dict[str, Tuple[int, int]] = {}
         self.non_billable_found: List[str] = []
         self.confidence_score = 0.0
 
+    @classmethod
+    def _label_matcher(cls) -> LabelMatcher:
+        """Compiled matcher for FIELD_PATTERNS / NON_BILLABLE_NAMES (built once)"""
+        if cls._compiled_label_matcher is None:
+            cls._compiled_label_matcher = LabelMatcher(
+                field_patterns=cls.FIELD_PATTERNS,
+                allowance_patterns=cls.ALLOWANCE_PATTERNS,
+                non_billable_names=cls.NON_BILLABLE_NAMES,
+                field_mode='substring',
+            )
+        return cls._compiled_label_matcher
+
     def analyze_worksheet(self, ws, sheet_name: str) -> Optional[Dict[str, Any]]:
         """
         Analyze a worksheet and generate a template.
@@ -447,8 +618,6 @@ class TemplateGenerator:
         Returns:
             Template dict or None if analysis failed
         """
-        import re
-
         self.detected_fields = {}
         self.detected_allowances = {}
         self.non_billable_found = []
@@ -458,6 +627,7 @@ class TemplateGenerator:
         max_scan_col = min(50, ws.max_column)
 
         label_positions = []  # Track where we find labels
+        matcher = self._label_matcher()
 
         for row in range(1, max_scan_row + 1):
             for col in range(1, max_scan_col + 1):
@@ -469,29 +639,23 @@ class TemplateGenerator:
                 if not label or len(label) > 30:  # Skip very long text
                     continue
 
-                # Normalize: remove spaces
-                label_normalized = label.replace(' ', '').replace('　', '')
-
-                # Check against known field patterns
-                for field_name, patterns in self.FIELD_PATTERNS.items():
-                    if field_name in self.detected_fields:
-                        continue  # Already found
+                # One lookup returns every category this label belongs to
+                match = matcher.match(label)
 
-                    for pattern in patterns:
-                        pattern_normalized = pattern.replace(' ', '').replace('　', '')
-                        if pattern_normalized in label_normalized or label_normalized == pattern_normalized:
-                            self.detected_fields[field_name] = (row, col)
-                            label_positions.append((row, col, field_name))
-                            break
+                # Check against known field patterns (pattern contained in label)
+                for field_name in match.fields:
+                    if field_name not in self.detected_fields:
+                        self.detected_fields[field_name] = (row, col)
+                        label_positions.append((row, col, field_name))
 
                 # Check for non-billable allowances
-                if label in self.NON_BILLABLE_NAMES:
+                if match.is_non_billable:
                     if label not in self.non_billable_found:
                         self.non_billable_found.append(label)
                         self.detected_allowances[label] = (row, col)
 
                 # Check for other 手当 (allowances)
-                elif re.match(r'.*手当.*', label) or re.match(r'.*割増.*', label):
+                elif match.is_allowance:
                     if label not in self.detected_allowances:
                         self.detected_allowances[label] = (row, col)
 
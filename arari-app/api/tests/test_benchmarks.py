@@ -0,0 +1,77 @@
+import unittest
+import sys
+import os
+import tempfile
+from pathlib import Path
+
+# Add api directory to path so we can import modules from parent directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.run_benchmarks import compare
+from benchmarks.synthetic_payroll import (
+    build_employee_master, build_payroll_workbook, employee_ids, write_workbook
+)
+from employee_parser import DBGenzaiXParser
+from salary_parser import SalaryStatementParser
+from template_manager import TemplateManager
+
+
+class TestSyntheticWorkbooks(unittest.TestCase):
+    """Generated workbooks must parse like real ones"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.tmp_dir = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_payroll_workbook_parses(self):
+        content = build_payroll_workbook(sheet_count=3, employees_per_sheet=4)
+        manager = TemplateManager(db_path=self.tmp_dir / 'templates.db')
+        records = SalaryStatementParser(template_manager=manager).parse(content)
+
+        self.assertEqual([r.employee_id for r in records], employee_ids(3, 4))
+        for record in records:
+            self.assertEqual(record.period, '2025年1月')
+            self.assertGreater(record.work_days, 0)
+            self.assertGreaterEqual(record.work_hours, 152)
+            self.assertGreater(record.base_salary, 0)
+            self.assertGreater(record.gross_salary, record.net_salary)
+
+    def test_employee_master_parses(self):
+        path = write_workbook(
+            build_employee_master(50, sheet_count=3, employees_per_sheet=4), self.tmp_dir / '社員台帳.xlsm'
+        )
+        employees, stats = DBGenzaiXParser().parse_employees(str(path))
+
+        self.assertEqual(stats['employees_found'], 50)
+        self.assertEqual([e.employee_id for e in employees[:12]], employee_ids(3, 4))
+        self.assertTrue(all(e.hourly_rate > 0 and e.billing_rate > e.hourly_rate for e in employees))
+
+    def test_same_seed_same_workbook(self):
+        first = build_payroll_workbook(sheet_count=2, employees_per_sheet=2, seed=7)
+        second = build_payroll_workbook(sheet_count=2, employees_per_sheet=2, seed=7)
+        manager = TemplateManager(db_path=self.tmp_dir / 'templates.db')
+
+        self.assertEqual(
+            [r.model_dump() for r in SalaryStatementParser(template_manager=manager).parse(first)],
+            [r.model_dump() for r in SalaryStatementParser(template_manager=manager).parse(second)],
+        )
+
+
+class TestBaselineComparison(unittest.TestCase):
+
+    def test_flags_regressions(self):
+        baseline = {'a': {'wall_seconds': 1.0}, 'b': {'wall_seconds': 1.0}}
+        results = {'a': {'wall_seconds': 1.2}, 'b': {'wall_seconds': 1.5}, 'new': {'wall_seconds': 9.0}}
+
+        rows = {row['case']: row for row in compare(results, baseline, tolerance=0.25)}
+
+        self.assertFalse(rows['a']['regression'])
+        self.assertTrue(rows['b']['regression'])
+        self.assertNotIn('new', rows)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+import unittest
+import sys
+import os
+import contextlib
+import io
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+# Add api directory to path so we can import modules from parent directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import bulk_ingest
+import database
+from bulk_ingest import BulkIngestor, collect_files
+from folder_sync import SyncManifestService
+from ingestion import ParsedFileWriter
+from models import EmployeeCreate
+from salary_parser import shutdown_parse_pool
+from services import PayrollService
+from template_manager import TemplateManager
+
+from test_folder_sync import write_workbook
+
+
+class TestBulkIngest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.tmp_dir = Path(self.tmp.name)
+        self.db_path = self.tmp_dir / 'arari_pro.db'
+        with patch.object(database, 'DB_PATH', self.db_path), \
+                patch('backup.BACKUP_DIR', self.tmp_dir / 'backups'), \
+                contextlib.redirect_stdout(io.StringIO()):
+            database.init_db()
+            self.conn = database.get_connection()
+            self.templates = TemplateManager(db_path=self.tmp_dir / 'templates.db')
+
+        PayrollService(self.conn).bulk_upsert_employees(
+            EmployeeCreate(employee_id=str(i), name=f'Employee {i}', dispatch_company='Test Co',
+                           hourly_rate=1500, billing_rate=2000)
+            for i in range(1, 6)
+        )
+        self.folder = self.tmp_dir / 'history'
+        self.folder.mkdir()
+        for month in range(1, 7):
+            write_workbook(self.folder / f'2024_{month:02d}.xlsm', ['1', '2'], period=f'2024年{month}月')
+
+    def tearDown(self):
+        shutdown_parse_pool()
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def ingest(self, **kwargs):
+        options = dict(workers=1, commit_files=4, out=io.StringIO())
+        options.update(kwargs)
+        ingestor = BulkIngestor(self.conn, self.templates, **options)
+        with contextlib.redirect_stdout(io.StringIO()):
+            return ingestor.run(collect_files([str(self.folder)]))
+
+    def count_records(self):
+        return self.conn.execute("SELECT COUNT(*) FROM payroll_records").fetchone()[0]
+
+    def test_imports_all_files_in_large_transactions(self):
+        result = self.ingest()
+        self.assertEqual(result['files_done'], 6)
+        self.assertEqual(result['records_saved'], 12)
+        self.assertEqual(result['commits'], 2)  # 4 + 2 files
+        self.assertGreater(result['records_per_second'], 0)
+        self.assertEqual(self.count_records(), 12)
+
+    def test_parallel_workers(self):
+        result = self.ingest(workers=2)
+        self.assertEqual(result['files_imported'], 6)
+        self.assertEqual(self.count_records(), 12)
+
+    def test_failed_file_does_not_roll_back_batch(self):
+        (self.folder / '2024_99.xlsm').write_bytes(b'not a workbook')
+        result = self.ingest(commit_files=10)
+        self.assertEqual(result['files_failed'], 1)
+        self.assertEqual(len(result['failures']), 1)
+        self.assertEqual(self.count_records(), 12)
+        entry = SyncManifestService(self.conn).get_entries()[str(self.folder / '2024_99.xlsm')]
+        self.assertEqual(entry['last_status'], 'failed')
+
+    def test_resume_after_interruption(self):
+        original = ParsedFileWriter.write
+        calls = []
+
+        def interrupt_on_fourth(writer, *args, **kwargs):
+            calls.append(args[0])
+            if len(calls) == 4:
+                raise KeyboardInterrupt
+            return original(writer, *args, **kwargs)
+
+        with patch.object(ParsedFileWriter, 'write', interrupt_on_fourth):
+            with self.assertRaises(KeyboardInterrupt):
+                self.ingest(commit_files=2)
+        self.conn.rollback()
+        self.assertEqual(self.count_records(), 4)  # Two committed batches of two files
+
+        result = self.ingest()
+        self.assertEqual(result['files_already_imported'], 2)
+        self.assertEqual(result['files_done'], 4)
+        self.assertEqual(self.count_records(), 12)
+
+        self.assertEqual(self.ingest()['files_done'], 0)
+        self.assertEqual(self.ingest(restart=True)['files_done'], 6)
+
+    def test_main_writes_to_given_database(self):
+        db_path = self.tmp_dir / 'offline.db'
+        with patch.object(database, 'DB_PATH', database.DB_PATH), \
+                patch('backup.BACKUP_DIR', self.tmp_dir / 'backups'), \
+                contextlib.redirect_stdout(io.StringIO()) as out:
+            exit_code = bulk_ingest.main([str(self.folder), '--db', str(db_path), '--workers', '1'])
+
+        self.assertEqual(exit_code, 0)  # Employees unknown: records skipped, files partial
+        self.assertIn('BULK INGESTION SUMMARY', out.getvalue())
+        with patch.object(database, 'DB_PATH', db_path):
+            conn = database.get_connection()
+        try:
+            self.assertEqual(len(SyncManifestService(conn).get_entries()), 6)
+        finally:
+            conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,230 @@
+import unittest
+import sys
+import os
+import asyncio
+import contextlib
+import contextvars
+import io
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+# Add api directory to path so we can import modules from parent directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import database
+import db_async
+import main
+from db_async import db_endpoint, db_executor_stats, run_db, shutdown_db_executor
+from db_writer import WriteQueue
+from fastapi import HTTPException
+from fastapi.routing import APIRoute
+from models import EmployeeCreate
+from services import PayrollService
+
+
+class TestRunDb(unittest.TestCase):
+
+    def tearDown(self):
+        shutdown_db_executor(wait=True)
+
+    def test_runs_off_the_event_loop_thread(self):
+        async def scenario():
+            loop_thread = threading.get_ident()
+            worker_thread = await run_db(threading.get_ident)
+            return loop_thread, worker_thread
+
+        loop_thread, worker_thread = asyncio.run(scenario())
+        self.assertNotEqual(loop_thread, worker_thread)
+
+    def test_arguments_results_and_errors(self):
+        async def scenario():
+            self.assertEqual(await run_db(pow, 2, 10), 1024)
+            self.assertEqual(await run_db(int, 'ff', base=16), 255)
+            with self.assertRaises(ZeroDivisionError):
+                await run_db(lambda: 1 / 0)
+
+        asyncio.run(scenario())
+
+    def test_context_is_carried_into_the_pool(self):
+        channel = contextvars.ContextVar('channel', default=None)
+
+        async def scenario():
+            channel.set('job-1')
+            return await run_db(channel.get)
+
+        self.assertEqual(asyncio.run(scenario()), 'job-1')
+
+    def test_db_endpoint_keeps_signature(self):
+        def endpoint(employee_id: str, period: str = None):
+            """Docstring"""
+            return employee_id, period
+
+        wrapped = db_endpoint(endpoint)
+        self.assertTrue(asyncio.iscoroutinefunction(wrapped))
+        self.assertEqual(wrapped.__doc__, 'Docstring')
+        self.assertIs(wrapped.__wrapped__, endpoint)
+        self.assertEqual(asyncio.run(wrapped('1', period='2025-01')), ('1', '2025-01'))
+
+    def test_stats(self):
+        async def scenario():
+            await asyncio.gather(*(run_db(time.sleep, 0.01) for _ in range(4)))
+
+        before = db_executor_stats()['calls']
+        asyncio.run(scenario())
+        stats = db_executor_stats()
+        self.assertEqual(stats['calls'] - before, 4)
+        self.assertEqual(stats['active'], 0)
+        self.assertEqual(stats['threads'], db_async.DB_THREADS)
+
+
+class TestEndpointConcurrency(unittest.TestCase):
+    """A slow query must not stall other requests of the same worker"""
+
+    SLOW_SECONDS = 0.5
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.tmp_dir = Path(self.tmp.name)
+        self.db_path = self.tmp_dir / 'arari_pro.db'
+        with patch.object(database, 'DB_PATH', self.db_path), \
+                patch('backup.BACKUP_DIR', self.tmp_dir / 'backups'), \
+                contextlib.redirect_stdout(io.StringIO()):
+            database.init_db()
+            self.slow_conn = database.get_connection()
+            self.fast_conn = database.get_connection()
+
+        PayrollService(self.fast_conn).bulk_upsert_employees(
+            EmployeeCreate(employee_id=str(i), name=f'Employee {i}', dispatch_company='Test Co',
+                           hourly_rate=1500, billing_rate=2000)
+            for i in range(1, 4)
+        )
+
+    def tearDown(self):
+        shutdown_db_executor(wait=True)
+        self.slow_conn.close()
+        self.fast_conn.close()
+        self.tmp.cleanup()
+
+    def test_fast_endpoint_not_blocked_by_slow_query(self):
+        finished = {}
+
+        def slow_statistics(service, period=None):
+            time.sleep(self.SLOW_SECONDS)
+            return {'period': period}
+
+        async def call(name, endpoint, **kwargs):
+            started = time.perf_counter()
+            result = await endpoint(**kwargs)
+            finished[name] = time.perf_counter() - started
+            return result
+
+        async def scenario():
+            slow = asyncio.create_task(call('slow', main.get_statistics, db=self.slow_conn, period=None))
+            await asyncio.sleep(0.05)  # Slow query is running
+            employees = await call('fast', main.get_employees, db=self.fast_conn)
+            await slow
+            return employees
+
+        with patch.object(PayrollService, 'get_statistics', slow_statistics):
+            employees = asyncio.run(scenario())
+
+        self.assertEqual(len(employees), 3)
+        self.assertGreaterEqual(finished['slow'], self.SLOW_SECONDS)
+        self.assertLess(finished['fast'], self.SLOW_SECONDS / 2)
+
+    def test_async_endpoints_use_the_db_pool(self):
+        # Endpoints reading the database must not block the event loop
+        for endpoint in (main.get_statistics, main.get_employees, main.get_payroll_records):
+            self.assertTrue(asyncio.iscoroutinefunction(endpoint))
+            self.assertTrue(hasattr(endpoint, '__wrapped__'))
+
+
+class TestWriteEndpoints(unittest.TestCase):
+    """Endpoint writes are queued to the DB writer instead of taking the write lock"""
+
+    LONG_SECONDS = 0.5
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.tmp_dir = Path(self.tmp.name)
+        self.db_path = self.tmp_dir / 'arari_pro.db'
+        with patch.object(database, 'DB_PATH', self.db_path), \
+                patch('backup.BACKUP_DIR', self.tmp_dir / 'backups'), \
+                contextlib.redirect_stdout(io.StringIO()):
+            database.init_db()
+            self.conn = database.get_connection()
+        # A request connection gives up on the write lock long before the batch ends
+        self.conn.execute("PRAGMA busy_timeout = 50")
+        self.writer = WriteQueue(self.db_path, linger=0)
+        writer_patch = patch('db_writer.db_writer', self.writer)
+        writer_patch.start()
+        self.addCleanup(writer_patch.stop)
+
+    def tearDown(self):
+        self.writer.stop()
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def setting(self, key):
+        return PayrollService(self.conn).get_setting(key)
+
+    def test_endpoint_write_during_long_writer_batch(self):
+        started, release = threading.Event(), threading.Event()
+
+        def long_batch(conn):
+            PayrollService(conn).update_setting('batch', 'written')
+            started.set()
+            release.wait(5)
+
+        async def scenario():
+            batch = self.writer.submit(long_batch)
+            started.wait(5)
+            endpoint = asyncio.create_task(
+                main.update_setting(key='endpoint', payload={'value': 1}))
+            await asyncio.sleep(self.LONG_SECONDS)
+            waiting = not endpoint.done()  # Queued behind the batch, not failed
+            release.set()
+            batch.result(timeout=5)
+            return waiting, await endpoint
+
+        waiting, response = asyncio.run(scenario())
+        self.assertTrue(waiting)
+        self.assertEqual(response['status'], 'updated')
+        self.assertEqual((self.setting('batch'), self.setting('endpoint')), ('written', '1'))
+
+    def test_endpoint_error_undoes_its_writes_only(self):
+        def failing_endpoint(db):
+            PayrollService(db).update_setting('discarded', 'x')
+            raise HTTPException(status_code=400, detail='invalid')
+
+        async def scenario():
+            other = self.writer.submit(lambda conn: PayrollService(conn).update_setting('kept', 'y'))
+            with self.assertRaises(HTTPException):
+                await db_async.db_write_endpoint(failing_endpoint)()
+            other.result(timeout=5)
+
+        asyncio.run(scenario())
+        self.assertEqual((self.setting('discarded'), self.setting('kept')), (None, 'y'))
+
+    def test_routes_hold_no_pooled_connection_they_do_not_need(self):
+        # Streams and uploads last long; write routes write through the writer
+        long_running = {'/api/progress/{channel}', '/api/upload', '/api/import-employees',
+                        '/api/sync-from-folder', '/api/jobs/upload'}
+        read_only_posts = {'/api/search/employees'}
+        checked = 0
+        for route in main.app.routes:
+            if not isinstance(route, APIRoute):
+                continue
+            writes = bool(route.methods - set(database.READ_METHODS)) and route.path not in read_only_posts
+            if route.path in long_running or writes:
+                calls = {dependency.call for dependency in route.dependant.dependencies}
+                self.assertNotIn(database.get_db, calls, route.path)
+                checked += 1
+        self.assertGreater(checked, 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
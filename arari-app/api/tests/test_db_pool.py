@@ -0,0 +1,113 @@
+import unittest
+import sys
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Add api directory to path so we can import modules from parent directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import database
+import db_pool
+from db_pool import ConnectionPool, PoolTimeoutError, close_pools, connect, get_pool
+
+
+class TestConnectionPool(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = Path(self.tmp.name) / 'pool.db'
+        conn = connect(self.db_path)
+        conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        close_pools()
+        self.tmp.cleanup()
+
+    def test_connections_are_tuned(self):
+        with ConnectionPool(self.db_path, 1).connection() as conn:
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+            self.assertEqual(conn.execute("PRAGMA synchronous").fetchone()[0], 1)  # NORMAL
+            self.assertEqual(conn.execute("PRAGMA foreign_keys").fetchone()[0], 1)
+            self.assertIsNotNone(conn.execute("SELECT 1 AS one").fetchone()['one'])
+
+    def test_connection_is_reused(self):
+        pool = ConnectionPool(self.db_path, 2)
+        with pool.connection() as first:
+            pass
+        with pool.connection() as second:
+            pass
+        self.assertIs(first, second)
+        stats = pool.stats()
+        self.assertEqual((stats['created'], stats['checkouts'], stats['checked_out']), (1, 2, 0))
+
+    def test_uncommitted_work_is_rolled_back(self):
+        pool = ConnectionPool(self.db_path, 1)
+        with pool.connection() as conn:
+            conn.execute("INSERT INTO items (name) VALUES ('x')")
+        with pool.connection() as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM items").fetchone()[0], 0)
+        self.assertEqual(pool.stats()['rollbacks'], 1)
+
+    def test_closed_connection_is_replaced(self):
+        pool = ConnectionPool(self.db_path, 1)
+        conn = pool.acquire()
+        conn.close()
+        pool.release(conn)
+        with pool.connection() as fresh:
+            self.assertIsNot(fresh, conn)
+            fresh.execute("SELECT 1")
+        self.assertEqual(pool.stats()['discarded'], 1)
+
+    def test_stale_connection_failing_health_check_is_replaced(self):
+        pool = ConnectionPool(self.db_path, 1)
+        with pool.connection() as conn:
+            pass
+        with patch.object(db_pool, 'HEALTH_CHECK_IDLE_SECONDS', -1), \
+                patch.object(ConnectionPool, '_healthy', return_value=False):
+            with pool.connection() as fresh:
+                self.assertIsNot(fresh, conn)
+
+    def test_waits_and_timeouts_are_measured(self):
+        pool = ConnectionPool(self.db_path, 1, timeout=0.05)
+        conn = pool.acquire()
+        with self.assertRaises(PoolTimeoutError):
+            pool.acquire()
+
+        threading.Timer(0.05, pool.release, args=(conn,)).start()
+        pool.timeout = 5
+        with pool.connection():
+            pass
+        stats = pool.stats()
+        self.assertEqual(stats['timeouts'], 1)
+        self.assertEqual(stats['waits'], 2)
+        self.assertGreater(stats['wait_seconds'], 0)
+
+    def test_readers_not_blocked_by_open_write_transaction(self):
+        writer = get_pool(self.db_path, 'write').acquire()
+        writer.execute("INSERT INTO items (name) VALUES ('pending')")
+        started = time.monotonic()
+        with get_pool(self.db_path, 'read').connection() as reader:
+            self.assertEqual(reader.execute("SELECT COUNT(*) FROM items").fetchone()[0], 0)
+        self.assertLess(time.monotonic() - started, 1)
+        writer.commit()
+        get_pool(self.db_path, 'write').release(writer)
+
+    def test_get_db_uses_read_pool_for_get_requests(self):
+        with patch.object(database, 'DB_PATH', self.db_path):
+            for method, kind in (('GET', 'read'), ('POST', 'write')):
+                dependency = database.get_db(SimpleNamespace(method=method))
+                next(dependency)
+                self.assertEqual(get_pool(self.db_path, kind).stats()['checked_out'], 1)
+                dependency.close()
+                self.assertEqual(get_pool(self.db_path, kind).stats()['checked_out'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,179 @@
+import unittest
+import sys
+import os
+import contextlib
+import io
+import tempfile
+import threading
+from pathlib import Path
+from unittest.mock import patch
+
+# Add api directory to path so we can import modules from parent directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import database
+from db_pool import connect
+from db_writer import WriteQueue
+from models import EmployeeCreate
+from progress_events import progress_bus, publish_event
+from services import PayrollService
+from upload_jobs import JobRunner, UploadJobService
+
+from test_upload_jobs import write_csv
+
+
+class TestWriteQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = Path(self.tmp.name) / 'writer.db'
+        conn = connect(self.db_path)
+        conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT UNIQUE)")
+        conn.commit()
+        conn.close()
+        self.writer = WriteQueue(self.db_path, linger=0)
+        self.reader = connect(self.db_path)
+
+    def tearDown(self):
+        self.writer.stop()
+        self.reader.close()
+        self.tmp.cleanup()
+
+    def names(self):
+        return [row['name'] for row in self.reader.execute("SELECT name FROM items ORDER BY id")]
+
+    def test_queued_writes_share_one_transaction(self):
+        started, release = threading.Event(), threading.Event()
+        blocker = self.writer.submit(lambda conn: started.set() or release.wait(5))
+        started.wait(5)  # Writer busy: the next writes queue up behind it
+        futures = [self.writer.execute("INSERT INTO items (name) VALUES (?)", (f'item{i}',)) for i in range(5)]
+        release.set()
+
+        self.assertTrue(blocker.result(timeout=5))
+        self.assertEqual([f.result(timeout=5) for f in futures], [1, 2, 3, 4, 5])
+        self.assertEqual(self.names(), ['item0', 'item1', 'item2', 'item3', 'item4'])
+        stats = self.writer.stats()
+        self.assertEqual(stats['transactions'], 2)
+        self.assertEqual(stats['max_batch'], 5)
+
+    def test_failing_task_does_not_undo_others(self):
+        release = threading.Event()
+        self.writer.submit(lambda conn: release.wait(5))
+        first = self.writer.execute("INSERT INTO items (name) VALUES ('a')")
+        duplicate = self.writer.execute("INSERT INTO items (name) VALUES ('a')")
+        last = self.writer.execute("INSERT INTO items (name) VALUES ('b')")
+        release.set()
+
+        first.result(timeout=5)
+        last.result(timeout=5)
+        with self.assertRaises(Exception):
+            duplicate.result(timeout=5)
+        self.assertEqual(self.names(), ['a', 'b'])
+        self.assertEqual(self.writer.stats()['failed_tasks'], 1)
+
+    def test_service_commit_is_deferred_and_rollback_is_local(self):
+        def write_and_rollback(conn):
+            conn.execute("INSERT INTO items (name) VALUES ('discarded')")
+            conn.rollback()
+            conn.execute("INSERT INTO items (name) VALUES ('kept')")
+            conn.commit()
+            return conn.in_transaction  # Still inside the writer's transaction
+
+        self.assertTrue(self.writer.run(write_and_rollback))
+        self.assertEqual(self.names(), ['kept'])
+
+    def test_with_block_maps_to_the_savepoint(self):
+        def write_in_blocks(conn):
+            with conn:
+                conn.execute("INSERT INTO items (name) VALUES ('kept')")
+            try:
+                with conn:
+                    conn.execute("INSERT INTO items (name) VALUES ('discarded')")
+                    raise ValueError('undo this block')
+            except ValueError:
+                pass
+            return conn.in_transaction  # Not committed by the with block
+
+        self.assertTrue(self.writer.run(write_in_blocks))
+        self.assertEqual(self.names(), ['kept'])
+
+    def test_task_submitting_a_task_runs_it_inline(self):
+        def nested(conn):
+            inner = self.writer.run(lambda inner_conn: inner_conn.execute(
+                "INSERT INTO items (name) VALUES ('inner')").lastrowid)
+            try:
+                self.writer.run(lambda inner_conn: inner_conn.execute(
+                    "INSERT INTO items (name) VALUES ('inner')"))  # UNIQUE violation
+            except Exception:
+                pass  # Only the failing nested task is undone
+            conn.execute("INSERT INTO items (name) VALUES ('outer')")
+            return inner
+
+        self.assertEqual(self.writer.submit(nested).result(timeout=5), 1)
+        self.assertEqual(self.names(), ['inner', 'outer'])
+        self.assertEqual(self.writer.stats()['transactions'], 1)
+
+    def test_tasks_run_in_submitter_context(self):
+        with progress_bus.bind('writer-test'):
+            self.writer.run(lambda conn: publish_event('records_persisted', saved=1))
+        self.assertEqual(progress_bus.history('writer-test')[-1]['type'], 'records_persisted')
+
+    def test_executemany_returns_rowcount(self):
+        count = self.writer.executemany("INSERT INTO items (name) VALUES (?)", [('x',), ('y',)]).result(timeout=5)
+        self.assertEqual(count, 2)
+
+    def test_stop_drains_queue(self):
+        futures = [self.writer.execute("INSERT INTO items (name) VALUES (?)", (str(i),)) for i in range(20)]
+        self.writer.stop()
+        self.assertTrue(all(f.done() for f in futures))
+        self.assertEqual(len(self.names()), 20)
+        self.assertFalse(self.writer.running)
+
+
+class TestUploadJobsThroughWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.tmp_dir = Path(self.tmp.name)
+        self.db_path = self.tmp_dir / 'arari_pro.db'
+        with patch.object(database, 'DB_PATH', self.db_path), \
+                patch('backup.BACKUP_DIR', self.tmp_dir / 'backups'), \
+                contextlib.redirect_stdout(io.StringIO()):
+            database.init_db()
+            self.conn = database.get_connection()
+        PayrollService(self.conn).bulk_upsert_employees(
+            EmployeeCreate(employee_id=str(i), name=f'Employee {i}', dispatch_company='Test Co',
+                           hourly_rate=1500, billing_rate=2000)
+            for i in range(1, 4)
+        )
+        self.writer = WriteQueue(self.db_path)
+        self.runner = JobRunner(max_workers=3, connect=self.connect, writer=self.writer)
+
+    def connect(self):
+        with patch.object(database, 'DB_PATH', self.db_path):
+            return database.get_connection()
+
+    def tearDown(self):
+        self.runner.shutdown(wait=True)
+        self.writer.stop()
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def test_concurrent_uploads_are_serialized_by_writer(self):
+        jobs = UploadJobService(self.conn)
+        job_ids = [
+            jobs.create_job('upload', str(write_csv(self.tmp_dir / f'{i}.csv', [str(i)])),
+                            filename=f'{i}.csv', file_ext='.csv')
+            for i in range(1, 4)
+        ]
+        with contextlib.redirect_stdout(io.StringIO()):
+            futures = [self.runner.submit(job_id) for job_id in job_ids]
+            results = [future.result(timeout=30) for future in futures]
+
+        self.assertEqual([r['saved_records'] for r in results], [1, 1, 1])
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM payroll_records").fetchone()[0], 3)
+        self.assertGreaterEqual(self.writer.stats()['tasks'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,192 @@
+import unittest
+import sys
+import os
+import contextlib
+import io
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+# Add api directory to path so we can import modules from parent directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import database
+from db_writer import WriteQueue
+from models import EmployeeCreate
+from services import PayrollService, employee_content_hash
+
+
+def make_employee(employee_id: str, **overrides) -> EmployeeCreate:
+    values = dict(
+        employee_id=employee_id,
+        name=f'Employee {employee_id}',
+        dispatch_company='Test Co',
+        hourly_rate=1500,
+        billing_rate=2000,
+        hire_date='2024-01-01',
+    )
+    values.update(overrides)
+    return EmployeeCreate(**values)
+
+
+class EmployeeDBTestCase(unittest.TestCase):
+    """Real schema (init_db) in a temporary database"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        tmp_dir = Path(self.tmp.name)
+        self.db_path = tmp_dir / 'arari_pro.db'
+        with patch.object(database, 'DB_PATH', self.db_path), \
+                patch('backup.BACKUP_DIR', tmp_dir / 'backups'), \
+                contextlib.redirect_stdout(io.StringIO()):
+            database.init_db()
+            self.conn = database.get_connection()
+        self.service = PayrollService(self.conn)
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmp.cleanup()
+
+
+class TestBulkUpsertEmployees(EmployeeDBTestCase):
+
+    def test_counts(self):
+        first = self.service.bulk_upsert_employees(make_employee(str(i)) for i in range(10))
+        self.assertEqual(first, {'added': 10, 'updated': 0, 'unchanged': 0})
+
+        changed = [make_employee(str(i), hourly_rate=1600 if i < 3 else 1500) for i in range(12)]
+        second = self.service.bulk_upsert_employees(changed)
+        self.assertEqual(second, {'added': 2, 'updated': 3, 'unchanged': 7})
+
+        self.assertEqual(len(self.service.get_employees()), 12)
+        self.assertEqual(self.service.get_employee('0')['hourly_rate'], 1600)
+        self.assertEqual(self.service.get_employee('5')['hourly_rate'], 1500)
+
+    def test_unchanged_rows_keep_updated_at(self):
+        self.service.bulk_upsert_employees([make_employee('1'), make_employee('2')])
+        self.conn.execute("UPDATE employees SET updated_at = '2000-01-01'")
+        self.conn.commit()
+
+        self.service.bulk_upsert_employees([make_employee('1'), make_employee('2', status='inactive')])
+
+        self.assertEqual(self.service.get_employee('1')['updated_at'], '2000-01-01')
+        self.assertNotEqual(self.service.get_employee('2')['updated_at'], '2000-01-01')
+
+    def test_spans_several_batches(self):
+        self.service.bulk_upsert_employees([make_employee('1')])
+        employees = (make_employee(str(i)) for i in range(10))
+        counts = self.service.bulk_upsert_employees(employees, batch_size=4)
+        self.assertEqual(counts, {'added': 9, 'updated': 0, 'unchanged': 1})
+
+    def test_failure_rolls_back(self):
+        employees = [make_employee('1'), make_employee('2')]
+        employees[1].name = None  # NOT NULL violation after validation
+        with self.assertRaises(Exception):
+            self.service.bulk_upsert_employees(employees)
+        self.assertEqual(self.service.get_employees(), [])
+
+
+
+class TestSyncEmployees(EmployeeDBTestCase):
+    """Change-detecting import: only new/changed employees are written"""
+
+    def test_only_changed_rows_written(self):
+        first = self.service.sync_employees(make_employee(str(i)) for i in range(10))
+        self.assertEqual((first['added'], first['updated'], first['unchanged']), (10, 0, 0))
+        self.conn.execute("UPDATE employees SET updated_at = '2000-01-01'")
+        self.conn.commit()
+
+        changes_before = self.conn.total_changes
+        incoming = [make_employee(str(i)) for i in range(10)]
+        incoming[3] = make_employee('3', billing_rate=2100, dispatch_company='New Co')
+        incoming.append(make_employee('10'))
+        result = self.service.sync_employees(incoming)
+
+        self.assertEqual(self.conn.total_changes - changes_before, 2)
+        self.assertEqual((result['added'], result['updated'], result['unchanged']), (1, 1, 9))
+        self.assertEqual(result['diff']['added'], ['10'])
+        self.assertEqual(result['diff']['changed'], {
+            '3': {'dispatch_company': ['Test Co', 'New Co'], 'billing_rate': [2000.0, 2100.0]},
+        })
+        stale = self.conn.execute(
+            "SELECT COUNT(*) FROM employees WHERE updated_at = '2000-01-01'"
+        ).fetchone()[0]
+        self.assertEqual(stale, 9)
+
+    def test_terminated(self):
+        self.service.sync_employees([make_employee('1'), make_employee('2'), make_employee('3')])
+        result = self.service.sync_employees([
+            make_employee('1', status='inactive'),
+            make_employee('2', termination_date='2025-01-31'),
+            make_employee('3', hourly_rate=1550),
+        ])
+        self.assertEqual(result['terminated'], 2)
+        self.assertEqual(result['diff']['terminated'], ['1', '2'])
+
+    def test_hash_stored_and_cleared_by_manual_edit(self):
+        employee = make_employee('1')
+        self.service.sync_employees([employee])
+        stored = self.conn.execute("SELECT content_hash FROM employees").fetchone()[0]
+        self.assertEqual(stored, employee_content_hash(employee.model_dump()))
+
+        self.service.update_employee('1', make_employee('1', hourly_rate=1700))
+        self.assertIsNone(self.conn.execute("SELECT content_hash FROM employees").fetchone()[0])
+
+        # The import restores the file's values even though its hash equals the old one
+        result = self.service.sync_employees([make_employee('1')])
+        self.assertEqual(result['diff']['changed'], {'1': {'hourly_rate': [1700.0, 1500]}})
+        self.assertEqual(self.service.get_employee('1')['hourly_rate'], 1500)
+
+    def test_rows_without_hash_compared_by_value(self):
+        self.service.create_employee(make_employee('1'))
+        result = self.service.sync_employees([make_employee('1')])
+        self.assertEqual((result['added'], result['updated'], result['unchanged']), (0, 0, 1))
+
+    def test_duplicate_ids_last_occurrence_wins(self):
+        result = self.service.sync_employees([make_employee('1'), make_employee('1')])
+        self.assertEqual((result['added'], result['unchanged']), (1, 0))
+
+        result = self.service.sync_employees([
+            make_employee('1', hourly_rate=1600), make_employee('1', hourly_rate=1700),
+            make_employee('2'), make_employee('2', hourly_rate=1800),
+        ])
+        self.assertEqual((result['added'], result['updated'], result['unchanged']), (1, 1, 0))
+        self.assertEqual(result['diff']['changed'], {'1': {'hourly_rate': [1500.0, 1700]}})
+        self.assertEqual(self.service.get_employee('1')['hourly_rate'], 1700)
+        self.assertEqual(self.service.get_employee('2')['hourly_rate'], 1800)
+
+        # A duplicate restoring the stored values is unchanged, and written back
+        result = self.service.sync_employees([
+            make_employee('1', hourly_rate=1600), make_employee('1', hourly_rate=1700),
+        ])
+        self.assertEqual((result['updated'], result['unchanged']), (0, 1))
+        self.assertEqual(result['diff']['changed'], {})
+        self.assertEqual(self.service.get_employee('1')['hourly_rate'], 1700)
+
+    def test_writer_gets_one_task_per_batch(self):
+        self.service.sync_employees([make_employee('1')])
+        writer = WriteQueue(self.db_path, linger=0)
+        try:
+            result = self.service.sync_employees(
+                (make_employee(str(i)) for i in range(8)), batch_size=3, writer=writer)
+            stats = writer.stats()
+        finally:
+            writer.stop()
+
+        # 7 new employees (1 unchanged) -> batches of 3, 3 and 1
+        self.assertEqual((result['added'], result['unchanged']), (7, 1))
+        self.assertEqual(stats['tasks'], 3)
+        self.assertEqual(len(self.service.get_employees()), 8)
+
+    def test_failure_rolls_back_every_batch(self):
+        self.service.sync_employees([make_employee('1')])
+        employees = [make_employee('1', hourly_rate=1600), make_employee('2')]
+        employees[1].name = None  # NOT NULL violation in the second batch
+        with self.assertRaises(Exception):
+            self.service.sync_employees(employees, batch_size=1)
+        self.assertEqual(self.service.get_employee('1')['hourly_rate'], 1500)
+        self.assertIsNone(self.service.get_employee('2'))
+
+
+if __name__ == '__main__':
+    unittest.main()
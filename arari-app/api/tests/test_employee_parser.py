@@ -0,0 +1,84 @@
+import unittest
+import sys
+import os
+import tempfile
+import types
+from io import BytesIO
+from pathlib import Path
+
+import openpyxl
+
+# Add api directory to path so we can import modules from parent directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.synthetic_payroll import build_employee_master, write_workbook
+from employee_parser import DBGenzaiXParser, batched
+
+
+class TestStreamingEmployeeParser(unittest.TestCase):
+    """iter_employees must match the full-load parser"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = write_workbook(build_employee_master(120), Path(self.tmp.name) / '社員台帳.xlsm')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_streaming_matches_full_load(self):
+        streamed, streamed_stats = DBGenzaiXParser().parse_employees(str(self.path))
+        full, full_stats = DBGenzaiXParser().parse_employees(str(self.path), streaming=False)
+
+        self.assertEqual(len(streamed), 120)
+        self.assertEqual([vars(e) for e in streamed], [vars(e) for e in full])
+        self.assertEqual(streamed_stats, full_stats)
+
+    def test_iter_employees_is_lazy(self):
+        parser = DBGenzaiXParser()
+        stats = parser.new_stats()
+        employees = parser.iter_employees(str(self.path), stats)
+
+        self.assertIsInstance(employees, types.GeneratorType)
+        self.assertEqual(stats['employees_found'], 0)
+
+        first = next(employees)
+        self.assertEqual(stats['employees_found'], 1)
+        self.assertTrue(first.employee_id)
+
+        remaining = sum(1 for _ in employees)
+        self.assertEqual(stats['employees_found'], remaining + 1)
+
+    def test_reads_bytes(self):
+        employees, _ = DBGenzaiXParser().parse_employees(self.path.read_bytes())
+        self.assertEqual(len(employees), 120)
+
+    def test_other_sheet_used_when_dbgenzaix_missing(self):
+        wb = openpyxl.load_workbook(self.path)
+        wb['DBGenzaiX'].title = '名簿'
+        buffer = BytesIO()
+        wb.save(buffer)
+
+        employees, _ = DBGenzaiXParser().parse_employees(buffer.getvalue())
+        self.assertEqual(len(employees), 120)
+
+    def test_header_beyond_scan_rows_not_found(self):
+        wb = openpyxl.load_workbook(self.path)
+        wb['DBGenzaiX'].insert_rows(1, amount=25)
+        buffer = BytesIO()
+        wb.save(buffer)
+
+        parser = DBGenzaiXParser()
+        employees, _ = parser.parse_employees(buffer.getvalue())
+        self.assertEqual(employees, [])
+        self.assertTrue(parser.errors)
+
+
+class TestBatched(unittest.TestCase):
+
+    def test_batches(self):
+        self.assertEqual(list(batched(range(7), 3)), [[0, 1, 2], [3, 4, 5], [6]])
+        self.assertEqual(list(batched([], 3)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,229 @@
+import unittest
+import sys
+import os
+import contextlib
+import io
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+import openpyxl
+
+# Add api directory to path so we can import modules from parent directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import database
+from db_writer import WriteQueue
+import ingestion
+import main
+import reset_db
+from folder_sync import SyncManifestService
+from models import EmployeeCreate
+from salary_parser import shutdown_parse_pool
+from services import PayrollService
+from template_manager import TemplateManager
+
+from test_salary_parser import SAMPLE_SHEETS, build_salary_workbook
+
+
+HEADER = ['社員番号', '期間', '出勤日数', '労働時間', '基本給', '総支給額', '差引支給額']
+
+
+def write_workbook(path: Path, employee_ids, period='2025年1月') -> Path:
+    """Generic payroll sheet (ExcelParser layout) saved as .xlsm"""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(HEADER)
+    for emp_id in employee_ids:
+        ws.append([emp_id, period, 20, 160, 240000, 260000, 210000])
+    wb.save(path)
+    return path
+
+
+class TestFolderSync(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.tmp_dir = Path(self.tmp.name)
+        with patch.object(database, 'DB_PATH', self.tmp_dir / 'arari_pro.db'), \
+                patch('backup.BACKUP_DIR', self.tmp_dir / 'backups'), \
+                contextlib.redirect_stdout(io.StringIO()):
+            database.init_db()
+            self.conn = database.get_connection()
+            self.templates = TemplateManager(db_path=self.tmp_dir / 'templates.db')
+
+        self.add_employees()
+        self.folder = self.tmp_dir / 'folder'
+        self.folder.mkdir()
+
+    def tearDown(self):
+        shutdown_parse_pool()
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def add_employees(self):
+        PayrollService(self.conn).bulk_upsert_employees(
+            EmployeeCreate(employee_id=str(i), name=f'Employee {i}', dispatch_company='Test Co',
+                           hourly_rate=1500, billing_rate=2000)
+            for i in range(1, 6)
+        )
+
+    def sync(self, workers=1, **kwargs):
+        with patch.object(ingestion, 'FOLDER_SYNC_WORKERS', workers), \
+                contextlib.redirect_stdout(io.StringIO()):
+            return ingestion.sync_folder(self.conn, self.folder, template_manager=self.templates, **kwargs)
+
+    def report(self, result, name):
+        return next(f for f in result['files'] if f['file'] == name)
+
+    def count_records(self):
+        return self.conn.execute("SELECT COUNT(*) FROM payroll_records").fetchone()[0]
+
+    def test_second_sync_skips_unchanged_files(self):
+        write_workbook(self.folder / 'a.xlsm', ['1', '2'])
+        write_workbook(self.folder / 'b.xlsm', ['3'], period='2025年2月')
+
+        first = self.sync()
+        self.assertEqual(first['files_processed'], 2)
+        self.assertEqual(first['files_unchanged'], 0)
+        self.assertEqual(first['total_records_saved'], 3)
+        self.assertEqual([f['status'] for f in first['files']], ['imported', 'imported'])
+
+        with patch('ingestion.hash_content') as hash_content:
+            second = self.sync()
+        hash_content.assert_not_called()  # Size and mtime matched: files not even read
+        self.assertEqual(second['files_processed'], 0)
+        self.assertEqual(second['files_unchanged'], 2)
+        self.assertEqual(self.count_records(), 3)
+
+    def test_touched_file_with_same_content_is_not_parsed(self):
+        path = write_workbook(self.folder / 'a.xlsm', ['1'])
+        self.sync()
+        os.utime(path, ns=(0, 1_000_000_000))
+
+        with patch('ingestion.parse_files') as parse_files:
+            parse_files.return_value = iter(())
+            result = self.sync()
+        self.assertEqual(result['files_unchanged'], 1)
+        self.assertEqual(parse_files.call_args[0][0], [])
+        entry = SyncManifestService(self.conn).get_entries()[str(path)]
+        self.assertEqual(entry['mtime_ns'], 1_000_000_000)
+
+    def test_reset_forgets_imported_files(self):
+        write_workbook(self.folder / 'a.xlsm', ['1', '2'])
+        self.sync()
+
+        resets = [
+            lambda: main.reset_database.__wrapped__(db=self.conn),
+            lambda: reset_db.reset_db(),
+        ]
+        for reset in resets:
+            with patch.object(reset_db, 'DB_PATH', str(self.tmp_dir / 'arari_pro.db')), \
+                    contextlib.redirect_stdout(io.StringIO()):
+                reset()
+            self.assertEqual(self.count_records(), 0)
+            self.assertEqual(SyncManifestService(self.conn).get_entries(), {})
+
+            self.add_employees()
+            result = self.sync()
+            self.assertEqual(result['files_processed'], 1)
+            self.assertEqual(self.count_records(), 2)
+
+    def test_modified_file_is_reimported(self):
+        write_workbook(self.folder / 'a.xlsm', ['1'])
+        path = write_workbook(self.folder / 'b.xlsm', ['2'])
+        self.sync()
+
+        write_workbook(path, ['2', '3', '4'])
+        result = self.sync()
+        self.assertEqual(result['files_processed'], 1)
+        self.assertEqual(self.report(result, 'a.xlsm')['status'], 'unchanged')
+        self.assertEqual(self.report(result, 'b.xlsm')['saved'], 3)
+        self.assertEqual(self.count_records(), 4)
+
+    def test_failed_and_partial_files_are_retried(self):
+        (self.folder / 'broken.xlsm').write_bytes(b'not a workbook')
+        write_workbook(self.folder / 'partial.xlsm', ['1', '99'])
+        write_workbook(self.folder / 'ok.xlsm', ['2'])
+
+        first = self.sync()
+        broken = self.report(first, 'broken.xlsm')
+        self.assertEqual(broken['status'], 'failed')
+        self.assertTrue(broken['error'])
+        self.assertEqual(self.report(first, 'partial.xlsm')['status'], 'partial')
+        self.assertEqual(self.report(first, 'partial.xlsm')['skipped'], 1)
+        self.assertEqual(first['files_failed'], 1)
+        self.assertEqual(self.report(first, 'ok.xlsm')['saved'], 1)
+
+        PayrollService(self.conn).bulk_upsert_employees([
+            EmployeeCreate(employee_id='99', name='Late hire', dispatch_company='Test Co',
+                           hourly_rate=1500, billing_rate=2000)
+        ])
+        second = self.sync()
+        self.assertEqual(self.report(second, 'ok.xlsm')['status'], 'unchanged')
+        self.assertEqual(self.report(second, 'broken.xlsm')['status'], 'failed')
+        self.assertEqual(self.report(second, 'partial.xlsm')['status'], 'imported')
+        self.assertEqual(self.count_records(), 3)
+
+    def test_sync_through_writer(self):
+        (self.folder / 'broken.xlsm').write_bytes(b'not a workbook')
+        write_workbook(self.folder / 'a.xlsm', ['1', '2'])
+        path = write_workbook(self.folder / 'b.xlsm', ['3'])
+        self.sync()
+        os.utime(path, ns=(0, 1_000_000_000))  # Touched: manifest update only
+
+        writer = WriteQueue(self.tmp_dir / 'arari_pro.db', linger=0)
+        try:
+            result = self.sync(force=False, writer=writer)
+            stats = writer.stats()
+        finally:
+            writer.stop()
+        # Touch of b.xlsm and the failure of broken.xlsm, both committed by the writer
+        self.assertEqual(stats['tasks'], 2)
+        self.assertEqual(self.report(result, 'broken.xlsm')['status'], 'failed')
+        self.assertEqual(SyncManifestService(self.conn).get_entries()[str(path)]['mtime_ns'], 1_000_000_000)
+
+        write_workbook(path, ['3', '4'])
+        writer = WriteQueue(self.tmp_dir / 'arari_pro.db', linger=0)
+        try:
+            result = self.sync(writer=writer)
+        finally:
+            writer.stop()
+        self.assertEqual(self.report(result, 'b.xlsm')['saved'], 2)
+        self.assertEqual(self.count_records(), 4)
+
+    def test_templates_saved_when_syncing_through_writer(self):
+        (self.folder / '給与明細.xlsm').write_bytes(build_salary_workbook(SAMPLE_SHEETS))
+        # Templates in the same database the writer holds the write lock on
+        with contextlib.redirect_stdout(io.StringIO()):
+            templates = TemplateManager(db_path=self.tmp_dir / 'arari_pro.db')
+        writer = WriteQueue(self.tmp_dir / 'arari_pro.db', linger=0)
+        try:
+            with patch.object(self, 'templates', templates):
+                result = self.sync(writer=writer)
+        finally:
+            writer.stop()
+        self.assertEqual(self.report(result, '給与明細.xlsm')['status'], 'partial')
+        saved = {t['factory_identifier'] for t in templates.list_templates()}
+        self.assertEqual(saved, set(SAMPLE_SHEETS))
+
+    def test_force_reimports_everything(self):
+        write_workbook(self.folder / 'a.xlsm', ['1'])
+        self.sync()
+        result = self.sync(force=True)
+        self.assertEqual(result['files_processed'], 1)
+        self.assertEqual(result['files_unchanged'], 0)
+
+    def test_parallel_sync_matches_sequential(self):
+        for i in range(1, 5):
+            write_workbook(self.folder / f'{i}.xlsm', [str(i)], period=f'2025年{i}月')
+
+        result = self.sync(workers=2)
+        self.assertEqual(result['files_processed'], 4)
+        self.assertEqual(result['total_records_saved'], 4)
+        self.assertEqual([f['file'] for f in result['files']], ['1.xlsm', '2.xlsm', '3.xlsm', '4.xlsm'])
+        self.assertEqual(self.count_records(), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
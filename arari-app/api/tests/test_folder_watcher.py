@@ -0,0 +1,178 @@
+import unittest
+import sys
+import os
+import contextlib
+import io
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+# Add api directory to path so we can import modules from parent directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import database
+from folder_sync import SyncManifestService
+from folder_watcher import FolderWatcher
+from models import EmployeeCreate
+from parse_cache import hash_content
+from services import PayrollService
+from upload_jobs import JobRunner, UploadJobService
+
+from test_upload_jobs import write_csv
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestFolderWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.tmp_dir = Path(self.tmp.name)
+        self.db_path = self.tmp_dir / 'arari_pro.db'
+        with patch.object(database, 'DB_PATH', self.db_path), \
+                patch('backup.BACKUP_DIR', self.tmp_dir / 'backups'), \
+                contextlib.redirect_stdout(io.StringIO()):
+            database.init_db()
+            self.conn = database.get_connection()
+
+        PayrollService(self.conn).bulk_upsert_employees(
+            EmployeeCreate(employee_id=str(i), name=f'Employee {i}', dispatch_company='Test Co',
+                           hourly_rate=1500, billing_rate=2000)
+            for i in range(1, 4)
+        )
+        self.folder = self.tmp_dir / 'inbox'
+        self.folder.mkdir()
+        self.clock = FakeClock()
+        self.runner = JobRunner(max_workers=2, connect=self.connect)
+        self.watcher = self.make_watcher()
+
+    def make_watcher(self, **kwargs):
+        options = dict(interval=1, debounce=10, max_in_flight=2, runner=self.runner,
+                       connect=self.connect, clock=self.clock)
+        options.update(kwargs)
+        return FolderWatcher(self.folder, **options)
+
+    def connect(self):
+        with patch.object(database, 'DB_PATH', self.db_path):
+            return database.get_connection()
+
+    def tearDown(self):
+        self.runner.shutdown(wait=True)
+        if self.watcher._conn is not None:
+            self.watcher._conn.close()
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def poll(self, watcher=None, advance=0.0):
+        self.clock.now += advance
+        with contextlib.redirect_stdout(io.StringIO()):
+            return (watcher or self.watcher).poll_once()
+
+    def wait_jobs(self, watcher=None):
+        watcher = watcher or self.watcher
+        with contextlib.redirect_stdout(io.StringIO()):
+            for future, *_ in list(watcher.in_flight.values()):
+                future.result(timeout=30)
+
+    def count_records(self):
+        return self.conn.execute("SELECT COUNT(*) FROM payroll_records").fetchone()[0]
+
+    def test_file_queued_once_stable(self):
+        path = write_csv(self.folder / 'payroll.csv', ['1', '2'])
+
+        self.assertEqual(self.poll(), [])             # First seen
+        self.assertEqual(self.poll(advance=5), [])    # Not stable long enough
+        self.assertEqual(self.poll(advance=6), [str(path)])
+
+        self.wait_jobs()
+        self.poll(advance=1)  # Reap: result stored in the manifest
+        self.assertEqual(self.count_records(), 2)
+        entry = SyncManifestService(self.conn).get_entries()[str(path)]
+        self.assertEqual(entry['last_status'], 'imported')
+        self.assertEqual(entry['records_saved'], 2)
+
+        self.assertEqual(self.poll(advance=60), [])   # Not imported again
+        self.assertEqual(self.watcher.counters['imported'], 1)
+
+    def test_growing_file_is_debounced(self):
+        path = write_csv(self.folder / 'payroll.csv', ['1'])
+        self.poll()
+        write_csv(path, ['1', '2'])  # Still being written
+        os.utime(path, ns=(0, 2_000_000_000))
+        self.assertEqual(self.poll(advance=11), [])
+        self.assertEqual(self.poll(advance=11), [str(path)])
+
+    def test_changed_file_is_reimported(self):
+        path = write_csv(self.folder / 'payroll.csv', ['1'])
+        self.poll()
+        self.poll(advance=11)
+        self.wait_jobs()
+        self.poll(advance=1)
+
+        write_csv(path, ['1', '2', '3'])
+        os.utime(path, ns=(0, 3_000_000_000))
+        self.poll(advance=1)
+        self.assertEqual(self.poll(advance=11), [str(path)])
+        self.wait_jobs()
+        self.poll(advance=1)
+        self.assertEqual(self.count_records(), 3)
+
+    def test_concurrency_is_bounded(self):
+        for i in range(5):
+            write_csv(self.folder / f'{i}.csv', ['1'])
+        self.poll()
+        with patch.object(self.runner, 'submit') as submit:
+            queued = self.poll(advance=11)
+        self.assertEqual(len(queued), 2)
+        self.assertEqual(submit.call_count, 2)
+
+    def test_lock_files_ignored_and_restart_skips_imported(self):
+        (self.folder / '~$payroll.xlsx').write_bytes(b'lock')
+        path = write_csv(self.folder / 'payroll.csv', ['1'])
+        self.poll()
+        self.poll(advance=11)
+        self.wait_jobs()
+        self.poll(advance=1)
+        jobs = UploadJobService(self.conn).get_jobs()
+        self.assertEqual([job['filename'] for job in jobs], ['payroll.csv'])
+
+        # New process: manifest says the file is already imported
+        restarted = self.make_watcher(debounce=0)
+        try:
+            self.assertEqual(self.poll(restarted), [])
+        finally:
+            restarted._conn.close()
+        self.assertTrue(path.exists())
+
+    def test_job_resumed_after_restart_is_not_queued_twice(self):
+        path = write_csv(self.folder / 'payroll.csv', ['1', '2'])
+        # Queued by the previous process, queued again by JobRunner.resume
+        UploadJobService(self.conn).create_job(
+            'upload', str(path), filename='payroll.csv', file_ext='.csv',
+            content_hash=hash_content(str(path)), size_bytes=path.stat().st_size,
+        )
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(self.runner.resume()['resumed'], 1)
+
+        restarted = self.make_watcher(debounce=0)
+        try:
+            self.assertEqual(self.poll(restarted), [])
+            self.wait_jobs(restarted)
+            self.poll(restarted)
+            entry = SyncManifestService(self.conn).get_entries()[str(path)]
+            self.assertEqual((entry['last_status'], entry['records_saved']), ('imported', 2))
+            self.assertEqual(self.poll(restarted), [])
+        finally:
+            restarted._conn.close()
+        self.assertEqual(len(UploadJobService(self.conn).get_jobs()), 1)
+        self.assertEqual(self.count_records(), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import unittest
+import sys
+import os
+import re
+
+# Add api directory to path so we can import modules from parent directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from label_matcher import normalize_label
+from salary_parser import SalaryStatementParser
+from template_manager import TemplateGenerator
+
+
+def _labels():
+    """Every known pattern plus variants (suffixes, spaces, brackets, payment words)"""
+    base = set()
+    for patterns in list(SalaryStatementParser.FIELD_PATTERNS.values()) + list(TemplateGenerator.FIELD_PATTERNS.values()):
+        base.update(patterns)
+    base.update(SalaryStatementParser.DYNAMIC_ZONE_LABELS)
+    base.update(SalaryStatementParser.NON_BILLABLE_ALLOWANCES)
+
+    labels = set(base)
+    for label in base:
+        labels.update({
+            label + '手当', label + '数', label[:-1] or label, label[1:] or label,
+            ' ' + label, label.replace(label[:1], label[:1] + '　', 1),
+            '前' + label + '後', label + '（非）',
+        })
+    labels.update(['給', '額', '加算金', 'X', '60h超残業手当', '残業', '深夜', '休日出勤手当', 'ID番号'])
+    return sorted(l.strip() for l in labels if l.strip())
+
+
+def _reference_prefix_fields(patterns, label):
+    """Original SalaryStatementParser._detect_field_positions loop"""
+    label_normalized = label.replace(' ', '').replace('　', '')
+    found = []
+    for field_name, field_patterns in patterns.items():
+        for pattern in field_patterns:
+            pattern_normalized = pattern.replace(' ', '').replace('　', '')
+            if label_normalized == pattern_normalized:
+                found.append(field_name)
+                break
+            elif label_normalized.startswith(pattern_normalized):
+                is_payment_field = any(ind in label_normalized for ind in ['手当', '代', '割増', '給'])
+                if '_hours' in field_name or '_days' in field_name:
+                    if not is_payment_field:
+                        found.append(field_name)
+                        break
+                else:
+                    found.append(field_name)
+                    break
+    return tuple(found)
+
+
+def _reference_substring_fields(patterns, label):
+    """Original TemplateGenerator.analyze_worksheet loop"""
+    label_normalized = label.replace(' ', '').replace('　', '')
+    found = []
+    for field_name, field_patterns in patterns.items():
+        for pattern in field_patterns:
+            pattern_normalized = pattern.replace(' ', '').replace('　', '')
+            if pattern_normalized in label_normalized or label_normalized == pattern_normalized:
+                found.append(field_name)
+                break
+    return tuple(found)
+
+
+def _reference_dynamic(labels, label):
+    """Original SalaryStatementParser._scan_dynamic_zone_for_employee loop"""
+    label_normalized = label.replace(' ', '').replace('　', '')
+    for known_label, category in labels.items():
+        if known_label in label_normalized or label_normalized in known_label:
+            return category
+    return None
+
+
+class TestLabelMatcher(unittest.TestCase):
+    """The compiled matcher must agree with the original nested loops"""
+
+    def setUp(self):
+        self.labels = _labels()
+
+    def test_parser_matches_reference(self):
+        cls = SalaryStatementParser
+        matcher = cls._label_matcher()
+        for label in self.labels:
+            match = matcher.match(label)
+            self.assertEqual(match.fields, _reference_prefix_fields(cls.FIELD_PATTERNS, label), label)
+            self.assertEqual(match.dynamic_category, _reference_dynamic(cls.DYNAMIC_ZONE_LABELS, label), label)
+            self.assertEqual(
+                match.is_allowance, any(re.match(p, label) for p in cls.ALLOWANCE_PATTERNS), label
+            )
+            self.assertEqual(match.is_non_billable, label in cls.NON_BILLABLE_ALLOWANCES, label)
+
+    def test_template_generator_matches_reference(self):
+        cls = TemplateGenerator
+        matcher = cls._label_matcher()
+        for label in self.labels:
+            match = matcher.match(label)
+            self.assertEqual(match.fields, _reference_substring_fields(cls.FIELD_PATTERNS, label), label)
+            self.assertIsNone(match.dynamic_category)
+            self.assertEqual(
+                match.is_allowance,
+                bool(re.match(r'.*手当.*', label) or re.match(r'.*割増.*', label)),
+                label,
+            )
+
+    def test_hours_field_rejects_payment_prefix(self):
+        match = SalaryStatementParser._label_matcher().match('残業時間手当')
+        self.assertNotIn('overtime_hours', match.fields)
+        self.assertIn('overtime_hours', SalaryStatementParser._label_matcher().match('残業時間(h)').fields)
+
+    def test_normalize_label(self):
+        self.assertEqual(normalize_label('通勤手当（非）'), '通勤手当')
+        self.assertEqual(normalize_label('基　本 給'), '基本給')
+        self.assertEqual(normalize_label('健康・厚生'), '健康厚生')
+
+
+if __name__ == '__main__':
+    unittest.main()
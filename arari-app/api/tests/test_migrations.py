@@ -0,0 +1,243 @@
+import unittest
+import sys
+import os
+import contextlib
+import io
+import sqlite3
+import tempfile
+import threading
+from pathlib import Path
+from unittest.mock import patch
+
+# Add api directory to path so we can import modules from parent directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import database
+from db_writer import WriteQueue
+from migrations import (
+    Backfill, BackfillWorker, Migration, latest_version, migrate, pending_backfills,
+    run_backfills, schema_state, schema_status,
+)
+
+
+def create_items(conn):
+    conn.execute("CREATE TABLE IF NOT EXISTS items (id INTEGER PRIMARY KEY, value INTEGER)")
+
+
+def add_doubled(conn):
+    try:
+        conn.execute("ALTER TABLE items ADD COLUMN doubled INTEGER")
+    except sqlite3.OperationalError:
+        pass  # Column already exists
+
+
+DOUBLED_BACKFILL = Backfill(
+    'items_doubled', 'items',
+    "UPDATE items SET doubled = value * 2 WHERE id > ? AND id <= ? AND doubled IS NULL"
+)
+
+MIGRATIONS = [
+    Migration(1, 'items', create_items),
+    Migration(2, 'items_doubled', add_doubled, backfills=(DOUBLED_BACKFILL,)),
+]
+
+
+class TestMigrate(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = Path(self.tmp.name) / 'test.db'
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.row_factory = sqlite3.Row
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def migrate(self, migrations=MIGRATIONS, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return migrate(self.conn, migrations, **kwargs)
+
+    def fill_items(self, count):
+        self.conn.executemany("INSERT INTO items (value) VALUES (?)", ((i,) for i in range(count)))
+        self.conn.commit()
+
+    def test_new_database(self):
+        self.assertEqual(schema_state(self.conn), (0, 0))
+        result = self.migrate()
+        self.assertEqual(result['applied'], [1, 2])
+        self.assertEqual(schema_state(self.conn), (2, 0))
+        self.assertEqual(latest_version(MIGRATIONS), 2)
+        # No rows to fill: the backfill is registered as done
+        self.assertEqual(schema_status(self.conn, MIGRATIONS)['backfills'][0]['status'], 'done')
+
+    def test_current_schema_is_skipped(self):
+        self.migrate()
+        calls = []
+        counted = [Migration(m.version, m.name, lambda conn, m=m: calls.append(m.version), m.backfills)
+                   for m in MIGRATIONS]
+        result = self.migrate(counted)
+        self.assertEqual((result['version'], result['applied']), (2, []))
+        self.assertEqual(calls, [])
+
+    def test_only_new_steps_run(self):
+        self.migrate(MIGRATIONS[:1])
+        self.fill_items(10)
+        self.assertEqual(schema_state(self.conn), (1, 0))
+
+        result = self.migrate()
+        self.assertEqual(result['applied'], [2])
+        self.assertEqual(result['backfills'], {'items_doubled': 10})
+        rows = self.conn.execute("SELECT value, doubled FROM items").fetchall()
+        self.assertTrue(all(row['doubled'] == row['value'] * 2 for row in rows))
+
+    def test_failed_step_is_retried(self):
+        def broken(conn):
+            raise sqlite3.OperationalError('disk I/O error')
+
+        result = self.migrate(MIGRATIONS[:1] + [Migration(2, 'broken', broken),
+                                                 Migration(3, 'after', create_items)])
+        self.assertEqual((result['version'], result['failed']), (1, 2))
+        self.assertEqual(schema_state(self.conn), (1, 0))
+
+        result = self.migrate()
+        self.assertEqual(result['applied'], [2])
+
+    def test_step_that_commits_is_still_rolled_back(self):
+        def half_done(conn):
+            conn.execute("CREATE TABLE partial (id INTEGER PRIMARY KEY)")
+            conn.commit()  # init_*_tables helpers commit internally
+            raise sqlite3.OperationalError('disk I/O error')
+
+        result = self.migrate(MIGRATIONS[:1] + [Migration(2, 'half_done', half_done)])
+        self.assertEqual((result['version'], result['failed']), (1, 2))
+        tables = {row[0] for row in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        self.assertIn('items', tables)
+        self.assertNotIn('partial', tables)
+
+    def test_concurrent_start_rereads_version_under_lock(self):
+        self.migrate(MIGRATIONS[:1])
+        other = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        other.execute("BEGIN IMMEDIATE")  # Another process is migrating
+
+        def finish_other():
+            add_doubled(other)
+            other.execute("INSERT INTO schema_version (version, name) VALUES (2, 'items_doubled')")
+            other.commit()
+
+        timer = threading.Timer(0.3, finish_other)
+        timer.start()
+        calls = []
+        counted = MIGRATIONS[:1] + [Migration(2, 'items_doubled', lambda conn: calls.append(2))]
+        try:
+            result = self.migrate(counted)
+        finally:
+            timer.join()
+            other.close()
+        self.assertEqual((result['version'], result['applied']), (2, []))
+        self.assertEqual(calls, [])
+
+    def test_backfill_resumes_after_interruption(self):
+        self.migrate(MIGRATIONS[:1])
+        self.fill_items(25)
+        self.migrate(run_backfills_now=False)
+        self.assertEqual(pending_backfills(self.conn), ['items_doubled'])
+
+        # Interrupted after two chunks: their rows are committed
+        self.assertEqual(run_backfills(self.conn, MIGRATIONS, chunk_size=10, max_chunks=2),
+                         {'items_doubled': 20})
+        filled = self.conn.execute("SELECT COUNT(*) FROM items WHERE doubled IS NOT NULL").fetchone()[0]
+        self.assertEqual(filled, 20)
+        self.assertEqual(schema_state(self.conn), (2, 1))
+
+        # Next start picks up at id 20
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(run_backfills(self.conn, MIGRATIONS, chunk_size=10), {'items_doubled': 25})
+        backfill = schema_status(self.conn, MIGRATIONS)['backfills'][0]
+        self.assertEqual((backfill['status'], backfill['chunks'], backfill['last_id']), ('done', 3, 25))
+        self.assertEqual(pending_backfills(self.conn), [])
+
+    def test_background_backfill_through_writer(self):
+        self.migrate(MIGRATIONS[:1])
+        self.fill_items(50)
+        self.migrate(run_backfills_now=False)
+        self.conn.commit()
+
+        writer = WriteQueue(self.db_path)
+        worker = BackfillWorker(MIGRATIONS, writer, chunk_size=7, pause=0)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                worker.start()
+                worker.join(30)
+        finally:
+            writer.stop()
+        self.assertFalse(worker.is_alive())
+        self.assertEqual(schema_state(self.conn), (2, 0))
+        missing = self.conn.execute("SELECT COUNT(*) FROM items WHERE doubled IS NULL").fetchone()[0]
+        self.assertEqual(missing, 0)
+
+
+class TestInitDb(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.tmp_dir = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def init_db(self):
+        output = io.StringIO()
+        with patch.object(database, 'DB_PATH', self.tmp_dir / 'arari_pro.db'), \
+                patch('backup.BACKUP_DIR', self.tmp_dir / 'backups'), \
+                contextlib.redirect_stdout(output):
+            database.init_db()
+        return output.getvalue()
+
+    def test_second_start_is_one_version_check(self):
+        first = self.init_db()
+        self.assertIn('[OK] Migration 1: baseline', first)
+        self.assertIn('[OK] Migration 2: payroll_period_key', first)
+
+        with patch.object(database, '_baseline') as baseline:
+            second = self.init_db()
+        baseline.assert_not_called()
+        self.assertIn(f'[OK] Schema is current (version {latest_version(database.MIGRATIONS)})', second)
+        self.assertNotIn('[OK] Migration', second)
+
+    def test_failing_module_does_not_block_migrations(self):
+        with patch('audit.init_audit_tables', side_effect=sqlite3.OperationalError('boom')):
+            output = self.init_db()
+        self.assertIn('[WARN] Audit tables: boom', output)
+        self.assertIn('[OK] Auth tables initialized', output)
+        with patch.object(database, 'DB_PATH', self.tmp_dir / 'arari_pro.db'):
+            conn = database.get_connection()
+        try:
+            self.assertEqual(schema_state(conn), (latest_version(database.MIGRATIONS), 0))
+            tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            self.assertIn('alerts', tables)
+        finally:
+            conn.close()
+
+    def test_legacy_database_is_migrated(self):
+        # Database created by init_db before schema_version existed
+        with patch.object(database, 'DB_PATH', self.tmp_dir / 'arari_pro.db'):
+            conn = database.get_connection()
+        with contextlib.redirect_stdout(io.StringIO()):
+            database._baseline(conn)
+        conn.close()
+
+        output = self.init_db()
+        self.assertIn('[OK] Migration 1: baseline', output)
+        with patch.object(database, 'DB_PATH', self.tmp_dir / 'arari_pro.db'):
+            conn = database.get_connection()
+        try:
+            self.assertEqual(schema_state(conn), (latest_version(database.MIGRATIONS), 0))
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(payroll_records)")}
+            self.assertIn('period_key', columns)
+        finally:
+            conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
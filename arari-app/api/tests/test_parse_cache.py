@@ -0,0 +1,97 @@
+import unittest
+import sys
+import os
+import tempfile
+import threading
+from pathlib import Path
+from unittest.mock import patch
+
+# Add api directory to path so we can import modules from parent directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from parse_cache import ParseCache, hash_content, parse_cached
+from salary_parser import SalaryStatementParser
+from template_manager import TemplateManager
+from tests.test_salary_parser import SAMPLE_SHEETS, build_salary_workbook
+
+
+class TestParseCache(unittest.TestCase):
+    """Identical files are parsed once; template changes invalidate entries"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = ParseCache(cache_dir=Path(self.tmp.name) / 'cache')
+        self.manager = TemplateManager(db_path=Path(self.tmp.name) / 'templates.db')
+        self.content = build_salary_workbook(SAMPLE_SHEETS)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _parse(self, cache=None):
+        parser = SalaryStatementParser(template_manager=self.manager, engine='streaming')
+        return parse_cached(parser, self.content, cache or self.cache)
+
+    def test_second_parse_is_cache_hit(self):
+        records, stats, hit = self._parse()
+        self.assertFalse(hit)
+
+        with patch.object(SalaryStatementParser, 'parse') as parse:
+            cached, cached_stats, hit = self._parse()
+            parse.assert_not_called()
+
+        self.assertTrue(hit)
+        self.assertEqual([r.model_dump() for r in cached], [r.model_dump() for r in records])
+        # Timing metrics belong to the original parse and are not cached
+        self.assertNotIn('metrics', cached_stats)
+        self.assertEqual(cached_stats, {k: v for k, v in stats.items() if k != 'metrics'})
+
+    def test_disk_tier_survives_new_instance(self):
+        records, _, _ = self._parse()
+
+        fresh = ParseCache(cache_dir=self.cache.cache_dir)
+        cached, _, hit = self._parse(fresh)
+
+        self.assertTrue(hit)
+        self.assertEqual(fresh.get_stats()['disk_hits'], 1)
+        self.assertEqual([r.model_dump() for r in cached], [r.model_dump() for r in records])
+
+    def test_template_change_invalidates(self):
+        self._parse()
+        self.manager.delete_template('プレテック', hard_delete=True)
+
+        _, _, hit = self._parse()
+        self.assertFalse(hit)
+
+    def test_memory_lru_respects_byte_cap(self):
+        records, _, _ = self._parse()
+        self.cache.clear()
+
+        small = ParseCache(cache_dir=Path(self.tmp.name) / 'small', max_memory_bytes=1500)
+        for i in range(5):
+            small.put(hash_content(bytes([i])), 'v', records)
+
+        stats = small.get_stats()
+        self.assertLessEqual(stats['memory_bytes'], 1500)
+        self.assertLess(stats['memory_entries'], 5)
+        self.assertGreater(stats['evictions'], 0)
+        self.assertEqual(stats['disk_entries'], 5)
+
+    def test_concurrent_writers_of_same_entry(self):
+        records, _, _ = self._parse()
+        key_hash = hash_content(self.content)
+        writers = [ParseCache(cache_dir=Path(self.tmp.name) / 'shared') for _ in range(8)]
+        threads = [threading.Thread(target=w.put, args=(key_hash, 'v', records)) for w in writers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        cache_dir = writers[0].cache_dir
+        self.assertEqual(list(cache_dir.glob('*.tmp')), [])
+        cached = ParseCache(cache_dir=cache_dir).get(key_hash, 'v')
+        self.assertIsNotNone(cached)
+        self.assertEqual([r.model_dump() for r in cached[0]], [r.model_dump() for r in records])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import unittest
+import sys
+import os
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+# Add api directory to path so we can import modules from parent directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from parse_metrics import STAGES, ParseMetricsService, SheetMetrics, init_parse_metrics_tables
+from salary_parser import SalaryStatementParser, shutdown_parse_pool
+from template_manager import TemplateManager
+from test_salary_parser import SAMPLE_SHEETS, build_salary_workbook
+
+
+class TestSheetMetrics(unittest.TestCase):
+
+    def test_nested_stages_are_exclusive(self):
+        metrics = SheetMetrics('テスト')
+        with metrics.stage('extraction'):
+            time.sleep(0.01)
+            with metrics.stage('dynamic_zone'):
+                time.sleep(0.02)
+
+        self.assertGreaterEqual(metrics.stages['dynamic_zone'], 0.02)
+        self.assertLess(metrics.stages['extraction'], 0.02)
+
+    def test_cells_counted_per_stage(self):
+        class View:
+            cells_read = 0
+
+        metrics = SheetMetrics('テスト')
+        metrics.view = View()
+        with metrics.stage('extraction'):
+            metrics.view.cells_read += 10
+            with metrics.stage('dynamic_zone'):
+                metrics.view.cells_read += 3
+
+        self.assertEqual(metrics.stage_cells['extraction'], 10)
+        self.assertEqual(metrics.stage_cells['dynamic_zone'], 3)
+        self.assertEqual(metrics.to_dict()['cells_read'], 13)
+
+
+class TestParserMetrics(unittest.TestCase):
+    """get_parsing_stats()['metrics'] describes every parsed sheet"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = build_salary_workbook(SAMPLE_SHEETS)
+        self.manager = TemplateManager(db_path=Path(self.tmp.name) / 'templates.db')
+
+    def tearDown(self):
+        shutdown_parse_pool()
+        self.tmp.cleanup()
+
+    def _metrics(self, **kwargs):
+        parser = SalaryStatementParser(template_manager=self.manager, **kwargs)
+        parser.parse(self.content)
+        return parser.get_parsing_stats()['metrics']
+
+    def test_stages_and_template_status(self):
+        first = self._metrics(engine='xml')
+        second = self._metrics(engine='xml')
+
+        self.assertEqual([s['sheet'] for s in first['sheets']], list(SAMPLE_SHEETS))
+        self.assertEqual({s['template'] for s in first['sheets']}, {'generated'})
+        self.assertEqual({s['template'] for s in second['sheets']}, {'hit'})
+        self.assertEqual((second['template_hits'], second['template_misses']), (2, 0))
+
+        self.assertEqual(set(second['stages']), set(STAGES))
+        self.assertEqual(second['employees_found'], 4)  # 000000 is found but not extracted
+        self.assertEqual(sum(s['records'] for s in second['sheets']), 3)
+        self.assertGreater(second['cells_read'], 0)
+        self.assertGreater(second['stages']['dynamic_zone'], 0)
+        self.assertGreater(second['stages']['extraction'], 0)
+        # Fingerprinting has its own stage (not counted as template lookup)
+        self.assertGreater(second['stages']['fingerprint'], 0)
+        self.assertLessEqual(second['total_seconds'], second['wall_seconds'] + 0.01)
+
+    def test_parallel_parse_merges_sheets(self):
+        self._metrics(engine='xml')  # Generate templates
+        metrics = self._metrics(engine='xml', max_workers=2)
+
+        self.assertTrue(metrics['parallel'])
+        self.assertEqual([s['sheet'] for s in metrics['sheets']], list(SAMPLE_SHEETS))
+        self.assertEqual(metrics['template_hits'], 2)
+
+
+class TestParseMetricsService(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.conn.row_factory = sqlite3.Row
+        init_parse_metrics_tables(self.conn)
+        self.tmp = tempfile.TemporaryDirectory()
+        manager = TemplateManager(db_path=Path(self.tmp.name) / 'templates.db')
+        parser = SalaryStatementParser(template_manager=manager, engine='xml')
+        parser.parse(build_salary_workbook(SAMPLE_SHEETS))
+        self.metrics = parser.get_parsing_stats()['metrics']
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def test_record_and_query(self):
+        service = ParseMetricsService(self.conn)
+        run_id = service.record_run(self.metrics, '給与明細.xlsm')
+        service.record_run(self.metrics, '給与明細.xlsm')
+        service.record_run({'sheets': []}, '給与明細.xlsm', cache_hit=True)
+
+        runs = service.get_runs()
+        self.assertEqual(len(runs), 3)
+        self.assertEqual(runs[0]['cache_hit'], 1)
+        self.assertEqual(set(runs[-1]['stage_seconds']), set(STAGES))
+
+        sheets = service.get_run_sheets(run_id)
+        self.assertEqual({s['sheet_name'] for s in sheets}, set(SAMPLE_SHEETS))
+
+        summary = {row['sheet_name']: row for row in service.get_sheet_summary()}
+        self.assertEqual(summary['プレテック']['runs'], 2)
+        self.assertEqual(summary['プレテック']['avg_employees'], 2)
+
+    def test_cache_hit_without_metrics(self):
+        # parse_cached strips the timings of cached results
+        service = ParseMetricsService(self.conn)
+        run_id = service.record_run(None, '給与明細.xlsm', cache_hit=True)
+        run = service.get_runs()[0]
+        self.assertEqual((run['id'], run['cache_hit'], run['sheet_count']), (run_id, 1, 0))
+        self.assertEqual(service.get_run_sheets(run_id), [])
+
+    def test_nothing_to_record(self):
+        self.assertIsNone(ParseMetricsService(self.conn).record_run(None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import unittest
+import sys
+import os
+import contextlib
+import io
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+# Add api directory to path so we can import modules from parent directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import database
+from models import EmployeeCreate, PayrollRecordCreate
+from services import PayrollService
+
+
+def make_record(employee_id: str, period: str = '2025年1月', **overrides) -> PayrollRecordCreate:
+    values = dict(
+        employee_id=employee_id,
+        period=period,
+        work_days=20,
+        work_hours=160,
+        overtime_hours=10,
+        night_hours=4,
+        base_salary=240000,
+        overtime_pay=18750,
+        gross_salary=280000,
+        social_insurance=14000,
+        welfare_pension=25000,
+        net_salary=220000,
+        other_allowances=5000,
+    )
+    values.update(overrides)
+    return PayrollRecordCreate(**values)
+
+
+class TestBulkCreatePayrollRecords(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        tmp_dir = Path(self.tmp.name)
+        with patch.object(database, 'DB_PATH', tmp_dir / 'arari_pro.db'), \
+                patch('backup.BACKUP_DIR', tmp_dir / 'backups'), \
+                contextlib.redirect_stdout(io.StringIO()):
+            database.init_db()
+            self.conn = database.get_connection()
+        self.service = PayrollService(self.conn)
+        self.service.bulk_upsert_employees(
+            EmployeeCreate(employee_id=str(i), name=f'Employee {i}', dispatch_company='Test Co',
+                           hourly_rate=1500, billing_rate=2000 + i * 100)
+            for i in range(5)
+        )
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def _rows(self):
+        cursor = self.conn.execute(
+            "SELECT * FROM payroll_records ORDER BY employee_id, period"
+        )
+        rows = []
+        for row in cursor.fetchall():
+            row = dict(row)
+            del row['id'], row['created_at']
+            rows.append(row)
+        return rows
+
+    def test_matches_create_payroll_record(self):
+        records = [make_record(str(i), overtime_hours=i) for i in range(5)]
+
+        for record in records:
+            self.service.create_payroll_record(record)
+        self.conn.commit()
+        expected = self._rows()
+
+        self.conn.execute("DELETE FROM payroll_records")
+        result = self.service.bulk_create_payroll_records(records)
+        self.conn.commit()
+
+        self.assertEqual(result, {'saved': 5, 'skipped': [], 'errors': []})
+        self.assertEqual(self._rows(), expected)
+
+    def test_unknown_employees_skipped(self):
+        records = [make_record('1'), make_record('999'), make_record('2')]
+        result = self.service.bulk_create_payroll_records(records)
+
+        self.assertEqual(result['saved'], 2)
+        self.assertEqual([(row['index'], row['employee_id']) for row in result['skipped']], [(1, '999')])
+        self.assertEqual(len(self._rows()), 2)
+
+    def test_row_errors_reported(self):
+        broken = make_record('3')
+        broken.gross_salary = None  # Fails while computing company costs
+        result = self.service.bulk_create_payroll_records([make_record('1'), broken])
+
+        self.assertEqual(result['saved'], 1)
+        self.assertEqual([(row['index'], row['employee_id']) for row in result['errors']], [(1, '3')])
+
+    def test_preloaded_map_and_rates(self):
+        employee_map = {'1': {'employee_id': '1', 'billing_rate': 3000, 'hourly_rate': 1500}}
+        rates = {'employment_insurance_rate': 0.01, 'workers_comp_rate': 0.0}
+
+        with patch.object(self.service, 'get_employees') as get_employees, \
+                patch.object(self.service, 'get_insurance_rates') as get_rates:
+            self.service.bulk_create_payroll_records([make_record('1')], employee_map, rates)
+        get_employees.assert_not_called()
+        get_rates.assert_not_called()
+
+        row = self._rows()[0]
+        self.assertEqual(row['company_employment_insurance'], 2800)
+        self.assertEqual(row['company_workers_comp'], 0)
+
+    def test_reimport_replaces(self):
+        self.service.bulk_create_payroll_records([make_record('1')])
+        self.service.bulk_create_payroll_records([make_record('1', gross_salary=300000)])
+        rows = self._rows()
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['gross_salary'], 300000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+import unittest
+import sys
+import os
+import contextlib
+import io
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+# Add api directory to path so we can import modules from parent directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import database
+from models import EmployeeCreate
+from migrations import run_backfills
+from periods import month_key, period_key, set_period_key_fallback
+from services import PayrollService
+
+from test_payroll_import import make_record
+
+# Text order puts 2025年9月 after 2025年10月
+PERIODS = ['2024年12月', '2025年9月', '2025年10月', '2025年11月']
+
+
+class TestPeriodKeyParsing(unittest.TestCase):
+
+    def test_period_key(self):
+        self.assertEqual(period_key('2025年1月'), 202501)
+        self.assertEqual(period_key('2025年01月'), 202501)
+        self.assertEqual(period_key('2025年12月'), 202512)
+        self.assertEqual(month_key(2025, 10), 202510)
+        for value in (None, '', '2025-01', '2025年', 'abc2025年1月'):
+            self.assertIsNone(period_key(value))
+
+
+class TestPeriodKeyQueries(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.tmp_dir = Path(self.tmp.name)
+        self.db_path = self.tmp_dir / 'arari_pro.db'
+        self.init_db()
+        with patch.object(database, 'DB_PATH', self.db_path):
+            self.conn = database.get_connection()
+        self.service = PayrollService(self.conn)
+        self.service.bulk_upsert_employees(
+            EmployeeCreate(employee_id=str(i), name=f'Employee {i}', dispatch_company=f'Co {i % 2}',
+                           hourly_rate=1500, billing_rate=2000 + i * 100)
+            for i in range(4)
+        )
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def init_db(self):
+        with patch.object(database, 'DB_PATH', self.db_path), \
+                patch('backup.BACKUP_DIR', self.tmp_dir / 'backups'), \
+                contextlib.redirect_stdout(io.StringIO()):
+            database.init_db()
+
+    def save_records(self):
+        # Hours grow with the month, so each period has a different profit
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.service.bulk_create_payroll_records(
+                make_record(str(i), period, work_hours=100 + n * 10)
+                for n, period in enumerate(PERIODS) for i in range(4)
+            )
+        self.conn.commit()
+
+    def keys(self):
+        return [row[0] for row in self.conn.execute(
+            "SELECT period_key FROM payroll_records ORDER BY id")]
+
+    def test_key_saved_with_records(self):
+        self.save_records()
+        self.assertEqual(set(self.keys()), {202412, 202509, 202510, 202511})
+
+    def test_chronological_order(self):
+        self.save_records()
+        self.assertEqual(self.service.get_available_periods(), PERIODS[::-1])
+        self.assertEqual(self.service.get_latest_period(), '2025年11月')
+
+        trend = self.service.get_profit_trend(3)
+        self.assertEqual([row['period'] for row in trend], PERIODS[1:])
+
+        stats = self.service.get_statistics()
+        self.assertEqual(stats['current_period'], '2025年11月')
+        self.assertEqual([row['period'] for row in stats['profit_trend']], PERIODS)
+        self.assertEqual({row['period'] for row in stats['recent_payrolls']}, {'2025年11月'})
+
+        monthly = self.service.get_monthly_statistics()
+        self.assertEqual([row['period'] for row in monthly], PERIODS[::-1])
+        self.assertEqual([row['period'] for row in self.service.get_monthly_statistics(2025, 9)],
+                         ['2025年9月'])
+
+        records = self.service.get_payroll_records()
+        self.assertEqual(records[0]['period'], '2025年11月')
+        self.assertEqual(records[-1]['period'], '2024年12月')
+        self.assertEqual(len(self.service.get_payroll_records(period='2025年09月')), 4)
+
+    def test_company_statistics_use_latest_month(self):
+        self.save_records()
+        latest = self.conn.execute(
+            "SELECT SUM(gross_profit) FROM payroll_records WHERE period = '2025年11月'"
+        ).fetchone()[0]
+        companies = self.service.get_company_statistics()
+        self.assertAlmostEqual(sum(c['total_monthly_profit'] for c in companies), latest)
+
+    def test_backfill_and_trigger(self):
+        self.save_records()
+        # Database saved before period_key existed (schema version 1)
+        self.conn.execute("UPDATE payroll_records SET period_key = NULL")
+        self.conn.execute("DELETE FROM schema_version WHERE version >= 2")
+        self.conn.execute("DELETE FROM schema_backfills")
+        self.conn.commit()
+        self.init_db()
+        self.assertNotIn(None, self.keys())
+        self.assertEqual(self.service.get_latest_period(), '2025年11月')
+
+        # Rows written without the key (raw SQL) get it from period
+        self.conn.execute(
+            "INSERT INTO payroll_records (employee_id, period) VALUES ('1', '2026年2月')")
+        self.conn.execute(
+            "UPDATE payroll_records SET period = '2023年3月' WHERE employee_id = '0' AND period = '2024年12月'")
+        self.assertEqual(self.service.get_latest_period(), '2026年2月')
+        self.assertEqual(self.service.get_available_periods()[-1], '2023年3月')
+
+    def test_periods_visible_during_background_backfill(self):
+        self.save_records()
+        self.conn.execute("UPDATE payroll_records SET period_key = NULL")
+        self.conn.execute("DELETE FROM schema_version WHERE version >= 2")
+        self.conn.execute("DELETE FROM schema_backfills")
+        self.conn.commit()
+        self.addCleanup(set_period_key_fallback, False)
+        with patch('migrations.BACKFILL_MODE', 'background'), patch('database.BACKFILL_MODE', 'background'):
+            self.init_db()
+        self.assertEqual(set(self.keys()), {None})  # BackfillWorker has not run yet
+
+        # Rows without a key are still listed, in month order
+        self.assertEqual(self.service.get_available_periods(), PERIODS[::-1])
+        self.assertEqual(self.service.get_latest_period(), '2025年11月')
+        self.assertEqual([row['period'] for row in self.service.get_profit_trend(3)], PERIODS[1:])
+        self.assertEqual(len(self.service.get_payroll_records(period='2025年09月')), 4)
+        self.assertEqual(self.service.get_statistics()['current_period'], '2025年11月')
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            run_backfills(self.conn, database.MIGRATIONS)
+        database.backfill_finished(database.PERIOD_KEY_BACKFILL)
+        self.assertNotIn(None, self.keys())
+        self.assertEqual(self.service.get_available_periods(), PERIODS[::-1])
+
+    def test_queries_use_period_key_indexes(self):
+        def plan(sql, params=()):
+            return ' '.join(row[-1] for row in self.conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+
+        latest = plan("SELECT period FROM payroll_records WHERE period_key IS NOT NULL "
+                      "ORDER BY period_key DESC LIMIT 1")
+        self.assertIn('idx_payroll_period_key', latest)
+        self.assertNotIn('TEMP B-TREE', latest)
+
+        history = plan("SELECT * FROM payroll_records WHERE employee_id = ? "
+                       "ORDER BY period_key DESC LIMIT 6", ('1',))
+        self.assertIn('idx_payroll_emp_period_key', history)
+        self.assertNotIn('TEMP B-TREE', history)
+
+
+if __name__ == '__main__':
+    unittest.main()
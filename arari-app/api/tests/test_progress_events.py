@@ -0,0 +1,153 @@
+import unittest
+import sys
+import os
+import asyncio
+import contextlib
+import io
+import sqlite3
+import tempfile
+import threading
+from pathlib import Path
+from unittest.mock import patch
+
+# Add api directory to path so we can import modules from parent directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import progress_events
+from benchmarks.synthetic_payroll import build_payroll_workbook
+from progress_events import ProgressBus, current_channel, progress_bus, publish_event
+from salary_parser import SalaryStatementParser
+from template_manager import TemplateManager
+
+
+class TestProgressBus(unittest.TestCase):
+
+    def setUp(self):
+        self.bus = ProgressBus()
+
+    def test_publish_without_channel_is_noop(self):
+        self.assertIsNone(current_channel())
+        publish_event('stage', stage='parse')  # Nothing bound: dropped
+
+    def test_bind_routes_events(self):
+        with patch.object(progress_events, 'progress_bus', self.bus):
+            with self.bus.bind('job-1'):
+                publish_event('records_parsed', count=3)
+            publish_event('records_parsed', count=4)
+
+        history = self.bus.history('job-1')
+        self.assertEqual([(e['type'], e['data']) for e in history], [('records_parsed', {'count': 3})])
+
+    def test_subscriber_gets_history_and_events_from_threads(self):
+        async def scenario():
+            self.bus.publish('job', 'stage', stage='parse', percent=5)
+            sub = self.bus.subscribe('job')
+
+            def worker():
+                for i in range(3):
+                    self.bus.publish('job', 'sheet_finished', sheet=f'S{i}')
+                self.bus.publish('job', 'done')
+
+            thread = threading.Thread(target=worker)
+            thread.start()
+            events = []
+            while True:
+                event = await sub.get(timeout=5)
+                self.assertIsNotNone(event)
+                events.append(event['type'])
+                if event['type'] == 'done':
+                    break
+            thread.join()
+            sub.close()
+            return events
+
+        events = asyncio.run(scenario())
+        self.assertEqual(events, ['stage', 'sheet_finished', 'sheet_finished', 'sheet_finished', 'done'])
+        self.assertTrue(self.bus.is_closed('job'))
+
+    def test_get_times_out(self):
+        async def scenario():
+            sub = self.bus.subscribe('idle')
+            return await sub.get(timeout=0.01)
+
+        self.assertIsNone(asyncio.run(scenario()))
+
+    def test_slow_subscriber_drops_oldest(self):
+        async def scenario():
+            with patch.object(progress_events, 'SUBSCRIBER_QUEUE_SIZE', 3):
+                sub = self.bus.subscribe('job')
+            for i in range(5):
+                self.bus.publish('job', 'records_parsed', count=i)
+            await asyncio.sleep(0)  # Let call_soon_threadsafe callbacks run
+            return [(await sub.get(timeout=1))['data']['count'] for _ in range(3)], sub.dropped
+
+        counts, dropped = asyncio.run(scenario())
+        self.assertEqual(counts, [2, 3, 4])
+        self.assertEqual(dropped, 2)
+
+    def test_unpublished_channels_expire(self):
+        async def scenario():
+            self.bus.subscribe('unknown').close()
+            open_sub = self.bus.subscribe('waiting')
+            self.bus.publish('job', 'done')
+
+            later = progress_events.time.time() + progress_events.CHANNEL_TTL + 1
+            with patch.object(progress_events.time, 'time', return_value=later):
+                self.bus.subscribe('next').close()
+            open_sub.close()
+
+        asyncio.run(scenario())
+        # 'waiting' still had a subscriber when the expiry ran
+        self.assertEqual(sorted(self.bus._channels), ['next', 'waiting'])
+
+    def test_warnings_capped(self):
+        with patch.object(progress_events, 'MAX_WARNINGS', 2):
+            for i in range(5):
+                self.bus.publish('job', 'warning', message=str(i))
+        self.assertEqual(len(self.bus.history('job')), 2)
+
+
+class TestPublishers(unittest.TestCase):
+    """The parser and PayrollService publish on the bound channel"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.manager = TemplateManager(db_path=Path(self.tmp.name) / 'templates.db')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_parser_sheet_events(self):
+        content = build_payroll_workbook(sheet_count=3, employees_per_sheet=2)
+        parser = SalaryStatementParser(template_manager=self.manager, max_workers=1)
+        with contextlib.redirect_stdout(io.StringIO()), progress_bus.bind('parse-test'):
+            records = parser.parse(content)
+
+        events = progress_bus.history('parse-test')
+        started = [e['data']['sheet'] for e in events if e['type'] == 'sheet_started']
+        finished = [e['data'] for e in events if e['type'] == 'sheet_finished']
+        self.assertEqual(len(started), 3)
+        self.assertEqual([f['sheet'] for f in finished], started)
+        self.assertEqual(sum(f['records'] for f in finished), len(records))
+
+    def test_bulk_create_publishes(self):
+        from services import PayrollService
+        from models import PayrollRecordCreate
+
+        conn = sqlite3.connect(':memory:')
+        conn.row_factory = sqlite3.Row
+        service = PayrollService(conn)
+        with progress_bus.bind('persist-test'):
+            service.bulk_create_payroll_records(
+                [PayrollRecordCreate(employee_id='404', period='2025年1月')], employee_map={}, rates={}
+            )
+        conn.close()
+
+        types = [(e['type'], e['data']) for e in progress_bus.history('persist-test')]
+        self.assertEqual(types[0][0], 'warning')
+        self.assertEqual(types[0][1]['employee_id'], '404')
+        self.assertEqual(types[1], ('records_persisted', {'saved': 0, 'skipped': 1, 'errors': 0}))
+
+
+if __name__ == '__main__':
+    unittest.main()
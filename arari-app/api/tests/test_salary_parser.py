@@ -0,0 +1,314 @@
+import unittest
+import sys
+import os
+import tempfile
+from datetime import datetime
+from io import BytesIO
+from pathlib import Path
+from unittest.mock import patch
+
+import openpyxl
+
+# Add api directory to path so we can import modules from parent directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from salary_parser import SalaryStatementParser, shutdown_parse_pool, _hours_with_minutes
+from template_manager import TemplateManager
+from xlsx_reader import XlsxFormatError
+
+
+def build_salary_workbook(sheets):
+    """
+    Build a minimal 給与明細 workbook using the real row layout.
+
+    Args:
+        sheets: Dict of sheet_name -> list of employee dicts
+
+    Returns:
+        Workbook bytes
+    """
+    wb = openpyxl.Workbook()
+    wb.active.title = '集計'
+
+    for sheet_name, employees in sheets.items():
+        ws = wb.create_sheet(sheet_name)
+        for idx, emp in enumerate(employees):
+            base = 1 + idx * SalaryStatementParser.EMPLOYEE_COLUMN_WIDTH
+            label, value, days, minutes = base + 2, base + 3, base + 5, base + 9
+
+            ws.cell(row=6, column=base + 9, value=emp['employee_id'])
+            ws.cell(row=7, column=base + 9, value=emp.get('name', 'テスト'))
+            ws.cell(row=10, column=base + 8, value=datetime(2025, 1, 31))
+
+            fixed_rows = [
+                (11, '出勤日数', None),
+                (12, '有給日数', emp.get('paid_leave_days', 0)),
+                (13, '労働時間', emp.get('work_hours', 160)),
+                (14, '残業時間', emp.get('overtime_hours', 0)),
+                (15, '深夜時間', emp.get('night_hours', 0)),
+                (16, '基本給', emp.get('base_salary', 200000)),
+                (17, '残業手当', emp.get('overtime_pay', 0)),
+                (18, '深夜手当', emp.get('night_pay', 0)),
+                (30, '総支給額', emp.get('gross_salary', 250000)),
+                (31, '健康保険', 10000),
+                (32, '厚生年金', 18000),
+                (33, '雇用保険', 1500),
+                (34, '所得税', 5000),
+                (35, '住民税', 7000),
+                (47, '差引支給額', 200000),
+            ]
+            for row, text, amount in fixed_rows:
+                ws.cell(row=row, column=label, value=text)
+                if amount is not None:
+                    ws.cell(row=row, column=value, value=amount)
+            ws.cell(row=11, column=days, value=emp.get('work_days', 20))
+            ws.cell(row=13, column=minutes, value=emp.get('work_minutes', 0))
+
+            # Dynamic zone (rows 20-29): allowances vary per employee
+            for offset, (text, amount, day_count) in enumerate(emp.get('dynamic', [])):
+                row = SalaryStatementParser.DYNAMIC_ZONE_START + offset
+                ws.cell(row=row, column=label, value=text)
+                ws.cell(row=row, column=value, value=amount)
+                if day_count is not None:
+                    ws.cell(row=row, column=days, value=day_count)
+
+    output = BytesIO()
+    wb.save(output)
+    return output.getvalue()
+
+
+SAMPLE_SHEETS = {
+    '高雄工業 本社': [
+        {
+            'employee_id': '250101', 'work_hours': 168, 'work_minutes': 30,
+            'overtime_hours': 73, 'base_salary': 201600,
+            'dynamic': [('有給休暇', 9600, 1), ('ガソリン代', 5000, None), ('皆勤手当', 3000, None)],
+        },
+        {
+            'employee_id': '250102', 'work_hours': 0, 'work_minutes': 10080,
+            'dynamic': [('60H過残業', 12000, None), ('通勤手当(非)', 4000, None), ('寮費', 30000, None)],
+        },
+    ],
+    'プレテック': [
+        {'employee_id': '250201', 'work_hours': 150.5, 'dynamic': [('特別手当', 2500, None)]},
+        {'employee_id': '000000'},
+    ],
+}
+
+
+class TestSalaryParserEngines(unittest.TestCase):
+    """The streaming engine must produce exactly the same records as openpyxl"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = build_salary_workbook(SAMPLE_SHEETS)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _parse(self, engine: str, db_name: str):
+        manager = TemplateManager(db_path=Path(self.tmp.name) / db_name)
+        parser = SalaryStatementParser(template_manager=manager, engine=engine)
+        return parser, parser.parse(self.content)
+
+    def test_streaming_matches_openpyxl(self):
+        _, expected = self._parse('openpyxl', 'full.db')
+        _, actual = self._parse('streaming', 'streaming.db')
+
+        self.assertEqual(len(expected), 3)
+        self.assertEqual([r.model_dump() for r in actual], [r.model_dump() for r in expected])
+
+    def test_xml_matches_openpyxl(self):
+        _, expected = self._parse('openpyxl', 'full.db')
+        _, actual = self._parse('xml', 'xml.db')
+
+        self.assertEqual([r.model_dump() for r in actual], [r.model_dump() for r in expected])
+
+    def test_xml_falls_back_to_openpyxl(self):
+        _, expected = self._parse('openpyxl', 'full.db')
+        with patch('salary_parser.XlsxGridReader', side_effect=XlsxFormatError('unsupported')):
+            _, actual = self._parse('xml', 'xml.db')
+
+        self.assertEqual([r.model_dump() for r in actual], [r.model_dump() for r in expected])
+
+    def test_streaming_extracts_hours_and_dynamic_zone(self):
+        _, records = self._parse('streaming', 'streaming.db')
+        by_id = {r.employee_id: r for r in records}
+
+        first = by_id['250101']
+        self.assertEqual(first.period, '2025年1月')
+        self.assertAlmostEqual(first.work_hours, 168.5)
+        self.assertEqual(first.overtime_hours, 60)
+        self.assertEqual(first.overtime_over_60h, 13)
+        self.assertEqual(first.paid_leave_amount, 9600)
+        self.assertEqual(first.paid_leave_days, 1)
+        self.assertEqual(first.non_billable_allowances, 5000)
+        self.assertEqual(first.other_allowances, 3000)
+
+        # プレテック format: total minutes only
+        second = by_id['250102']
+        self.assertAlmostEqual(second.work_hours, 168.0)
+        self.assertEqual(second.overtime_over_60h_pay, 12000)
+        self.assertEqual(second.rent_deduction, 30000)
+
+    def test_template_reuse_matches_detection(self):
+        manager = TemplateManager(db_path=Path(self.tmp.name) / 'shared.db')
+        first = SalaryStatementParser(template_manager=manager, engine='streaming')
+        detected = first.parse(self.content)
+        second = SalaryStatementParser(template_manager=manager, engine='streaming')
+        reused = second.parse(self.content)
+
+        self.assertEqual(sorted(second.templates_used), sorted(SAMPLE_SHEETS))
+        self.assertEqual([r.model_dump() for r in reused], [r.model_dump() for r in detected])
+
+    def test_unknown_engine_rejected(self):
+        with self.assertRaises(ValueError):
+            SalaryStatementParser(engine='pandas')
+
+
+class TestBlockExtraction(unittest.TestCase):
+    """Sheet-wide extraction must match the single-employee path"""
+
+    def test_hours_with_minutes_formats(self):
+        self.assertEqual(_hours_with_minutes(13.5, 45), 13.5)      # Already decimal
+        self.assertEqual(_hours_with_minutes(0, 10080), 168.0)     # Total minutes (プレテック)
+        self.assertEqual(_hours_with_minutes(73, 30), 73.5)        # HH:MM
+        self.assertEqual(_hours_with_minutes(73, -5), 73)          # Invalid minutes ignored
+
+    def test_block_matches_single_employee(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            parser = SalaryStatementParser(
+                template_manager=TemplateManager(db_path=Path(tmp) / 't.db'), engine='streaming'
+            )
+            wb = openpyxl.load_workbook(BytesIO(build_salary_workbook(SAMPLE_SHEETS)))
+            ws = wb['高雄工業 本社']
+            parser._detect_field_positions(ws)
+            cols = parser._detect_employee_columns(ws)
+
+            block = parser._extract_block(parser._sheet_view(ws), cols, ws.title)
+            single = [parser._extract_employee_data(ws, col, ws.title) for col in cols]
+
+        self.assertEqual(len(block), 2)
+        self.assertEqual([r.model_dump() for r in block], [r.model_dump() for r in single])
+
+
+class TestParallelParse(unittest.TestCase):
+    """Process-pool parsing must merge results in workbook order"""
+
+    @classmethod
+    def tearDownClass(cls):
+        shutdown_parse_pool()
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        sheets = dict(SAMPLE_SHEETS)
+        sheets['第三工場'] = [{'employee_id': '250301', 'dynamic': [('皆勤賞', 1000, None)]}]
+        self.content = build_salary_workbook(sheets)
+        self.sheet_names = list(sheets)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_parallel_matches_sequential(self):
+        sequential = SalaryStatementParser(
+            template_manager=TemplateManager(db_path=Path(self.tmp.name) / 'seq.db'), engine='streaming'
+        )
+        expected = sequential.parse(self.content)
+
+        manager = TemplateManager(db_path=Path(self.tmp.name) / 'par.db')
+        parallel = SalaryStatementParser(template_manager=manager, engine='streaming', max_workers=2)
+        actual = parallel.parse(self.content)
+
+        self.assertEqual([r.model_dump() for r in actual], [r.model_dump() for r in expected])
+        self.assertEqual(parallel.templates_generated, sequential.templates_generated)
+        self.assertEqual(parallel.templates_generated, self.sheet_names)
+
+        # Templates detected in workers are saved by the parent process
+        saved = {t['factory_identifier'] for t in manager.list_templates()}
+        self.assertEqual(saved, set(self.sheet_names))
+
+    def test_sheet_state_not_carried_over(self):
+        # Sheet 'A' has a template with its own column offsets; sheet 'B' has
+        # no labels (low detection confidence) and must use the defaults
+        # whether or not it is parsed right after 'A'
+        wb = openpyxl.load_workbook(BytesIO(build_salary_workbook({
+            'A': [{'employee_id': '250401'}],
+            'B': [{'employee_id': '250402', 'base_salary': 210000}],
+        })))
+        for row in range(11, 48):
+            wb['B'].cell(row=row, column=3).value = None
+        output = BytesIO()
+        wb.save(output)
+        content = output.getvalue()
+
+        def parse(db_name, max_workers):
+            manager = TemplateManager(db_path=Path(self.tmp.name) / db_name)
+            offsets = dict(SalaryStatementParser.COLUMN_OFFSETS, value=4)
+            manager.save_template('A', dict(SalaryStatementParser.FALLBACK_ROW_POSITIONS),
+                                  offsets, detection_confidence=0.9)
+            parser = SalaryStatementParser(template_manager=manager, engine='streaming',
+                                           max_workers=max_workers)
+            return parser.parse(content)
+
+        sequential = parse('seq.db', 1)
+        parallel = parse('par.db', 2)
+        self.assertEqual([r.model_dump() for r in parallel], [r.model_dump() for r in sequential])
+        by_id = {r.employee_id: r for r in sequential}
+        self.assertEqual(by_id['250402'].base_salary, 210000)
+
+
+class TestSheetFingerprints(unittest.TestCase):
+    """Unchanged sheets are skipped on re-upload"""
+
+    @classmethod
+    def tearDownClass(cls):
+        shutdown_parse_pool()
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.manager = TemplateManager(db_path=Path(self.tmp.name) / 'templates.db')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _parse(self, content, known=None, max_workers=1):
+        parser = SalaryStatementParser(
+            template_manager=self.manager, engine='streaming', max_workers=max_workers
+        )
+        parser.known_fingerprints = known or {}
+        records = parser.parse(content)
+        return records, parser.get_parsing_stats()
+
+    @staticmethod
+    def _known(stats):
+        return {s['sheet']: {s['fingerprint']} for s in stats['sheets'] if s['fingerprint']}
+
+    def test_reupload_skips_unchanged_sheets(self):
+        _, first = self._parse(build_salary_workbook(SAMPLE_SHEETS))
+        self.assertEqual(first['templates_generated'], list(SAMPLE_SHEETS))
+
+        # Same workbook: templates now exist, fingerprints must still match
+        records, second = self._parse(build_salary_workbook(SAMPLE_SHEETS), self._known(first))
+        self.assertEqual(records, [])
+        self.assertEqual(second['unchanged_sheets'], list(SAMPLE_SHEETS))
+
+        # Correct one sheet: only that sheet is parsed
+        corrected = dict(SAMPLE_SHEETS)
+        corrected['プレテック'] = [{'employee_id': '250201', 'work_hours': 151}]
+        records, third = self._parse(build_salary_workbook(corrected), self._known(first))
+        self.assertEqual([r.employee_id for r in records], ['250201'])
+        self.assertEqual(third['unchanged_sheets'], ['高雄工業 本社'])
+
+    def test_parallel_fingerprints_match_sequential(self):
+        content = build_salary_workbook(SAMPLE_SHEETS)
+        _, sequential = self._parse(content)
+
+        other = TemplateManager(db_path=Path(self.tmp.name) / 'parallel.db')
+        parser = SalaryStatementParser(template_manager=other, engine='streaming', max_workers=2)
+        parser.parse(content)
+
+        self.assertEqual(parser.get_parsing_stats()['sheets'], sequential['sheets'])
+
+
+if __name__ == '__main__':
+    unittest.main()
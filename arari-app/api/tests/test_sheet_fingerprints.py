@@ -0,0 +1,60 @@
+import unittest
+import sys
+import os
+import sqlite3
+
+# Add api directory to path so we can import modules from parent directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models import PayrollRecordCreate
+from sheet_fingerprints import SheetFingerprintService, init_fingerprint_tables, partition_by_sheet
+
+
+def _record(employee_id):
+    return PayrollRecordCreate(employee_id=employee_id, period='2025年1月')
+
+
+SHEETS = [
+    {'sheet': 'A', 'fingerprint': 'fa', 'records': 2, 'unchanged': False},
+    {'sheet': 'B', 'fingerprint': 'fb', 'records': 1, 'unchanged': False},
+    {'sheet': 'C', 'fingerprint': 'fc', 'records': 0, 'unchanged': True},
+]
+
+
+class TestSheetFingerprintService(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        init_fingerprint_tables(self.conn)
+        self.service = SheetFingerprintService(self.conn)
+        self.records = [_record('1'), _record('2'), _record('3')]
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_partition_drops_known_sheets(self):
+        kept, sheets, changed, unchanged = partition_by_sheet(self.records, SHEETS, {'B': {'fb'}})
+
+        self.assertEqual([r.employee_id for r in kept], ['1', '2'])
+        self.assertEqual(sheets, ['A', 'A'])
+        self.assertEqual(changed, ['A'])
+        self.assertEqual(unchanged, ['B', 'C'])
+
+    def test_only_complete_sheets_are_recorded(self):
+        kept, sheets, _, _ = partition_by_sheet(self.records, SHEETS, {})
+        stored = self.service.record_sheets(SHEETS, kept, sheets, incomplete_sheets={'B'})
+        self.conn.commit()
+
+        self.assertEqual(stored, 1)
+        self.assertEqual(self.service.get_known(), {'A': {'fa'}})
+        row = self.conn.execute("SELECT period, record_count FROM sheet_fingerprints").fetchone()
+        self.assertEqual(row, ('2025年1月', 2))
+
+    def test_clear(self):
+        self.service.record_sheets(SHEETS[:1], self.records[:2], ['A', 'A'], set())
+        self.assertEqual(self.service.clear(), 1)
+        self.assertEqual(self.service.get_known(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+import sys
+import os
+import sqlite3
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+# Add api directory to path so we can import modules from parent directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from template_manager import TemplateManager
+
+
+def _save(manager, factory_identifier, confidence=0.9):
+    return manager.save_template(
+        factory_identifier=factory_identifier,
+        field_positions={'employee_id': 6, 'gross_salary': 30},
+        column_offsets={'label': 2, 'value': 3},
+        detection_confidence=confidence,
+    )
+
+
+class TestTemplateIndex(unittest.TestCase):
+    """Template lookups are served from the process-wide index"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = Path(self.tmp.name) / 'templates.db'
+        self.manager = TemplateManager(db_path=self.db_path)
+        _save(self.manager, '高雄工業 本社')
+        _save(self.manager, 'プレテック')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_lookups_do_not_open_connections(self):
+        self.manager.find_matching_template('プレテック')  # Warm the index
+
+        other = TemplateManager(db_path=self.db_path)
+        with patch.object(TemplateManager, '_get_connection', side_effect=AssertionError('DB hit')):
+            self.assertEqual(other.find_matching_template('プレテック')['factory_identifier'], 'プレテック')
+            self.assertEqual(other.find_matching_template('高雄工業本社')['factory_identifier'], '高雄工業 本社')
+            self.assertEqual(other.find_matching_template('プレテック 2月分')['factory_identifier'], 'プレテック')
+            self.assertIsNone(other.find_matching_template('未登録工場'))
+
+    def test_save_and_delete_invalidate_index(self):
+        self.assertIsNone(self.manager.find_matching_template('新工場'))
+        generation = self.manager.generation
+
+        _save(self.manager, '新工場')
+        self.assertGreater(self.manager.generation, generation)
+        self.assertIsNotNone(self.manager.find_matching_template('新工場'))
+
+        self.manager.delete_template('新工場')
+        self.assertIsNone(self.manager.find_matching_template('新工場'))
+
+    def test_refresh_picks_up_external_writes(self):
+        self.manager.find_matching_template('プレテック')
+
+        conn = sqlite3.connect(str(self.db_path))
+        conn.execute(
+            "UPDATE factory_templates SET is_active = 0, updated_at = '2099-01-01' "
+            "WHERE factory_identifier = 'プレテック'"
+        )
+        conn.commit()
+        conn.close()
+
+        self.assertIsNotNone(self.manager.find_matching_template('プレテック'))  # Still cached
+        self.manager.refresh_if_changed()
+        self.assertIsNone(self.manager.find_matching_template('プレテック'))
+
+    def test_returned_templates_are_copies(self):
+        template = self.manager.load_template('プレテック')
+        template['field_positions']['employee_id'] = 99
+
+        self.assertEqual(self.manager.load_template('プレテック')['field_positions']['employee_id'], 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,185 @@
+import unittest
+import sys
+import os
+import contextlib
+import io
+import sqlite3
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+# Add api directory to path so we can import modules from parent directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import database
+from db_writer import WriteQueue
+from models import EmployeeCreate
+from services import PayrollService
+from upload_jobs import JobProgress, JobRunner, UploadJobService
+
+
+CSV_HEADER = '社員番号,期間,出勤日数,労働時間,基本給,総支給額,差引支給額\n'
+
+
+def write_csv(path: Path, employee_ids) -> Path:
+    lines = [f'{emp_id},2025年1月,20,160,240000,260000,210000\n' for emp_id in employee_ids]
+    path.write_text(CSV_HEADER + ''.join(lines), encoding='utf-8')
+    return path
+
+
+class TestUploadJobs(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.tmp_dir = Path(self.tmp.name)
+        self.db_path = self.tmp_dir / 'arari_pro.db'
+        with patch.object(database, 'DB_PATH', self.db_path), \
+                patch('backup.BACKUP_DIR', self.tmp_dir / 'backups'), \
+                contextlib.redirect_stdout(io.StringIO()):
+            database.init_db()
+            self.conn = database.get_connection()
+
+        PayrollService(self.conn).bulk_upsert_employees(
+            EmployeeCreate(employee_id=str(i), name=f'Employee {i}', dispatch_company='Test Co',
+                           hourly_rate=1500, billing_rate=2000)
+            for i in range(1, 4)
+        )
+        self.jobs = UploadJobService(self.conn)
+        self.runner = JobRunner(max_workers=2, connect=self.connect)
+
+    def connect(self):
+        with patch.object(database, 'DB_PATH', self.db_path):
+            return database.get_connection()
+
+    def tearDown(self):
+        self.runner.shutdown(wait=True)
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def run_job(self, job_id):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return self.runner.submit(job_id).result(timeout=30)
+
+    def test_upload_job_completes(self):
+        path = write_csv(self.tmp_dir / 'payroll.csv', ['1', '2', '3', '99'])
+        job_id = self.jobs.create_job('upload', str(path), filename='payroll.csv', file_ext='.csv',
+                                      delete_source=True)
+        self.assertEqual(self.jobs.get_job(job_id)['status'], 'queued')
+
+        result = self.run_job(job_id)
+        job = self.jobs.get_job(job_id)
+
+        self.assertEqual(job['status'], 'completed')
+        self.assertEqual(job['stage'], 'done')
+        self.assertEqual(job['percent'], 100)
+        self.assertEqual((job['records_total'], job['records_saved'], job['records_skipped']), (4, 3, 1))
+        self.assertEqual(job['result']['saved_records'], 3)
+        self.assertEqual(result['job_id'], job_id)
+        self.assertFalse(path.exists())  # Spooled source removed
+        count = self.conn.execute("SELECT COUNT(*) FROM payroll_records").fetchone()[0]
+        self.assertEqual(count, 3)
+
+    def test_job_with_writer_writes_nothing_on_its_connection(self):
+        def read_only():
+            conn = sqlite3.connect(f'file:{self.db_path}?mode=ro', uri=True, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            return conn
+
+        path = write_csv(self.tmp_dir / 'payroll.csv', ['1', '2'])
+        job_id = self.jobs.create_job('upload', str(path), filename='payroll.csv', file_ext='.csv')
+        writer = WriteQueue(self.db_path, linger=0)
+        runner = JobRunner(max_workers=1, connect=read_only, writer=writer)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = runner.submit(job_id).result(timeout=30)
+        finally:
+            runner.shutdown(wait=True)
+            writer.stop()
+
+        self.assertEqual(result['saved_records'], 2)
+        self.assertEqual(self.jobs.get_job(job_id)['status'], 'completed')
+
+    def test_failed_job_records_error(self):
+        path = self.tmp_dir / 'broken.xlsx'
+        path.write_bytes(b'not a workbook')
+        job_id = self.jobs.create_job('upload', str(path), filename='broken.xlsx', file_ext='.xlsx')
+
+        self.assertIsNone(self.run_job(job_id))
+        job = self.jobs.get_job(job_id)
+        self.assertEqual(job['status'], 'failed')
+        self.assertTrue(job['error'])
+        self.assertTrue(path.exists())  # Not a spooled upload: left alone
+
+    def test_folder_sync_job(self):
+        folder = self.tmp_dir / 'folder'
+        folder.mkdir()
+        job_id = self.jobs.create_job('folder_sync', str(folder))
+        self.run_job(job_id)
+
+        job = self.jobs.get_job(job_id)
+        self.assertEqual(job['status'], 'completed')
+        self.assertEqual(job['result']['files_found'], 0)
+
+    def test_resume_after_restart(self):
+        queued = self.jobs.create_job(
+            'upload', str(write_csv(self.tmp_dir / 'queued.csv', ['1'])), filename='queued.csv', file_ext='.csv'
+        )
+        missing = self.jobs.create_job('upload', str(self.tmp_dir / 'gone.csv'), filename='gone.csv',
+                                       file_ext='.csv')
+        running = self.jobs.create_job('upload', str(self.tmp_dir / 'x.csv'), filename='x.csv', file_ext='.csv')
+        self.jobs.update_job(running, status='running')
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            recovered = self.runner.resume()
+            self.runner.shutdown(wait=True)
+
+        self.assertEqual(recovered, {'resumed': 1, 'interrupted': 1})
+        self.assertEqual(self.jobs.get_job(queued)['status'], 'completed')
+        self.assertEqual(self.jobs.get_job(missing)['status'], 'failed')
+        self.assertEqual(self.jobs.get_job(running)['error'], 'Interrupted by server restart')
+
+    def test_job_runs_once(self):
+        path = write_csv(self.tmp_dir / 'payroll.csv', ['1'])
+        job_id = self.jobs.create_job('upload', str(path), filename='payroll.csv', file_ext='.csv')
+        self.run_job(job_id)
+        self.assertIsNone(self.run_job(job_id))  # Already completed
+
+    def test_job_is_claimed_once(self):
+        path = write_csv(self.tmp_dir / 'payroll.csv', ['1'])
+        job_id = self.jobs.create_job('upload', str(path), filename='payroll.csv', file_ext='.csv')
+        # Two processes (or a resume and a fresh submit) starting the same job
+        other = JobRunner(max_workers=1, connect=self.connect)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                futures = [self.runner.submit(job_id), other.submit(job_id)]
+                results = [future.result(timeout=30) for future in futures]
+        finally:
+            other.shutdown(wait=True)
+        self.assertEqual(sum(result is not None for result in results), 1)
+        self.assertFalse(self.jobs.claim_job(job_id))
+
+    def test_resume_deletes_spool_of_interrupted_upload(self):
+        spool = write_csv(self.tmp_dir / 'spooled.csv', ['1'])
+        job_id = self.jobs.create_job('upload', str(spool), filename='payroll.csv', file_ext='.csv',
+                                      delete_source=True)
+        self.jobs.update_job(job_id, status='running')
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(self.runner.resume(), {'resumed': 0, 'interrupted': 1})
+        self.assertFalse(spool.exists())
+        self.assertEqual(self.jobs.get_job(job_id)['status'], 'failed')
+
+    def test_progress_throttled(self):
+        job_id = self.jobs.create_job('upload', 'x.csv')
+        progress = JobProgress(self.jobs, job_id, interval=60)
+        with patch.object(self.jobs, 'update_job', wraps=self.jobs.update_job) as update:
+            progress('parse', 5)
+            progress('parse', 10)
+            progress('calculate', 60, records_total=10)
+        self.assertEqual(update.call_count, 2)
+        job = self.jobs.get_job(job_id)
+        self.assertEqual((job['stage'], job['percent'], job['records_total']), ('calculate', 60, 10))
+
+
+if __name__ == '__main__':
+    unittest.main()
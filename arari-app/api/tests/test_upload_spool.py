@@ -0,0 +1,110 @@
+import unittest
+import sys
+import os
+import asyncio
+import hashlib
+import tempfile
+from pathlib import Path
+
+# Add api directory to path so we can import modules from parent directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from parse_cache import ParseCache, hash_content, parse_cached
+from salary_parser import SalaryStatementParser
+from template_manager import TemplateManager
+from upload_spool import PeakMemoryMonitor, SpooledUpload, UploadTooLargeError
+from test_salary_parser import SAMPLE_SHEETS, build_salary_workbook
+
+
+class FakeUpload:
+    """Minimal UploadFile: async read(size) over bytes, records chunk sizes"""
+
+    def __init__(self, content: bytes):
+        self.content = content
+        self.position = 0
+        self.reads = []
+
+    async def read(self, size: int = -1) -> bytes:
+        end = len(self.content) if size < 0 else self.position + size
+        chunk = self.content[self.position:end]
+        self.position += len(chunk)
+        self.reads.append(size)
+        return chunk
+
+
+class TestSpooledUpload(unittest.TestCase):
+    """Uploads are received in chunks, hashed and size-checked incrementally"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = build_salary_workbook(SAMPLE_SHEETS)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _receive(self, upload, **kwargs):
+        return asyncio.run(SpooledUpload.from_upload(upload, suffix='.xlsm', spool_dir=self.tmp.name, **kwargs))
+
+    def test_spools_in_chunks(self):
+        upload = FakeUpload(self.content)
+        spool = self._receive(upload, chunk_size=1024)
+
+        self.assertTrue(all(size == 1024 for size in upload.reads))
+        self.assertEqual(spool.size, len(self.content))
+        self.assertEqual(spool.sha256, hashlib.sha256(self.content).hexdigest())
+        self.assertEqual(Path(spool.path).read_bytes(), self.content)
+        self.assertTrue(spool.path.endswith('.xlsm'))
+
+        spool.close()
+        self.assertFalse(os.path.exists(spool.path))
+
+    def test_size_limit_stops_copy(self):
+        upload = FakeUpload(self.content)
+        with self.assertRaises(UploadTooLargeError):
+            self._receive(upload, chunk_size=1024, max_bytes=2048)
+
+        # Stopped after the chunk that crossed the limit, spool removed
+        self.assertEqual(upload.position, 3072)
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    def test_parse_from_spool_path(self):
+        with self._receive(FakeUpload(self.content)) as spool:
+            manager = TemplateManager(db_path=Path(self.tmp.name) / 'templates.db')
+            from_path = SalaryStatementParser(template_manager=manager, engine='xml').parse(spool.path)
+            from_bytes = SalaryStatementParser(template_manager=manager, engine='xml').parse(self.content)
+            self.assertEqual(hash_content(spool.path), spool.sha256)
+
+        self.assertEqual(len(from_path), 3)
+        self.assertEqual([r.model_dump() for r in from_path], [r.model_dump() for r in from_bytes])
+
+    def test_parse_cached_with_known_hash(self):
+        cache = ParseCache(cache_dir=Path(self.tmp.name) / 'cache')
+        manager = TemplateManager(db_path=Path(self.tmp.name) / 'templates.db')
+        with self._receive(FakeUpload(self.content)) as spool:
+            hits = []
+            for _ in range(2):
+                parser = SalaryStatementParser(template_manager=manager, engine='xml')
+                records, _, hit = parse_cached(parser, spool.path, cache=cache, content_hash=spool.sha256)
+                hits.append(hit)
+
+        self.assertEqual(hits, [False, True])
+        self.assertEqual(len(records), 3)
+
+
+class TestPeakMemoryMonitor(unittest.TestCase):
+
+    def test_reports_peak(self):
+        monitor = PeakMemoryMonitor(interval=0.001).start()
+        buffer = bytearray(32 * 1024 * 1024)
+        stats = monitor.stop()
+        del buffer
+
+        self.assertEqual(
+            set(stats), {'baseline_rss_mb', 'peak_rss_mb', 'peak_memory_mb', 'elapsed_seconds'}
+        )
+        if stats['peak_rss_mb'] is not None:
+            self.assertGreaterEqual(stats['peak_memory_mb'], 16)
+
+
+if __name__ == '__main__':
+    unittest.main()
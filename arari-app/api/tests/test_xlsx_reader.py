@@ -0,0 +1,98 @@
+import unittest
+import sys
+import os
+from datetime import datetime, time
+from io import BytesIO
+
+import openpyxl
+from openpyxl.cell.rich_text import CellRichText, TextBlock
+from openpyxl.cell.text import InlineFont
+
+# Add api directory to path so we can import modules from parent directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sheet_grid import SheetGrid
+from xlsx_reader import XlsxFormatError, XlsxGridReader
+
+
+def build_mixed_workbook():
+    """Workbook with every value type the parser can meet"""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = '高雄工業 本社'
+    ws['A1'] = '給与明細'
+    ws['J6'] = '250101'
+    ws['I10'] = datetime(2025, 1, 31)
+    ws['I10'].number_format = 'yyyy"年"m"月"'
+    ws['D16'] = 201600
+    ws['D17'] = 1234.5
+    ws['D18'] = True
+    ws['D19'] = time(8, 30)
+    ws['C20'] = CellRichText('有給', TextBlock(InlineFont(b=True), '休暇'))
+    ws['D55'] = '=SUM(D16:D18)'  # No cached value
+    ws['C70'] = '備考'  # Beyond max_row
+
+    second = wb.create_sheet('プレテック')
+    second['AB3'] = 'x'
+    second['B2'] = '=1/0'
+
+    output = BytesIO()
+    wb.save(output)
+    return output.getvalue()
+
+
+class TestXlsxGridReader(unittest.TestCase):
+    """Grids from the XML reader must equal openpyxl read-only snapshots"""
+
+    def setUp(self):
+        self.content = build_mixed_workbook()
+
+    def test_grids_match_openpyxl(self):
+        reader = XlsxGridReader(self.content)
+        wb = openpyxl.load_workbook(BytesIO(self.content), read_only=True, data_only=True)
+        try:
+            self.assertEqual(reader.sheetnames, wb.sheetnames)
+            for name in wb.sheetnames:
+                expected = SheetGrid.from_worksheet(wb[name])
+                actual = reader[name]
+                self.assertEqual(actual.title, name)
+                for row in range(1, 61):
+                    for col in range(1, 40):
+                        self.assertEqual(actual.value(row, col), expected.value(row, col), (name, row, col))
+        finally:
+            reader.close()
+            wb.close()
+
+    def test_values(self):
+        reader = XlsxGridReader(self.content)
+        grid = reader['高雄工業 本社']
+        reader.close()
+
+        self.assertEqual(grid.value(10, 9), datetime(2025, 1, 31))
+        self.assertEqual(grid.value(16, 4), 201600)
+        self.assertEqual(grid.value(18, 4), True)
+        self.assertEqual(grid.value(20, 3), '有給休暇')
+        self.assertIsNone(grid.value(55, 4))
+        self.assertIsNone(grid.value(70, 3))
+
+    def test_max_row(self):
+        reader = XlsxGridReader(self.content, max_row=10)
+        grid = reader['高雄工業 本社']
+        reader.close()
+
+        self.assertEqual(grid.value(10, 9), datetime(2025, 1, 31))
+        self.assertIsNone(grid.value(16, 4))
+
+    def test_unknown_sheet(self):
+        reader = XlsxGridReader(self.content)
+        with self.assertRaises(KeyError):
+            reader['存在しない']
+        reader.close()
+
+    def test_not_a_workbook(self):
+        with self.assertRaises(XlsxFormatError):
+            XlsxGridReader(b'not a zip file')
+
+
+if __name__ == '__main__':
+    unittest.main()
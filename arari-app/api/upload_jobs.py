@@ -0,0 +1,337 @@
+"""
+UploadJobs - Background ingestion of uploads and folder syncs
+
+An upload is spooled to disk, a job row is stored and the request returns
+the job ID right away. A bounded pool of worker threads runs the
+parse → calculate → persist pipeline (ingestion.py) with its own database
+connection, and writes stage / percent / counts to the upload_jobs table,
+so GET /api/jobs/{job_id} can report progress while the API keeps serving
+dashboards.
+
+Job state lives in SQLite and survives restarts: on startup, queued jobs
+whose file is still on disk are queued again; jobs that were running are
+marked failed (their transaction was rolled back with the process).
+
+Configuration:
+- ARARI_UPLOAD_JOB_WORKERS: concurrent jobs (default 2)
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import ingestion
+from db_writer import WriteQueue, db_writer
+from progress_events import progress_bus
+
+
+UPLOAD_JOB_WORKERS = int(os.environ.get("ARARI_UPLOAD_JOB_WORKERS", "2"))
+
+# Progress updates are written at most this often (stage changes always are)
+PROGRESS_WRITE_INTERVAL = 0.5
+
+JOB_STATUSES = ('queued', 'running', 'completed', 'failed')
+
+
+def init_upload_job_tables(conn: sqlite3.Connection):
+    """Initialize upload job tables"""
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS upload_jobs (
+            id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            filename TEXT,
+            file_ext TEXT,
+            source_path TEXT,
+            content_hash TEXT,
+            size_bytes INTEGER DEFAULT 0,
+            delete_source INTEGER DEFAULT 0,
+            status TEXT NOT NULL DEFAULT 'queued',
+            stage TEXT DEFAULT 'queued',
+            percent REAL DEFAULT 0,
+            records_total INTEGER DEFAULT 0,
+            records_saved INTEGER DEFAULT 0,
+            records_skipped INTEGER DEFAULT 0,
+            error_count INTEGER DEFAULT 0,
+            error TEXT,
+            result JSON,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            started_at TEXT,
+            finished_at TEXT,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_upload_jobs_status
+        ON upload_jobs(status, created_at)
+    """)
+
+    conn.commit()
+
+
+class UploadJobService:
+    """
+    Service for upload job rows.
+
+    With a writer (db_writer.py), create_job and update_job are write tasks
+    (they return once committed); reads use conn.
+    """
+
+    COUNT_FIELDS = ('records_total', 'records_saved', 'records_skipped', 'error_count')
+
+    def __init__(self, conn: sqlite3.Connection, writer: Optional[WriteQueue] = None):
+        self.conn = conn
+        self.writer = writer
+
+    def create_job(self, kind: str, source_path: str, filename: Optional[str] = None,
+                   file_ext: Optional[str] = None, content_hash: Optional[str] = None,
+                   size_bytes: int = 0, delete_source: bool = False) -> str:
+        """
+        Store a queued job and commit.
+
+        Args:
+            kind: 'upload' (one file) or 'folder_sync'
+            source_path: Spooled file or folder
+            delete_source: Remove source_path when the job ends (spooled uploads)
+
+        Returns:
+            Job ID
+        """
+        if self.writer is not None:
+            return self.writer.run(lambda conn: UploadJobService(conn).create_job(
+                kind, source_path, filename=filename, file_ext=file_ext, content_hash=content_hash,
+                size_bytes=size_bytes, delete_source=delete_source,
+            ))
+        job_id = uuid.uuid4().hex
+        self.conn.execute("""
+            INSERT INTO upload_jobs
+                (id, kind, filename, file_ext, source_path, content_hash, size_bytes,
+                 delete_source, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            job_id, kind, filename, file_ext, source_path, content_hash, size_bytes,
+            int(delete_source), datetime.now().isoformat(), datetime.now().isoformat(),
+        ))
+        self.conn.commit()
+        return job_id
+
+    def update_job(self, job_id: str, **fields) -> None:
+        """Update columns of a job and commit (result is stored as JSON)"""
+        if self.writer is not None:
+            self.writer.run(lambda conn: UploadJobService(conn).update_job(job_id, **fields))
+            return
+        if 'result' in fields:
+            fields['result'] = json.dumps(fields['result'], ensure_ascii=False, default=str)
+        fields['updated_at'] = datetime.now().isoformat()
+        assignments = ', '.join(f"{name} = ?" for name in fields)
+        self.conn.execute(
+            f"UPDATE upload_jobs SET {assignments} WHERE id = ?",
+            (*fields.values(), job_id)
+        )
+        self.conn.commit()
+
+    def claim_job(self, job_id: str) -> bool:
+        """
+        Mark a queued job running and commit (one conditional UPDATE).
+
+        Returns:
+            False if the job is not queued (another worker or process took it)
+        """
+        if self.writer is not None:
+            return self.writer.run(lambda conn: UploadJobService(conn).claim_job(job_id))
+        now = datetime.now().isoformat()
+        cursor = self.conn.execute("""
+            UPDATE upload_jobs
+            SET status = 'running', stage = 'parse', started_at = ?, updated_at = ?
+            WHERE id = ? AND status = 'queued'
+        """, (now, now, job_id))
+        self.conn.commit()
+        return cursor.rowcount == 1
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        cursor = self.conn.execute("SELECT * FROM upload_jobs WHERE id = ?", (job_id,))
+        row = cursor.fetchone()
+        return self._to_dict(row) if row else None
+
+    def get_jobs(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent jobs (newest first)"""
+        query = "SELECT * FROM upload_jobs"
+        params: List[Any] = []
+        if status:
+            query += " WHERE status = ?"
+            params.append(status)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        return [self._to_dict(row) for row in self.conn.execute(query, params).fetchall()]
+
+    def _to_dict(self, row) -> Dict[str, Any]:
+        job = dict(row)
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        job['delete_source'] = bool(job['delete_source'])
+        return job
+
+
+class JobProgress:
+    """
+    Progress callback (see ingestion.ProgressCallback) writing to a job row.
+
+    Writes are throttled to PROGRESS_WRITE_INTERVAL, except stage changes.
+    """
+
+    def __init__(self, service: UploadJobService, job_id: str,
+                 interval: float = PROGRESS_WRITE_INTERVAL):
+        self.service = service
+        self.job_id = job_id
+        self.interval = interval
+        self.stage: Optional[str] = None
+        self.counts: Dict[str, int] = {}
+        self._last_write = 0.0
+
+    def __call__(self, stage: str, percent: float, **counts) -> None:
+        self.counts.update({k: v for k, v in counts.items() if k in UploadJobService.COUNT_FIELDS})
+        now = time.monotonic()
+        if stage == self.stage and now - self._last_write < self.interval:
+            return
+        self.stage = stage
+        self._last_write = now
+        self.service.update_job(self.job_id, stage=stage, percent=round(percent, 1), **self.counts)
+
+
+class JobRunner:
+    """
+    Bounded pool of worker threads running upload jobs.
+
+    Each job opens its own connection (database.get_connection), so a long
+    import never shares a connection with a request.
+    """
+
+    def __init__(self, max_workers: int = UPLOAD_JOB_WORKERS, connect=None, writer=None):
+        if connect is None:
+            from database import get_connection
+            connect = get_connection
+        self.connect = connect
+        # Single-writer queue (db_writer.py) for job rows and the records of uploaded files
+        self.writer = writer
+        self.max_workers = max(1, max_workers)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._futures: Dict[str, Future] = {}
+
+    def submit(self, job_id: str) -> Future:
+        """Queue a stored job"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix='upload-job'
+                )
+            future = self._executor.submit(self.run_job, job_id)
+            self._futures[job_id] = future
+        future.add_done_callback(lambda _: self._futures.pop(job_id, None))
+        return future
+
+    def run_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Run one job to completion (status, result and errors are stored)"""
+        conn = self.connect()
+        service = UploadJobService(conn, writer=self.writer)
+        if not service.claim_job(job_id):
+            conn.close()
+            return None
+
+        job = service.get_job(job_id)
+        progress = JobProgress(service, job_id)
+        try:
+            with progress_bus.bind(job_id):
+                result = self._ingest(conn, job, progress)
+            result['job_id'] = job_id
+            service.update_job(
+                job_id, status='completed', stage='done', percent=100, result=result,
+                finished_at=datetime.now().isoformat(), **progress.counts,
+            )
+            progress_bus.publish(job_id, 'done', **progress.counts)
+            return result
+        except Exception as e:
+            print(f"[ERROR] Upload job {job_id} failed: {e}")
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                pass
+            service.update_job(
+                job_id, status='failed', error=str(e), finished_at=datetime.now().isoformat()
+            )
+            progress_bus.publish(job_id, 'failed', error=str(e))
+            return None
+        finally:
+            if job['delete_source']:
+                try:
+                    os.unlink(job['source_path'])
+                except OSError:
+                    pass
+            conn.close()
+
+    def _ingest(self, conn: sqlite3.Connection, job: Dict[str, Any], progress: 'JobProgress') -> Dict[str, Any]:
+        if job['kind'] == 'folder_sync':
+            return ingestion.sync_folder(conn, Path(job['source_path']), progress=progress, writer=self.writer)
+        return ingestion.ingest_file(
+            conn, job['source_path'], job['filename'], job['file_ext'],
+            content_hash=job['content_hash'], progress=progress, writer=self.writer,
+        )
+
+    def resume(self) -> Dict[str, int]:
+        """
+        Recover jobs left by a previous process (called at startup).
+
+        Running jobs are marked failed (interrupted) and their spooled upload
+        is deleted; queued jobs are queued again if their file or folder
+        still exists.
+        """
+        conn = self.connect()
+        service = UploadJobService(conn, writer=self.writer)
+        resumed = interrupted = 0
+        try:
+            for job in service.get_jobs(status='running', limit=1000):
+                service.update_job(job['id'], status='failed', error='Interrupted by server restart',
+                                   finished_at=datetime.now().isoformat())
+                if job['delete_source']:
+                    try:
+                        os.unlink(job['source_path'])
+                    except OSError:
+                        pass
+                interrupted += 1
+
+            for job in service.get_jobs(status='queued', limit=1000):
+                if job['source_path'] and os.path.exists(job['source_path']):
+                    self.submit(job['id'])
+                    resumed += 1
+                else:
+                    service.update_job(job['id'], status='failed', error='Source file no longer exists',
+                                       finished_at=datetime.now().isoformat())
+        finally:
+            conn.close()
+        return {'resumed': resumed, 'interrupted': interrupted}
+
+    def active_jobs(self) -> int:
+        return len(self._futures)
+
+    def active_futures(self) -> Dict[str, Future]:
+        """Futures of the jobs queued or running in this process, by job ID"""
+        with self._lock:
+            return dict(self._futures)
+
+    def shutdown(self, wait: bool = False) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+                self._executor = None
+
+
+# Global job runner
+job_runner = JobRunner(writer=db_writer)
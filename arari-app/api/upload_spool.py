@@ -0,0 +1,216 @@
+"""
+UploadSpool - Memory-bounded handling of uploaded files
+Streams an upload to disk in chunks instead of `await file.read()`
+
+- The request body is copied chunk by chunk into a temp file, so at most
+  one chunk (UPLOAD_CHUNK_SIZE) of the upload is held in memory
+- SHA-256 and size are computed while copying; the size limit stops the copy
+  as soon as it is exceeded. It does not cut the HTTP transfer short:
+  Starlette has already received the whole multipart body (into its own
+  SpooledTemporaryFile) before the endpoint runs, so the limit bounds the
+  spool file and the work done on it, not the bytes read from the client
+- File writes run in the thread pool, so a slow disk does not block the
+  event loop
+- Parsers receive the spool file path (openpyxl / zipfile read it on demand,
+  process-pool workers open it themselves instead of getting pickled bytes)
+
+The spool is a named file (not tempfile.SpooledTemporaryFile) because the
+path is handed to the parsers and to worker processes.
+
+PeakMemoryMonitor samples the process RSS while an upload is processed and
+reports the peak in the upload response.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+try:
+    import psutil  # Optional: more accurate RSS on every platform
+except ImportError:
+    psutil = None
+
+
+# Upload configuration
+UPLOAD_CHUNK_SIZE = int(os.environ.get("ARARI_UPLOAD_CHUNK_KB", "1024")) * 1024
+MAX_UPLOAD_BYTES = int(os.environ.get("ARARI_MAX_UPLOAD_MB", "50")) * 1024 * 1024
+UPLOAD_SPOOL_DIR = os.environ.get("ARARI_UPLOAD_SPOOL_DIR") or None  # None = system temp dir
+
+# RSS sampling interval while an upload is processed (seconds)
+MEMORY_SAMPLE_INTERVAL = 0.02
+
+
+class UploadTooLargeError(ValueError):
+    """Upload exceeded the size limit (received = bytes copied before stopping)"""
+
+    def __init__(self, received: int, limit: int):
+        self.received = received
+        self.limit = limit
+        super().__init__(
+            f"File too large. Maximum size: {limit / 1024 / 1024:.0f}MB. "
+            f"Received more than {received / 1024 / 1024:.2f}MB"
+        )
+
+
+class SpooledUpload:
+    """
+    An uploaded file spooled to a temp file.
+
+    Usage:
+        with await SpooledUpload.from_upload(file, suffix='.xlsm') as upload:
+            records = parser.parse(upload.path)
+    """
+
+    def __init__(self, suffix: str = '', max_bytes: int = MAX_UPLOAD_BYTES,
+                 spool_dir: Optional[str] = UPLOAD_SPOOL_DIR):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.detached = False
+        self._digest = hashlib.sha256()
+        self._file = tempfile.NamedTemporaryFile(
+            prefix='arari_upload_', suffix=suffix, dir=spool_dir, delete=False
+        )
+        self.path = self._file.name
+
+    @classmethod
+    async def from_upload(cls, upload, suffix: str = '', max_bytes: int = MAX_UPLOAD_BYTES,
+                          chunk_size: int = UPLOAD_CHUNK_SIZE,
+                          spool_dir: Optional[str] = UPLOAD_SPOOL_DIR) -> 'SpooledUpload':
+        """
+        Receive a FastAPI UploadFile chunk by chunk.
+
+        Raises:
+            UploadTooLargeError: If the upload is larger than max_bytes
+                                 (the spool file is removed)
+        """
+        spool = await run_in_threadpool(cls, suffix=suffix, max_bytes=max_bytes, spool_dir=spool_dir)
+        try:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+                await run_in_threadpool(spool.write, chunk)
+            await run_in_threadpool(spool.finish)
+        except BaseException:
+            spool.close()  # Also on cancellation, so not awaited
+            raise
+        return spool
+
+    def write(self, chunk: bytes) -> None:
+        """Append a chunk (hash and size limit are updated incrementally)"""
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise UploadTooLargeError(self.size, self.max_bytes)
+        self._digest.update(chunk)
+        self._file.write(chunk)
+
+    def finish(self) -> None:
+        """Flush and close the spool file for writing (path stays readable)"""
+        self._file.close()
+
+    @property
+    def sha256(self) -> str:
+        """SHA-256 hex digest of everything written so far"""
+        return self._digest.hexdigest()
+
+    def read_bytes(self) -> bytes:
+        """Whole content in memory (only for parsers that need bytes)"""
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def detach(self) -> str:
+        """
+        Keep the spool file after close() (a background job takes it over
+        and deletes it when done). Returns its path.
+        """
+        self.detached = True
+        return self.path
+
+    def close(self) -> None:
+        """Delete the spool file (unless detached)"""
+        if not self._file.closed:
+            self._file.close()
+        if self.detached:
+            return
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self) -> 'SpooledUpload':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def current_rss() -> Optional[int]:
+    """Resident set size of this process in bytes (None if unavailable)"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class PeakMemoryMonitor:
+    """
+    Tracks the peak RSS of the API process between start() and stop().
+
+    RSS is process-wide: concurrent uploads see each other's allocations,
+    and parse worker processes are not included.
+    """
+
+    def __init__(self, interval: float = MEMORY_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.baseline: Optional[int] = None
+        self.peak: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started_at = 0.0
+        self._elapsed = 0.0
+
+    def start(self) -> 'PeakMemoryMonitor':
+        self._started_at = time.perf_counter()
+        self.baseline = self.peak = current_rss()
+        if self.baseline is not None:
+            self._thread = threading.Thread(target=self._sample, name='upload-memory-monitor', daemon=True)
+            self._thread.start()
+        return self
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._update()
+
+    def _update(self) -> None:
+        rss = current_rss()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+
+    def stop(self) -> Dict[str, Any]:
+        """Stop sampling and return the stats"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._update()
+        self._elapsed = time.perf_counter() - self._started_at
+        return self.get_stats()
+
+    def get_stats(self) -> Dict[str, Any]:
+        def mb(value: Optional[int]) -> Optional[float]:
+            return round(value / 1024 / 1024, 2) if value is not None else None
+
+        return {
+            'baseline_rss_mb': mb(self.baseline),
+            'peak_rss_mb': mb(self.peak),
+            'peak_memory_mb': mb(self.peak - self.baseline) if self.baseline is not None else None,
+            'elapsed_seconds': round(self._elapsed, 3),
+        }
@@ -0,0 +1,320 @@
+"""
+XLSX Reader - Direct XML reader for the first rows of every sheet
+==================================================================
+The salary parser only needs rows 1-60 of each sheet. openpyxl (even in
+read-only mode) still loads the full stylesheet into objects, wraps every
+cell and walks each sheet through its own reader.
+
+XlsxGridReader reads the .xlsx/.xlsm package directly:
+- xl/workbook.xml + rels:  sheet names -> worksheet XML paths, date epoch
+- xl/styles.xml:           only which cell styles are date / timedelta formats
+- xl/sharedStrings.xml:    parsed once per workbook
+- xl/worksheets/sheetN.xml: iterparsed until the last needed row, then closed
+
+Values are converted with the same rules openpyxl uses for data_only=True
+(numbers, shared/inline strings, booleans, errors, dates), so the resulting
+SheetGrid is identical to SheetGrid.from_worksheet().
+
+Anything the reader does not understand raises XlsxFormatError; the parser
+then falls back to openpyxl (see SalaryStatementParser._load_workbook).
+"""
+
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format, is_timedelta_format
+from openpyxl.utils.datetime import MAC_EPOCH, WINDOWS_EPOCH, from_ISO8601, from_excel
+
+from sheet_grid import DEFAULT_SNAPSHOT_ROWS, SPREADSHEET_NS, SheetGrid, WorkbookSource, workbook_input
+
+
+REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+PKG_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+
+_ROW = f'{{{SPREADSHEET_NS}}}row'
+_CELL = f'{{{SPREADSHEET_NS}}}c'
+_VALUE = f'{{{SPREADSHEET_NS}}}v'
+_INLINE = f'{{{SPREADSHEET_NS}}}is'
+_TEXT = f'{{{SPREADSHEET_NS}}}t'
+_RUN = f'{{{SPREADSHEET_NS}}}r'
+_SI = f'{{{SPREADSHEET_NS}}}si'
+
+# Cell types defined by SpreadsheetML (t attribute)
+KNOWN_CELL_TYPES = {'n', 's', 'b', 'str', 'd', 'e', 'inlineStr'}
+
+
+class XlsxFormatError(ValueError):
+    """The package uses something this reader does not handle"""
+
+
+def _cast_number(value: str) -> Any:
+    """Convert a numeric cell string to int or float (same rule as openpyxl)"""
+    if '.' in value or 'E' in value or 'e' in value:
+        return float(value)
+    return int(value)
+
+
+def _text_content(node: ET.Element) -> str:
+    """
+    Plain text of a <si> / <is> element.
+
+    Direct <t> plus the <t> of each rich-text run <r>; phonetic guides
+    (<rPh>, furigana) are ignored, like openpyxl does.
+    """
+    snippets = []
+    plain = node.find(_TEXT)
+    if plain is not None and plain.text:
+        snippets.append(plain.text)
+    for run in node.findall(_RUN):
+        text = run.find(_TEXT)
+        if text is not None and text.text:
+            snippets.append(text.text)
+    return ''.join(snippets)
+
+
+_column_cache: Dict[str, Tuple[int, int]] = {}
+
+
+def _split_reference(ref: str) -> Tuple[int, int]:
+    """'AB12' -> (12, 28)"""
+    cached = _column_cache.get(ref)
+    if cached is not None:
+        return cached
+
+    col = 0
+    for i, ch in enumerate(ref):
+        if 'A' <= ch <= 'Z':
+            col = col * 26 + (ord(ch) - 64)
+        else:
+            result = (int(ref[i:]), col)
+            break
+    else:
+        raise XlsxFormatError(f"Invalid cell reference '{ref}'")
+
+    if len(_column_cache) < 100000:
+        _column_cache[ref] = result
+    return result
+
+
+class XlsxGridReader:
+    """
+    Read-only access to the first rows of every sheet as SheetGrids.
+
+    Mirrors the small part of the openpyxl Workbook API the parser uses:
+    sheetnames, reader[name] and close().
+    """
+
+    def __init__(self, content: WorkbookSource, max_row: int = DEFAULT_SNAPSHOT_ROWS, fallback: bool = True):
+        """
+        Args:
+            content: Workbook bytes or path to the workbook file
+            max_row: Last row to read from every sheet
+            fallback: If True, sheets this reader cannot handle are read
+                      with openpyxl (read-only) instead of raising
+        """
+        self.max_row = max_row
+        self.fallback = fallback
+        self._content = content
+        self._fallback_wb = None
+        try:
+            self._zip = zipfile.ZipFile(workbook_input(content))
+        except (zipfile.BadZipFile, OSError) as e:
+            raise XlsxFormatError(f"Not an OOXML package: {e}")
+
+        try:
+            self._read_workbook()
+            self._read_styles()
+            self._read_shared_strings()
+        except XlsxFormatError:
+            self.close()
+            raise
+        except (KeyError, ET.ParseError, ValueError) as e:
+            self.close()
+            raise XlsxFormatError(f"Unsupported workbook structure: {e}")
+
+    # ==================== Workbook parts ====================
+
+    def _part_path(self, target: str) -> str:
+        """Resolve a relationship target (relative to xl/) to a zip member"""
+        if target.startswith('/'):
+            return target.lstrip('/')
+        return posixpath.normpath(posixpath.join('xl', target))
+
+    def _read_workbook(self) -> None:
+        rels = ET.fromstring(self._zip.read('xl/_rels/workbook.xml.rels'))
+        self._rels: Dict[str, Tuple[str, str]] = {}  # rId -> (type, path)
+        for rel in rels.iter(f'{{{PKG_REL_NS}}}Relationship'):
+            self._rels[rel.get('Id')] = (rel.get('Type', ''), self._part_path(rel.get('Target', '')))
+
+        root = ET.fromstring(self._zip.read('xl/workbook.xml'))
+
+        props = root.find(f'{{{SPREADSHEET_NS}}}workbookPr')
+        date1904 = props is not None and props.get('date1904') in ('1', 'true')
+        self.epoch = MAC_EPOCH if date1904 else WINDOWS_EPOCH
+
+        self.sheetnames: List[str] = []
+        self._sheet_paths: Dict[str, Optional[str]] = {}
+        sheets = root.find(f'{{{SPREADSHEET_NS}}}sheets')
+        for sheet in (sheets if sheets is not None else []):
+            name = sheet.get('name')
+            rel_type, path = self._rels.get(sheet.get(f'{{{REL_NS}}}id'), ('', None))
+            self.sheetnames.append(name)
+            # Chartsheets / dialog sheets etc. are left to openpyxl
+            self._sheet_paths[name] = path if rel_type.endswith('/worksheet') else None
+
+    def _find_part(self, rel_suffix: str, default: str) -> Optional[str]:
+        for rel_type, path in self._rels.values():
+            if rel_type.endswith(rel_suffix):
+                return path
+        return default if default in self._zip.namelist() else None
+
+    def _read_styles(self) -> None:
+        """Collect the style indexes that openpyxl would turn into dates"""
+        self._date_styles: Set[int] = set()
+        self._timedelta_styles: Set[int] = set()
+
+        path = self._find_part('/styles', 'xl/styles.xml')
+        if path is None:
+            return
+
+        root = ET.fromstring(self._zip.read(path))
+        custom = {}
+        num_fmts = root.find(f'{{{SPREADSHEET_NS}}}numFmts')
+        for fmt in (num_fmts if num_fmts is not None else []):
+            custom[int(fmt.get('numFmtId'))] = fmt.get('formatCode')
+
+        cell_xfs = root.find(f'{{{SPREADSHEET_NS}}}cellXfs')
+        for idx, xf in enumerate(cell_xfs if cell_xfs is not None else []):
+            fmt_id = int(xf.get('numFmtId', 0))
+            code = custom.get(fmt_id, BUILTIN_FORMATS.get(fmt_id))
+            if code is None:
+                continue
+            if is_date_format(code):
+                self._date_styles.add(idx)
+            if is_timedelta_format(code):
+                self._timedelta_styles.add(idx)
+
+    def _read_shared_strings(self) -> None:
+        self._strings: List[str] = []
+
+        path = self._find_part('/sharedStrings', 'xl/sharedStrings.xml')
+        if path is None:
+            return
+
+        with self._zip.open(path) as source:
+            for _, node in ET.iterparse(source):
+                if node.tag == _SI:
+                    self._strings.append(_text_content(node).replace('x005F_', ''))
+                    node.clear()
+
+    # ==================== Sheets ====================
+
+    def __getitem__(self, name: str) -> SheetGrid:
+        if name not in self._sheet_paths:
+            raise KeyError(f"Worksheet {name} does not exist.")
+
+        try:
+            path = self._sheet_paths[name]
+            if path is None:
+                raise XlsxFormatError(f"Sheet '{name}' is not a worksheet")
+            try:
+                return SheetGrid.from_rows(name, self._read_rows(path))
+            except (KeyError, ET.ParseError, ValueError, IndexError) as e:
+                if isinstance(e, XlsxFormatError):
+                    raise
+                raise XlsxFormatError(f"Unsupported sheet '{name}': {e}")
+
+        except XlsxFormatError as e:
+            if not self.fallback:
+                raise
+            print(f"[XlsxReader] {e} - reading sheet with openpyxl")
+            return SheetGrid.from_worksheet(self._openpyxl_workbook()[name], max_row=self.max_row)
+
+    def _openpyxl_workbook(self):
+        """openpyxl read-only workbook, opened on first fallback"""
+        if self._fallback_wb is None:
+            import openpyxl
+            self._fallback_wb = openpyxl.load_workbook(workbook_input(self._content), read_only=True, data_only=True)
+        return self._fallback_wb
+
+    def _read_rows(self, path: str) -> List[Tuple[Any, ...]]:
+        """Values of rows 1..max_row (stops reading at the first later row)"""
+        rows: Dict[int, Dict[int, Any]] = {}
+        row_counter = 0
+
+        with self._zip.open(path) as source:
+            for _, node in ET.iterparse(source):
+                if node.tag != _ROW:
+                    continue
+
+                ref = node.get('r')
+                row_counter = int(ref) if ref else row_counter + 1
+                if row_counter > self.max_row:
+                    break
+
+                cells = rows.setdefault(row_counter, {})
+                col_counter = 0
+                for cell in node.iter(_CELL):
+                    cell_ref = cell.get('r')
+                    if cell_ref:
+                        row_num, col_counter = _split_reference(cell_ref)
+                        if row_num != row_counter:
+                            raise XlsxFormatError(f"Cell {cell_ref} outside row {row_counter}")
+                    else:
+                        col_counter += 1
+                    cells[col_counter] = self._cell_value(cell)
+
+                node.clear()
+
+        last_row = max(rows, default=0)
+        grid = []
+        for row_num in range(1, last_row + 1):
+            cells = rows.get(row_num)
+            if not cells:
+                grid.append(())
+                continue
+            values = [None] * max(cells)
+            for col, value in cells.items():
+                values[col - 1] = value
+            grid.append(tuple(values))
+        return grid
+
+    def _cell_value(self, cell: ET.Element) -> Any:
+        """Cell value as openpyxl returns it with data_only=True"""
+        data_type = cell.get('t', 'n')
+        if data_type not in KNOWN_CELL_TYPES:
+            raise XlsxFormatError(f"Unknown cell type '{data_type}'")
+
+        if data_type == 'inlineStr':
+            inline = cell.find(_INLINE)
+            return _text_content(inline) if inline is not None else None
+
+        value = cell.findtext(_VALUE, None) or None
+        if value is None:
+            return None
+
+        if data_type == 'n':
+            value = _cast_number(value)
+            style = cell.get('s')
+            style_id = int(style) if style else 0
+            if style_id in self._date_styles:
+                try:
+                    return from_excel(value, self.epoch, timedelta=style_id in self._timedelta_styles)
+                except (OverflowError, ValueError):
+                    return '#VALUE!'
+            return value
+        if data_type == 's':
+            return self._strings[int(value)]
+        if data_type == 'b':
+            return bool(int(value))
+        if data_type == 'd':
+            return from_ISO8601(value)
+        return value  # 'str' (formula result) and 'e' (error code)
+
+    def close(self) -> None:
+        self._zip.close()
+        if self._fallback_wb is not None:
+            self._fallback_wb.close()
+            self._fallback_wb = None